@@ -0,0 +1 @@
+# This file makes 'benchmarks' a package so scripts can be run with `python -m benchmarks.<name>`.
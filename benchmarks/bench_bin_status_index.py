@@ -0,0 +1,61 @@
+"""
+Compares filtered bin listings served by the bin_manager status index with a
+full scan over every bin, at several inventory sizes.
+
+Run from the project root:
+    python -m benchmarks.bench_bin_status_index
+    python -m benchmarks.bench_bin_status_index --sizes 10000 100000 --full-ratio 0.02
+"""
+import argparse
+import random
+import timeit
+
+from waste_management import bin_manager, route_manager
+
+def _populate(bin_count: int, full_ratio: float, seed: int) -> None:
+    """Fills bin_manager with bin_count bins, about full_ratio of them FULL."""
+    bin_manager._reset_bins_data()
+    route_manager._routes.clear()
+    rng = random.Random(seed)
+    for i in range(bin_count):
+        bin_id = f"BIN_{i:07d}"
+        bin_manager.add_bin(bin_id, {'lat': 40.5 + rng.random() * 0.4, 'lon': -74.2 + rng.random() * 0.4}, 100.0)
+        if rng.random() < full_ratio:
+            bin_manager.update_bin_from_sensor_data(bin_id, 90.0)
+        else:
+            bin_manager.update_bin_from_sensor_data(bin_id, rng.uniform(0.0, 79.0))
+
+def _scan_full_bins():
+    """The pre-index implementation of list_bins(status_filter='FULL')."""
+    return [bin_obj for bin_obj in bin_manager._bins.values() if bin_obj.status == 'FULL']
+
+def _best_of(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def run(sizes, full_ratio: float, repeat: int, seed: int) -> None:
+    print(f"{'bins':>10} {'full':>8} {'scan ms':>10} {'index ms':>10} {'speedup':>8} {'route ms':>10}")
+    for size in sizes:
+        _populate(size, full_ratio, seed)
+        full_count = len(bin_manager.list_bins(status_filter='FULL'))
+        assert full_count == len(_scan_full_bins())
+
+        scan_s = _best_of(_scan_full_bins, repeat)
+        index_s = _best_of(lambda: bin_manager.list_bins(status_filter='FULL'), repeat)
+        route_s = _best_of(lambda: route_manager.generate_route("BENCH_TRUCK"), repeat)
+        route_manager._routes.clear()
+
+        print(f"{size:>10} {full_count:>8} {scan_s * 1000:>10.3f} {index_s * 1000:>10.3f} "
+              f"{scan_s / index_s if index_s else float('inf'):>7.1f}x {route_s * 1000:>10.3f}")
+    bin_manager._reset_bins_data()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--full-ratio', type=float, default=0.01, help="Fraction of bins that are FULL.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.sizes, args.full_ratio, args.repeat, args.seed)
+
+if __name__ == '__main__':
+    main()
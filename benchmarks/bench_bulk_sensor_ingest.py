@@ -0,0 +1,65 @@
+"""
+Compares sensor ingest throughput of one `PUT /bins/<id>/sensor_data` request per
+reading with the batched `POST /bins/sensor_data:batch` endpoint, using Flask's
+test client so that request parsing and response serialization are included.
+
+Run from the project root:
+    python -m benchmarks.bench_bulk_sensor_ingest
+    python -m benchmarks.bench_bulk_sensor_ingest --bins 5000 --batch-size 2000
+"""
+import argparse
+import json
+import random
+import time
+
+from waste_management import bin_manager
+from waste_management.api import app
+
+def _readings(bin_ids, rng):
+    return [{"bin_id": bin_id, "fill_level": rng.uniform(0.0, 100.0)} for bin_id in bin_ids]
+
+def run(bin_count: int, batch_size: int, seed: int) -> None:
+    rng = random.Random(seed)
+    bin_manager._reset_bins_data()
+    bin_ids = [f"BIN_{i:06d}" for i in range(bin_count)]
+    for bin_id in bin_ids:
+        bin_manager.add_bin(bin_id, {'lat': 40.5 + rng.random() * 0.4, 'lon': -74.2 + rng.random() * 0.4}, 100.0)
+
+    client = app.test_client()
+
+    readings = _readings(bin_ids, rng)
+    start = time.perf_counter()
+    for reading in readings:
+        client.put(f"/bins/{reading['bin_id']}/sensor_data", json={"fill_level": reading["fill_level"]})
+    single_s = time.perf_counter() - start
+
+    readings = _readings(bin_ids, rng)
+    start = time.perf_counter()
+    for offset in range(0, len(readings), batch_size):
+        client.post('/bins/sensor_data:batch', json=readings[offset:offset + batch_size])
+    batch_s = time.perf_counter() - start
+
+    ndjson_bodies = [
+        "\n".join(json.dumps(r) for r in readings[offset:offset + batch_size])
+        for offset in range(0, len(readings), batch_size)
+    ]
+    start = time.perf_counter()
+    for body in ndjson_bodies:
+        client.post('/bins/sensor_data:batch', data=body, content_type='application/x-ndjson')
+    ndjson_s = time.perf_counter() - start
+
+    print(f"{'mode':<22} {'readings/s':>12} {'speedup':>8}")
+    for label, elapsed in (("per-request PUT", single_s), (f"batch JSON x{batch_size}", batch_s), (f"batch NDJSON x{batch_size}", ndjson_s)):
+        print(f"{label:<22} {bin_count / elapsed:>12,.0f} {single_s / elapsed:>7.1f}x")
+    bin_manager._reset_bins_data()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bins', type=int, default=5_000, help="Number of bins, each receiving one reading per mode.")
+    parser.add_argument('--batch-size', type=int, default=1_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.bins, args.batch_size, args.seed)
+
+if __name__ == '__main__':
+    main()
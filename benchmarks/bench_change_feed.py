@@ -0,0 +1,82 @@
+"""
+Measures the change feed behind the SSE endpoints (`GET /events`): the cost a sensor update
+pays to publish, with and without listening clients, and the cost of fanning a burst of bin
+updates out to many clients, compared with every client re-polling `GET /bins`.
+
+Clients are simulated by their cursors, as the SSE stream does it (coalesce, then send the
+shared encoded messages), so the numbers exclude socket I/O.
+
+Run from the project root:
+    python -m benchmarks.bench_change_feed
+    python -m benchmarks.bench_change_feed --bins 50000 --clients 5000 --updates 20000
+"""
+import argparse
+import random
+import time
+
+from common import change_feed
+from waste_management import bin_manager
+from waste_management.api import app
+from waste_management.models import trash_bin_to_dict
+from waste_management.storage import BIN_RECORD
+
+def _update_us(bin_ids, rng, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        bin_manager.update_bin_from_sensor_data(rng.choice(bin_ids), rng.random() * 100.0)
+    return (time.perf_counter() - start) * 1e6 / count
+
+def run(bin_count: int, client_count: int, update_count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    bin_manager._reset_bins_data()
+    bin_ids = [f"BIN_{i:07d}" for i in range(bin_count)]
+    for bin_id in bin_ids:
+        bin_manager.add_bin(bin_id, {'lat': 40.5 + rng.random() * 0.4, 'lon': -74.2 + rng.random() * 0.4}, 100.0)
+    feed = change_feed.get_feed('waste')
+
+    idle_us = _update_us(bin_ids, rng, update_count)
+    feed.subscribe()  # Stands in for the connected clients; publishing does not depend on how many
+    cursor = feed.sequence
+    listened_us = _update_us(bin_ids, rng, update_count)
+    print(f"bins={bin_count:,} clients={client_count:,} burst={update_count:,} updates")
+    print(f"sensor update, no clients:     {idle_us:8.2f} us")
+    print(f"sensor update, clients:        {listened_us:8.2f} us")
+
+    with app.app_context():
+        dumps = app.json.dumps
+        start = time.perf_counter()
+        sent_bytes = 0
+        for _ in range(client_count):
+            _, changes = feed.changes_since(cursor)
+            messages = []
+            for change in change_feed._coalesce(changes):
+                if change.message is None:  # Encoded by the first client, shared by the rest
+                    change.message = (f"id: {feed.epoch}.{change.sequence}\nevent: {BIN_RECORD}\n"
+                                      f"data: {dumps(trash_bin_to_dict(change.entity))}\n\n")
+                messages.append(change.message)
+            sent_bytes += len(''.join(messages))
+        feed_s = time.perf_counter() - start
+
+        poll_clients = max(1, client_count // 100)  # Full listings are slow; time a sample and scale
+        start = time.perf_counter()
+        for _ in range(poll_clients):
+            poll_bytes = len(app.json.response([trash_bin_to_dict(b) for b in bin_manager.list_bins()]).get_data())
+        poll_s = (time.perf_counter() - start) * client_count / poll_clients
+    feed.unsubscribe()
+
+    print(f"{'delivery':<22}{'total CPU':>12}{'per client':>14}{'bytes per client':>20}")
+    print(f"{'change feed':<22}{feed_s:>10.2f} s{feed_s * 1e3 / client_count:>11.2f} ms{sent_bytes // client_count:>20,}")
+    print(f"{'re-poll GET /bins':<22}{poll_s:>10.2f} s{poll_s * 1e3 / client_count:>11.2f} ms{poll_bytes:>20,}")
+    bin_manager._reset_bins_data()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bins', type=int, default=20_000)
+    parser.add_argument('--clients', type=int, default=1_000)
+    parser.add_argument('--updates', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.bins, args.clients, args.updates, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Measures dashboard-style polling of `GET /bins/<id>`: time per request and bytes on the
+wire for a full 200 response against a 304 answered from the client's ETag.
+
+Run from the project root:
+    python -m benchmarks.bench_conditional_get
+    python -m benchmarks.bench_conditional_get --polls 50000
+"""
+import argparse
+import time
+
+from waste_management import bin_manager
+from waste_management.api import app
+
+def _wire_bytes(response) -> int:
+    # Status line and headers as a WSGI server would write them, plus the body
+    head = f"HTTP/1.1 {response.status}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in response.headers.items()) + "\r\n"
+    return len(head.encode()) + len(response.get_data())
+
+def _poll(client, url: str, headers: dict, polls: int):
+    start = time.perf_counter()
+    for _ in range(polls):
+        response = client.get(url, headers=headers)
+    elapsed_us = (time.perf_counter() - start) * 1e6 / polls
+    return elapsed_us, response.status_code, _wire_bytes(response)
+
+def run(polls: int) -> None:
+    bin_manager._reset_bins_data()
+    bin_manager.add_bin("BIN_0000001", {'lat': 40.7128, 'lon': -74.0060}, 100.0)
+    bin_manager.update_bin_from_sensor_data("BIN_0000001", 42.0)
+    client = app.test_client()
+    url = "/bins/BIN_0000001"
+    etag = client.get(url).headers["ETag"]
+
+    print(f"polls={polls:,}")
+    print(f"{'request':<22}{'status':>8}{'per poll':>14}{'bytes':>10}")
+    for label, headers in (("unconditional", {}), ("If-None-Match", {"If-None-Match": etag})):
+        per_poll_us, status, size = _poll(client, url, headers, polls)
+        print(f"{label:<22}{status:>8}{per_poll_us:>11.1f} us{size:>10}")
+    bin_manager._reset_bins_data()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--polls', type=int, default=10_000)
+    args = parser.parse_args()
+    run(args.polls)
+
+if __name__ == '__main__':
+    main()
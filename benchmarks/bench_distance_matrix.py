@@ -0,0 +1,94 @@
+"""
+Times the bin nearest-neighbor lists: the initial build, incremental add_bin updates and bin
+moves while attached to bin_manager, reopening a flushed cache, and nearest-neighbor lookups
+versus recomputing distances per query. Memory and the cache file grow with bins x neighbors.
+
+Run from the project root:
+    python -m benchmarks.bench_distance_matrix
+    python -m benchmarks.bench_distance_matrix --bins 200000 --added 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from waste_management import bin_manager
+from waste_management.distance_matrix import DistanceMatrixService, pairwise_haversine
+
+def _random_location(rng: random.Random) -> dict:
+    return {'lat': 40.5 + rng.random() * 0.4, 'lon': -74.2 + rng.random() * 0.4}
+
+def run(bin_count: int, added: int, neighbor_count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    bin_manager._reset_bins_data()
+    for i in range(bin_count):
+        bin_manager.add_bin(f"BIN_{i:07d}", _random_location(rng), 100.0)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = DistanceMatrixService(cache_dir=cache_dir, neighbor_count=neighbor_count)
+        start = time.perf_counter()
+        service.attach()
+        service.candidate_lists([])  # Lists are built on the first query
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(added):
+            bin_manager.add_bin(f"NEW_{i:07d}", _random_location(rng), 100.0)
+            service.candidate_lists([])
+        add_ms = (time.perf_counter() - start) * 1000.0 / max(1, added)
+
+        start = time.perf_counter()
+        for i in rng.sample(range(bin_count), added):
+            bin_manager.update_bin_from_sensor_data(f"BIN_{i:07d}", 10.0, location=_random_location(rng))
+            service.candidate_lists([])
+        move_ms = (time.perf_counter() - start) * 1000.0 / max(1, added)
+        service.close()
+        file_mib = sum(entry.stat().st_size for entry in os.scandir(cache_dir)) / 2 ** 20
+
+        reopened = DistanceMatrixService(cache_dir=cache_dir, neighbor_count=neighbor_count)
+        start = time.perf_counter()
+        recomputed = reopened.sync(bin_manager.list_bins(), bin_manager.get_bin_set_version())
+        reopened.candidate_lists([])
+        reopen_s = time.perf_counter() - start
+
+        ids = reopened.bin_ids
+        sample = rng.sample(ids, 1000)
+        start = time.perf_counter()
+        for bin_id in sample:
+            reopened.nearest_neighbors(bin_id)
+        knn_us = (time.perf_counter() - start) * 1e6 / len(sample)
+
+        lats = np.array([b.location['lat'] for b in bin_manager.list_bins()])
+        lons = np.array([b.location['lon'] for b in bin_manager.list_bins()])
+        start = time.perf_counter()
+        for bin_id in sample[:100]:
+            row = ids.index(bin_id)
+            distances = pairwise_haversine(lats[row:row + 1], lons[row:row + 1], lats, lons)[0]
+            np.argpartition(distances, neighbor_count)[:neighbor_count + 1]
+        scan_us = (time.perf_counter() - start) * 1e6 / 100
+        reopened.close()
+
+    total = bin_count + added
+    print(f"bins={total:,} neighbors={neighbor_count} cache file={file_mib:,.1f} MiB "
+          f"(a float32 distance matrix would be {total * total * 4 / 2 ** 20:,.0f} MiB)")
+    print(f"initial build:            {build_s:8.2f} s")
+    print(f"incremental add_bin:      {add_ms:8.2f} ms per bin")
+    print(f"bin move:                 {move_ms:8.2f} ms per bin")
+    print(f"reopen + sync:            {reopen_s * 1000:8.1f} ms  ({recomputed} bins added or moved)")
+    print(f"k-nearest lookup:         {knn_us:8.1f} us  (recompute row per query: {scan_us:,.0f} us)")
+    bin_manager._reset_bins_data()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bins', type=int, default=10_000)
+    parser.add_argument('--added', type=int, default=200, help="Bins added one by one after the initial build.")
+    parser.add_argument('--neighbors', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.bins, args.added, args.neighbors, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Times a one-year (8760 hourly steps) energy simulation over a large streetlight
+inventory with the NumPy StreetlightArrayRegistry, with constant state and with a
+share of the lights following the adaptive lighting schedule, and compares
+streetlight_manager.simulate_energy_consumption (which snapshots the lights into a registry) with the
+per-light Python loop it used to run, both for a single one-hour step and for a year
+(one loop call per hour).
+
+Run from the project root:
+    python -m benchmarks.bench_energy_simulation
+    python -m benchmarks.bench_energy_simulation --lights 100000 --loop-lights 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from energy_management import streetlight_manager
+from energy_management.columnar_store import StreetlightArrayRegistry
+
+def _python_loop_step(duration_hours: float) -> float:
+    # streetlight_manager.simulate_energy_consumption as it was
+    total_energy_consumed_kwh = 0.0
+    with streetlight_manager._storage_batch():
+        for light in streetlight_manager._streetlights.values():
+            if light.status == 'ON' and light.power_consumption_watts is not None and light.power_consumption_watts > 0:
+                energy_kwh = (light.power_consumption_watts * (light.brightness_level / 100.0) * duration_hours) / 1000.0
+                light.current_energy_usage += energy_kwh
+                total_energy_consumed_kwh += energy_kwh
+                streetlight_manager._persist_streetlight(light)
+    return total_energy_consumed_kwh
+
+def run(light_count: int, hours: int, loop_light_count: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    light_ids = [f"SL_{i:07d}" for i in range(light_count)]
+    power = rng.choice([60.0, 100.0, 150.0], size=light_count)
+    brightness = rng.integers(0, 101, size=light_count)
+    statuses = rng.choice(['ON', 'OFF', 'FAULTY'], size=light_count, p=[0.8, 0.15, 0.05]).tolist()
+    adaptive = rng.random(light_count) < 0.3
+
+    start = time.perf_counter()
+    registry = StreetlightArrayRegistry(initial_capacity=light_count)
+    registry.add_streetlights(light_ids, power, brightness, statuses, adaptive_lighting=adaptive)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    step_totals = registry.simulate_energy_consumption(np.ones(hours))
+    vectorized_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scheduled_totals = registry.simulate_energy_consumption(np.ones(hours), start_hour=0,
+                                                            adaptive_schedule=streetlight_manager._ADAPTIVE_SCHEDULE)
+    scheduled_s = time.perf_counter() - start
+
+    # The manager and the Python loop are timed on a smaller inventory; the year is extrapolated for the loop.
+    streetlight_manager._reset_streetlights_data()
+    for i in range(loop_light_count):
+        streetlight_manager.add_streetlight(light_ids[i], {'lat': 0.0, 'lon': 0.0}, float(power[i]))
+        streetlight_manager.update_streetlight_status(light_ids[i], statuses[i], int(brightness[i]))
+    start = time.perf_counter()
+    _python_loop_step(1.0)
+    loop_step_s = time.perf_counter() - start
+    start = time.perf_counter()
+    streetlight_manager.simulate_energy_consumption(1.0)
+    manager_step_s = time.perf_counter() - start
+    start = time.perf_counter()
+    streetlight_manager.simulate_energy_consumption(float(hours), start_hour=0)
+    manager_s = time.perf_counter() - start
+    streetlight_manager._reset_streetlights_data()
+    scale = light_count / loop_light_count
+
+    print(f"lights={light_count:,} steps={hours:,}")
+    print(f"registry build:          {build_s:10.3f} s")
+    print(f"vectorized simulation:   {vectorized_s:10.3f} s  (total {step_totals.sum():,.0f} kWh)")
+    print(f"adaptive schedule:       {scheduled_s:10.3f} s  (total {scheduled_totals.sum():,.0f} kWh, {adaptive.mean():.0%} adaptive)")
+    print(f"manager, one step:       {manager_step_s * 1000:10.2f} ms for {loop_light_count:,} lights")
+    print(f"python loop, one step:   {loop_step_s * 1000:10.2f} ms for {loop_light_count:,} lights")
+    print(f"manager (estimated):     {manager_s * scale:10.1f} s  ({manager_s * 1000:.2f} ms for {loop_light_count:,} lights)")
+    print(f"python loop (estimated): {loop_step_s * hours * scale:10.1f} s  ({loop_step_s * 1000:.2f} ms per step for {loop_light_count:,} lights)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lights', type=int, default=500_000)
+    parser.add_argument('--hours', type=int, default=8760)
+    parser.add_argument('--loop-lights', type=int, default=50_000, help="Inventory size for timing the Python loop.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.lights, args.hours, args.loop_lights, args.seed)
+
+if __name__ == '__main__':
+    main()
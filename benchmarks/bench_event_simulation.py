@@ -0,0 +1,42 @@
+"""
+Stress-tests the traffic SignalController offline: generates a grid city and runs
+it on the discrete-event kernel, reporting how far simulated time outpaces wall-clock time.
+
+Run from the project root:
+    python -m benchmarks.bench_event_simulation
+    python -m benchmarks.bench_event_simulation --rows 50 --cols 50 --vehicles 500
+"""
+import argparse
+import time
+
+from traffic_management.scenarios import generate_grid_city
+from traffic_management.simulation import TrafficSimulation
+
+def run(rows: int, cols: int, vehicle_count: int, until: float, seed: int) -> None:
+    start = time.perf_counter()
+    scenario = generate_grid_city(rows, cols, vehicle_count, departure_window_s=until / 2, seed=seed)
+    generate_s = time.perf_counter() - start
+
+    simulation = TrafficSimulation(sim_id="BenchSim")
+    simulation.load_scenario(scenario)
+    stats = simulation.run_event_driven(until=until)
+
+    print(f"grid={rows}x{cols} signals={rows * cols:,} vehicles={vehicle_count:,}")
+    print(f"scenario generation: {generate_s:10.3f} s")
+    print(f"simulated:           {stats['simulated_seconds']:10.0f} s")
+    print(f"wall clock:          {stats['wall_seconds']:10.3f} s  ({stats['simulated_seconds'] / stats['wall_seconds']:,.0f}x real time)")
+    print(f"events:              {stats['events_processed']:10,}  transitions={stats['signal_transitions']:,} preemptions={stats['preemptions']:,}")
+    print(f"trips completed:     {stats['vehicles_arrived']:10,}  mean trip {stats['mean_trip_seconds'] or 0:.1f} s")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=30)
+    parser.add_argument('--cols', type=int, default=30)
+    parser.add_argument('--vehicles', type=int, default=200)
+    parser.add_argument('--until', type=float, default=3600.0, help="Simulated seconds to run.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.rows, args.cols, args.vehicles, args.until, args.seed)
+
+if __name__ == '__main__':
+    main()
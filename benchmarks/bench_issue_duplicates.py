@@ -0,0 +1,69 @@
+"""
+Times the duplicate check create_issue runs (same-category issues within 50 m and 72 hours) on
+the issue proximity index against a scan of every issue, and the hot-spot aggregation behind
+`GET /issues/clusters` at several cell sizes.
+
+Issues are fed to the index directly, without ReportedIssue objects, so millions fit in memory.
+
+Run from the project root:
+    python -m benchmarks.bench_issue_duplicates
+    python -m benchmarks.bench_issue_duplicates --issues 5000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from citizen_reporting.issue_manager import DUPLICATE_RADIUS_METERS, DUPLICATE_WINDOW_HOURS, UNRESOLVED_STATUSES
+from citizen_reporting.proximity_index import IssueProximityIndex
+from common.geo import haversine_meters
+
+CATEGORIES = ("Pothole", "Streetlight Out", "Graffiti", "Trash Overflow", "Damaged Signage", "Other")
+STATUSES = ("OPEN", "IN_PROGRESS", "RESOLVED", "CLOSED")
+
+def run(issue_count: int, queries: int, seed: int) -> None:
+    rng = random.Random(seed)
+    start_time = datetime(2024, 1, 1)
+    # Issues spread over a year across a 40 x 40 km city
+    rows = [(rng.choice(CATEGORIES), 40.5 + rng.random() * 0.36, -74.2 + rng.random() * 0.47,
+             start_time + timedelta(seconds=i * 365 * 86400 / issue_count), rng.choice(STATUSES))
+            for i in range(issue_count)]
+    index = IssueProximityIndex()
+    start = time.perf_counter()
+    for i, (category, lat, lon, timestamp, status) in enumerate(rows):
+        index.add(str(i), category, lat, lon, timestamp, status)
+    add_us = (time.perf_counter() - start) * 1e6 / issue_count
+
+    probes = [rng.choice(rows) for _ in range(queries)]
+    window = timedelta(hours=DUPLICATE_WINDOW_HOURS)
+    start = time.perf_counter()
+    found = 0
+    for category, lat, lon, timestamp, _ in probes:
+        found += len(index.nearby(category, lat, lon, timestamp, DUPLICATE_RADIUS_METERS, window, UNRESOLVED_STATUSES))
+    index_us = (time.perf_counter() - start) * 1e6 / queries
+
+    scan_probes = probes[:max(1, queries // 100)]  # Full scans are slow; time a sample
+    start = time.perf_counter()
+    for category, lat, lon, timestamp, _ in scan_probes:
+        [row for row in rows if row[0] == category and row[4] in UNRESOLVED_STATUSES
+         and abs(row[3] - timestamp) <= window and haversine_meters(lat, lon, row[1], row[2]) <= DUPLICATE_RADIUS_METERS]
+    scan_us = (time.perf_counter() - start) * 1e6 / len(scan_probes)
+
+    print(f"issues={issue_count:,} add={add_us:.1f} us/issue, {found / queries:.2f} candidates per check")
+    print(f"duplicate check, index:  {index_us:12,.1f} us")
+    print(f"duplicate check, scan:   {scan_us:12,.1f} us")
+    for cell_meters in (250, 1000, 5000):
+        start = time.perf_counter()
+        spots = index.clusters(cell_meters, UNRESOLVED_STATUSES)
+        print(f"hot spots, {cell_meters:>5} m cells: {(time.perf_counter() - start) * 1e3:9.1f} ms ({len(spots):,} spots)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--issues', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.issues, args.queries, args.seed)
+
+if __name__ == '__main__':
+    main()
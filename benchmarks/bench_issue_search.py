@@ -0,0 +1,93 @@
+"""
+Times `GET /issues?q=&status=&category=` lookups on the issue search index (first page of 100
+plus facet counts) for selective and common words, filter-only listings and their facets,
+against scanning every issue with lowercase comparisons as list_issues used to.
+
+Issues are fed to the index directly, without ReportedIssue objects, so millions fit in memory.
+
+Run from the project root:
+    python -m benchmarks.bench_issue_search
+    python -m benchmarks.bench_issue_search --issues 5000000
+"""
+import argparse
+import itertools
+import random
+import time
+
+from citizen_reporting.search_index import IssueSearchIndex
+
+CATEGORIES = ("Pothole", "Streetlight Out", "Graffiti", "Illegal Dumping", "Noise", "Broken Sidewalk",
+              "Abandoned Vehicle", "Water Leak", "Fallen Tree", "Missed Collection")
+STATUSES = ("OPEN", "IN_PROGRESS", "RESOLVED", "CLOSED")
+STATUS_WEIGHTS = (0.2, 0.1, 0.4, 0.3)
+COMMON_WORDS = ("the", "on", "near", "large", "street", "corner", "again", "blocking", "since", "week")
+
+def _vocabulary(rng: random.Random, size: int):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+def _per_call_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1e3 / repeat
+
+def run(issue_count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    rare_words = _vocabulary(rng, 20_000)  # Street names and the like, drawn with a long tail
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(rare_words))))
+    status_cum_weights = list(itertools.accumulate(STATUS_WEIGHTS))
+    rows = [(rng.choice(CATEGORIES),
+             " ".join(rng.sample(COMMON_WORDS, 3) + rng.choices(rare_words, cum_weights=cum_weights, k=3)),
+             rng.choices(STATUSES, cum_weights=status_cum_weights)[0])
+            for _ in range(issue_count)]
+    index = IssueSearchIndex()
+    start = time.perf_counter()
+    for i, (category, description, status) in enumerate(rows):
+        index.add(f"{i:032x}", category, description, status)
+    add_us = (time.perf_counter() - start) * 1e6 / issue_count
+
+    selective = rare_words[500]
+    queries = (
+        ("selective word", dict(query=selective)),
+        ("two words", dict(query=f"street {rare_words[50]}")),
+        ("common word", dict(query="street")),
+        ("two common words", dict(query="street corner")),
+        ("word + filters", dict(query="street", status="open", category="pothole")),
+        ("filters only", dict(status="open", category="pothole")),
+        ("status only", dict(status="resolved")),
+        ("facets only", dict()),
+    )
+    print(f"issues={issue_count:,} add={add_us:.1f} us/issue")
+    print(f"{'query':<20}{'matches':>12}{'index':>12}{'full scan':>14}")
+    for label, kwargs in queries:
+        total = index.search(limit=100, **kwargs)[1]
+        index_ms = _per_call_ms(lambda: index.search(limit=100, **kwargs), 20)
+        scan_ms = _per_call_ms(lambda: _scan(rows, **kwargs), 1)
+        print(f"{label:<20}{total:>12,}{index_ms:>9.2f} ms{scan_ms:>11,.0f} ms")
+
+def _scan(rows, query: str = "", status: str = None, category: str = None):
+    # The unindexed equivalent: lowercase comparisons and word splits on every issue
+    words = query.lower().split()
+    matches = []
+    for row_category, description, row_status in rows:
+        if status and row_status.lower() != status.lower():
+            continue
+        if category and row_category.lower() != category.lower():
+            continue
+        if words:
+            text = f"{row_category} {description}".lower().split()
+            if not all(word in text for word in words):
+                continue
+        matches.append(row_category)
+    return matches
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--issues', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.issues, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Compares `GET /bins` as one JSON array with the NDJSON stream (`?stream=1`): time to the
+first byte, total time and peak Python memory allocated while producing the response.
+
+Run from the project root:
+    python -m benchmarks.bench_ndjson_streaming
+    python -m benchmarks.bench_ndjson_streaming --bins 500000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from waste_management import bin_manager
+from waste_management.api import app
+
+def _consume(client, url: str):
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    chunks = iter(response.response)
+    size = len(next(chunks))
+    first_byte_s = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)  # Chunks are dropped as a server would after writing them
+    total_s = time.perf_counter() - start
+    response.close()
+    return first_byte_s, total_s, size
+
+def _measure(client, url: str):
+    first_byte_s, total_s, size = _consume(client, url)
+    # Memory is traced in a separate pass, as tracing slows allocation-heavy code down severalfold
+    tracemalloc.start()
+    _consume(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte_s, total_s, peak, size
+
+def run(bin_count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    bin_manager._reset_bins_data()
+    for i in range(bin_count):
+        bin_manager.add_bin(f"BIN_{i:07d}", {'lat': 40.5 + rng.random() * 0.4, 'lon': -74.2 + rng.random() * 0.4}, 100.0)
+
+    client = app.test_client()
+    print(f"bins={bin_count:,}")
+    print(f"{'mode':<12}{'first byte':>14}{'total':>12}{'peak memory':>16}{'body':>12}")
+    for label, url in (("json array", "/bins"), ("ndjson", "/bins?stream=1")):
+        first_byte_s, total_s, peak, size = _measure(client, url)
+        print(f"{label:<12}{first_byte_s * 1000:>11.1f} ms{total_s:>10.2f} s{peak / 2 ** 20:>12.1f} MiB{size / 2 ** 20:>8.1f} MiB")
+    bin_manager._reset_bins_data()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bins', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.bins, args.seed)
+
+if __name__ == '__main__':
+    main()
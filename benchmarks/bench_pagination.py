@@ -0,0 +1,51 @@
+"""
+Times keyset pagination of bins (list_bins_page) on the first, middle and last page,
+against slicing an offset page out of the full list_bins() listing, and the cost the
+sorted ID index adds to add_bin.
+
+Run from the project root:
+    python -m benchmarks.bench_pagination
+    python -m benchmarks.bench_pagination --bins 1000000 --limit 100
+"""
+import argparse
+import random
+import time
+
+from waste_management import bin_manager
+
+def _per_call_us(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+def run(bin_count: int, limit: int, seed: int) -> None:
+    rng = random.Random(seed)
+    bin_manager._reset_bins_data()
+    ids = [f"BIN_{i:07d}" for i in range(bin_count)]
+    rng.shuffle(ids)  # IDs arrive in random order, so the index sees inserts everywhere
+    start = time.perf_counter()
+    for bin_id in ids:
+        bin_manager.add_bin(bin_id, {'lat': 40.5 + rng.random() * 0.4, 'lon': -74.2 + rng.random() * 0.4}, 100.0)
+    add_us = (time.perf_counter() - start) * 1e6 / bin_count
+    sorted_ids = sorted(ids)
+
+    print(f"bins={bin_count:,} limit={limit} add_bin={add_us:.1f} us")
+    print(f"{'page':<8}{'keyset':>12}{'offset slice':>16}")
+    for label, offset in (("first", 0), ("middle", bin_count // 2), ("last", bin_count - limit)):
+        after = sorted_ids[offset - 1] if offset else None
+        keyset_us = _per_call_us(lambda: bin_manager.list_bins_page(limit, after), 200)
+        offset_us = _per_call_us(lambda: bin_manager.list_bins()[offset:offset + limit], 5)
+        print(f"{label:<8}{keyset_us:>9.1f} us{offset_us:>13,.0f} us")
+    bin_manager._reset_bins_data()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bins', type=int, default=200_000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.bins, args.limit, args.seed)
+
+if __name__ == '__main__':
+    main()
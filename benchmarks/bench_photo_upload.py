@@ -0,0 +1,81 @@
+"""
+Measures `POST /photos`: peak Python memory and time per upload when the photo is streamed to
+disk in chunks, as a raw body and as a multipart form, against reading the whole body into
+memory first (`request.get_data()`), plus the cost of re-uploading a photo already stored.
+
+Run from the project root:
+    python -m benchmarks.bench_photo_upload
+    python -m benchmarks.bench_photo_upload --megabytes 10 --uploads 20
+"""
+import argparse
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from flask import request
+
+from citizen_reporting import api
+
+def _buffered_upload():
+    # The naive handler: the whole body in memory, then hashed and written out
+    body = request.get_data()
+    path = os.path.join(api._photos.root, hashlib.sha256(body).hexdigest() + '.jpg')
+    with open(path, 'wb') as f:
+        f.write(body)
+    return {"size": len(body)}, 201
+
+def _measure(upload, uploads: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(uploads):
+        response = upload(i)
+    elapsed_ms = (time.perf_counter() - start) * 1e3 / uploads
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed_ms, peak, response.status_code
+
+def run(megabytes: float, uploads: int) -> None:
+    root = tempfile.mkdtemp()
+    api._photos.root = root
+    api.app.add_url_rule('/bench/buffered', 'bench_buffered_upload', _buffered_upload, methods=['POST'])
+    client = api.app.test_client()
+    size = int(megabytes * 1024 * 1024)
+    # Distinct photos per upload, so only the dedup row stores nothing new
+    photos = [b'\xff\xd8\xff\xe0' + os.urandom(size - 4) for _ in range(uploads)]
+
+    cases = (
+        ("buffered get_data()", lambda i: client.post('/bench/buffered', input_stream=io.BytesIO(photos[i]),
+                                                      content_type='image/jpeg', content_length=size)),
+        ("streamed raw body", lambda i: client.post('/photos', input_stream=io.BytesIO(photos[i]),
+                                                    content_type='image/jpeg', content_length=size)),
+        ("streamed multipart", lambda i: client.post('/photos', data={'photo': (io.BytesIO(photos[i]), 'p.jpg')},
+                                                     content_type='multipart/form-data')),
+        ("re-upload (dedup)", lambda i: client.post('/photos', input_stream=io.BytesIO(photos[i]),
+                                                    content_type='image/jpeg', content_length=size)),
+    )
+    print(f"photo={megabytes:g} MiB uploads={uploads}")
+    print(f"{'upload':<22}{'status':>8}{'per upload':>14}{'peak memory':>16}")
+    try:
+        for label, upload in cases:
+            if label.startswith("streamed multipart"):
+                shutil.rmtree(root)  # Store the photos again rather than deduplicating them
+                os.makedirs(root)
+            elapsed_ms, peak, status = _measure(upload, uploads)
+            print(f"{label:<22}{status:>8}{elapsed_ms:>11.1f} ms{peak / 1024 / 1024:>12.2f} MiB")
+    finally:
+        api._photos.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--megabytes', type=float, default=8)
+    parser.add_argument('--uploads', type=int, default=10)
+    args = parser.parse_args()
+    run(args.megabytes, args.uploads)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Compares building the `GET /bins` response with dataclasses.asdict and Flask's default JSON
+provider against the precompiled trash_bin_to_dict serializer, with the default provider and
+with the orjson provider (when orjson is installed). Times the dict conversion alone and the
+full conversion plus encoding.
+
+Run from the project root:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --bins 500000
+"""
+import argparse
+import random
+import time
+from dataclasses import asdict
+
+from flask import Flask
+
+from common.serialization import install_json_provider
+from waste_management.models import TrashBin, trash_bin_to_dict
+
+def _best_of(func, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(bin_count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    bins = [TrashBin(f"BIN_{i:07d}", {'lat': 40.5 + rng.random() * 0.4, 'lon': -74.2 + rng.random() * 0.4},
+                     100.0, rng.random() * 100.0) for i in range(bin_count)]
+    default_app = Flask(__name__)
+    fast_app = Flask(__name__)
+    has_orjson = install_json_provider(fast_app)
+
+    def encode(app: Flask, to_dict) -> int:
+        with app.app_context():
+            return len(app.json.response([to_dict(b) for b in bins]).get_data())
+
+    cases = [
+        ("asdict", lambda: [asdict(b) for b in bins], lambda: encode(default_app, asdict)),
+        ("serializer", lambda: [trash_bin_to_dict(b) for b in bins], lambda: encode(default_app, trash_bin_to_dict)),
+    ]
+    if has_orjson:
+        cases.append(("serializer + orjson", None, lambda: encode(fast_app, trash_bin_to_dict)))
+
+    print(f"bins={bin_count:,} orjson={'yes' if has_orjson else 'not installed'}")
+    print(f"{'path':<22}{'to dicts':>12}{'dicts + JSON':>16}")
+    for label, convert, full in cases:
+        convert_ms = f"{_best_of(convert) * 1000:>9.0f} ms" if convert else f"{'-':>12}"
+        print(f"{label:<22}{convert_ms}{_best_of(full) * 1000:>13.0f} ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bins', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.bins, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Times `POST /traffic/simulation/run` through the simulation job manager: a first request that
+runs the scenario on a background worker, repeated requests for the same run answered from
+the result cache, and a submission that returns immediately with a run ID, against building
+and running a new TrafficSimulation in the request thread as the endpoint used to.
+
+Run from the project root:
+    python -m benchmarks.bench_simulation_jobs
+    python -m benchmarks.bench_simulation_jobs --rows 20 --cols 20 --vehicles 100 --repeat 500
+"""
+import argparse
+import logging
+import time
+
+from flask import Flask, jsonify
+
+from traffic_management import api
+from traffic_management.scenarios import generate_grid_city
+from traffic_management.simulation import TrafficSimulation
+
+def _per_call_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1e3 / repeat
+
+def _inline_grid_run(params: dict, seed: int) -> None:
+    simulation = TrafficSimulation(sim_id="BenchSim")
+    simulation.load_scenario(generate_grid_city(params["rows"], params["cols"], params["vehicles"],
+                                                departure_window_s=params["departure_window_s"], seed=seed))
+    simulation.run_event_driven(until=params["until"])
+
+def run(rows: int, cols: int, vehicle_count: int, until: float, repeat: int, seed: int) -> None:
+    logging.getLogger("traffic_management").setLevel(logging.ERROR)  # The demo scenario warns on every run
+    app = Flask(__name__)
+    app.register_blueprint(api.traffic_bp)
+    client = app.test_client()
+    api._simulation_jobs.clear()
+
+    @app.route('/inline/<scenario>', methods=['POST'])
+    def inline_run(scenario):
+        # The endpoint as it was: a new simulation, run to completion in the request thread
+        if scenario == "grid_city":
+            _inline_grid_run(params, seed)
+        else:
+            TrafficSimulation(sim_id="BenchSim").run_emergency_preemption_scenario()
+        return jsonify({"message": "Traffic simulation scenario executed."})
+
+    params = {"rows": rows, "cols": cols, "vehicles": vehicle_count, "departure_window_s": until / 2, "until": until}
+    grid = {"scenario": "grid_city", "params": params, "seed": seed}
+
+    def post(payload):
+        response = client.post('/traffic/simulation/run', json=payload)
+        assert response.status_code in (200, 202), response.json
+        return response
+
+    print(f"grid city {rows}x{cols}, {vehicle_count} vehicles, {until:g} simulated s; {repeat} repeated requests")
+    print(f"{'request':<44}{'per request':>14}")
+    timings = [
+        ("demo scenario, run in the request thread", _per_call_ms(lambda: client.post('/inline/demo'), repeat)),
+        ("demo scenario, first run (wait)", _per_call_ms(lambda: post({"wait": 30}), 1)),
+        ("demo scenario, repeated (cached)", _per_call_ms(lambda: post({}), repeat)),
+        ("grid city, run in the request thread", _per_call_ms(lambda: client.post('/inline/grid_city'), 1)),
+        ("grid city, first run (wait)", _per_call_ms(lambda: post(dict(grid, wait=30)), 1)),
+        ("grid city, submit only (202)", _per_call_ms(lambda: post(dict(grid, seed=seed + 1)), 1)),
+        ("grid city, repeated (cached)", _per_call_ms(lambda: post(grid), repeat)),
+    ]
+    for label, ms in timings:
+        print(f"{label:<44}{ms:>11.3f} ms")
+    api._simulation_jobs.shutdown()
+    api._simulation_jobs.clear()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10)
+    parser.add_argument('--cols', type=int, default=10)
+    parser.add_argument('--vehicles', type=int, default=40)
+    parser.add_argument('--until', type=float, default=1800.0)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.rows, args.cols, args.vehicles, args.until, args.repeat, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures the memory and time the simulation log costs over a long event-driven run of a grid
+city: the bounded SimulationLog (in memory only, and spilling to a file) against the old
+unbounded list of formatted strings.
+
+Run from the project root:
+    python -m benchmarks.bench_simulation_log
+    python -m benchmarks.bench_simulation_log --rows 40 --cols 40 --vehicles 2000 --hours 4
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from traffic_management.scenarios import generate_grid_city
+from traffic_management.simulation import TrafficSimulation
+
+class _ListLogSimulation(TrafficSimulation):
+    """The old log: every event formatted up front and kept in a list."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.log = list(self.log)
+
+    def log_event(self, message: str, *args):
+        self.log.append(f"[{self.sim_id} Log] {message % args if args else message}")
+
+def _measure(make_simulation, scenario_args: dict, until: float):
+    # tracemalloc slows the run down, so time one run and trace another
+    simulation = make_simulation()
+    simulation.load_scenario(generate_grid_city(**scenario_args))
+    start = time.perf_counter()
+    simulation.run_event_driven(until=until)
+    elapsed = time.perf_counter() - start
+    kept = len(simulation.log)
+    if hasattr(simulation.log, "close"):
+        simulation.log.close()
+
+    simulation = make_simulation()
+    simulation.load_scenario(generate_grid_city(**scenario_args))
+    tracemalloc.start()
+    simulation.run_event_driven(until=until)
+    with_log = tracemalloc.get_traced_memory()[0]
+    simulation.log = None
+    gc.collect()
+    log_bytes = with_log - tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, elapsed, log_bytes
+
+def run(rows: int, cols: int, vehicle_count: int, hours: float, capacity: int, seed: int) -> None:
+    until = hours * 3600
+    scenario_args = dict(rows=rows, cols=cols, vehicle_count=vehicle_count, departure_window_s=until / 2, seed=seed)
+    print(f"grid={rows}x{cols} vehicles={vehicle_count:,} simulated={hours:g} h capacity={capacity:,}")
+    print(f"{'log':<22}{'events kept':>14}{'run time':>12}{'log memory':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        spill_path = os.path.join(directory, "simulation.log")
+        cases = (
+            ("unbounded list", lambda: _ListLogSimulation(sim_id="BenchSim")),
+            ("ring buffer", lambda: TrafficSimulation(sim_id="BenchSim", log_capacity=capacity)),
+            ("ring buffer + spill", lambda: TrafficSimulation(sim_id="BenchSim", log_capacity=capacity, log_spill_path=spill_path)),
+        )
+        for label, make_simulation in cases:
+            kept, elapsed, log_bytes = _measure(make_simulation, scenario_args, until)
+            print(f"{label:<22}{kept:>14,}{elapsed:>10.2f} s{log_bytes / 1e6:>12.2f} MB")
+        print(f"spill file: {os.path.getsize(spill_path) / 1e6:.1f} MB (timed and traced runs)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=30)
+    parser.add_argument('--cols', type=int, default=30)
+    parser.add_argument('--vehicles', type=int, default=1000)
+    parser.add_argument('--hours', type=float, default=2.0)
+    parser.add_argument('--capacity', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.rows, args.cols, args.vehicles, args.hours, args.capacity, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures process startup cost: the time to `import main_dashboard` in fresh interpreters,
+plus the one-off cost of building the traffic API's global SignalController on first use
+(from the signal inventory, and from a precompiled snapshot).
+
+Run from the project root:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_TIMER = "import time; t = time.perf_counter(); import main_dashboard; print(time.perf_counter() - t)"
+FIRST_USE_TIMER = (
+    "import time; import main_dashboard; from traffic_management import api; "
+    "t = time.perf_counter(); api.get_global_traffic_controller(); print(time.perf_counter() - t)"
+)
+
+def time_in_subprocess(code: str, runs: int, env: dict) -> list:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env,
+                                check=True, capture_output=True, text=True).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return samples
+
+def report(label: str, samples: list) -> None:
+    print(f"{label:34s} median {statistics.median(samples) * 1000:8.2f} ms  min {min(samples) * 1000:8.2f} ms")
+
+def run(runs: int) -> None:
+    env = dict(os.environ)
+    env.pop("TRAFFIC_SIGNAL_SNAPSHOT", None)
+    print(f"runs={runs}")
+    report("import main_dashboard", time_in_subprocess(IMPORT_TIMER, runs, env))
+    report("first controller use (inventory)", time_in_subprocess(FIRST_USE_TIMER, runs, env))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env["TRAFFIC_SIGNAL_SNAPSHOT"] = os.path.join(temp_dir, "signals.snapshot")
+        time_in_subprocess(FIRST_USE_TIMER, 1, env) # Writes the snapshot
+        report("first controller use (snapshot)", time_in_subprocess(FIRST_USE_TIMER, runs, env))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+    run(args.runs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Times bin_manager with SQLite storage attached: adding bins, bulk sensor ingest written
+through to the log, reloading every bin on attach (as after a restart), cached and
+read-through lookups, and compaction. Compares ingest with the purely in-memory manager.
+
+Run from the project root:
+    python -m benchmarks.bench_storage
+    python -m benchmarks.bench_storage --bins 1000000 --batch 5000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from waste_management import bin_manager
+from waste_management.storage import SQLiteStorage
+
+def _add_bins(bin_count: int, rng: random.Random) -> float:
+    start = time.perf_counter()
+    for i in range(bin_count):
+        bin_manager.add_bin(f"BIN_{i:07d}", {'lat': 40.5 + rng.random() * 0.4, 'lon': -74.2 + rng.random() * 0.4}, 100.0)
+    return time.perf_counter() - start
+
+def _ingest(readings, batch_size: int) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(readings), batch_size):
+        bin_manager.update_bins_bulk(readings[offset:offset + batch_size])
+    return time.perf_counter() - start
+
+def run(bin_count: int, batch_size: int, seed: int) -> None:
+    rng = random.Random(seed)
+    readings = [(f"BIN_{i:07d}", rng.uniform(0.0, 100.0)) for i in range(bin_count)]
+
+    bin_manager._reset_bins_data()
+    _add_bins(bin_count, random.Random(seed))
+    memory_ingest_s = _ingest(readings, batch_size)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "waste.db")
+        storage = SQLiteStorage(path)
+        bin_manager.attach_storage(storage)
+        # Adds are committed one by one, as through POST /bins
+        add_s = _add_bins(bin_count, random.Random(seed))
+        ingest_s = _ingest(readings, batch_size)
+        start = time.perf_counter()
+        storage.compact()
+        compact_s = time.perf_counter() - start
+        storage.close()
+        size_mib = os.path.getsize(path) / 2 ** 20
+
+        reopened = SQLiteStorage(path)
+        start = time.perf_counter()
+        loaded = bin_manager.attach_storage(reopened)
+        load_s = time.perf_counter() - start
+
+        sample = rng.sample([bin_id for bin_id, _ in readings], min(10_000, bin_count))
+        start = time.perf_counter()
+        for bin_id in sample:
+            bin_manager.get_bin(bin_id)
+        cached_us = (time.perf_counter() - start) * 1e6 / len(sample)
+
+        bin_manager._bins.clear()  # Drop the cache so every lookup reads through to SQLite
+        start = time.perf_counter()
+        for bin_id in sample:
+            bin_manager.get_bin(bin_id)
+        read_through_us = (time.perf_counter() - start) * 1e6 / len(sample)
+        reopened.close()
+    bin_manager._reset_bins_data()
+
+    print(f"bins={bin_count:,} ingest batch={batch_size:,} database={size_mib:,.0f} MiB after compaction")
+    print(f"add_bin (one commit each): {bin_count / add_s:12,.0f} bins/s")
+    print(f"bulk ingest, SQLite:       {bin_count / ingest_s:12,.0f} readings/s")
+    print(f"bulk ingest, memory only:  {bin_count / memory_ingest_s:12,.0f} readings/s")
+    print(f"compaction:                {compact_s:12.2f} s")
+    print(f"attach + load {loaded:,} bins: {load_s:9.2f} s")
+    print(f"get_bin cached:            {cached_us:12.2f} us")
+    print(f"get_bin read-through:      {read_through_us:12.2f} us")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bins', type=int, default=100_000)
+    parser.add_argument('--batch', type=int, default=1000, help="Readings per update_bins_bulk call.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.bins, args.batch, args.seed)
+
+if __name__ == '__main__':
+    main()
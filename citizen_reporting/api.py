@@ -1,14 +1,41 @@
+import math
 import os
-from flask import Flask, request, jsonify, render_template # Ensure render_template is here
-from dataclasses import asdict
-from datetime import datetime # Required for sample data
+from flask import Flask, request, jsonify, render_template, send_file # Ensure render_template is here
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from datetime import datetime, timezone # datetime is required for sample data
 
+from common.state_server import get_shared_client
+from common.pagination import page_args, page_response
+from common.conditional import conditional_response
+from common.change_feed import get_feed
+from common.events import sse_response
+from common.serialization import install_json_provider
+from common.streaming import ndjson_response, wants_ndjson
 from . import issue_manager
-from .models import ReportedIssue # For type hinting if needed
+from .models import ReportedIssue, reported_issue_to_dict
+from .photo_store import PHOTO_CHUNK_SIZE, PhotoStore, PhotoTooLargeError
+from .search_index import DEFAULT_SEARCH_LIMIT
 
 app = Flask(__name__)
+install_json_provider(app)
 # Configure a basic upload folder.
 app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads', 'citizen_reporting')
+# Uploaded photos, stored by content hash (see photo_store)
+_photos = PhotoStore(app.config['UPLOAD_FOLDER'])
+# Seconds POST /issues waits for a new photo's EXIF location when the report has no location
+PHOTO_LOCATION_TIMEOUT = 2.0
+
+# Worker processes share issues through the state server named by SMARTCITY_STATE_SOCKET, when set.
+_shared_state = get_shared_client()
+if _shared_state is not None:
+    issue_manager.attach_storage(_shared_state)
+
+
+@app.before_request
+def _sync_shared_state():
+    # Picks up issues other worker processes created or updated
+    issue_manager.sync_storage()
 
 
 # --- HTML Serving Routes ---
@@ -39,6 +66,13 @@ def create_issue_route():
     location = data.get('location')
     reporter_id = data.get('reporter_id')
     photo_filename = data.get('photo_filename')
+    if photo_filename is not None and not isinstance(photo_filename, str):
+        return jsonify({"error": "'photo_filename' must be a string"}), 400
+
+    if not location and photo_filename:
+        # Reports with a photo may leave the location to the photo's GPS data
+        photo_info = _photos.info(photo_filename, timeout=PHOTO_LOCATION_TIMEOUT) if _photos.exists(photo_filename) else None
+        location = (photo_info or {}).get('location')
 
     if not all([category, description, location]):
         return jsonify({"error": "Missing required fields: category, description, location"}), 400
@@ -51,7 +85,7 @@ def create_issue_route():
             reporter_id=reporter_id,
             photo_filename=photo_filename
         )
-        return jsonify(asdict(issue)), 201
+        return jsonify(reported_issue_to_dict(issue)), 201
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -61,27 +95,186 @@ def create_issue_route():
 
 @app.route('/issues', methods=['GET'])
 def list_issues_route():
-    """Lists all issues, with optional filtering."""
+    """Lists all issues, with optional filtering. Streams NDJSON with ?stream=1 or Accept: application/x-ndjson."""
     status_filter = request.args.get('status')
     category_filter = request.args.get('category')
 
+    if 'q' in request.args:
+        return _search_issues_response(request.args['q'], status_filter, category_filter)
+
+    # ?limit= and ?after= return one page in issue ID order: {"items": [...], "next": cursor or null}
+    filters = {name: value for name, value in (("status", status_filter), ("category", category_filter)) if value}
+    try:
+        page = page_args(filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if page is not None:
+        issues_page, next_issue_id = issue_manager.list_issues_page(
+            *page, status_filter=status_filter, category_filter=category_filter
+        )
+        return page_response(issues_page, next_issue_id, reported_issue_to_dict, filters)
+
     issues = issue_manager.list_issues(
         status_filter=status_filter,
         category_filter=category_filter
     )
-    return jsonify([asdict(issue) for issue in issues]), 200
+    if wants_ndjson():
+        return ndjson_response(issues, reported_issue_to_dict)
+    return jsonify([reported_issue_to_dict(issue) for issue in issues]), 200
+
+
+def _multipart_file_chunks(stream, boundary: bytes, field_name: str):
+    """Yields the bytes of one file field of a multipart body as they arrive, without buffering the body."""
+    decoder = MultipartDecoder(boundary)
+    in_file = found = False
+    while True:
+        data = stream.read(PHOTO_CHUNK_SIZE)
+        decoder.receive_data(data or None)
+        event = decoder.next_event()
+        while not isinstance(event, (NeedData, Epilogue)):
+            if isinstance(event, File):
+                in_file = event.name == field_name
+                found = found or in_file
+            elif isinstance(event, Field):
+                in_file = False
+            elif isinstance(event, Data) and in_file and event.data:
+                yield event.data
+            event = decoder.next_event()
+        if isinstance(event, Epilogue) or not data:
+            break
+    if not found:
+        raise ValueError(f"Missing '{field_name}' file field")
+
+
+def _raw_body_chunks(stream):
+    while True:
+        chunk = stream.read(PHOTO_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+@app.route('/photos', methods=['POST'])
+def upload_photo_route():
+    """
+    Stores an issue photo, streamed to disk as it arrives. Send the image as the request body
+    (Content-Type image/jpeg, image/png or image/gif; chunked transfer encoding is fine) or as
+    the `photo` field of a multipart/form-data body. Identical photos are stored once.
+    Answers {"photo_filename", "size", "duplicate"}; pass photo_filename to POST /issues.
+    """
+    mimetype, options = parse_options_header(request.headers.get('Content-Type', ''))
+    if mimetype == 'multipart/form-data':
+        if 'boundary' not in options:
+            return jsonify({"error": "Multipart body without a boundary"}), 400
+        chunks = _multipart_file_chunks(request.stream, options['boundary'].encode(), 'photo')
+    else:
+        chunks = _raw_body_chunks(request.stream)
+    try:
+        photo = _photos.save(chunks)
+    except PhotoTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    body = {"photo_filename": photo.filename, "size": photo.size, "duplicate": photo.duplicate}
+    return jsonify(body), 200 if photo.duplicate else 201
+
+
+@app.route('/photos/<string:filename>', methods=['GET'])
+def get_photo_route(filename: str):
+    """Serves a stored photo. Photos never change, so they may be cached indefinitely."""
+    if not _photos.exists(filename):
+        return jsonify({"error": "Photo not found"}), 404
+    return send_file(_photos.path(filename), conditional=True, max_age=31536000, etag=filename)
+
+
+@app.route('/photos/<string:filename>/thumbnail', methods=['GET'])
+def get_photo_thumbnail_route(filename: str):
+    """Serves a photo's thumbnail once the workers generated it (requires Pillow)."""
+    if not _photos.exists(filename) or not os.path.isfile(_photos.thumbnail_path(filename)):
+        return jsonify({"error": "Thumbnail not found"}), 404
+    return send_file(_photos.thumbnail_path(filename), mimetype='image/jpeg', conditional=True, max_age=31536000)
+
+
+@app.route('/photos/<string:filename>/info', methods=['GET'])
+def get_photo_info_route(filename: str):
+    """
+    Returns what the background workers extracted from a photo:
+    {"status": "done", "location": {"lat", "lon"} or null, "thumbnail": bool}, {"status": "processing"},
+    or {"status": "error", "error": message} if the results could not be saved (retried on the next request).
+    """
+    info = _photos.info(filename)
+    if info is None:
+        return jsonify({"error": "Photo not found"}), 404
+    return jsonify(info), 200
+
+
+@app.route('/issues/clusters', methods=['GET'])
+def issue_clusters_route():
+    """
+    Aggregates issues into hot spots for the dashboard instead of returning raw points:
+    [{"lat": centroid, "lon": centroid, "count": n, "categories": {label: n}}, ...], busiest first.
+    Query parameters:
+        cell: approximate hot spot size in meters, default 250
+        status: count issues of this status instead of the unresolved ones (OPEN and IN_PROGRESS)
+        category: count only this category
+        min_count: omit hot spots with fewer issues, default 1
+    """
+    try:
+        cell_meters = float(request.args.get('cell', 250.0))
+        min_count = int(request.args.get('min_count', 1))
+    except ValueError:
+        return jsonify({"error": "'cell' must be a number and 'min_count' an integer"}), 400
+    if not math.isfinite(cell_meters) or cell_meters <= 0:
+        return jsonify({"error": "'cell' must be a positive finite number"}), 400
+    hot_spots = issue_manager.issue_hot_spots(
+        cell_meters,
+        status_filter=request.args.get('status'),
+        category_filter=request.args.get('category'),
+        min_count=min_count,
+    )
+    return jsonify(hot_spots), 200
+
+
+def _search_issues_response(query: str, status_filter, category_filter):
+    """
+    ?q= searches issue categories and descriptions for every word of q, newest first, and answers
+    {"items": [...], "total": n, "facets": {"status": {...}, "category": {...}}, "next": cursor or null}.
+    """
+    filters = {name: value for name, value in (("q", query), ("status", status_filter), ("category", category_filter)) if value}
+    try:
+        page = page_args(filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit, after = page if page is not None else (DEFAULT_SEARCH_LIMIT, None)
+    issues, total, facets, next_issue_id = issue_manager.search_issues(
+        query, status_filter=status_filter, category_filter=category_filter, limit=limit, after=after
+    )
+    return page_response(issues, next_issue_id, reported_issue_to_dict, filters,
+                         extra={"total": total, "facets": facets})
 
 
 @app.route('/issues/<string:issue_id>', methods=['GET'])
 def get_issue_route(issue_id: str):
-    """Retrieves a specific issue by its ID."""
+    """Retrieves a specific issue by its ID. Supports conditional GET (ETag / Last-Modified)."""
     issue = issue_manager.get_issue(issue_id)
     if issue:
-        return jsonify(asdict(issue)), 200
+        # Issue times are naive local times
+        return conditional_response(issue.version, issue.last_updated.astimezone(timezone.utc),
+                                    lambda: (jsonify(reported_issue_to_dict(issue)), 200))
     else:
         return jsonify({"error": "Issue not found"}), 404
 
 
+@app.route('/events', methods=['GET'])
+def issue_events_route():
+    """
+    Streams issue changes as Server-Sent Events: `event: issue` with the new or updated issue as JSON,
+    coalesced to its latest state, and `event: reset` when the listing must be refetched.
+    """
+    return sse_response(get_feed('citizen'), {issue_manager.ISSUE_RECORD: reported_issue_to_dict},
+                        sync=_sync_shared_state)
+
+
 @app.route('/issues/<string:issue_id>/status', methods=['PUT'])
 def update_issue_status_route(issue_id: str):
     """Updates the status of an existing issue."""
@@ -97,7 +290,7 @@ def update_issue_status_route(issue_id: str):
     try:
         updated_issue = issue_manager.update_issue_status(issue_id, new_status)
         if updated_issue:
-            return jsonify(asdict(updated_issue)), 200
+            return jsonify(reported_issue_to_dict(updated_issue)), 200
         else:
             return jsonify({"error": "Issue not found"}), 404
     except ValueError as e:
@@ -116,6 +309,7 @@ if __name__ == '__main__':
 
     os.makedirs(upload_dir_config, exist_ok=True)
     app.config['UPLOAD_FOLDER'] = upload_dir_config # Ensure it's set to the absolute path
+    _photos.root = upload_dir_config
 
     # Create sample data only if no issues exist, to avoid duplication on reload
     if not issue_manager._issues:  # Accessing internal for demo setup
@@ -1,14 +1,40 @@
 import uuid
-from datetime import datetime
-from typing import Optional, List, Dict
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Tuple
 
+from common.change_feed import get_feed
+from common.pagination import SortedKeyIndex
+from common.storage import StorageBackend
 from .models import ReportedIssue
+from .proximity_index import IssueProximityIndex
+from .search_index import DEFAULT_SEARCH_LIMIT, IssueSearchIndex
+
+# Record kind of issues in a storage backend
+ISSUE_RECORD = "issue"
 
 # In-memory storage for issues
 _issues: Dict[str, ReportedIssue] = {}
+# Issue IDs in sorted order, for keyset pagination (see list_issues_page)
+_sorted_issue_ids = SortedKeyIndex()
+# Word index with status and category facets (see search_issues); also serves filtered listings
+_search_index = IssueSearchIndex()
+# Issues by location, category and report time, for duplicate detection and hot spots
+_proximity_index = IssueProximityIndex()
+# Optional shared or persistent store; when attached, _issues acts as a read-through cache in front of it
+_storage: Optional[StorageBackend] = None
+# Storage change sequence the cache reflects (see sync_storage)
+_storage_sequence = 0
+# The citizen reporting change feed; every changed issue is published to it (see common.change_feed)
+_changes = get_feed('citizen')
 
 # Allowed issue statuses
 ALLOWED_STATUSES = {"OPEN", "IN_PROGRESS", "RESOLVED", "CLOSED"}
+# Statuses of issues that still need work; only these are duplicate candidates and hot spots by default
+UNRESOLVED_STATUSES = ("OPEN", "IN_PROGRESS")
+# A new report is a likely duplicate of an unresolved issue of the same category this close...
+DUPLICATE_RADIUS_METERS = 50.0
+# ...reported at most this many hours earlier or later
+DUPLICATE_WINDOW_HOURS = 72.0
 
 
 def create_issue(
@@ -23,10 +49,14 @@ def create_issue(
         raise ValueError("Location must be a dict with 'lat' and 'lon' keys.")
     if not isinstance(location['lat'], (int, float)) or not isinstance(location['lon'], (int, float)):
         raise ValueError("Location 'lat' and 'lon' must be numbers.")
+    # Written so NaN fails too; large values would overflow the grid indexes
+    if not (-90 <= location['lat'] <= 90 and -180 <= location['lon'] <= 180):
+        raise ValueError("Location 'lat' must be within [-90, 90] and 'lon' within [-180, 180].")
 
     issue_id = str(uuid.uuid4())
     now = datetime.now()
     initial_status = "OPEN"
+    duplicates = find_duplicate_candidates(category, location, now)
 
     issue = ReportedIssue(
         issue_id=issue_id,
@@ -38,40 +68,193 @@ def create_issue(
         reporter_id=reporter_id,
         photo_filename=photo_filename,
         last_updated=now,
+        # Points at the original report, so repeated reports of one pothole form one group
+        duplicate_of=(duplicates[0].duplicate_of or duplicates[0].issue_id) if duplicates else None,
     )
-    _issues[issue_id] = issue
+    _cache_issue(issue)
+    _persist_issue(issue)
     return issue
 
 
+def _issue_to_record(issue: ReportedIssue) -> dict:
+    # Datetimes are stored as ISO strings
+    return dict(vars(issue), timestamp=issue.timestamp.isoformat(), last_updated=issue.last_updated.isoformat())
+
+
+def _issue_from_record(record: dict) -> ReportedIssue:
+    return ReportedIssue(**dict(
+        record,
+        timestamp=datetime.fromisoformat(record["timestamp"]),
+        last_updated=datetime.fromisoformat(record["last_updated"]),
+    ))
+
+
+def _cache_issue(issue: ReportedIssue) -> ReportedIssue:
+    # The proximity index rejects unusable locations before anything else is touched
+    _proximity_index.add(issue.issue_id, issue.category, issue.location['lat'], issue.location['lon'],
+                         issue.timestamp, issue.status)
+    _issues[issue.issue_id] = issue
+    _sorted_issue_ids.add(issue.issue_id)
+    _search_index.add(issue.issue_id, issue.category, issue.description, issue.status)
+    return issue
+
+
+def _persist_issue(issue: ReportedIssue) -> None:
+    """Writes a changed issue through to the attached storage and publishes it on the change feed."""
+    if _storage is not None:
+        _storage.put(ISSUE_RECORD, issue.issue_id, _issue_to_record(issue))
+    _changes.publish(ISSUE_RECORD, issue.issue_id, issue)
+
+
+def attach_storage(backend: Optional[StorageBackend]) -> int:
+    """
+    Makes a storage backend the home of issue state, loading the issues it holds.
+
+    The in-memory issues then serve reads as a cache and every change is written through.
+    With a backend shared by several processes (common.state_server or a SQLite file), call
+    sync_storage() to pick up the other processes' changes. Passing None detaches and keeps
+    running in memory.
+    Returns the number of issues loaded.
+    """
+    global _storage, _storage_sequence
+    _storage = None
+    _issues.clear()
+    _sorted_issue_ids.clear()
+    _search_index.clear()
+    _proximity_index.clear()
+    _changes.publish_reset()
+    if backend is None:
+        return 0
+    _storage_sequence = backend.change_sequence()
+    for _, record in backend.load_all(ISSUE_RECORD):
+        _cache_issue(_issue_from_record(record))
+    _storage = backend
+    return len(_issues)
+
+
+def sync_storage() -> int:
+    """
+    Applies issue changes other processes wrote to the attached storage since the last sync.
+    Returns the number of changed issues applied.
+    """
+    global _storage_sequence
+    if _storage is None:
+        return 0
+    sequence, changes = _storage.changes_since(_storage_sequence)
+    if changes is None:
+        return attach_storage(_storage)
+    applied = 0
+    for kind, issue_id, record in changes:
+        if kind != ISSUE_RECORD or record is None:
+            continue
+        issue = _issues.get(issue_id)
+        if issue is None or _issue_to_record(issue) != record:
+            _changes.publish(ISSUE_RECORD, issue_id, _cache_issue(_issue_from_record(record)))
+            applied += 1
+    _storage_sequence = sequence
+    return applied
+
+
 def get_issue(issue_id: str) -> Optional[ReportedIssue]:
     """Retrieves an issue by its ID."""
-    return _issues.get(issue_id)
+    issue = _issues.get(issue_id)
+    if issue is None and _storage is not None:
+        record = _storage.get(ISSUE_RECORD, issue_id)
+        if record is not None:
+            issue = _cache_issue(_issue_from_record(record))
+    return issue
 
 
 def list_issues(
     status_filter: Optional[str] = None, category_filter: Optional[str] = None
 ) -> List[ReportedIssue]:
-    """Lists all issues, with optional filtering by status and/or category."""
-    results = list(_issues.values())
-
-    if status_filter:
-        results = [
-            issue for issue in results if issue.status.lower() == status_filter.lower()
-        ]
-    if category_filter:
-        results = [
-            issue
-            for issue in results
-            if issue.category.lower() == category_filter.lower()
-        ]
-    return results
+    """Lists all issues, with optional filtering by status and/or category (case-insensitive)."""
+    if not status_filter and not category_filter:
+        return list(_issues.values())
+    # The index holds every cached issue; IDs it still has after _issues was cleared are skipped
+    matches = (_issues.get(issue_id) for issue_id in _search_index.matching_ids(status_filter, category_filter))
+    return [issue for issue in matches if issue is not None]
+
+
+def search_issues(
+    query: str = "",
+    status_filter: Optional[str] = None,
+    category_filter: Optional[str] = None,
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    after: Optional[str] = None,
+) -> Tuple[List[ReportedIssue], int, Dict[str, Dict[str, int]], Optional[str]]:
+    """
+    Searches issues whose category or description contains every word of `query`, newest first.
+    Returns one page of issues, the total number of matches, the status and category facet
+    counts (see IssueSearchIndex.search) and the issue ID to pass as `after` for the next page.
+    """
+    issue_ids, total, facets, next_issue_id = _search_index.search(
+        query, status_filter, category_filter, limit, after
+    )
+    issues = [_issues[issue_id] for issue_id in issue_ids if issue_id in _issues]
+    return issues, total, facets, next_issue_id
+
+
+def list_issues_page(
+    limit: int,
+    after: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    category_filter: Optional[str] = None,
+) -> Tuple[List[ReportedIssue], Optional[str]]:
+    """
+    Lists one page of issues in issue ID order, with the same optional filters as list_issues.
+    The page starts right after the issue ID `after` (None for the first page). Returns the
+    issues and the issue ID to pass as `after` for the next page (None on the last page).
+    """
+    status = status_filter.lower() if status_filter else None
+    category = category_filter.lower() if category_filter else None
+
+    def matches(issue: ReportedIssue) -> bool:
+        return (status is None or issue.status.lower() == status) and (
+            category is None or issue.category.lower() == category
+        )
+
+    return _sorted_issue_ids.page(limit, after, _issues.get, matches if status or category else None)
+
+
+def find_duplicate_candidates(
+    category: str,
+    location: Dict[str, float],
+    timestamp: Optional[datetime] = None,
+    radius_meters: float = DUPLICATE_RADIUS_METERS,
+    window_hours: float = DUPLICATE_WINDOW_HOURS,
+) -> List[ReportedIssue]:
+    """
+    Finds unresolved issues of the same category (case-insensitive) reported within
+    `radius_meters` of a location and `window_hours` of a time (default now), nearest first.
+    """
+    matches = _proximity_index.nearby(
+        category, location['lat'], location['lon'], timestamp or datetime.now(),
+        radius_meters, timedelta(hours=window_hours), UNRESOLVED_STATUSES,
+    )
+    return [_issues[issue_id] for _, issue_id in matches if issue_id in _issues]
+
+
+def issue_hot_spots(
+    cell_meters: float,
+    status_filter: Optional[str] = None,
+    category_filter: Optional[str] = None,
+    min_count: int = 1,
+) -> List[dict]:
+    """
+    Aggregates issues into hot spots of about `cell_meters` on a side, busiest first: each has the
+    centroid `lat`/`lon`, the issue `count` and the count per category. Counts unresolved issues
+    unless a status filter is given.
+    """
+    statuses = [status_filter.upper()] if status_filter else UNRESOLVED_STATUSES
+    return _proximity_index.clusters(cell_meters, statuses, category_filter, min_count)
 
 
 def update_issue_status(
     issue_id: str, new_status: str
 ) -> Optional[ReportedIssue]:
     """Updates the status of an existing issue."""
-    issue = _issues.get(issue_id)
+    issue = get_issue(issue_id)
     if not issue:
         return None
 
@@ -83,4 +266,18 @@ def update_issue_status(
 
     issue.status = normalized_new_status
     issue.last_updated = datetime.now()
+    issue.version += 1
+    _search_index.set_status(issue_id, normalized_new_status)
+    _proximity_index.set_status(issue_id, normalized_new_status)
+    _persist_issue(issue)
     return issue
+
+
+def _reset_issues_data():
+    global _storage, _storage_sequence
+    _storage = None
+    _storage_sequence = 0
+    _issues.clear()
+    _sorted_issue_ids.clear()
+    _search_index.clear()
+    _proximity_index.clear()
@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Dict
 
+from common.serialization import dataclass_serializer
+
 @dataclass
 class ReportedIssue:
     """Represents a citizen-reported issue."""
@@ -14,3 +16,9 @@ class ReportedIssue:
     last_updated: datetime
     reporter_id: Optional[str] = None
     photo_filename: Optional[str] = None
+    version: int = 0  # Bumped by every change made through issue_manager; identifies the state in ETags
+    duplicate_of: Optional[str] = None  # Earlier unresolved issue this report likely repeats (see issue_manager.create_issue)
+
+# Response serializer: a shallow dict of the fields, without dataclasses.asdict's deep copy.
+# Datetimes are left to the app's JSON provider, which sends them as HTTP dates.
+reported_issue_to_dict = dataclass_serializer(ReportedIssue)
@@ -0,0 +1,271 @@
+"""
+Content-addressed storage for issue photos, with background post-processing.
+
+Uploads are streamed chunk by chunk into a temporary file while their SHA-256 is computed,
+so a photo is never held in memory whole. The finished file is named after its hash
+(`<sha256>.<ext>`, under a two-character fan-out directory), which makes storing the same
+photo twice a no-op: the second upload is discarded and both reports share the file.
+
+After a new photo is stored, a worker pool extracts the GPS location from its EXIF data
+and, when Pillow is installed, writes a thumbnail. The results are saved next to the photo
+as `<sha256>.json`, so every worker process sharing the folder can read them.
+"""
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Thumbnails are skipped; EXIF locations are read without Pillow
+    Image = None
+
+# Bytes read from an upload per step
+PHOTO_CHUNK_SIZE = 64 * 1024
+# Largest photo accepted, matching the report form
+MAX_PHOTO_BYTES = 10 * 1024 * 1024
+# Bounding box of generated thumbnails, in pixels
+THUMBNAIL_SIZE = (320, 320)
+# Threads post-processing new photos
+PHOTO_WORKERS = 2
+
+# Leading bytes of the accepted image formats
+_SIGNATURES = ((b'\xff\xd8\xff', '.jpg'), (b'\x89PNG\r\n\x1a\n', '.png'), (b'GIF87a', '.gif'), (b'GIF89a', '.gif'))
+_PHOTO_FILENAME = re.compile(r'^([0-9a-f]{64})\.(jpg|png|gif)$')
+# EXIF tags: the GPS IFD pointer in IFD0, and latitude/longitude (with their N/S and E/W references) in it
+_GPS_IFD_TAG = 0x8825
+_GPS_LAT_REF, _GPS_LAT, _GPS_LON_REF, _GPS_LON = 1, 2, 3, 4
+
+
+class PhotoTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_PHOTO_BYTES."""
+
+
+@dataclass
+class StoredPhoto:
+    """Result of storing an upload."""
+    filename: str  # <sha256>.<ext>; the value to keep in ReportedIssue.photo_filename
+    size: int
+    duplicate: bool  # True if the same photo was already stored
+
+
+def _image_extension(head: bytes) -> Optional[str]:
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def read_exif_location(data: bytes) -> Optional[Dict[str, float]]:
+    """
+    Reads the GPS position from the EXIF block of a JPEG.
+
+    Args:
+        data: The start of the JPEG; the EXIF block is within its first 64 KiB.
+
+    Returns:
+        {"lat": ..., "lon": ...} in degrees, or None if the photo carries no usable position.
+    """
+    position = 2  # After the SOI marker
+    while position + 4 <= len(data) and data[position] == 0xFF:
+        marker = data[position + 1]
+        length = struct.unpack('>H', data[position + 2:position + 4])[0]
+        if marker == 0xE1 and data[position + 4:position + 10] == b'Exif\x00\x00':
+            try:
+                return _tiff_gps_location(data[position + 10:position + 2 + length])
+            except (struct.error, IndexError, ZeroDivisionError):
+                return None  # Truncated or corrupt EXIF data
+        if marker == 0xDA:  # Start of the image data; no EXIF block before it
+            return None
+        position += 2 + length
+    return None
+
+
+def _tiff_gps_location(tiff: bytes) -> Optional[Dict[str, float]]:
+    order = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if order is None:
+        return None
+
+    def entries(offset: int) -> Dict[int, tuple]:
+        count = struct.unpack(order + 'H', tiff[offset:offset + 2])[0]
+        ifd = {}
+        for i in range(count):
+            tag, kind, items, value = struct.unpack(order + 'HHI4s', tiff[offset + 2 + 12 * i:offset + 14 + 12 * i])
+            ifd[tag] = (kind, items, value)
+        return ifd
+
+    def degrees(entry: tuple) -> float:
+        kind, items, value = entry
+        offset = struct.unpack(order + 'I', value)[0]
+        parts = struct.unpack(order + 'I' * 6, tiff[offset:offset + 24])  # Three RATIONALs: d, m, s
+        d, m, s = (parts[i] / parts[i + 1] for i in (0, 2, 4))
+        return d + m / 60.0 + s / 3600.0
+
+    ifd0 = entries(struct.unpack(order + 'I', tiff[4:8])[0])
+    if _GPS_IFD_TAG not in ifd0:
+        return None
+    gps = entries(struct.unpack(order + 'I', ifd0[_GPS_IFD_TAG][2])[0])
+    if not all(tag in gps for tag in (_GPS_LAT_REF, _GPS_LAT, _GPS_LON_REF, _GPS_LON)):
+        return None
+    lat = degrees(gps[_GPS_LAT]) * (-1.0 if gps[_GPS_LAT_REF][2][:1] == b'S' else 1.0)
+    lon = degrees(gps[_GPS_LON]) * (-1.0 if gps[_GPS_LON_REF][2][:1] == b'W' else 1.0)
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return {"lat": lat, "lon": lon}
+
+
+class PhotoStore:
+    """Photos stored by content hash under a root folder, post-processed by a background pool."""
+
+    def __init__(self, root: str, workers: int = PHOTO_WORKERS):
+        self.root = root
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def path(self, filename: str) -> str:
+        """
+        Returns the file path of a stored photo.
+
+        Raises:
+            ValueError: If the name is not one this store gives out.
+        """
+        match = _PHOTO_FILENAME.match(filename) if isinstance(filename, str) else None
+        if match is None:
+            raise ValueError(f"Not a stored photo: '{filename}'.")
+        return os.path.join(self.root, filename[:2], filename)
+
+    def _sidecar_path(self, filename: str, suffix: str) -> str:
+        return os.path.join(self.root, filename[:2], filename.rsplit('.', 1)[0] + suffix)
+
+    def thumbnail_path(self, filename: str) -> str:
+        """Returns where the thumbnail of a stored photo is written."""
+        self.path(filename)  # Validates the name
+        return self._sidecar_path(filename, '.thumb.jpg')
+
+    def exists(self, filename: str) -> bool:
+        try:
+            return os.path.isfile(self.path(filename))
+        except ValueError:
+            return False
+
+    def save(self, chunks: Iterable[bytes], max_bytes: int = MAX_PHOTO_BYTES) -> StoredPhoto:
+        """
+        Streams an upload to disk and stores it under its content hash, then queues its
+        post-processing.
+
+        Args:
+            chunks: The photo's bytes, in pieces of any size.
+            max_bytes: Largest accepted photo.
+
+        Returns:
+            The stored photo.
+
+        Raises:
+            PhotoTooLargeError: If the upload exceeds max_bytes (nothing is stored).
+            ValueError: If the upload is not a JPEG, PNG or GIF image.
+        """
+        incoming = os.path.join(self.root, '.incoming')
+        os.makedirs(incoming, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=incoming)
+        hasher = hashlib.sha256()
+        head = b''
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise PhotoTooLargeError(f"Photo exceeds {max_bytes} bytes.")
+                    if len(head) < 8:
+                        head += chunk[:8]
+                    hasher.update(chunk)
+                    temp_file.write(chunk)
+            extension = _image_extension(head)
+            if extension is None:
+                raise ValueError("Photo must be a JPEG, PNG or GIF image.")
+            filename = hasher.hexdigest() + extension
+            final_path = self.path(filename)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            duplicate = os.path.exists(final_path)
+            if duplicate:
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, final_path)  # Atomic, so readers never see a partial photo
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._schedule(filename)
+        return StoredPhoto(filename=filename, size=size, duplicate=duplicate)
+
+    def _schedule(self, filename: str) -> Optional[Future]:
+        with self._lock:
+            job = self._jobs.get(filename)
+            if job is None and not os.path.exists(self._sidecar_path(filename, '.json')):
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='photo')
+                job = self._jobs[filename] = self._executor.submit(self._process, filename)
+            return job
+
+    def _process(self, filename: str) -> dict:
+        path = self.path(filename)
+        info = {"location": None, "thumbnail": False}
+        try:
+            if filename.endswith('.jpg'):
+                with open(path, 'rb') as photo:
+                    info["location"] = read_exif_location(photo.read(PHOTO_CHUNK_SIZE + 16))
+            if Image is not None:
+                with Image.open(path) as image:
+                    thumbnail = ImageOps.exif_transpose(image)
+                    thumbnail.thumbnail(THUMBNAIL_SIZE)
+                    thumbnail.convert('RGB').save(self.thumbnail_path(filename), 'JPEG', quality=80)
+                info["thumbnail"] = True
+        except Exception as e:  # A photo that cannot be decoded keeps its upload; only the extras are lost
+            info["error"] = str(e)
+        sidecar = self._sidecar_path(filename, '.json')
+        try:
+            with open(sidecar + '.tmp', 'w') as f:
+                json.dump(info, f)
+            os.replace(sidecar + '.tmp', sidecar)
+        finally:
+            # A failed job is not kept, so the next info() call retries it
+            with self._lock:
+                self._jobs.pop(filename, None)
+        return info
+
+    def info(self, filename: str, timeout: Optional[float] = 0) -> Optional[dict]:
+        """
+        Returns the post-processing results of a stored photo: {"status": "done", "location":
+        {"lat", "lon"} or None, "thumbnail": bool}, or {"status": "processing"} if they are not
+        ready within `timeout` seconds (None waits indefinitely), or {"status": "error", "error": message}
+        if its results could not be saved. Returns None for unknown photos.
+        """
+        if not self.exists(filename):
+            return None
+        sidecar = self._sidecar_path(filename, '.json')
+        if not os.path.exists(sidecar):
+            job = self._schedule(filename)  # Also picks up photos another process stored
+            if job is not None:
+                try:
+                    job.result(timeout)
+                except FutureTimeoutError:
+                    return {"status": "processing"}
+                except Exception as e:
+                    return {"status": "error", "error": str(e)}
+        with open(sidecar) as f:
+            return dict(json.load(f), status="done")
+
+    def shutdown(self) -> None:
+        """Waits for queued post-processing to finish and stops the workers."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
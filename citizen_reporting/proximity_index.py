@@ -0,0 +1,261 @@
+"""
+Spatial-temporal index over reported issues, for duplicate detection and hot-spot clusters.
+
+Issues are bucketed by a latitude/longitude grid cell, then by category, in report-time
+order. A duplicate search visits only the few cells around the new report and, in each,
+binary-searches the time window, so its cost depends on the reports nearby rather than on
+the total. Running counts and coordinate sums per (cell, category, status) are kept in NumPy
+columns, so hot spots at any coarser cell size are aggregated in a few vectorized passes over
+the occupied cells without visiting the issues.
+"""
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from common.geo import METERS_PER_DEGREE, haversine_meters
+
+# Edge length of a grid cell in degrees (about 110 m of latitude)
+DEFAULT_CELL_SIZE_DEGREES = 0.001
+
+class _Entry:
+    __slots__ = ('issue_id', 'category', 'lat', 'lon', 'time', 'status')
+
+    def __init__(self, issue_id: str, category: str, lat: float, lon: float, time: float, status: str):
+        self.issue_id = issue_id
+        self.category = category  # Lowercase
+        self.lat = lat
+        self.lon = lon
+        self.time = time  # Report time in epoch seconds
+        self.status = status
+
+class _Cell:
+    __slots__ = ('times', 'entries')
+
+    def __init__(self):
+        # Per lowercase category: report times in ascending order, and the entries in the same order
+        self.times: Dict[str, List[float]] = {}
+        self.entries: Dict[str, List[_Entry]] = {}
+
+class IssueProximityIndex:
+    """
+    Grid of issues by location, category and report time.
+
+    An issue's category, location and report time never change, so they are indexed once;
+    later add() calls for the same issue only update its status.
+    """
+
+    def __init__(self, cell_size_degrees: float = DEFAULT_CELL_SIZE_DEGREES):
+        if cell_size_degrees <= 0:
+            raise ValueError("cell_size_degrees must be positive.")
+        self.cell_size_degrees = cell_size_degrees
+        self._cells: Dict[Tuple[int, int], _Cell] = {}
+        self._entries: Dict[str, _Entry] = {}
+        self._category_codes: Dict[str, int] = {}  # Lowercase category -> code
+        self._category_labels: List[str] = []  # Code -> first spelling seen
+        self._status_codes: Dict[str, int] = {}
+        # Aggregation slots, one per (cell, category, status) ever used
+        self._slot_of: Dict[Tuple[Tuple[int, int], str, str], int] = {}
+        self._slot_cells = np.empty((1024, 2), dtype=np.int64)  # Row and column
+        self._slot_keys = np.empty((1024, 2), dtype=np.int32)  # Category and status codes
+        self._slot_sums = np.zeros((1024, 3))  # Issue count, sum of latitudes, sum of longitudes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, issue_id: str) -> bool:
+        return issue_id in self._entries
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._entries.clear()
+        self._category_codes.clear()
+        self._category_labels.clear()
+        self._status_codes.clear()
+        self._slot_of.clear()
+        self._slot_sums[:] = 0
+
+    def _cell_for(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size_degrees), math.floor(lon / self.cell_size_degrees))
+
+    def add(self, issue_id: str, category: str, lat: float, lon: float, timestamp: datetime, status: str) -> None:
+        """
+        Indexes an issue, or updates its status if it is already indexed.
+
+        Raises:
+            ValueError: If lat is outside [-90, 90] or lon outside [-180, 180].
+        """
+        entry = self._entries.get(issue_id)
+        if entry is not None:
+            self.set_status(issue_id, status)
+            return
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):  # Also rejects NaN
+            raise ValueError(f"Invalid issue location: ({lat}, {lon}).")
+        lat, lon = float(lat), float(lon)
+        key = category.lower()
+        if key not in self._category_codes:
+            self._category_codes[key] = len(self._category_labels)
+            self._category_labels.append(category)
+        entry = _Entry(issue_id, key, lat, lon, timestamp.timestamp(), status)
+        self._entries[issue_id] = entry
+        cell_key = self._cell_for(entry.lat, entry.lon)
+        cell = self._cells.get(cell_key)
+        if cell is None:
+            cell = self._cells[cell_key] = _Cell()
+        times = cell.times.setdefault(key, [])
+        entries = cell.entries.setdefault(key, [])
+        if not times or times[-1] <= entry.time:
+            times.append(entry.time)  # Reports usually arrive in time order
+            entries.append(entry)
+        else:
+            position = bisect_right(times, entry.time)
+            times.insert(position, entry.time)
+            entries.insert(position, entry)
+        self._count(cell_key, entry, 1)
+
+    def set_status(self, issue_id: str, status: str) -> None:
+        """Moves an indexed issue to another status; unknown issues are ignored."""
+        entry = self._entries.get(issue_id)
+        if entry is None or entry.status == status:
+            return
+        cell_key = self._cell_for(entry.lat, entry.lon)
+        self._count(cell_key, entry, -1)
+        entry.status = status
+        self._count(cell_key, entry, 1)
+
+    def _count(self, cell_key: Tuple[int, int], entry: _Entry, sign: int) -> None:
+        slot = self._slot_of.get((cell_key, entry.category, entry.status))
+        if slot is None:
+            slot = len(self._slot_of)
+            self._slot_of[(cell_key, entry.category, entry.status)] = slot
+            if slot == len(self._slot_sums):
+                self._slot_cells = np.resize(self._slot_cells, (2 * slot, 2))
+                self._slot_keys = np.resize(self._slot_keys, (2 * slot, 2))
+                self._slot_sums = np.concatenate([self._slot_sums, np.zeros_like(self._slot_sums)])
+            status_code = self._status_codes.setdefault(entry.status, len(self._status_codes))
+            self._slot_cells[slot] = cell_key
+            self._slot_keys[slot] = (self._category_codes[entry.category], status_code)
+        sums = self._slot_sums
+        sums[slot, 0] += sign
+        sums[slot, 1] += sign * entry.lat
+        sums[slot, 2] += sign * entry.lon
+
+    def nearby(
+        self,
+        category: str,
+        lat: float,
+        lon: float,
+        timestamp: datetime,
+        meters: float,
+        window: timedelta,
+        statuses: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[float, str]]:
+        """
+        Finds the issues of a category (case-insensitive) reported within `meters` of a location
+        and within `window` before or after `timestamp`.
+
+        Args:
+            category: The category to match.
+            lat: Latitude of the search center in degrees.
+            lon: Longitude of the search center in degrees.
+            timestamp: The report time to search around.
+            meters: The search radius in meters.
+            window: The largest time difference to a matching report.
+            statuses: Optional statuses to restrict the matches to.
+
+        Returns:
+            (distance_meters, issue_id) tuples, nearest first.
+        """
+        if meters < 0:
+            return []
+        key = category.lower()
+        wanted_statuses = set(statuses) if statuses is not None else None
+        center = timestamp.timestamp()
+        earliest, latest = center - window.total_seconds(), center + window.total_seconds()
+        d_lat = meters / METERS_PER_DEGREE
+        d_lon = meters / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        min_row, min_col = self._cell_for(lat - d_lat, lon - d_lon)
+        max_row, max_col = self._cell_for(lat + d_lat, lon + d_lon)
+
+        matches = []
+        cells = self._cells
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                cell = cells.get((row, col))
+                if cell is None or key not in cell.times:
+                    continue
+                times, entries = cell.times[key], cell.entries[key]
+                for i in range(bisect_left(times, earliest), bisect_right(times, latest)):
+                    entry = entries[i]
+                    if wanted_statuses is not None and entry.status not in wanted_statuses:
+                        continue
+                    distance = haversine_meters(lat, lon, entry.lat, entry.lon)
+                    if distance <= meters:
+                        matches.append((distance, entry.issue_id))
+        matches.sort()
+        return matches
+
+    def clusters(
+        self,
+        cell_meters: float,
+        statuses: Optional[Iterable[str]] = None,
+        category: Optional[str] = None,
+        min_count: int = 1,
+    ) -> List[dict]:
+        """
+        Aggregates the issues into hot spots: one per square of about `cell_meters` on a side
+        that holds at least `min_count` matching issues.
+
+        Args:
+            cell_meters: Approximate size of a hot spot; rounded to a whole number of grid cells.
+            statuses: Optional statuses to count; all if None.
+            category: Optional category (case-insensitive) to count; all if None.
+            min_count: Smallest number of issues a reported hot spot holds.
+
+        Returns:
+            Dicts with the centroid `lat` and `lon`, the issue `count` and the count per category
+            label (`categories`, largest first), ordered by count, largest first.
+        """
+        # Capped at the width of the globe, beyond which squares group nothing more and overflow int64
+        factor = max(1, round(min(cell_meters / (self.cell_size_degrees * METERS_PER_DEGREE), 360 / self.cell_size_degrees)))
+        slot_count = len(self._slot_of)
+        sums = self._slot_sums[:slot_count]
+        keys = self._slot_keys[:slot_count]
+        selected = sums[:, 0] > 0
+        if statuses is not None:
+            codes = [self._status_codes[status] for status in statuses if status in self._status_codes]
+            selected &= np.isin(keys[:, 1], codes)
+        if category:
+            selected &= keys[:, 0] == self._category_codes.get(category.lower(), -1)
+        slots = np.flatnonzero(selected)
+        if not len(slots):
+            return []
+
+        # Number the hot-spot squares the selected slots fall in, then sum per square
+        squares = self._slot_cells[slots] // factor
+        square_ids = (squares[:, 0] - squares[:, 0].min()) * (np.ptp(squares[:, 1]) + 1) + (squares[:, 1] - squares[:, 1].min())
+        _, spot_of_slot = np.unique(square_ids, return_inverse=True)
+        spot_count = int(spot_of_slot.max()) + 1
+        counts = np.bincount(spot_of_slot, weights=sums[slots, 0], minlength=spot_count)
+        lat_sums = np.bincount(spot_of_slot, weights=sums[slots, 1], minlength=spot_count)
+        lon_sums = np.bincount(spot_of_slot, weights=sums[slots, 2], minlength=spot_count)
+        category_count = len(self._category_labels)
+        by_category = np.bincount(spot_of_slot * category_count + keys[slots, 0], weights=sums[slots, 0],
+                                  minlength=spot_count * category_count).reshape(spot_count, category_count)
+
+        labels = self._category_labels
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] >= min_count]
+        hot_spots = []
+        for count, lat_sum, lon_sum, spot_categories in zip(counts[order].tolist(), lat_sums[order].tolist(),
+                                                            lon_sums[order].tolist(), by_category[order].tolist()):
+            ranked = sorted((c for c, n in enumerate(spot_categories) if n), key=lambda c: -spot_categories[c])
+            hot_spots.append({
+                "lat": lat_sum / count,
+                "lon": lon_sum / count,
+                "count": int(count),
+                "categories": {labels[c]: int(spot_categories[c]) for c in ranked},
+            })
+        return hot_spots
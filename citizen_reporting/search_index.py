@@ -0,0 +1,329 @@
+"""
+Full-text and faceted search over reported issues.
+
+Every indexed issue gets a dense document number in indexing order. Each lowercase word of
+its category and description maps to a posting list of the document numbers containing it,
+appended in ascending order, so a query for several words intersects sorted arrays with
+binary searches, smallest list first. Status and category are kept as NumPy code columns,
+plus status x category count tables, for all issues and for each frequent word, maintained on
+every change: totals and facet counts of listings and of one-word searches never touch the
+documents, and pages are found by scanning back from the newest until the page is full.
+"""
+import re
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Issues a search returns when the caller gives no limit
+DEFAULT_SEARCH_LIMIT = 100
+# Posting list length from which a word keeps its own status x category count table, so that
+# searching for a common word alone needs no pass over its matches
+FREQUENT_WORD_POSTINGS = 50_000
+# Documents examined per step when scanning backwards for the newest matches
+_SCAN_CHUNK = 65_536
+# Code of a filter value the index has never seen; matches nothing
+_UNKNOWN = -2
+
+_WORD = re.compile(r"\w+")
+
+def _grown(counts: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    grown = np.zeros(shape, dtype=np.int64)
+    grown[:counts.shape[0], :counts.shape[1]] = counts
+    return grown
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into its distinct lowercase words, in order of first occurrence."""
+    return list(dict.fromkeys(_WORD.findall(text.lower())))
+
+class _Vocabulary:
+    """Maps case-insensitive labels to dense codes, keeping the first spelling seen as the label."""
+
+    __slots__ = ('labels', '_codes')
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, label: str, add: bool = False) -> int:
+        key = label.lower()
+        code = self._codes.get(key)
+        if code is None:
+            if not add:
+                return _UNKNOWN
+            code = self._codes[key] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def clear(self) -> None:
+        self.labels.clear()
+        self._codes.clear()
+
+class IssueSearchIndex:
+    """
+    Inverted index over issue category and description words, with status and category facets.
+
+    Results are ordered newest indexed first. An issue's category and description never change,
+    so they are indexed once; later add() calls for the same issue only update its status. All
+    methods are thread safe: posting lists are read through NumPy views that must not outlive a
+    resize, so reads and writes share one lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, array] = {}
+        self._category_postings: List[array] = []
+        self._issue_ids: List[str] = []
+        self._doc_of: Dict[str, int] = {}
+        self._statuses = _Vocabulary()
+        self._categories = _Vocabulary()
+        self._status_codes = np.empty(1024, dtype=np.int8)
+        self._category_codes = np.empty(1024, dtype=np.int32)
+        self._counts = np.zeros((0, 0), dtype=np.int64)  # [status code, category code] -> issues
+        self._word_counts: Dict[str, np.ndarray] = {}  # The same, per frequent word
+
+    def __len__(self) -> int:
+        return int(self._counts.sum())
+
+    def __contains__(self, issue_id: str) -> bool:
+        return issue_id in self._doc_of
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._category_postings.clear()
+            self._issue_ids.clear()
+            self._doc_of.clear()
+            self._statuses.clear()
+            self._categories.clear()
+            self._counts = np.zeros((0, 0), dtype=np.int64)
+            self._word_counts.clear()
+
+    def add(self, issue_id: str, category: str, description: str, status: str) -> None:
+        """Indexes an issue, or updates its status if it is already indexed."""
+        with self._lock:
+            doc = self._doc_of.get(issue_id)
+            if doc is not None:
+                self._set_status(doc, status)
+                return
+            status_code = self._statuses.code(status, add=True)
+            category_code = self._categories.code(category, add=True)
+            self._grow_counts()
+            doc = len(self._issue_ids)
+            if doc == len(self._status_codes):
+                self._status_codes = np.resize(self._status_codes, 2 * doc)
+                self._category_codes = np.resize(self._category_codes, 2 * doc)
+            self._issue_ids.append(issue_id)
+            self._doc_of[issue_id] = doc
+            self._status_codes[doc] = status_code
+            self._category_codes[doc] = category_code
+            self._counts[status_code, category_code] += 1
+            if category_code == len(self._category_postings):
+                self._category_postings.append(array('i'))
+            self._category_postings[category_code].append(doc)
+            postings, word_counts = self._postings, self._word_counts
+            for token in tokenize(f"{category} {description}"):
+                token_postings = postings.get(token)
+                if token_postings is None:
+                    token_postings = postings[token] = array('i')
+                token_postings.append(doc)
+                counts = word_counts.get(token)
+                if counts is not None:
+                    counts[status_code, category_code] += 1
+                elif len(token_postings) >= FREQUENT_WORD_POSTINGS:
+                    word_counts[token] = self._count_docs(token_postings)
+
+    def set_status(self, issue_id: str, status: str) -> None:
+        """Moves an indexed issue to another status; unknown issues are ignored."""
+        with self._lock:
+            doc = self._doc_of.get(issue_id)
+            if doc is not None:
+                self._set_status(doc, status)
+
+    def _set_status(self, doc: int, status: str) -> None:
+        old_code = self._status_codes[doc]
+        new_code = self._statuses.code(status, add=True)
+        if new_code == old_code:
+            return
+        self._grow_counts()
+        category_code = self._category_codes[doc]
+        self._counts[old_code, category_code] -= 1
+        self._counts[new_code, category_code] += 1
+        self._status_codes[doc] = new_code
+        for token, counts in self._word_counts.items():
+            docs = np.frombuffer(self._postings[token], dtype=np.int32)
+            position = np.searchsorted(docs, doc)
+            if position < len(docs) and docs[position] == doc:
+                counts[old_code, category_code] -= 1
+                counts[new_code, category_code] += 1
+
+    def _grow_counts(self) -> None:
+        # Makes room in the count tables for new statuses and categories
+        shape = (len(self._statuses.labels), len(self._categories.labels))
+        if shape != self._counts.shape:
+            self._counts = _grown(self._counts, shape)
+            for token, counts in self._word_counts.items():
+                self._word_counts[token] = _grown(counts, shape)
+
+    def _count_docs(self, postings: array) -> np.ndarray:
+        n_statuses, n_categories = self._counts.shape
+        docs = np.frombuffer(postings, dtype=np.int32)
+        cells = self._status_codes[docs].astype(np.int64) * n_categories + self._category_codes[docs]
+        return np.bincount(cells, minlength=n_statuses * n_categories).reshape(n_statuses, n_categories)
+
+    def matching_ids(self, status: Optional[str] = None, category: Optional[str] = None) -> List[str]:
+        """Returns the IDs of the issues with the given status and category (case-insensitive), oldest first."""
+        with self._lock:
+            docs = self._filter_docs(self._statuses.code(status) if status else None,
+                                     self._categories.code(category) if category else None)
+            issue_ids = self._issue_ids
+            return [issue_ids[doc] for doc in docs.tolist()]
+
+    def _filter_docs(self, status_code: Optional[int], category_code: Optional[int]) -> np.ndarray:
+        size = len(self._issue_ids)
+        if category_code is not None:
+            if category_code < 0:
+                return np.empty(0, dtype=np.int32)
+            docs = np.array(self._category_postings[category_code], dtype=np.int32)
+            return docs if status_code is None else docs[self._status_codes[docs] == status_code]
+        if status_code is None:
+            return np.arange(size)
+        return np.flatnonzero(self._status_codes[:size] == status_code)
+
+    def search(
+        self,
+        query: str = "",
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        after: Optional[str] = None,
+    ) -> Tuple[List[str], int, Dict[str, Dict[str, int]], Optional[str]]:
+        """
+        Finds the issues whose category or description contains every word of `query`.
+
+        Args:
+            query: Words to match, case-insensitively; empty matches every issue.
+            status: Optional status filter (case-insensitive).
+            category: Optional category filter (case-insensitive).
+            limit: Maximum number of issue IDs to return.
+            after: Last issue ID of the previous page, or None for the first page.
+
+        Returns:
+            The matching issue IDs of the page (newest first), the total number of matches,
+            the facet counts and the issue ID to pass as `after` for the next page (None on
+            the last page). Facets are `{"status": {label: count}, "category": {label: count}}`
+            for the matches of the query; each facet ignores its own filter, so it shows what
+            selecting another value would return. Values without matches are omitted.
+        """
+        tokens = tokenize(query)
+        with self._lock:
+            status_code = self._statuses.code(status) if status else None
+            category_code = self._categories.code(category) if category else None
+            end = len(self._issue_ids) if after is None else self._doc_of.get(after, 0)
+            if not tokens:
+                result = self._search_counted(self._counts, None, status_code, category_code, end, limit)
+            elif len(tokens) == 1 and tokens[0] in self._word_counts:
+                result = self._search_counted(self._word_counts[tokens[0]], self._postings[tokens[0]],
+                                              status_code, category_code, end, limit)
+            else:
+                result = self._search_words(tokens, status_code, category_code, end, limit)
+            docs, total, status_counts, category_counts = result
+            issue_ids = self._issue_ids
+            page = [issue_ids[doc] for doc in docs[:limit].tolist()]
+            facets = {
+                "status": _facet(self._statuses.labels, status_counts),
+                "category": _facet(self._categories.labels, category_counts),
+            }
+        next_issue_id = page[-1] if len(docs) > limit else None
+        return page, total, facets, next_issue_id
+
+    # The _search helpers run under the lock and return new arrays only, so that no view of a
+    # posting list outlives it. Each returns the newest `limit + 1` matching documents before
+    # document `end`, the total number of matches and the status and category facet counts.
+
+    def _search_counted(self, counts: np.ndarray, postings: Optional[array], status_code: Optional[int],
+                        category_code: Optional[int], end: int, limit: int) -> Tuple[np.ndarray, int, np.ndarray, np.ndarray]:
+        # Totals and facets from a count table; `postings` is None for all issues
+        if category_code is None:
+            status_counts = counts.sum(axis=1)
+        else:
+            status_counts = counts[:, category_code] if category_code >= 0 else np.zeros(counts.shape[0], dtype=np.int64)
+        if status_code is None:
+            category_counts = counts.sum(axis=0)
+        else:
+            category_counts = counts[status_code] if status_code >= 0 else np.zeros(counts.shape[1], dtype=np.int64)
+        if status_code is None:
+            total = int(status_counts.sum())
+        else:
+            total = int(status_counts[status_code]) if status_code >= 0 else 0
+        if total == 0:
+            return np.empty(0, dtype=np.int32), 0, status_counts, category_counts
+
+        filter_category = category_code is not None
+        if postings is None and filter_category:
+            postings, filter_category = self._category_postings[category_code], False
+        candidates = None
+        if postings is not None:
+            candidates = np.frombuffer(postings, dtype=np.int32)
+            end = int(np.searchsorted(candidates, end))
+        found = []
+        wanted = limit + 1
+        while end > 0 and wanted > 0:
+            start = max(0, end - _SCAN_CHUNK)
+            docs = np.arange(start, end, dtype=np.int32) if candidates is None else candidates[start:end]
+            if status_code is not None:
+                docs = docs[self._status_codes[docs] == status_code]
+            if filter_category:
+                docs = docs[self._category_codes[docs] == category_code]
+            hits = docs[::-1][:wanted]
+            found.append(hits.copy())
+            wanted -= len(hits)
+            end = start
+        del candidates
+        return np.concatenate(found), total, status_counts, category_counts
+
+    def _search_words(self, tokens: List[str], status_code: Optional[int], category_code: Optional[int],
+                      end: int, limit: int) -> Tuple[np.ndarray, int, np.ndarray, np.ndarray]:
+        # Intersects the posting lists, then counts the facets over the matches
+        n_statuses, n_categories = self._counts.shape
+        postings = [self._postings.get(token) for token in tokens]
+        if any(p is None for p in postings):
+            docs = np.empty(0, dtype=np.int32)
+        else:
+            lists = sorted((np.frombuffer(p, dtype=np.int32) for p in postings), key=len)
+            docs = lists[0].copy()
+            for other in lists[1:]:
+                if not len(docs):
+                    break
+                if len(docs) * 8 < len(other):
+                    # Few candidates: binary search each in the longer list
+                    positions = np.minimum(np.searchsorted(other, docs), len(other) - 1)
+                    docs = docs[other[positions] == docs]
+                else:
+                    # Comparable lengths: a membership mask is cheaper than millions of binary searches
+                    members = np.zeros(len(self._issue_ids), dtype=bool)
+                    members[other] = True
+                    docs = docs[members.take(docs)]
+            del lists
+        status_codes = self._status_codes[docs]
+        category_codes = self._category_codes[docs]
+        if category_code is not None:
+            in_category = category_codes == category_code
+            status_codes = status_codes[in_category]
+        if status_code is not None:
+            in_status = self._status_codes[docs] == status_code
+            category_codes = category_codes[in_status]
+        status_counts = np.bincount(status_codes, minlength=n_statuses)
+        category_counts = np.bincount(category_codes, minlength=n_categories)
+        if status_code is not None:
+            docs = docs[in_status & in_category if category_code is not None else in_status]
+        elif category_code is not None:
+            docs = docs[in_category]
+        total = len(docs)
+        docs = docs[:np.searchsorted(docs, end)][::-1][:limit + 1]
+        return docs, total, status_counts, category_counts
+
+def _facet(labels: List[str], counts: np.ndarray) -> Dict[str, int]:
+    order = np.argsort(-counts, kind='stable')
+    return {labels[code]: int(counts[code]) for code in order.tolist() if counts[code]}
@@ -1,3 +1,4 @@
+import dataclasses
 import unittest
 from datetime import datetime, timedelta
 from typing import Dict, Any # For type hinting test data
@@ -15,8 +16,8 @@ from citizen_reporting.models import ReportedIssue
 class TestIssueManager(unittest.TestCase):
 
     def setUp(self):
-        """Clear the in-memory issue storage before each test."""
-        issue_manager._issues.clear()
+        """Clear the in-memory issue storage and its indexes before each test."""
+        issue_manager._reset_issues_data()
         # It's also good to reset any other global state if applicable, e.g. Allowed Statuses
         # For this example, ALLOWED_STATUSES is a constant, so no reset needed.
 
@@ -76,6 +77,20 @@ class TestIssueManager(unittest.TestCase):
             issue_manager.create_issue("Test", "Test desc", {"lat": "invalid", "lon": 1.0})
         with self.assertRaisesRegex(ValueError, "Location 'lat' and 'lon' must be numbers."):
             issue_manager.create_issue("Test", "Test desc", {"lat": 1.0, "lon": "invalid"})
+        for lat, lon in ((1e300, 0.0), (float('nan'), 0.0), (0.0, float('inf')), (91, 0.0), (0.0, -180.5), (10 ** 400, 0)):
+            with self.assertRaisesRegex(ValueError, "Location 'lat' must be within"):
+                issue_manager.create_issue("Test", "Test desc", {"lat": lat, "lon": lon})
+        self.assertEqual(issue_manager.list_issues(), [])
+
+    def test_cache_issue_leaves_no_ghost_on_index_failure(self):
+        """Test that an issue the proximity index rejects is not left in the other indexes."""
+        issue = issue_manager.create_issue("Pothole", "Deep one", {"lat": 10.0, "lon": 20.0})
+        ghost = dataclasses.replace(issue, issue_id="ghost", location={"lat": 1e300, "lon": 0.0})
+        with self.assertRaises(ValueError):
+            issue_manager._cache_issue(ghost)
+        self.assertNotIn("ghost", issue_manager._issues)
+        self.assertEqual([i.issue_id for i in issue_manager.search_issues("deep")[0]], [issue.issue_id])
+        self.assertEqual(issue_manager.list_issues_page(10)[0], [issue])
 
 
     def test_get_issue_existing(self):
@@ -181,6 +196,14 @@ class TestIssueManager(unittest.TestCase):
         self.assertEqual(stored_issue.status, "RESOLVED")
         self.assertEqual(stored_issue.last_updated, updated_issue.last_updated)
 
+    def test_update_issue_status_bumps_version(self):
+        """Test that every status update bumps the issue's version."""
+        issue = self._create_sample_issue()
+        self.assertEqual(issue.version, 0)
+        issue_manager.update_issue_status(issue.issue_id, "IN_PROGRESS")
+        issue_manager.update_issue_status(issue.issue_id, "RESOLVED")
+        self.assertEqual(issue_manager.get_issue(issue.issue_id).version, 2)
+
     def test_update_issue_status_invalid_status(self):
         """Test updating with an invalid status."""
         issue = self._create_sample_issue()
@@ -199,5 +222,64 @@ class TestIssueManager(unittest.TestCase):
         self.assertIsNotNone(updated_issue)
         self.assertEqual(updated_issue.status, "RESOLVED") # Should be stored in upper case as per ALLOWED_STATUSES
 
+    def test_search_issues(self):
+        """Test searching issue words with facets that follow status updates."""
+        main_st = self._create_sample_issue(category="Pothole", description="Deep pothole on Main St")
+        broadway = self._create_sample_issue(category="Pothole", description="Pothole on Broadway")
+        light = self._create_sample_issue(category="Streetlight", description="Light out on Main St")
+        issue_manager.update_issue_status(broadway.issue_id, "RESOLVED")
+
+        issues, total, facets, next_issue_id = issue_manager.search_issues("main st")
+        self.assertEqual([i.issue_id for i in issues], [light.issue_id, main_st.issue_id])  # Newest first
+        self.assertEqual(total, 2)
+        self.assertEqual(facets["category"], {"Pothole": 1, "Streetlight": 1})
+        self.assertIsNone(next_issue_id)
+
+        issues, total, facets, _ = issue_manager.search_issues("pothole", status_filter="open")
+        self.assertEqual([i.issue_id for i in issues], [main_st.issue_id])
+        self.assertEqual(facets["status"], {"OPEN": 1, "RESOLVED": 1})  # Ignores its own filter
+
+        issues, total, _, next_issue_id = issue_manager.search_issues("", limit=2)
+        self.assertEqual((len(issues), total, next_issue_id), (2, 3, broadway.issue_id))
+        issues, _, _, next_issue_id = issue_manager.search_issues("", limit=2, after=next_issue_id)
+        self.assertEqual(([i.issue_id for i in issues], next_issue_id), ([main_st.issue_id], None))
+
+    def test_create_issue_links_nearby_duplicates(self):
+        """Test that a repeated report of an unresolved issue points at the original."""
+        original = self._create_sample_issue(location={"lat": 34.0, "lon": -118.0})
+        repeat = self._create_sample_issue(category="POTHOLE", location={"lat": 34.0001, "lon": -118.0})
+        again = self._create_sample_issue(location={"lat": 34.0, "lon": -118.0001})
+        elsewhere = self._create_sample_issue(location={"lat": 34.01, "lon": -118.0})
+        other_category = self._create_sample_issue(category="Graffiti", location={"lat": 34.0, "lon": -118.0})
+
+        self.assertIsNone(original.duplicate_of)
+        self.assertEqual(repeat.duplicate_of, original.issue_id)
+        self.assertEqual(again.duplicate_of, original.issue_id)
+        self.assertIsNone(elsewhere.duplicate_of)
+        self.assertIsNone(other_category.duplicate_of)
+
+        candidates = issue_manager.find_duplicate_candidates("pothole", {"lat": 34.0, "lon": -118.0})
+        self.assertEqual(candidates[0].issue_id, original.issue_id)
+        self.assertEqual(len(candidates), 3)
+        later = datetime.now() + timedelta(hours=issue_manager.DUPLICATE_WINDOW_HOURS + 1)
+        self.assertEqual(issue_manager.find_duplicate_candidates("Pothole", {"lat": 34.0, "lon": -118.0}, later), [])
+
+        for issue in (original, repeat, again):
+            issue_manager.update_issue_status(issue.issue_id, "RESOLVED")
+        self.assertIsNone(self._create_sample_issue(location={"lat": 34.0, "lon": -118.0}).duplicate_of)
+
+    def test_issue_hot_spots(self):
+        """Test that hot spots aggregate unresolved issues by area."""
+        for _ in range(3):
+            self._create_sample_issue(location={"lat": 34.0, "lon": -118.0})
+        resolved = self._create_sample_issue(category="Graffiti", location={"lat": 34.0, "lon": -118.0})
+        issue_manager.update_issue_status(resolved.issue_id, "RESOLVED")
+        self._create_sample_issue(location={"lat": 35.0, "lon": -118.0})
+
+        spots = issue_manager.issue_hot_spots(250)
+        self.assertEqual([(s["count"], s["categories"]) for s in spots], [(3, {"Pothole": 3}), (1, {"Pothole": 1})])
+        self.assertEqual([s["count"] for s in issue_manager.issue_hot_spots(250, status_filter="resolved")], [1])
+        self.assertEqual(len(issue_manager.issue_hot_spots(250, min_count=2)), 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+from citizen_reporting.photo_store import PhotoStore, PhotoTooLargeError, read_exif_location
+
+
+def _rational_dms(value: float) -> bytes:
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round(((value - degrees) * 60 - minutes) * 60 * 1000)
+    return struct.pack('<6I', degrees, 1, minutes, 1, seconds, 1000)
+
+
+def _jpeg_with_gps(lat: float, lon: float, body: bytes = b'\x00' * 100) -> bytes:
+    """A minimal JPEG whose EXIF block holds a GPS position (little-endian TIFF)."""
+    # TIFF header, IFD0 with one entry (GPS IFD pointer) at 8, GPS IFD at 26, rationals at 80
+    ifd0 = struct.pack('<H', 1) + struct.pack('<HHII', 0x8825, 4, 1, 26) + struct.pack('<I', 0)
+    gps = struct.pack('<H', 4)
+    gps += struct.pack('<HHI4s', 1, 2, 2, (b'S' if lat < 0 else b'N') + b'\x00\x00\x00')
+    gps += struct.pack('<HHII', 2, 5, 3, 80)
+    gps += struct.pack('<HHI4s', 3, 2, 2, (b'W' if lon < 0 else b'E') + b'\x00\x00\x00')
+    gps += struct.pack('<HHII', 4, 5, 3, 104)
+    gps += struct.pack('<I', 0)
+    tiff = b'II*\x00' + struct.pack('<I', 8) + ifd0 + gps
+    tiff += _rational_dms(abs(lat)) + _rational_dms(abs(lon))
+    app1 = b'Exif\x00\x00' + tiff
+    return b'\xff\xd8' + b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1 + b'\xff\xda' + body
+
+
+class TestPhotoStore(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = PhotoStore(self.root)
+        self.addCleanup(self.store.shutdown)
+
+    def test_read_exif_location(self):
+        location = read_exif_location(_jpeg_with_gps(40.7128, -74.006))
+        self.assertAlmostEqual(location["lat"], 40.7128, places=4)
+        self.assertAlmostEqual(location["lon"], -74.006, places=4)
+        self.assertIsNone(read_exif_location(b'\xff\xd8\xff\xda' + b'\x00' * 10))
+        self.assertIsNone(read_exif_location(_jpeg_with_gps(1.0, 1.0)[:40]))  # Truncated
+
+    def test_save_streams_chunks_and_dedups(self):
+        photo = _jpeg_with_gps(40.0, -74.0, body=os.urandom(200_000))
+        chunks = [photo[i:i + 1000] for i in range(0, len(photo), 1000)]
+        first = self.store.save(iter(chunks))
+        self.assertRegex(first.filename, r'^[0-9a-f]{64}\.jpg$')
+        self.assertEqual((first.size, first.duplicate), (len(photo), False))
+        with open(self.store.path(first.filename), 'rb') as f:
+            self.assertEqual(f.read(), photo)
+
+        second = self.store.save([photo])
+        self.assertEqual((second.filename, second.duplicate), (first.filename, True))
+        self.assertEqual(os.listdir(os.path.join(self.root, '.incoming')), [])
+
+    def test_rejected_uploads_leave_nothing(self):
+        with self.assertRaises(PhotoTooLargeError):
+            self.store.save([b'\x89PNG\r\n\x1a\n', b'\x00' * 100], max_bytes=50)
+        with self.assertRaisesRegex(ValueError, "JPEG, PNG or GIF"):
+            self.store.save([b'%PDF-1.4 not a photo'])
+        self.assertEqual(os.listdir(os.path.join(self.root, '.incoming')), [])
+        self.assertEqual(sorted(os.listdir(self.root)), ['.incoming'])
+
+    def test_background_processing_extracts_location(self):
+        photo = self.store.save([_jpeg_with_gps(-33.8688, 151.2093)])
+        info = self.store.info(photo.filename, timeout=5)
+        self.assertEqual(info["status"], "done")
+        self.assertAlmostEqual(info["location"]["lat"], -33.8688, places=4)
+        self.assertAlmostEqual(info["location"]["lon"], 151.2093, places=4)
+        # Another store on the same folder (another process) reads the saved results
+        self.assertEqual(PhotoStore(self.root).info(photo.filename), info)
+        self.assertIsNone(self.store.info("0" * 64 + ".jpg"))
+
+    def test_failed_processing_is_reported_and_retried(self):
+        with mock.patch('citizen_reporting.photo_store.json.dump', side_effect=OSError("disk full")):
+            photo = self.store.save([_jpeg_with_gps(48.8566, 2.3522)])
+            self.assertEqual(self.store.info(photo.filename, timeout=5), {"status": "error", "error": "disk full"})
+        info = self.store.info(photo.filename, timeout=5)
+        self.assertEqual(info["status"], "done")
+        self.assertAlmostEqual(info["location"]["lat"], 48.8566, places=4)
+
+    def test_path_rejects_foreign_names(self):
+        for name in ("../secret.jpg", "pothole.jpg", "0" * 64 + ".exe", 123, None, ["a.jpg"]):
+            with self.assertRaises(ValueError):
+                self.store.path(name)
+            self.assertFalse(self.store.exists(name))
+
+if __name__ == '__main__':
+    unittest.main()
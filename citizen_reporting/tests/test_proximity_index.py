@@ -0,0 +1,67 @@
+import unittest
+from datetime import datetime, timedelta
+
+from citizen_reporting.proximity_index import IssueProximityIndex
+
+
+class TestIssueProximityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = IssueProximityIndex()
+        self.now = datetime(2024, 5, 1, 12, 0)
+        # About 11 m north per 0.0001 degree of latitude
+        self.index.add("a", "Pothole", 40.0, -74.0, self.now - timedelta(hours=1), "OPEN")
+        self.index.add("b", "pothole", 40.0002, -74.0, self.now - timedelta(hours=30), "OPEN")
+        self.index.add("c", "Pothole", 40.0, -74.0, self.now - timedelta(days=10), "OPEN")
+        self.index.add("d", "Graffiti", 40.0, -74.0, self.now, "OPEN")
+        self.index.add("e", "Pothole", 40.01, -74.0, self.now, "OPEN")
+
+    def _nearby(self, **kwargs):
+        args = dict(category="POTHOLE", lat=40.0, lon=-74.0, timestamp=self.now, meters=50,
+                    window=timedelta(hours=48))
+        args.update(kwargs)
+        return [issue_id for _, issue_id in self.index.nearby(**args)]
+
+    def test_nearby_matches_category_distance_and_time(self):
+        self.assertEqual(self._nearby(), ["a", "b"])  # Nearest first
+        self.assertEqual(self._nearby(meters=10), ["a"])
+        self.assertEqual(self._nearby(window=timedelta(hours=2)), ["a"])
+        self.assertEqual(self._nearby(window=timedelta(days=30)), ["a", "c", "b"])
+        self.assertEqual(self._nearby(category="Streetlight Out"), [])
+
+    def test_nearby_across_cell_edges(self):
+        index = IssueProximityIndex(cell_size_degrees=0.001)
+        index.add("x", "Pothole", 40.00099, -74.0, self.now, "OPEN")
+        matches = index.nearby("Pothole", 40.00101, -74.0, self.now, 10, timedelta(hours=1))
+        self.assertEqual([issue_id for _, issue_id in matches], ["x"])
+
+    def test_out_of_order_reports(self):
+        self.index.add("f", "Pothole", 40.0, -74.0, self.now - timedelta(hours=20), "OPEN")
+        self.assertEqual(self._nearby(window=timedelta(hours=25), meters=1), ["a", "f"])
+
+    def test_status_filter_and_updates(self):
+        self.index.set_status("a", "RESOLVED")
+        self.assertEqual(self._nearby(statuses=("OPEN", "IN_PROGRESS")), ["b"])
+        self.index.add("a", "Pothole", 40.0, -74.0, self.now, "OPEN")  # Re-adding only updates the status
+        self.assertEqual(self._nearby(statuses=("OPEN",)), ["a", "b"])
+        self.assertEqual(len(self.index), 5)
+
+    def test_clusters(self):
+        spots = self.index.clusters(500)
+        self.assertEqual([spot["count"] for spot in spots], [4, 1])
+        self.assertEqual(spots[0]["categories"], {"Pothole": 3, "Graffiti": 1})  # First spelling is the label
+        self.assertAlmostEqual(spots[0]["lat"], 40.00005)
+        self.assertAlmostEqual(spots[1]["lat"], 40.01)
+
+        self.assertEqual(self.index.clusters(500, min_count=2), spots[:1])
+        self.assertEqual([s["count"] for s in self.index.clusters(500, category="graffiti")], [1])
+        self.index.set_status("d", "CLOSED")
+        self.assertEqual([s["categories"] for s in self.index.clusters(500, statuses=["CLOSED"])], [{"Graffiti": 1}])
+        self.assertEqual([s["count"] for s in self.index.clusters(500, statuses=["OPEN"])], [3, 1])
+
+    def test_clusters_larger_than_the_globe(self):
+        spots = self.index.clusters(1e300)
+        self.assertEqual([s["count"] for s in spots], [5])
+
+if __name__ == '__main__':
+    unittest.main()
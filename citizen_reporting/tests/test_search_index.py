@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+
+from citizen_reporting import search_index
+from citizen_reporting.search_index import IssueSearchIndex, tokenize
+
+
+class TestIssueSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = IssueSearchIndex()
+        self.index.add("a", "Pothole", "Big pothole on Main St.", "OPEN")
+        self.index.add("b", "Streetlight Out", "Light out on Main", "OPEN")
+        self.index.add("c", "pothole", "Another hole near the park", "IN_PROGRESS")
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Main St. main-st 5th"), ["main", "st", "5th"])
+
+    def test_query_matches_every_word(self):
+        self.assertEqual(self.index.search("main")[:2], (["b", "a"], 2))
+        self.assertEqual(self.index.search("MAIN pothole")[:2], (["a"], 1))
+        self.assertEqual(self.index.search("main park")[:2], ([], 0))
+        self.assertEqual(self.index.search("unknown")[:2], ([], 0))
+
+    def test_category_words_are_searchable(self):
+        self.assertEqual(self.index.search("streetlight")[0], ["b"])
+
+    def test_filters_are_case_insensitive(self):
+        self.assertEqual(self.index.search("", category="POTHOLE")[0], ["c", "a"])
+        self.assertEqual(self.index.search("", status="open", category="pothole")[0], ["a"])
+        self.assertEqual(self.index.search("", status="CLOSED")[:2], ([], 0))
+        self.assertEqual(self.index.matching_ids(status="open"), ["a", "b"])
+        self.assertEqual(self.index.matching_ids(category="Pothole"), ["a", "c"])
+        self.assertEqual(self.index.matching_ids(category="Graffiti"), [])
+
+    def test_facets_exclude_their_own_filter(self):
+        _, total, facets, _ = self.index.search("", status="OPEN", category="pothole")
+        self.assertEqual(total, 1)
+        # First spelling of a category is its label
+        self.assertEqual(facets, {"status": {"OPEN": 1, "IN_PROGRESS": 1},
+                                  "category": {"Pothole": 1, "Streetlight Out": 1}})
+        # With words, the same facets are counted over the matches
+        self.assertEqual(self.index.search("pothole hole", status="OPEN")[2],
+                         {"status": {"IN_PROGRESS": 1}, "category": {}})
+
+    def test_status_updates_move_counts(self):
+        self.index.set_status("a", "RESOLVED")
+        self.index.add("b", "Streetlight Out", "Light out on Main", "RESOLVED")  # Re-adding only updates the status
+        _, total, facets, _ = self.index.search("")
+        self.assertEqual(total, 3)
+        self.assertEqual(facets["status"], {"RESOLVED": 2, "IN_PROGRESS": 1})
+        self.assertEqual(self.index.search("main", status="resolved")[0], ["b", "a"])
+        self.assertEqual(len(self.index), 3)
+
+    def test_pages(self):
+        for i in range(10):
+            self.index.add(f"x{i}", "Graffiti", f"tag {i}", "OPEN")
+        seen, after = [], None
+        while True:
+            page, total, _, after = self.index.search("tag", limit=4, after=after)
+            seen.extend(page)
+            if after is None:
+                break
+        self.assertEqual(seen, [f"x{i}" for i in reversed(range(10))])
+        self.assertEqual(total, 10)
+        page, _, _, after = self.index.search("", status="open", limit=11)
+        self.assertEqual((page[-2:], after), (["x0", "b"], "b"))
+        self.assertEqual(self.index.search("", status="open", limit=11, after=after)[0], ["a"])
+
+    def test_rare_word_with_frequent_word(self):
+        for i in range(20):
+            self.index.add(f"x{i}", "Graffiti", f"tag on wall {i}", "OPEN")
+        self.assertEqual(self.index.search("tag 7")[:2], (["x7"], 1))
+        self.assertEqual(self.index.search("7 tag", category="graffiti")[0], ["x7"])
+
+    @mock.patch.object(search_index, 'FREQUENT_WORD_POSTINGS', 3)
+    def test_frequent_word_counts_follow_changes(self):
+        index = IssueSearchIndex()
+        for i in range(6):
+            index.add(f"x{i}", "Graffiti", "tag on the wall", "OPEN")
+        self.assertIn("tag", index._word_counts)
+        index.set_status("x1", "RESOLVED")
+        index.add("y", "Noise", "tag heard at night", "NEW")  # New status and category grow the tables
+        index.add("z", "Noise", "loud music", "OPEN")
+
+        page, total, facets, after = index.search("TAG", status="open", limit=3)
+        self.assertEqual((page, total, after), (["x5", "x4", "x3"], 5, "x3"))
+        self.assertEqual(facets, {"status": {"OPEN": 5, "RESOLVED": 1, "NEW": 1}, "category": {"Graffiti": 5}})
+        self.assertEqual(index.search("tag", status="open", limit=3, after=after)[0], ["x2", "x0"])
+        self.assertEqual(index.search("tag", category="noise")[:2], (["y"], 1))
+        self.assertEqual(index.search("tag", status="closed")[:2], ([], 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+# This file makes 'common' a package of code shared by the subsystems.
@@ -0,0 +1,150 @@
+"""
+In-process change feeds of the managers.
+
+Managers publish every entity they change to their subsystem's ChangeFeed, a fixed-size
+ring of (sequence, kind, key, entity) entries. Publishing is O(1) whatever the number of
+listening clients: nothing is queued per client. Readers such as the SSE streams of
+common.events keep a cursor into the ring and read the changes since it; _coalesce keeps
+each entity once, in its latest state, however often it changed in between.
+
+This module does not depend on Flask, so the managers can import it without the web stack.
+"""
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Tuple
+
+# Changes a feed keeps for clients that are behind; older cursors are reset
+DEFAULT_FEED_CAPACITY = 10_000
+# Minimum seconds between two syncs of a feed's shared state (see ChangeFeed.run_sync)
+SYNC_INTERVAL = 1.0
+
+class _Change:
+    __slots__ = ('sequence', 'kind', 'key', 'entity', 'message')
+
+    def __init__(self, sequence: int, kind: Optional[str], key: Optional[str], entity: Any):
+        self.sequence = sequence
+        self.kind = kind  # None for a reset marker
+        self.key = key
+        self.entity = entity
+        self.message: Optional[str] = None  # Encoded SSE message, shared by all clients
+
+class ChangeFeed:
+    """
+    Ring buffer of the changes published by one subsystem's managers.
+
+    Entries are only kept while a client is subscribed; with nobody listening, publish() just
+    advances the sequence, so a client resuming from an older ID is reset.
+    """
+
+    def __init__(self, name: str, capacity: int = DEFAULT_FEED_CAPACITY):
+        self.name = name
+        self.epoch = uuid.uuid4().hex[:8]  # Distinguishes IDs issued by this process
+        self._changes: Deque[_Change] = deque(maxlen=capacity)
+        self._sequence = 0
+        self._subscribers = 0
+        self._condition = threading.Condition()
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the latest change."""
+        return self._sequence
+
+    def publish(self, kind: str, key: str, entity: Any) -> None:
+        """
+        Announces that an entity changed. The entity is encoded when a client sends it, so
+        publishers pass the live object and clients see its latest state.
+        """
+        with self._condition:
+            self._append(kind, key, entity)
+
+    def publish_many(self, kind: str, entities: Mapping[str, Any]) -> None:
+        """Announces that many entities, keyed by their keys, changed, as publish() would for each, under one lock."""
+        with self._condition:
+            if not self._subscribers:
+                self._sequence += len(entities)
+                self._changes.clear()
+                return
+            for key, entity in entities.items():
+                self._append(kind, key, entity)
+
+    def publish_reset(self) -> None:
+        """Tells every client to refetch the listings, e.g. after a bulk reload."""
+        with self._condition:
+            self._append(None, None, None)
+
+    def _append(self, kind: Optional[str], key: Optional[str], entity: Any) -> None:
+        self._sequence += 1
+        if self._subscribers:
+            self._changes.append(_Change(self._sequence, kind, key, entity))
+            self._condition.notify_all()
+        elif self._changes:
+            self._changes.clear()  # Keeps the ring contiguous; older cursors are now reset
+
+    def subscribe(self) -> None:
+        with self._condition:
+            self._subscribers += 1
+
+    def unsubscribe(self) -> None:
+        with self._condition:
+            self._subscribers -= 1
+
+    def changes_since(self, cursor: int) -> Tuple[int, Optional[List[_Change]]]:
+        """
+        Returns the latest sequence number and the changes after `cursor`, oldest first, or
+        None instead of the changes if the ring no longer covers the cursor.
+        """
+        with self._condition:
+            sequence = self._sequence
+            if cursor == sequence:
+                return sequence, []
+            changes = self._changes
+            first = changes[0].sequence if changes else sequence + 1
+            if not first - 1 <= cursor < sequence:
+                return sequence, None
+            return sequence, list(itertools.islice(changes, cursor - first + 1, None))
+
+    def wait(self, cursor: int, timeout: float) -> bool:
+        """Blocks until a change after `cursor` is published or the timeout passes. Returns whether one was."""
+        with self._condition:
+            if self._sequence == cursor:
+                self._condition.wait(timeout)
+            return self._sequence != cursor
+
+    def run_sync(self, sync: Callable[[], Any]) -> None:
+        """Runs a shared-state sync at most every SYNC_INTERVAL seconds, in one client's thread at a time."""
+        if time.monotonic() - self._last_sync < SYNC_INTERVAL or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sync = time.monotonic()
+            sync()
+        finally:
+            self._sync_lock.release()
+
+_feeds: Dict[str, ChangeFeed] = {}
+_feeds_lock = threading.Lock()
+
+def get_feed(name: str) -> ChangeFeed:
+    """Returns the process-wide change feed of a subsystem, creating it on first use."""
+    feed = _feeds.get(name)
+    if feed is None:
+        with _feeds_lock:
+            feed = _feeds.setdefault(name, ChangeFeed(name))
+    return feed
+
+def _coalesce(changes: List[_Change]) -> List[_Change]:
+    """Keeps the latest change per entity, in order of those changes; everything before a reset is dropped."""
+    latest: Dict[Tuple[str, str], _Change] = {}
+    for change in changes:
+        if change.kind is None:
+            latest.clear()
+            latest[(None, None)] = change
+            continue
+        entity_key = (change.kind, change.key)
+        latest.pop(entity_key, None)  # Re-inserted at the end, in order of its latest change
+        latest[entity_key] = change
+    return list(latest.values())
@@ -0,0 +1,63 @@
+"""
+Conditional GET for the single-entity endpoints.
+
+Every polled entity carries a version counter that its manager bumps on each change. The
+ETag combines that version with the entity's last-modified time (so a counter restarting
+from zero after a restart without storage cannot repeat an earlier tag). A request whose
+If-None-Match (or, without one, If-Modified-Since) still matches is answered with an empty
+304 before the entity is serialized at all.
+"""
+import datetime
+from typing import Callable, Optional
+
+from flask import Response, current_app, request
+from flask.typing import ResponseReturnValue
+
+def entity_tag(version: int, last_modified: Optional[datetime.datetime] = None, variant: Optional[str] = None) -> str:
+    """
+    Builds the (unquoted) ETag of an entity state.
+
+    Args:
+        version: The entity's version counter.
+        last_modified: When the entity last changed, if known.
+        variant: Optional suffix for response data outside the entity (e.g. a controller-wide flag).
+    """
+    stamp = 0 if last_modified is None else round(last_modified.timestamp() * 1_000_000)
+    tag = f"{version}-{stamp:x}"
+    return tag if variant is None else f"{tag}-{variant}"
+
+def is_not_modified(etag: str, last_modified: Optional[datetime.datetime] = None) -> bool:
+    """Returns whether the current request's validators match, i.e. the client's copy is current."""
+    if request.if_none_match:
+        # If-None-Match takes precedence; If-Modified-Since is ignored when it is present
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole seconds
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+def conditional_response(version: int, last_modified: Optional[datetime.datetime],
+                         build: Callable[[], ResponseReturnValue], variant: Optional[str] = None) -> Response:
+    """
+    Answers a GET for one entity, with a 304 if the client's copy is still current.
+
+    Args:
+        version: The entity's version counter.
+        last_modified: Timezone-aware time of the entity's last change, or None if unknown.
+        build: Produces the full response; only called when the client's copy is stale.
+        variant: See entity_tag.
+
+    Returns:
+        The response, carrying ETag and Last-Modified headers either way. Cache-Control: no-cache
+        makes browsers and proxies revalidate on every poll instead of serving a stored copy.
+    """
+    etag = entity_tag(version, last_modified, variant)
+    if is_not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.make_response(build())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
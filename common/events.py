@@ -0,0 +1,112 @@
+"""
+Server-Sent Events (SSE) streams of the change feeds (see common.change_feed).
+
+Managers publish every entity they change to their subsystem's ChangeFeed, a fixed-size
+ring of (sequence, kind, key, entity) entries. Publishing is O(1) whatever the number of
+listening clients: nothing is queued per client. Each SSE client instead keeps a cursor
+into the ring and, at most every COALESCE_INTERVAL seconds, sends the entities changed
+since its cursor, each once in its latest state however often it changed in between
+(coalescing). An entity's JSON is encoded once per change and shared by all clients.
+
+Backpressure: a client that reads slower than changes arrive simply falls behind, since the
+WSGI server only advances its stream as fast as the socket drains. Once its cursor has left
+the ring it receives a `reset` event (refetch the listing) and resumes from the newest
+change, so a slow client costs no memory. Bulk reloads publish a reset for everyone.
+
+Event IDs are `<feed epoch>.<sequence>`; a reconnecting EventSource sends the last one in
+Last-Event-ID and resumes without gaps while the ring still covers it, otherwise it is reset.
+"""
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from flask import Response, current_app, request, stream_with_context
+
+from .change_feed import SYNC_INTERVAL, ChangeFeed, _coalesce
+
+SSE_MIMETYPE = 'text/event-stream'
+# Minimum seconds between two writes to one client, so bursts coalesce
+COALESCE_INTERVAL = 0.25
+# Seconds of silence after which a comment line is sent, to keep proxies from closing the stream
+HEARTBEAT_INTERVAL = 15.0
+# Event name of the resync marker
+RESET_EVENT = 'reset'
+
+def _sse_messages(feed: ChangeFeed, encoders: Dict[str, Callable[[Any], dict]], cursor: Optional[int],
+                  sync: Optional[Callable[[], Any]]) -> Iterator[str]:
+    dumps = current_app.json.dumps
+    feed.subscribe()
+    try:
+        if cursor is None:
+            # A new client starts from now; the ID lets it resume from here if it reconnects
+            cursor = feed.sequence
+            yield f"retry: 2000\nid: {feed.epoch}.{cursor}\n\n"
+        else:
+            yield "retry: 2000\n\n"
+        last_write = time.monotonic()
+        while True:
+            if sync is not None:
+                feed.run_sync(sync)
+            sequence, changes = feed.changes_since(cursor)
+            if changes is None:
+                # Fell behind the ring (or resumed from another process): start over from now
+                cursor = sequence
+                yield f"id: {feed.epoch}.{cursor}\nevent: {RESET_EVENT}\ndata: {{}}\n\n"
+                last_write = time.monotonic()
+                continue
+            messages = []
+            for change in _coalesce(changes):
+                if change.message is None:
+                    if change.kind is None:
+                        change.message = f"id: {feed.epoch}.{change.sequence}\nevent: {RESET_EVENT}\ndata: {{}}\n\n"
+                    else:
+                        encoder = encoders.get(change.kind)
+                        data = dumps(encoder(change.entity)) if encoder is not None else '{}'
+                        change.message = f"id: {feed.epoch}.{change.sequence}\nevent: {change.kind}\ndata: {data}\n\n"
+                messages.append(change.message)
+            if changes:
+                cursor = changes[-1].sequence
+            if messages:
+                yield ''.join(messages)
+                last_write = time.monotonic()
+                time.sleep(COALESCE_INTERVAL)  # Lets the next burst of changes accumulate
+                continue
+            idle = time.monotonic() - last_write
+            if idle >= HEARTBEAT_INTERVAL:
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+                continue
+            timeout = HEARTBEAT_INTERVAL - idle
+            feed.wait(cursor, timeout if sync is None else min(timeout, SYNC_INTERVAL))
+    finally:
+        feed.unsubscribe()
+
+def _resume_cursor(feed: ChangeFeed) -> Optional[int]:
+    """Reads Last-Event-ID: the cursor to resume from, -1 (forces a reset) for a foreign ID, or None."""
+    last_event_id = request.headers.get('Last-Event-ID')
+    if not last_event_id:
+        return None
+    epoch, _, sequence = last_event_id.partition('.')
+    if epoch != feed.epoch or not sequence.isdigit():
+        return -1
+    return int(sequence)
+
+def sse_response(feed: ChangeFeed, encoders: Dict[str, Callable[[Any], dict]],
+                 sync: Optional[Callable[[], Any]] = None) -> Response:
+    """
+    Streams a change feed as Server-Sent Events: one `event: <kind>` message per changed entity,
+    with the entity as JSON data, and `event: reset` when the client must refetch the listings.
+
+    Args:
+        feed: The subsystem's change feed.
+        encoders: Converts entities of each published kind to a JSON-serializable dict.
+        sync: Optional callable applying other worker processes' changes (e.g. a manager's
+              sync_storage); run while streaming, at most every SYNC_INTERVAL seconds.
+
+    Returns:
+        A streaming response that runs until the client disconnects.
+    """
+    response = Response(stream_with_context(_sse_messages(feed, encoders, _resume_cursor(feed), sync)),
+                        mimetype=SSE_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Keeps nginx from buffering the stream
+    return response
@@ -0,0 +1,27 @@
+"""Great-circle geometry shared by the spatial indexes."""
+import math
+
+# Mean Earth radius used for great-circle distances.
+EARTH_RADIUS_METERS = 6_371_000.0
+# Length of one degree of latitude (and of longitude at the equator) on that sphere.
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180.0
+
+def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Computes the great-circle distance between two points.
+
+    Args:
+        lat1: Latitude of the first point in degrees.
+        lon1: Longitude of the first point in degrees.
+        lat2: Latitude of the second point in degrees.
+        lon2: Longitude of the second point in degrees.
+
+    Returns:
+        The distance between the two points in meters.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2.0) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,207 @@
+"""
+Keyset pagination for the list endpoints.
+
+Each manager keeps a SortedKeyIndex over its record IDs. A page is the next `limit`
+matching records with IDs greater than the last ID of the previous page, found with a
+binary search, so fetching page 1000 costs the same as fetching page 1 and pages stay
+stable while records are added. Clients receive the position as an opaque cursor token
+(`?limit=100&after=<token>`) rather than a raw ID.
+"""
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from flask import Response, jsonify, request
+
+from .streaming import ndjson_response, wants_ndjson
+
+T = TypeVar('T')
+
+# Largest page the APIs serve
+MAX_PAGE_LIMIT = 1000
+# Response header carrying the next page's cursor (also in the JSON body of paginated responses)
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+# Keys per chunk of a SortedKeyIndex; chunks split at twice this size
+DEFAULT_CHUNK_SIZE = 512
+
+class SortedKeyIndex:
+    """
+    Sorted set of string keys with O(log n) positioning, for keyset pagination.
+
+    Keys are held in a list of sorted chunks plus the maximum key of each chunk, so an
+    insertion or removal moves at most one chunk's worth of references (instead of shifting a
+    million-entry list) and finding the first key after a cursor is two binary searches.
+    """
+
+    __slots__ = ('_chunk_size', '_chunks', '_maxes', '_size')
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._chunk_size = chunk_size
+        self._chunks: List[List[str]] = []
+        self._maxes: List[str] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        return chunk[j] == key
+
+    def add(self, key: str) -> None:
+        """Adds a key; adding a key that is already present does nothing."""
+        maxes = self._maxes
+        if not maxes:
+            self._chunks.append([key])
+            maxes.append(key)
+            self._size = 1
+            return
+        i = bisect_left(maxes, key)
+        if i == len(maxes):
+            i -= 1  # Larger than every key: extends the last chunk
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j < len(chunk) and chunk[j] == key:
+            return
+        chunk.insert(j, key)
+        maxes[i] = chunk[-1]
+        self._size += 1
+        if len(chunk) > 2 * self._chunk_size:
+            half = len(chunk) // 2
+            self._chunks[i:i + 1] = [chunk[:half], chunk[half:]]
+            maxes[i:i + 1] = [chunk[half - 1], chunk[-1]]
+
+    def discard(self, key: str) -> None:
+        """Removes a key if present."""
+        maxes = self._maxes
+        i = bisect_left(maxes, key)
+        if i == len(maxes):
+            return
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if chunk[j] != key:
+            return
+        del chunk[j]
+        self._size -= 1
+        if chunk:
+            maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del maxes[i]
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self._maxes.clear()
+        self._size = 0
+
+    def iter_after(self, after: Optional[str] = None) -> Iterator[str]:
+        """Yields the keys greater than `after` (all keys if None) in ascending order. Do not modify the index meanwhile."""
+        chunks = self._chunks
+        if after is None:
+            i, j = 0, 0
+        else:
+            i = bisect_right(self._maxes, after)
+            if i == len(chunks):
+                return
+            j = bisect_right(chunks[i], after)
+        while i < len(chunks):
+            chunk = chunks[i]
+            while j < len(chunk):
+                yield chunk[j]
+                j += 1
+            i, j = i + 1, 0
+
+    def page(self, limit: int, after: Optional[str], resolve: Callable[[str], Optional[T]],
+             predicate: Optional[Callable[[T], bool]] = None) -> Tuple[List[T], Optional[str]]:
+        """
+        Returns one page of records in key order.
+
+        Args:
+            limit: Maximum number of records in the page.
+            after: Key of the last record of the previous page, or None for the first page.
+            resolve: Maps a key to its record; keys resolving to None are skipped.
+            predicate: Optional filter; records failing it are skipped. Skipped records are still
+                       visited, so a filtered page costs O(limit / fraction of records matching).
+
+        Returns:
+            The records and the key to pass as `after` for the next page (None on the last page).
+        """
+        items: List[T] = []
+        last_key = None
+        for key in self.iter_after(after):
+            record = resolve(key)
+            if record is None or (predicate is not None and not predicate(record)):
+                continue
+            if len(items) == limit:
+                return items, last_key  # A further match exists, so there is a next page
+            items.append(record)
+            last_key = key
+        return items, None
+
+def encode_cursor(last_key: str, filters: Optional[dict] = None) -> str:
+    """Wraps the last key of a page, and the filters it was listed with, in an opaque URL-safe token."""
+    payload = json.dumps({"k": last_key, "f": filters or {}}, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token: str, filters: Optional[dict] = None) -> str:
+    """
+    Returns the last key stored in a cursor token.
+
+    Raises:
+        ValueError: If the token is malformed or was issued for different filters.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        last_key, token_filters = payload["k"], payload["f"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid 'after' cursor.")
+    if not isinstance(last_key, str) or token_filters != (filters or {}):
+        raise ValueError("The 'after' cursor does not belong to this listing; it was issued for other filters.")
+    return last_key
+
+def page_args(filters: Optional[dict] = None) -> Optional[Tuple[int, Optional[str]]]:
+    """
+    Reads `limit` and `after` from the current request.
+
+    Args:
+        filters: The listing's filter values, which a cursor must have been issued for.
+
+    Returns:
+        (limit, last key of the previous page or None), or None if the request is not paginated.
+        A request is paginated when it has `limit` or `after`; `limit` defaults to MAX_PAGE_LIMIT.
+
+    Raises:
+        ValueError: If `limit` is not an integer between 1 and MAX_PAGE_LIMIT, or `after` is invalid.
+    """
+    raw_limit, token = request.args.get('limit'), request.args.get('after')
+    if raw_limit is None and token is None:
+        return None
+    try:
+        limit = MAX_PAGE_LIMIT if raw_limit is None else int(raw_limit)
+    except ValueError:
+        raise ValueError("'limit' must be an integer.")
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_LIMIT}.")
+    return limit, (decode_cursor(token, filters) if token else None)
+
+def page_response(items: List[Any], next_key: Optional[str], to_dict: Callable[[Any], dict],
+                  filters: Optional[dict] = None, extra: Optional[dict] = None) -> Response:
+    """
+    Builds the response for one page: `{"items": [...], "next": cursor or null}` plus any `extra`
+    fields (e.g. search totals), or the items as NDJSON when the client asked for a stream.
+    Either way the cursor is also sent in X-Next-Cursor.
+    """
+    cursor = encode_cursor(next_key, filters) if next_key is not None else None
+    if wants_ndjson():
+        response = ndjson_response(items, to_dict)
+    else:
+        response = jsonify({"items": [to_dict(item) for item in items], **(extra or {}), "next": cursor})
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return response
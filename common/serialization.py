@@ -0,0 +1,87 @@
+"""
+Fast JSON serialization for API responses.
+
+dataclass_serializer() compiles a function per model that builds the response dict with one
+attribute read per field. Unlike dataclasses.asdict it does not recurse into or deep-copy
+field values, so nested dicts such as `location` are shared with the model; the result must
+be serialized right away, not modified. Models with nested dataclass fields need asdict.
+
+OrjsonProvider is a Flask JSON provider that encodes with orjson when it is installed and
+produces the same JSON values as Flask's default provider (sorted keys, HTTP dates for
+datetimes); only non-ASCII text is sent as UTF-8 instead of \\u escapes. Without orjson,
+install_json_provider() keeps Flask's default provider.
+"""
+import dataclasses
+from typing import Any, Callable
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib json module is used instead
+    orjson = None
+
+def dataclass_serializer(cls: type) -> Callable[[Any], dict]:
+    """
+    Compiles a function converting instances of a dataclass to a shallow dict of its fields.
+
+    Args:
+        cls: The dataclass.
+
+    Returns:
+        A function taking an instance and returning a new dict {field name: value}.
+
+    Raises:
+        TypeError: If cls is not a dataclass.
+    """
+    if not dataclasses.is_dataclass(cls):
+        raise TypeError(f"{cls!r} is not a dataclass.")
+    names = [field.name for field in dataclasses.fields(cls)]
+    # One dict display with a direct attribute load per field, instead of asdict's generic recursion
+    body = ", ".join(f"{name!r}: obj.{name}" for name in names)
+    namespace: dict = {}
+    exec(f"def to_dict(obj):\n    return {{{body}}}\n", namespace)
+    to_dict = namespace["to_dict"]
+    to_dict.__name__ = to_dict.__qualname__ = f"{cls.__name__}_to_dict"
+    to_dict.__doc__ = f"Returns the fields of a {cls.__name__} as a shallow dict."
+    return to_dict
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with orjson.
+
+    Keys are sorted and datetimes, dates and dataclasses go through the default provider's
+    `default` hook, so responses decode to the same values as with the default provider while
+    being several times faster to produce for large lists.
+    """
+
+    _OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+                | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """Encodes obj as UTF-8 JSON bytes (compact, or indented by two spaces)."""
+        options = self._OPTIONS | orjson.OPT_INDENT_2 if indent else self._OPTIONS
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs.keys() - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)  # Options orjson has no equivalent for
+        return self.dumps_bytes(obj, indent=bool(kwargs.get("indent"))).decode()
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+def install_json_provider(app: Flask) -> bool:
+    """
+    Makes an app encode JSON with OrjsonProvider if orjson is installed.
+
+    Returns:
+        Whether the orjson provider was installed.
+    """
+    if orjson is None:
+        return False
+    app.json = OrjsonProvider(app)
+    return True
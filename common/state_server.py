@@ -0,0 +1,300 @@
+"""
+Local state server that lets several worker processes share manager state.
+
+A StateServer owns one StorageBackend (in memory, or SQLite for durability) and serves it
+over a Unix socket; every worker connects with a StateClient, which is itself a
+StorageBackend. The managers keep their in-memory dicts as caches in front of the client,
+write every change through to the server, and call their sync_storage() at the start of each
+request to apply the changes other workers made (the Flask apps register this for you when
+SMARTCITY_STATE_SOCKET is set). This is a stand-in for an external store such as Redis.
+
+Start a server from the project root, then start the workers with the same socket path:
+    python -m common.state_server /tmp/smartcity.sock
+    python -m common.state_server /tmp/smartcity.sock --db smartcity.db
+    SMARTCITY_STATE_SOCKET=/tmp/smartcity.sock gunicorn -w 4 main_dashboard:app
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .storage import InMemoryStorage, SQLiteStorage, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# Environment variable naming the socket of a running state server; workers use local state when unset.
+STATE_SOCKET_ENV = "SMARTCITY_STATE_SOCKET"
+# Writes remembered for changes_since(); clients further behind than this reload everything.
+DEFAULT_CHANGE_LOG_SIZE = 100_000
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection: one JSON request per line, one JSON response per line."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = {"result": self.server.state.execute(request)}
+            except Exception as e:  # Reported to the client, which raises it
+                response = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+class _ServerState:
+    """The served backend plus the bounded log of recent writes behind changes_since()."""
+
+    def __init__(self, backend: StorageBackend, change_log_size: int):
+        self.backend = backend
+        self.sequence = 0
+        # Changes at or below this sequence number are no longer known
+        self.horizon = 0
+        self.changes = collections.deque(maxlen=change_log_size)
+        self.lock = threading.Lock()
+
+    def execute(self, request: dict):
+        op = request["op"]
+        backend = self.backend
+        with self.lock:
+            if op == "put_many":
+                records = request["records"]
+                with backend.batch():
+                    for kind, key, record in records:
+                        backend.put(kind, key, record)
+                        self._log_change(kind, key)
+                return self.sequence
+            if op == "get":
+                return backend.get(request["kind"], request["key"])
+            if op == "load_all":
+                return [[key, record] for key, record in backend.load_all(request["kind"])]
+            if op == "sequence":
+                return self.sequence
+            if op == "changes_since":
+                return self._changes_since(request["sequence"])
+            if op == "clear":
+                backend.clear()
+                self.changes.clear()
+                self.sequence += 1
+                self.horizon = self.sequence
+                return self.sequence
+        raise ValueError(f"Unknown operation '{op}'.")
+
+    def _log_change(self, kind: str, key: str) -> None:
+        self.sequence += 1
+        if len(self.changes) == self.changes.maxlen:
+            self.horizon = self.changes[0][0]
+        self.changes.append((self.sequence, kind, key))
+
+    def _changes_since(self, sequence: int):
+        if sequence < self.horizon:
+            return [self.sequence, None]
+        # Walk back from the newest write; only the latest version of each record is returned
+        latest = {}
+        for change_sequence, kind, key in reversed(self.changes):
+            if change_sequence <= sequence:
+                break
+            latest.setdefault((kind, key), change_sequence)
+        ordered = sorted(latest.items(), key=lambda item: item[1])
+        return [self.sequence, [[kind, key, self.backend.get(kind, key)] for (kind, key), _ in ordered]]
+
+class StateServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves a StorageBackend to StateClients over a Unix socket, one thread per connection."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, backend: Optional[StorageBackend] = None,
+                 change_log_size: int = DEFAULT_CHANGE_LOG_SIZE):
+        """
+        Binds the server socket. Call serve_forever() (or start()) to begin serving.
+
+        Args:
+            socket_path: Path of the Unix socket. A stale socket file at that path is replaced.
+            backend: The backend holding the state. Defaults to a new InMemoryStorage.
+            change_log_size: Number of recent writes kept for changes_since().
+
+        Raises:
+            ValueError: If change_log_size is not positive.
+        """
+        if change_log_size <= 0:
+            raise ValueError("change_log_size must be positive.")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.state = _ServerState(backend if backend is not None else InMemoryStorage(), change_log_size)
+        super().__init__(socket_path, _RequestHandler)
+
+    def start(self, poll_interval: float = 0.5) -> threading.Thread:
+        """Serves from a background daemon thread (e.g. in tests) and returns the thread."""
+        thread = threading.Thread(target=self.serve_forever, args=(poll_interval,), name="state-server", daemon=True)
+        thread.start()
+        return thread
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+class StateClient(StorageBackend):
+    """
+    StorageBackend that forwards every operation to a StateServer.
+
+    The connection is opened on first use and reopened after a fork, so a client created
+    before a pre-forking server (e.g. gunicorn with --preload) starts its workers with their
+    own connections. Writes inside a batch() block are buffered for the calling thread and sent in
+    one request at its end, so a long batch does not hold up the other threads sharing the client.
+    Until then, get() and load_all() on that thread overlay its buffered records on the server's,
+    while change_sequence() and changes_since() report only what the server has received.
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._lock = threading.RLock()
+        self._socket: Optional[socket.socket] = None
+        self._reader = None
+        self._pid = None
+        self._local = threading.local()  # `pending`: the thread's buffered records while it is inside batch()
+
+    def _call(self, op: str, **arguments):
+        request = json.dumps(dict(arguments, op=op)).encode() + b"\n"
+        with self._lock:
+            if self._socket is None or self._pid != os.getpid():
+                self._connect()
+            try:
+                self._socket.sendall(request)
+                line = self._reader.readline()
+            except OSError:
+                self._disconnect()
+                raise
+        if not line:
+            self._disconnect()
+            raise ConnectionError(f"State server at '{self.socket_path}' closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"State server error: {response['error']}")
+        return response["result"]
+
+    def _connect(self) -> None:
+        # A socket inherited through fork belongs to the parent; it is dropped, not closed
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(self.socket_path)
+        self._reader = self._socket.makefile("rb")
+        self._pid = os.getpid()
+
+    def _disconnect(self) -> None:
+        if self._socket is not None and self._pid == os.getpid():
+            self._reader.close()
+            self._socket.close()
+        self._socket = self._reader = None
+
+    def put(self, kind: str, key: str, record: dict) -> None:
+        # Serialized now, so later changes to the written object are not sent
+        item = (kind, key, json.loads(json.dumps(record)))
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            pending.append(item)
+            return
+        self._call("put_many", records=[item])
+
+    @contextmanager
+    def batch(self):
+        if getattr(self._local, 'pending', None) is not None:
+            yield self  # Nested blocks are part of the outermost one
+            return
+        self._local.pending = []
+        try:
+            yield self
+        except BaseException:
+            self._local.pending = None  # A failed block sends nothing
+            raise
+        records, self._local.pending = self._local.pending, None
+        if records:
+            self._call("put_many", records=records)
+
+    def _flush_pending(self) -> None:
+        """Sends the calling thread's buffered records ahead of the end of its batch."""
+        pending = getattr(self._local, 'pending', None)
+        if pending:
+            records = list(pending)
+            pending.clear()
+            self._call("put_many", records=records)
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        for pending_kind, pending_key, record in reversed(getattr(self._local, 'pending', None) or ()):
+            if pending_kind == kind and pending_key == key:
+                return record
+        return self._call("get", kind=kind, key=key)
+
+    def load_all(self, kind: str) -> Iterator[Tuple[str, dict]]:
+        # The thread's buffered records of this kind, newest per key, in first-write order
+        overlay: Dict[str, dict] = {}
+        for pending_kind, key, record in getattr(self._local, 'pending', None) or ():
+            if pending_kind == kind:
+                overlay[key] = record
+        items = self._call("load_all", kind=kind)
+        for key, record in items:
+            yield key, overlay.pop(key, record)
+        yield from overlay.items()
+
+    def change_sequence(self) -> int:
+        return self._call("sequence")
+
+    def changes_since(self, sequence: int) -> Tuple[int, Optional[List[Tuple[str, str, dict]]]]:
+        latest, changes = self._call("changes_since", sequence=sequence)
+        if changes is not None:
+            changes = [tuple(change) for change in changes]
+        return latest, changes
+
+    def clear(self) -> None:
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            pending.clear()
+        self._call("clear")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._socket is not None:
+                self._flush_pending()
+            self._disconnect()
+
+_shared_client: Optional[StateClient] = None
+_shared_client_lock = threading.Lock()
+
+def get_shared_client() -> Optional[StateClient]:
+    """
+    Returns the process-wide StateClient for the server named by SMARTCITY_STATE_SOCKET.
+
+    All subsystems of a process share this client, so a process holds one connection however
+    many blueprints it serves. Returns None when the variable is unset.
+    """
+    global _shared_client
+    socket_path = os.environ.get(STATE_SOCKET_ENV)
+    if not socket_path:
+        return None
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client.socket_path != socket_path:
+            _shared_client = StateClient(socket_path)
+    return _shared_client
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('socket_path', help="Path of the Unix socket to serve on.")
+    parser.add_argument('--db', help="SQLite database file that keeps the state across restarts (in memory if omitted).")
+    parser.add_argument('--change-log-size', type=int, default=DEFAULT_CHANGE_LOG_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    backend = SQLiteStorage(args.db) if args.db else InMemoryStorage()
+    with StateServer(args.socket_path, backend, args.change_log_size) as server:
+        logger.info("Serving shared state on %s", args.socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            backend.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Number of appended log records after which SQLiteStorage folds the log into the state table.
+DEFAULT_COMPACT_THRESHOLD = 100_000
+
+class StorageBackend:
+    """
+    Interface of the persistence layer behind the subsystem managers.
+
+    Records are JSON-compatible dicts keyed by (kind, key). Writes are upserts appended to
+    a log; readers see the latest write for each key. Writes made inside a batch() block
+    are committed together when the outermost block exits.
+
+    Managers keep their in-memory state as a cache in front of a backend. Backends shared
+    between processes (common.state_server, or a SQLiteStorage file opened by each process)
+    also report the writes made since a given sequence number through changes_since(), so
+    each process can keep its cache current.
+    """
+
+    def put(self, kind: str, key: str, record: dict) -> None:
+        """Stores the latest version of a record. The record is serialized before put returns."""
+        raise NotImplementedError
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        """Returns the latest version of a record, or None if it was never written."""
+        raise NotImplementedError
+
+    def load_all(self, kind: str) -> Iterator[Tuple[str, dict]]:
+        """Yields (key, record) for the latest version of every record of a kind, in first-write order."""
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self):
+        """Groups the writes made inside the block into one transaction."""
+        yield self
+
+    def change_sequence(self) -> int:
+        """Returns the sequence number of the latest write, as used by changes_since()."""
+        return 0
+
+    def changes_since(self, sequence: int) -> Tuple[int, Optional[List[Tuple[str, str, dict]]]]:
+        """
+        Returns the writes made after a sequence number.
+
+        Returns:
+            The latest sequence number and the latest (kind, key, record) of every record written
+            since `sequence`, oldest first. The list is None when the backend no longer knows
+            changes that old and callers must reload everything. Backends that are not shared
+            between processes report no changes.
+        """
+        return sequence, []
+
+    def compact(self) -> None:
+        """Drops superseded log records."""
+
+    def clear(self) -> None:
+        """Deletes every record."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flushes pending writes and releases resources."""
+
+class InMemoryStorage(StorageBackend):
+    """
+    Non-durable backend that keeps serialized records in a dict.
+
+    Useful for tests and as a stand-in wherever state does not need to survive a restart.
+    Records are stored as JSON text so they are isolated from later changes to the objects
+    they were written from, like with a real database.
+    """
+
+    def __init__(self):
+        self._records: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def put(self, kind: str, key: str, record: dict) -> None:
+        payload = json.dumps(record)
+        with self._lock:
+            self._records[(kind, key)] = payload
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        payload = self._records.get((kind, key))
+        return json.loads(payload) if payload is not None else None
+
+    def load_all(self, kind: str) -> Iterator[Tuple[str, dict]]:
+        with self._lock:
+            items = [(key, payload) for (record_kind, key), payload in self._records.items() if record_kind == kind]
+        for key, payload in items:
+            yield key, json.loads(payload)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+class SQLiteStorage(StorageBackend):
+    """
+    Durable backend on a SQLite database in WAL mode.
+
+    Every write appends a row to a `log` table; reads take the newest log row for a key, falling
+    back to the `state` table. Once compact_threshold rows have been appended, compaction copies
+    the newest version of each logged key into `state` and deletes the log rows in one
+    transaction, so a crash at any point leaves either the old or the new layout intact.
+
+    Writes outside a batch() block are committed one by one; inside a block they are buffered
+    per thread and written with a single executemany in one transaction when the thread's
+    outermost block exits. Until then, get() and load_all() on that thread overlay its buffered
+    writes on the committed records, while change_sequence(), changes_since() and compact() see
+    only what has been committed. Statements use fixed SQL text with parameters, so sqlite3's
+    statement cache reuses the prepared statements. One connection is shared by all threads
+    and guarded by a lock, which is held for each statement or commit but not while the code
+    inside a batch() block runs.
+
+    Several processes may open the same database file. The log's row numbers double as change
+    sequence numbers, so changes_since() reports what any process wrote since a sequence number
+    that is still in the log; compaction and clear() move the horizon below which callers must
+    reload everything.
+    """
+
+    def __init__(self, path: str, compact_threshold: int = DEFAULT_COMPACT_THRESHOLD, synchronous: str = 'NORMAL'):
+        """
+        Opens (creating if needed) a storage database.
+
+        Args:
+            path: Database file path (':memory:' for a private in-memory database).
+            compact_threshold: Log records appended between automatic compactions.
+            synchronous: SQLite synchronous mode. 'NORMAL' is crash-safe in WAL mode but may lose
+                         the last commits on power loss; 'FULL' makes each commit durable.
+
+        Raises:
+            ValueError: If compact_threshold is not positive or synchronous is not a known mode.
+        """
+        if compact_threshold <= 0:
+            raise ValueError("compact_threshold must be positive.")
+        if synchronous.upper() not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"Unknown synchronous mode '{synchronous}'.")
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._local = threading.local()  # `pending`: the thread's buffered writes while it is inside batch()
+        self._appended_since_compaction = 0
+        # Transactions are managed explicitly (isolation_level=None) so a batch is exactly one transaction.
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={synchronous.upper()}")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS state (
+                kind TEXT NOT NULL, key TEXT NOT NULL, first_seq INTEGER NOT NULL, payload TEXT NOT NULL,
+                PRIMARY KEY (kind, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS log_by_key ON log (kind, key, seq);
+            -- Changes at or below the horizon are no longer in the log (see changes_since)
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO meta (name, value) VALUES ('horizon', 0);
+        """)
+        self._appended_since_compaction = self._connection.execute("SELECT COUNT(*) FROM log").fetchone()[0]
+
+    def put(self, kind: str, key: str, record: dict) -> None:
+        row = (kind, key, json.dumps(record))
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            pending.append(row)
+            return
+        with self._lock:
+            self._write_rows([row])
+
+    @contextmanager
+    def batch(self):
+        if getattr(self._local, 'pending', None) is not None:
+            yield self  # Nested blocks are part of the outermost one
+            return
+        self._local.pending = []
+        try:
+            yield self
+        except BaseException:
+            self._local.pending = None  # A failed block writes nothing
+            raise
+        rows, self._local.pending = self._local.pending, None
+        with self._lock:
+            self._write_rows(rows)
+
+    def _flush_pending(self) -> None:
+        """Commits the calling thread's buffered writes ahead of the end of its batch."""
+        pending = getattr(self._local, 'pending', None)
+        if pending:
+            rows = list(pending)
+            pending.clear()
+            self._write_rows(rows)
+
+    def _write_rows(self, rows: List[Tuple[str, str, str]]) -> None:
+        """Commits rows in one transaction, compacting afterwards once enough log records have piled up."""
+        if not rows:
+            return
+        connection = self._connection
+        connection.execute("BEGIN")
+        try:
+            connection.executemany("INSERT INTO log (kind, key, payload) VALUES (?, ?, ?)", rows)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._appended_since_compaction += len(rows)
+        if self._appended_since_compaction >= self.compact_threshold:
+            self.compact()
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        for pending_kind, pending_key, payload in reversed(getattr(self._local, 'pending', None) or ()):
+            if pending_kind == kind and pending_key == key:
+                return json.loads(payload)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM log WHERE kind = ? AND key = ? ORDER BY seq DESC LIMIT 1", (kind, key)).fetchone()
+            if row is None:
+                row = self._connection.execute("SELECT payload FROM state WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def load_all(self, kind: str) -> Iterator[Tuple[str, dict]]:
+        # The thread's buffered writes of this kind, newest per key, in first-write order
+        overlay: Dict[str, str] = {}
+        for pending_kind, key, payload in getattr(self._local, 'pending', None) or ():
+            if pending_kind == kind:
+                overlay[key] = payload
+        with self._lock:
+            # Newest version of every key, ordered by when the key was first written.
+            rows = self._connection.execute("""
+                WITH latest AS (
+                    SELECT key, MIN(seq) AS first_seq, MAX(seq) AS last_seq FROM log WHERE kind = ? GROUP BY key
+                )
+                SELECT COALESCE(state.first_seq, latest.first_seq) AS first_seq, latest.key, log.payload
+                FROM latest JOIN log ON log.seq = latest.last_seq
+                LEFT JOIN state ON state.kind = ? AND state.key = latest.key
+                UNION ALL
+                SELECT first_seq, key, payload FROM state
+                WHERE kind = ? AND key NOT IN (SELECT key FROM log WHERE kind = ?)
+                ORDER BY first_seq
+            """, (kind, kind, kind, kind)).fetchall()
+        for _, key, payload in rows:
+            yield key, json.loads(overlay.pop(key, payload))
+        for key, payload in overlay.items():
+            yield key, json.loads(payload)
+
+    def change_sequence(self) -> int:
+        with self._lock:
+            return self._read_sequence()[0]
+
+    def _read_sequence(self) -> Tuple[int, int]:
+        """Returns (latest sequence number, horizon) as committed by any process."""
+        row = self._connection.execute("""
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'log'), 0), value), value
+            FROM meta WHERE name = 'horizon'
+        """).fetchone()
+        return row[0], row[1]
+
+    def changes_since(self, sequence: int) -> Tuple[int, Optional[List[Tuple[str, str, dict]]]]:
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN")  # One snapshot for the sequence numbers and the rows
+            try:
+                latest, horizon = self._read_sequence()
+                if sequence < horizon or sequence > latest:
+                    return latest, None
+                rows = connection.execute("""
+                    SELECT kind, key, payload FROM log
+                    WHERE seq IN (SELECT MAX(seq) FROM log WHERE seq > ? GROUP BY kind, key)
+                    ORDER BY seq
+                """, (sequence,)).fetchall()
+            finally:
+                connection.execute("COMMIT")
+        return latest, [(kind, key, json.loads(payload)) for kind, key, payload in rows]
+
+    def compact(self) -> None:
+        """Folds the committed log into the state table and checkpoints the WAL file."""
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("""
+                    UPDATE meta SET value = MAX(value, COALESCE((SELECT MAX(seq) FROM log), 0)) WHERE name = 'horizon'
+                """)
+                connection.execute("""
+                    INSERT INTO state (kind, key, first_seq, payload)
+                    SELECT log.kind, log.key, latest.first_seq, log.payload
+                    FROM (SELECT kind, key, MIN(seq) AS first_seq, MAX(seq) AS last_seq FROM log GROUP BY kind, key) AS latest
+                    JOIN log ON log.seq = latest.last_seq
+                    WHERE true  -- Required by SQLite to parse an upsert after a join
+                    ON CONFLICT (kind, key) DO UPDATE SET payload = excluded.payload
+                """)
+                connection.execute("DELETE FROM log")
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self._appended_since_compaction = 0
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def log_size(self) -> int:
+        """Returns the number of log records written since the last compaction."""
+        with self._lock:
+            return self._appended_since_compaction + len(getattr(self._local, 'pending', None) or ())
+
+    def clear(self) -> None:
+        with self._lock:
+            pending = getattr(self._local, 'pending', None)
+            if pending:
+                pending.clear()
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Advance the sequence past the horizon, so every reader reloads and later writes are newer
+                horizon = self._read_sequence()[0] + 1
+                connection.execute("DELETE FROM log")
+                connection.execute("DELETE FROM state")
+                connection.execute("UPDATE meta SET value = ? WHERE name = 'horizon'", (horizon,))
+                connection.execute("DELETE FROM sqlite_sequence WHERE name = 'log'")
+                connection.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('log', ?)", (horizon,))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self._appended_since_compaction = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_pending()
+            self._connection.close()
@@ -0,0 +1,69 @@
+"""
+Newline-delimited JSON (NDJSON) responses for the list endpoints.
+
+A client asks for a stream with `Accept: application/x-ndjson` or `?stream=1`. Records are
+then serialized one at a time from an iterable and sent in chunks of STREAM_CHUNK_RECORDS
+lines, so the response never holds more than one chunk of serialized output, and the
+client can start processing the first records while the rest are still being encoded.
+"""
+import functools
+import json
+from typing import Any, AnyStr, Callable, Iterable, Iterator, Tuple
+
+from flask import Response, current_app, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+from .serialization import OrjsonProvider
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Records serialized per chunk written to the response
+STREAM_CHUNK_RECORDS = 500
+
+def wants_ndjson() -> bool:
+    """Returns whether the current request asked for an NDJSON stream."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    # Listed after application/json, so `*/*` and missing Accept headers keep getting a JSON array
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def _line_encoder() -> Tuple[Callable[[Any], AnyStr], AnyStr]:
+    """
+    Returns a record encoder and the matching line separator. Records are encoded like the app's
+    JSON provider (e.g. datetimes), so streamed records match the JSON array responses.
+    """
+    provider = current_app.json
+    if isinstance(provider, OrjsonProvider):
+        return provider.dumps_bytes, b'\n'
+    if isinstance(provider, DefaultJSONProvider):
+        # Binding the options once skips the provider's per-call keyword handling
+        return functools.partial(json.dumps, default=provider.default, ensure_ascii=provider.ensure_ascii,
+                                 sort_keys=provider.sort_keys), '\n'
+    return provider.dumps, '\n'
+
+def _ndjson_chunks(records: Iterable[Any], to_dict: Callable[[Any], dict]) -> Iterator[AnyStr]:
+    dumps, newline = _line_encoder()
+    empty = newline[:0]
+    lines = []
+    for record in records:
+        lines.append(dumps(to_dict(record)))
+        if len(lines) >= STREAM_CHUNK_RECORDS:
+            lines.append(empty)  # Terminates the last line of the chunk
+            yield newline.join(lines)
+            lines = []
+    if lines:
+        lines.append(empty)
+        yield newline.join(lines)
+
+def ndjson_response(records: Iterable[Any], to_dict: Callable[[Any], dict], status: int = 200) -> Response:
+    """
+    Streams records as NDJSON, one JSON object per line.
+
+    Args:
+        records: The records to send; consumed lazily while the response is written.
+        to_dict: Converts one record to a JSON-serializable dict.
+        status: The HTTP status code.
+
+    Returns:
+        A streaming Flask response.
+    """
+    return Response(stream_with_context(_ndjson_chunks(records, to_dict)), status=status, mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1 @@
+# This file makes 'tests' a sub-package of 'common'.
@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask, jsonify
+from werkzeug.http import http_date
+
+from common.conditional import conditional_response, entity_tag
+
+class TestConditionalResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.entity = {"version": 3, "modified": datetime(2024, 5, 1, 12, 0, 0, 250000, tzinfo=timezone.utc)}
+        self.builds = 0
+
+        def build():
+            self.builds += 1
+            return jsonify({"version": self.entity["version"]}), 200
+
+        @self.app.route('/entity')
+        def entity():
+            return conditional_response(self.entity["version"], self.entity["modified"], build)
+
+        self.client = self.app.test_client()
+
+    def test_full_response_carries_validators(self):
+        response = self.client.get('/entity')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"version": 3})
+        self.assertEqual(response.get_etag(), (entity_tag(3, self.entity["modified"]), False))
+        self.assertEqual(response.headers["Last-Modified"], "Wed, 01 May 2024 12:00:00 GMT")
+        self.assertIn("no-cache", response.headers["Cache-Control"])
+
+    def test_matching_etag_is_not_modified_without_building(self):
+        etag = self.client.get('/entity').headers["ETag"]
+        response = self.client.get('/entity', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+        self.assertEqual(self.builds, 1)
+        # A weak match is enough for GET
+        self.assertEqual(self.client.get('/entity', headers={"If-None-Match": "W/" + etag}).status_code, 304)
+
+    def test_new_version_gets_full_response(self):
+        etag = self.client.get('/entity').headers["ETag"]
+        self.entity["version"] = 4
+        response = self.client.get('/entity', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"version": 4})
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_same_version_with_other_modification_time_differs(self):
+        # A version counter restarting from zero must not repeat an earlier tag
+        modified = self.entity["modified"]
+        self.assertNotEqual(entity_tag(3, modified), entity_tag(3, modified + timedelta(microseconds=1)))
+        self.assertNotEqual(entity_tag(3, modified), entity_tag(3, modified, variant="e"))
+
+    def test_if_modified_since(self):
+        modified = self.entity["modified"]
+        current = self.client.get('/entity', headers={"If-Modified-Since": http_date(modified)})
+        self.assertEqual(current.status_code, 304)
+        stale = self.client.get('/entity', headers={"If-Modified-Since": http_date(modified - timedelta(seconds=1))})
+        self.assertEqual(stale.status_code, 200)
+        # If-None-Match wins over If-Modified-Since
+        mismatched = self.client.get('/entity', headers={"If-None-Match": '"other"', "If-Modified-Since": http_date(modified)})
+        self.assertEqual(mismatched.status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from common import change_feed, events
+from common.change_feed import ChangeFeed
+from common.events import RESET_EVENT, SSE_MIMETYPE, sse_response
+
+def _parse(chunk: str) -> list:
+    """Returns the (id, event, data) of each message in a chunk of SSE text; comments and bare retry/ID lines are skipped."""
+    messages = []
+    for block in chunk.strip('\n').split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+        if 'event' in fields:
+            messages.append((fields['id'], fields['event'], json.loads(fields['data'])))
+    return messages
+
+class TestChangeFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.feed = ChangeFeed('test', capacity=4)
+
+    def test_changes_since_cursor(self):
+        self.feed.subscribe()
+        self.feed.publish('bin', 'a', 1)
+        self.feed.publish('bin', 'b', 2)
+        sequence, changes = self.feed.changes_since(0)
+        self.assertEqual(sequence, 2)
+        self.assertEqual([(c.sequence, c.key, c.entity) for c in changes], [(1, 'a', 1), (2, 'b', 2)])
+        self.assertEqual([c.key for c in self.feed.changes_since(1)[1]], ['b'])
+        self.assertEqual(self.feed.changes_since(2), (2, []))
+
+    def test_cursor_behind_ring_is_reset(self):
+        self.feed.subscribe()
+        for i in range(6):
+            self.feed.publish('bin', str(i), i)
+        self.assertIsNone(self.feed.changes_since(1)[1])  # Only changes 3-6 are kept
+        self.assertEqual(len(self.feed.changes_since(2)[1]), 4)
+        self.assertIsNone(self.feed.changes_since(7)[1])  # From the future, e.g. another process
+
+    def test_no_history_without_subscribers(self):
+        self.feed.subscribe()
+        self.feed.publish('bin', 'a', 1)
+        self.feed.unsubscribe()
+        self.feed.publish('bin', 'b', 2)
+        self.assertEqual(self.feed.sequence, 2)
+        self.assertIsNone(self.feed.changes_since(1)[1])  # The gap cannot be replayed
+        self.assertEqual(self.feed.changes_since(2), (2, []))
+
+    def test_imports_without_flask(self):
+        code = "import sys; sys.modules['flask'] = None; import common.change_feed"
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+    def test_publish_many(self):
+        self.feed.publish_many('bin', {'a': 1, 'b': 2})
+        self.assertEqual(self.feed.sequence, 2)
+        self.feed.subscribe()
+        self.feed.publish_many('bin', {'c': 3, 'd': 4})
+        sequence, changes = self.feed.changes_since(2)
+        self.assertEqual(sequence, 4)
+        self.assertEqual([(c.sequence, c.key, c.entity) for c in changes], [(3, 'c', 3), (4, 'd', 4)])
+
+    def test_coalesce_keeps_latest_per_entity(self):
+        self.feed.subscribe()
+        for key in ('a', 'b', 'a', 'c'):
+            self.feed.publish('bin', key, key)
+        changes = change_feed._coalesce(self.feed.changes_since(0)[1])
+        self.assertEqual([(c.sequence, c.key) for c in changes], [(2, 'b'), (3, 'a'), (4, 'c')])
+
+        self.feed.publish_reset()
+        self.feed.publish('bin', 'd', 'd')
+        changes = change_feed._coalesce(self.feed.changes_since(2)[1])
+        self.assertEqual([(c.kind, c.key) for c in changes], [(None, None), ('bin', 'd')])
+
+    def test_wait(self):
+        self.assertFalse(self.feed.wait(0, timeout=0.01))
+        self.feed.publish('bin', 'a', 1)
+        self.assertTrue(self.feed.wait(0, timeout=0.01))
+
+@mock.patch.object(events, 'COALESCE_INTERVAL', 0)
+class TestSseResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.feed = ChangeFeed('test')
+        self.syncs = 0
+
+        def sync():
+            self.syncs += 1
+
+        @self.app.route('/events')
+        def stream():
+            return sse_response(self.feed, {'bin': lambda entity: dict(entity)}, sync=sync)
+
+        self.client = self.app.test_client()
+
+    def _open(self, headers=None):
+        response = self.client.get('/events', headers=headers or {}, buffered=False)
+        self.addCleanup(response.close)
+        return response, iter(response.response)
+
+    def test_streams_latest_state_of_changed_entities(self):
+        response, chunks = self._open()
+        self.assertEqual(response.mimetype, SSE_MIMETYPE)
+        self.assertIn('retry:', next(chunks).decode())
+        entity = {'bin_id': 'a', 'fill': 10}
+        self.feed.publish('bin', 'a', entity)
+        self.feed.publish('bin', 'b', {'bin_id': 'b', 'fill': 1})
+        entity['fill'] = 20
+        self.feed.publish('bin', 'a', entity)
+        messages = _parse(next(chunks).decode())
+        self.assertEqual([(event, data) for _, event, data in messages],
+                         [('bin', {'bin_id': 'b', 'fill': 1}), ('bin', {'bin_id': 'a', 'fill': 20})])
+        self.assertTrue(messages[-1][0].endswith('.3'))
+        self.assertEqual(self.syncs, 1)
+
+    def test_resume_from_last_event_id(self):
+        response, chunks = self._open()
+        next(chunks)
+        self.feed.publish('bin', 'a', {'n': 1})
+        last_id = _parse(next(chunks).decode())[-1][0]
+        self.feed.publish('bin', 'b', {'n': 2})  # Published while the client is still connected
+
+        _, resumed = self._open({'Last-Event-ID': last_id})
+        next(resumed)
+        self.assertEqual([data for _, _, data in _parse(next(resumed).decode())], [{'n': 2}])
+
+    def test_unknown_or_stale_id_is_reset(self):
+        _, chunks = self._open({'Last-Event-ID': 'otherprocess.5'})
+        next(chunks)
+        self.assertEqual(_parse(next(chunks).decode())[0][1], RESET_EVENT)
+
+    def test_subscription_ends_with_stream(self):
+        response, chunks = self._open()
+        next(chunks)
+        self.assertEqual(self.feed._subscribers, 1)
+        response.close()
+        self.assertEqual(self.feed._subscribers, 0)
+
+if __name__ == '__main__':
+    unittest.main()
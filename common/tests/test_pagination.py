@@ -0,0 +1,53 @@
+import random
+import unittest
+
+from common.pagination import SortedKeyIndex, decode_cursor, encode_cursor
+
+class TestSortedKeyIndex(unittest.TestCase):
+
+    def test_matches_sorted_set_under_random_updates(self):
+        rng = random.Random(7)
+        index, expected = SortedKeyIndex(chunk_size=4), set()
+        for _ in range(2000):
+            key = f"k{rng.randrange(300):03d}"
+            if rng.random() < 0.7:
+                index.add(key)
+                expected.add(key)
+            else:
+                index.discard(key)
+                expected.discard(key)
+        ordered = sorted(expected)
+        self.assertEqual(len(index), len(expected))
+        self.assertEqual(list(index.iter_after()), ordered)
+        self.assertEqual(list(index.iter_after("k150")), [key for key in ordered if key > "k150"])
+        self.assertEqual(list(index.iter_after("zzz")), [])
+        self.assertIn(ordered[0], index)
+        self.assertNotIn("k150x", index)
+
+    def test_page(self):
+        index = SortedKeyIndex(chunk_size=2)
+        records = {f"id{i:02d}": i for i in range(10)}
+        for key in records:
+            index.add(key)
+        index.add("stale")  # Keys without a record are skipped
+
+        items, after = index.page(4, None, records.get)
+        self.assertEqual((items, after), ([0, 1, 2, 3], "id03"))
+        items, after = index.page(4, after, records.get, lambda value: value % 2 == 0)
+        self.assertEqual((items, after), ([4, 6, 8], None))
+        self.assertEqual(index.page(3, "id06", records.get), ([7, 8, 9], None))
+
+class TestCursor(unittest.TestCase):
+
+    def test_round_trip_and_validation(self):
+        token = encode_cursor("bin/42", {"status": "FULL"})
+        self.assertNotIn("bin", token)
+        self.assertEqual(decode_cursor(token, {"status": "FULL"}), "bin/42")
+        with self.assertRaises(ValueError):
+            decode_cursor(token, {"status": "EMPTY"})  # Issued for another listing
+        for bad_token in ("not a cursor", "e30", encode_cursor("x")[:-2]):
+            with self.assertRaises(ValueError):
+                decode_cursor(bad_token)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import unittest
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from flask import Flask, jsonify
+
+from common import serialization
+from common.serialization import OrjsonProvider, dataclass_serializer, install_json_provider
+from common.streaming import ndjson_response
+from citizen_reporting.models import ReportedIssue, reported_issue_to_dict
+from energy_management.models import Streetlight, streetlight_to_dict
+from waste_management.models import CollectionRoute, TrashBin, collection_route_to_dict, trash_bin_to_dict
+
+class TestDataclassSerializer(unittest.TestCase):
+
+    def test_matches_asdict(self):
+        at = datetime(2024, 1, 1, 12, 30)
+        records = [
+            (TrashBin("BIN_1", {'lat': 40.7, 'lon': -74.0}, 100.0, 25.0), trash_bin_to_dict),
+            (CollectionRoute("ROUTE_1", "TRUCK_1", ["BIN_1", "BIN_2"]), collection_route_to_dict),
+            (Streetlight("SL_1", {'lat': 40.7, 'lon': -74.0}, 'ON', 80), streetlight_to_dict),
+            (ReportedIssue("ISSUE_1", at, "pothole", "Deep", {'lat': 1.0, 'lon': 2.0}, "open", at), reported_issue_to_dict),
+        ]
+        for record, to_dict in records:
+            with self.subTest(type(record).__name__):
+                self.assertEqual(to_dict(record), asdict(record))
+                self.assertEqual(list(to_dict(record)), list(asdict(record)))  # Same field order
+
+    def test_nested_values_are_shared(self):
+        bin_obj = TrashBin("BIN_1", {'lat': 40.7, 'lon': -74.0}, 100.0)
+        self.assertIs(trash_bin_to_dict(bin_obj)['location'], bin_obj.location)
+
+    def test_rejects_non_dataclass(self):
+        with self.assertRaises(TypeError):
+            dataclass_serializer(dict)
+
+    def test_function_name(self):
+        @dataclass
+        class Point:
+            x: int
+            y: int
+        to_dict = dataclass_serializer(Point)
+        self.assertEqual(to_dict.__name__, "Point_to_dict")
+        self.assertEqual(to_dict(Point(1, 2)), {'x': 1, 'y': 2})
+
+@unittest.skipIf(serialization.orjson is None, "orjson is not installed")
+class TestOrjsonProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.payload = {
+            "b": [1, 2.5, None, True],
+            "a": {"at": datetime(2024, 1, 1, 12, 0, 5), "name": "Straße"},
+            "bin": TrashBin("BIN_1", {'lat': 40.7, 'lon': -74.0}, 100.0),
+        }
+
+    def _get(self, app: Flask, url: str = '/payload'):
+        @app.route('/payload')
+        def payload():
+            return jsonify(self.payload)
+
+        @app.route('/lines')
+        def lines():
+            return ndjson_response([self.payload, self.payload], dict)
+
+        return app.test_client().get(url)
+
+    def test_install(self):
+        app = Flask(__name__)
+        self.assertTrue(install_json_provider(app))
+        self.assertIsInstance(app.json, OrjsonProvider)
+
+    def test_same_values_as_default_provider(self):
+        app = Flask(__name__)
+        install_json_provider(app)
+        expected = self._get(Flask(__name__)).json
+        response = self._get(app)
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.json, expected)
+        self.assertEqual(expected["a"]["at"], "Mon, 01 Jan 2024 12:00:05 GMT")
+
+    def test_sorted_keys_and_trailing_newline(self):
+        app = Flask(__name__)
+        install_json_provider(app)
+        body = self._get(app).data
+        self.assertTrue(body.endswith(b"\n"))
+        self.assertLess(body.index(b'"a"'), body.index(b'"b"'))
+
+    def test_dumps_falls_back_for_unsupported_options(self):
+        provider = OrjsonProvider(Flask(__name__))
+        self.assertEqual(provider.dumps({"a": "é"}, ensure_ascii=True), '{"a": "\\u00e9"}')
+        self.assertEqual(json.loads(provider.dumps({"a": "é"})), {"a": "é"})
+
+    def test_ndjson_uses_provider(self):
+        app = Flask(__name__)
+        install_json_provider(app)
+        expected = self._get(Flask(__name__), '/lines').data.decode().splitlines()
+        lines = self._get(app, '/lines').data.decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [json.loads(line) for line in expected])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from citizen_reporting import issue_manager
+from common.state_server import StateClient, StateServer
+from energy_management import streetlight_manager
+from waste_management import bin_manager
+
+class _ServerTestCase(unittest.TestCase):
+
+    def start_server(self, **kwargs):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.socket_path = os.path.join(temp_dir.name, "state.sock")
+        server = StateServer(self.socket_path, **kwargs)
+        server.start(poll_interval=0.05)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def connect(self):
+        client = StateClient(self.socket_path)
+        self.addCleanup(client.close)
+        return client
+
+class TestStateServer(_ServerTestCase):
+
+    def test_clients_share_records(self):
+        self.start_server()
+        first, second = self.connect(), self.connect()
+        first.put("bin", "b1", {"level": 1})
+        with first.batch():
+            first.put("bin", "b2", {"level": 2})
+            first.put("bin", "b1", {"level": 3})
+            self.assertEqual(first.get("bin", "b1"), {"level": 3})  # Pending writes are visible to the writer
+            self.assertEqual(second.get("bin", "b1"), {"level": 1})
+        self.assertEqual(second.get("bin", "b1"), {"level": 3})
+        self.assertIsNone(second.get("bin", "missing"))
+        self.assertEqual(list(second.load_all("bin")), [("b1", {"level": 3}), ("b2", {"level": 2})])
+
+    def test_changes_since(self):
+        self.start_server(change_log_size=4)
+        writer, reader = self.connect(), self.connect()
+        start = reader.change_sequence()
+        writer.put("issue", "i1", {"status": "OPEN"})
+        writer.put("issue", "i2", {"status": "OPEN"})
+        writer.put("issue", "i1", {"status": "CLOSED"})
+        sequence, changes = reader.changes_since(start)
+        self.assertEqual(sequence, start + 3)
+        # Only the latest version of each record, ordered by its latest write
+        self.assertEqual(changes, [("issue", "i2", {"status": "OPEN"}), ("issue", "i1", {"status": "CLOSED"})])
+        self.assertEqual(reader.changes_since(sequence), (sequence, []))
+
+        for i in range(5):
+            writer.put("issue", f"x{i}", {})
+        self.assertIsNone(reader.changes_since(sequence)[1])  # Fell out of the change log
+        latest = reader.change_sequence()
+        writer.clear()
+        self.assertIsNone(reader.changes_since(latest)[1])
+        self.assertEqual(list(reader.load_all("issue")), [])
+
+    def test_batch_does_not_block_other_threads(self):
+        self.start_server()
+        client = self.connect()
+        done = threading.Event()
+
+        def other_thread():
+            client.put("bin", "b2", {"level": 2})
+            self.assertIsNone(client.get("bin", "b1"))  # Another thread's pending writes are not visible
+            done.set()
+
+        with client.batch():
+            client.put("bin", "b1", {"level": 1})
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            self.assertTrue(done.wait(5))
+            thread.join()
+        self.assertEqual([key for key, _ in client.load_all("bin")], ["b2", "b1"])
+
+    def test_failed_batch_sends_nothing(self):
+        self.start_server()
+        client = self.connect()
+        with self.assertRaises(RuntimeError):
+            with client.batch():
+                client.put("bin", "b1", {"level": 1})
+                raise RuntimeError("ingest failed")
+        self.assertIsNone(client.get("bin", "b1"))
+
+    def test_reads_inside_batch_do_not_send_it(self):
+        self.start_server()
+        client, other = self.connect(), self.connect()
+        client.put("bin", "b1", {"level": 1})
+        sequence = other.change_sequence()
+        with self.assertRaises(RuntimeError):
+            with client.batch():
+                client.put("bin", "b2", {"level": 2})
+                client.put("bin", "b1", {"level": 3})
+                self.assertEqual(list(client.load_all("bin")), [("b1", {"level": 3}), ("b2", {"level": 2})])
+                self.assertEqual(client.change_sequence(), sequence)
+                self.assertEqual(client.changes_since(sequence), (sequence, []))
+                self.assertEqual(list(other.load_all("bin")), [("b1", {"level": 1})])
+                raise RuntimeError("ingest failed")
+        self.assertEqual(list(client.load_all("bin")), [("b1", {"level": 1})])
+
+    def test_server_errors_are_raised(self):
+        self.start_server()
+        client = self.connect()
+        with self.assertRaisesRegex(RuntimeError, "Unknown operation"):
+            client._call("drop_everything")
+        client.put("bin", "b1", {})  # The connection is still usable
+        self.assertEqual(client.get("bin", "b1"), {})
+
+class TestWorkersShareState(_ServerTestCase):
+    """The managers in this process play one worker; a second client plays another worker."""
+
+    def setUp(self):
+        self.start_server()
+        self.other_worker = self.connect()
+        self.addCleanup(bin_manager._reset_bins_data)
+        self.addCleanup(streetlight_manager._reset_streetlights_data)
+        self.addCleanup(issue_manager.attach_storage, None)
+
+    def test_issues(self):
+        issue_manager.attach_storage(self.connect())
+        issue = issue_manager.create_issue("Pothole", "Deep", {"lat": 1.0, "lon": 2.0})
+        record = self.other_worker.get(issue_manager.ISSUE_RECORD, issue.issue_id)
+        self.assertEqual(record["status"], "OPEN")
+
+        self.other_worker.put(issue_manager.ISSUE_RECORD, issue.issue_id, dict(record, status="RESOLVED"))
+        self.assertEqual(issue_manager.sync_storage(), 1)
+        self.assertEqual(issue_manager.get_issue(issue.issue_id).status, "RESOLVED")
+        self.assertEqual(issue_manager.sync_storage(), 0)
+
+    def test_streetlights(self):
+        streetlight_manager.attach_storage(self.connect())
+        streetlight_manager.add_streetlight("SL1", {"lat": 1.0, "lon": 2.0}, 100.0)
+        record = self.other_worker.get(streetlight_manager.LIGHT_RECORD, "SL1")
+        self.other_worker.put(streetlight_manager.LIGHT_RECORD, "SL1", dict(record, adaptive_lighting_enabled=True))
+        self.assertEqual(streetlight_manager.sync_storage(), 1)
+        summary = streetlight_manager.apply_adaptive_lighting_schedule(7)  # Lights the now-adaptive light
+        self.assertEqual(summary["updated_lights"], 1)
+        self.assertEqual(self.other_worker.get(streetlight_manager.LIGHT_RECORD, "SL1")["status"], "ON")
+
+    def test_bins(self):
+        bin_manager.attach_storage(self.connect())
+        bin_manager.add_bin("b1", {'lat': 40.0, 'lon': -74.0}, 100.0)
+        self.assertEqual(bin_manager.sync_storage(), 0)  # Own writes are already applied
+        record = self.other_worker.get("bin", "b1")
+        self.other_worker.put("bin", "b1", dict(record, current_fill_level_gallons=95.0, status='FULL',
+                                                location={'lat': 41.0, 'lon': -74.0}))
+        self.assertEqual(bin_manager.sync_storage(), 1)
+        self.assertEqual([b.bin_id for b in bin_manager.list_bins(status_filter='FULL')], ["b1"])
+        self.assertEqual(bin_manager.bins_within_radius(40.0, -74.0, 500), [])
+        self.assertEqual(bin_manager.bins_within_radius(41.0, -74.0, 500)[0].bin_id, "b1")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from common.storage import InMemoryStorage, SQLiteStorage
+
+class _BackendContract:
+    """Behavior shared by every storage backend."""
+
+    def make_backend(self):
+        raise NotImplementedError
+
+    def test_put_get_and_load_all(self):
+        backend = self.make_backend()
+        record = {"value": 1, "nested": {"a": [1, 2]}}
+        backend.put("bin", "b1", record)
+        record["value"] = 99  # Later changes to the written object are not seen
+        backend.put("bin", "b2", {"value": 2})
+        backend.put("route", "r1", {"value": 3})
+        backend.put("bin", "b1", {"value": 4})
+        self.assertEqual(backend.get("bin", "b1"), {"value": 4})
+        self.assertIsNone(backend.get("bin", "missing"))
+        self.assertEqual(list(backend.load_all("bin")), [("b1", {"value": 4}), ("b2", {"value": 2})])
+        self.assertEqual(list(backend.load_all("route")), [("r1", {"value": 3})])
+        backend.clear()
+        self.assertEqual(list(backend.load_all("bin")), [])
+
+    def test_batch(self):
+        backend = self.make_backend()
+        with backend.batch():
+            for i in range(10):
+                backend.put("bin", f"b{i}", {"i": i})
+            self.assertEqual(backend.get("bin", "b3"), {"i": 3})
+        self.assertEqual(len(list(backend.load_all("bin"))), 10)
+
+class TestInMemoryStorage(_BackendContract, unittest.TestCase):
+
+    def make_backend(self):
+        return InMemoryStorage()
+
+class TestSQLiteStorage(_BackendContract, unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "waste.db")
+
+    def make_backend(self, **kwargs):
+        backend = SQLiteStorage(self.path, **kwargs)
+        self.addCleanup(backend.close)
+        return backend
+
+    def test_compaction_keeps_latest_records_in_first_write_order(self):
+        backend = self.make_backend(compact_threshold=5)
+        for round_number in range(3):
+            for key in ("c", "a", "b"):
+                backend.put("bin", key, {"round": round_number})
+        # 9 appends with a threshold of 5: compacted once, 4 records since
+        self.assertEqual(backend.log_size(), 4)
+        backend.put("bin", "d", {"round": 0})
+        self.assertEqual(list(backend.load_all("bin")),
+                         [("c", {"round": 2}), ("a", {"round": 2}), ("b", {"round": 2}), ("d", {"round": 0})])
+        backend.compact()
+        self.assertEqual(backend.log_size(), 0)
+        self.assertEqual(backend.get("bin", "a"), {"round": 2})
+        self.assertEqual([key for key, _ in backend.load_all("bin")], ["c", "a", "b", "d"])
+
+    def test_state_survives_reopen(self):
+        backend = SQLiteStorage(self.path)
+        backend.put("bin", "b1", {"value": 1})
+        with backend.batch():
+            backend.put("bin", "b2", {"value": 2})
+        backend.close()
+        reopened = self.make_backend()
+        self.assertEqual(list(reopened.load_all("bin")), [("b1", {"value": 1}), ("b2", {"value": 2})])
+
+    def test_changes_since_across_connections(self):
+        writer = self.make_backend(compact_threshold=6)
+        reader = self.make_backend()
+        start = reader.change_sequence()
+        writer.put("bin", "b1", {"value": 1})
+        with writer.batch():
+            writer.put("bin", "b2", {"value": 2})
+            writer.put("bin", "b1", {"value": 3})
+        sequence, changes = reader.changes_since(start)
+        self.assertEqual(changes, [("bin", "b2", {"value": 2}), ("bin", "b1", {"value": 3})])
+        self.assertEqual(reader.changes_since(sequence), (sequence, []))
+
+        for i in range(3):
+            writer.put("bin", f"c{i}", {"value": i})  # The sixth write compacts the log
+        latest, changes = reader.changes_since(sequence)
+        self.assertIsNone(changes)
+        self.assertEqual(reader.changes_since(latest), (latest, []))
+        writer.clear()
+        self.assertIsNone(reader.changes_since(latest)[1])
+        writer.put("bin", "d", {"value": 4})
+        self.assertEqual(reader.changes_since(reader.change_sequence() - 1)[1], [("bin", "d", {"value": 4})])
+
+    def test_batch_does_not_block_other_threads(self):
+        backend = self.make_backend()
+        written = threading.Event()
+        with backend.batch():
+            backend.put("bin", "b1", {"value": 1})
+            thread = threading.Thread(target=lambda: (backend.put("bin", "b2", {"value": 2}), written.set()))
+            thread.start()
+            self.assertTrue(written.wait(5))
+            thread.join()
+        self.assertEqual([key for key, _ in backend.load_all("bin")], ["b2", "b1"])
+
+    def test_failed_batch_writes_nothing(self):
+        backend = self.make_backend()
+        with self.assertRaises(RuntimeError):
+            with backend.batch():
+                backend.put("bin", "b1", {"value": 1})
+                raise RuntimeError("ingest failed")
+        self.assertIsNone(backend.get("bin", "b1"))
+        backend.put("bin", "b2", {"value": 2})  # Not part of a batch any more
+        self.assertEqual(list(backend.load_all("bin")), [("b2", {"value": 2})])
+
+    def test_reads_inside_batch_do_not_commit_it(self):
+        backend = self.make_backend()
+        other = self.make_backend()
+        backend.put("bin", "b1", {"value": 1})
+        sequence = other.change_sequence()
+        with self.assertRaises(RuntimeError):
+            with backend.batch():
+                backend.put("bin", "b2", {"value": 2})
+                backend.put("bin", "b1", {"value": 3})
+                self.assertEqual(list(backend.load_all("bin")), [("b1", {"value": 3}), ("b2", {"value": 2})])
+                self.assertEqual(backend.change_sequence(), sequence)
+                self.assertEqual(backend.changes_since(sequence), (sequence, []))
+                backend.compact()
+                self.assertEqual(list(other.load_all("bin")), [("b1", {"value": 1})])
+                raise RuntimeError("ingest failed")
+        self.assertEqual(list(backend.load_all("bin")), [("b1", {"value": 1})])
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            SQLiteStorage(self.path, compact_threshold=0)
+        with self.assertRaises(ValueError):
+            SQLiteStorage(self.path, synchronous="sometimes")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import unittest
+from datetime import datetime
+
+from flask import Flask, jsonify
+
+from common import streaming
+from common.streaming import NDJSON_MIMETYPE, ndjson_response, wants_ndjson
+
+class TestNdjsonStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.produced = []
+
+        def records():
+            for i in range(5):
+                self.produced.append(i)
+                yield {"id": i, "at": datetime(2024, 1, 1, 12, 0, i)}
+
+        @self.app.route('/items')
+        def items():
+            if wants_ndjson():
+                return ndjson_response(records(), dict)
+            return jsonify(list(records()))
+
+        self.client = self.app.test_client()
+
+    def test_array_by_default(self):
+        for headers in ({}, {"Accept": "*/*"}, {"Accept": "application/json"}):
+            response = self.client.get('/items', headers=headers)
+            self.assertEqual(response.mimetype, "application/json")
+            self.assertEqual(len(response.json), 5)
+
+    def test_stream_matches_array_encoding(self):
+        array = self.client.get('/items').json
+        for url, headers in (('/items?stream=1', {}), ('/items', {"Accept": NDJSON_MIMETYPE})):
+            response = self.client.get(url, headers=headers)
+            self.assertEqual(response.mimetype, NDJSON_MIMETYPE)
+            self.assertTrue(response.is_streamed)
+            lines = response.get_data(as_text=True).split('\n')
+            self.assertEqual(lines[-1], '')  # Every record line is terminated
+            self.assertEqual([json.loads(line) for line in lines[:-1]], array)
+
+    def test_records_are_serialized_lazily_in_chunks(self):
+        original = streaming.STREAM_CHUNK_RECORDS
+        streaming.STREAM_CHUNK_RECORDS = 2
+        self.addCleanup(setattr, streaming, 'STREAM_CHUNK_RECORDS', original)
+        response = self.client.get('/items?stream=1', buffered=False)
+        chunks = response.response
+        first = next(chunks)
+        self.assertEqual(first.count(b'\n'), 2)
+        self.assertEqual(self.produced, [0, 1])  # Nothing beyond the first chunk was produced yet
+        self.assertEqual(len(list(chunks)), 2)
+        response.close()
+
+if __name__ == '__main__':
+    unittest.main()
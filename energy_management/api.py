@@ -1,19 +1,47 @@
 from flask import Blueprint, request, jsonify, render_template
-from dataclasses import asdict
 
+from common.change_feed import get_feed
+from common.events import sse_response
+from common.state_server import get_shared_client
+from common.pagination import page_args, page_response
+from common.streaming import ndjson_response, wants_ndjson
 from . import streetlight_manager
+from .models import streetlight_to_dict
 
 energy_bp = Blueprint('energy', __name__, template_folder='templates')
 
+# Worker processes share streetlight state through the state server named by SMARTCITY_STATE_SOCKET, when set.
+_shared_state = get_shared_client()
+if _shared_state is not None:
+    streetlight_manager.attach_storage(_shared_state)
+
+@energy_bp.before_request
+def _sync_shared_state():
+    # Picks up changes other worker processes made
+    streetlight_manager.sync_storage()
+
 @energy_bp.route('/streetlights', methods=['GET'])
 def get_all_streetlights_api():
     """
     Retrieves a list of all streetlights, optionally filtered by status.
     Query parameter: status (e.g., /streetlights?status=ON)
+    Query parameter: stream=1 (or Accept: application/x-ndjson) to stream one JSON object per line
+    Query parameters: limit and after for one page in light ID order, e.g. /streetlights?limit=100
+    then /streetlights?limit=100&after=<next>; the response is then {"items": [...], "next": cursor or null}
     """
     status_filter = request.args.get('status')
+    filters = {"status": status_filter} if status_filter else None
+    try:
+        page = page_args(filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if page is not None:
+        lights_page, next_light_id = streetlight_manager.list_streetlights_page(*page, status_filter=status_filter)
+        return page_response(lights_page, next_light_id, streetlight_to_dict, filters)
     lights_list = streetlight_manager.list_streetlights(status_filter=status_filter)
-    lights_as_dicts = [asdict(light) for light in lights_list]
+    if wants_ndjson():
+        return ndjson_response(lights_list, streetlight_to_dict)
+    lights_as_dicts = [streetlight_to_dict(light) for light in lights_list]
     return jsonify(lights_as_dicts), 200
 
 
@@ -46,7 +74,7 @@ def create_streetlight_api():
             location=location,
             power_consumption_watts=float(power_consumption_watts) if power_consumption_watts is not None else None
         )
-        return jsonify(asdict(new_light)), 201
+        return jsonify(streetlight_to_dict(new_light)), 201
     except ValueError as e: # Handles duplicate light_id or other validation errors from manager/model
         return jsonify({"error": str(e)}), 409 # Conflict or Bad Request
     except Exception as e:
@@ -58,7 +86,7 @@ def get_specific_streetlight_api(light_id: str):
     """Retrieves a specific streetlight by its ID."""
     light = streetlight_manager.get_streetlight(light_id)
     if light:
-        return jsonify(asdict(light)), 200
+        return jsonify(streetlight_to_dict(light)), 200
     else:
         return jsonify({"error": f"Streetlight with ID '{light_id}' not found"}), 404
 
@@ -91,7 +119,7 @@ def update_streetlight_status_api(light_id: str):
             brightness_level=brightness_level
         )
         if updated_light:
-            return jsonify(asdict(updated_light)), 200
+            return jsonify(streetlight_to_dict(updated_light)), 200
         else:
             return jsonify({"error": f"Streetlight with ID '{light_id}' not found for update"}), 404
     except ValueError as e: # Handles invalid status or brightness from manager/model
@@ -120,13 +148,22 @@ def report_streetlight_fault_api(light_id: str):
         # faulty_light = streetlight_manager.update_streetlight_status(light_id, status='FAULTY')
 
         if faulty_light:
-            return jsonify(asdict(faulty_light)), 200
+            return jsonify(streetlight_to_dict(faulty_light)), 200
         else:
             return jsonify({"error": f"Streetlight with ID '{light_id}' not found to report fault"}), 404
     except Exception as e:
         energy_bp.logger.error(f"Error reporting fault for streetlight {light_id}: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
+@energy_bp.route('/events', methods=['GET'])
+def energy_events_api():
+    """
+    Streams streetlight changes as Server-Sent Events: `event: streetlight` with the changed light as JSON,
+    coalesced to its latest state, and `event: reset` when the listing must be refetched.
+    """
+    return sse_response(get_feed('energy'), {streetlight_manager.LIGHT_RECORD: streetlight_to_dict},
+                        sync=_sync_shared_state)
+
 @energy_bp.route('/dashboard')
 def dashboard():
     """Serves the energy management dashboard HTML page."""
@@ -137,7 +174,8 @@ def dashboard():
 def run_energy_simulation_api():
     """
     Runs an energy consumption simulation for a given duration.
-    Expects JSON payload: {"duration_hours": float}
+    Expects JSON payload: {"duration_hours": float, "start_hour": int (optional)}
+    With a start hour, adaptive lights follow the adaptive lighting schedule hour by hour.
     Returns the total energy consumed by all streetlights.
     """
     data = request.get_json()
@@ -155,9 +193,15 @@ def run_energy_simulation_api():
     if duration_hours <= 0:
         return jsonify({"error": "'duration_hours' must be a positive number"}), 400
 
+    start_hour = data.get('start_hour')
+    if start_hour is not None and (not isinstance(start_hour, int) or isinstance(start_hour, bool)):
+        return jsonify({"error": "'start_hour' must be an integer"}), 400
+
     try:
-        total_consumed = streetlight_manager.simulate_energy_consumption(float(duration_hours))
+        total_consumed = streetlight_manager.simulate_energy_consumption(float(duration_hours), start_hour)
         return jsonify({"total_energy_consumed_kwh": total_consumed}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Log the exception for debugging purposes
         energy_bp.logger.error(f"Error during energy simulation: {e}")
@@ -181,17 +225,13 @@ def toggle_adaptive_lighting_api(light_id: str):
     if not isinstance(enabled_value, bool):
         return jsonify({"error": "'enabled' field must be a boolean"}), 400
 
-    light = streetlight_manager.get_streetlight(light_id)
-    if not light:
-        return jsonify({"error": f"Streetlight with ID '{light_id}' not found"}), 404
-
     try:
-        light.adaptive_lighting_enabled = enabled_value
-        light.last_updated = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        # No need to call _streetlights[light_id] = light, direct modification
-        # streetlight_manager._streetlights[light_id] = light # This would be needed if manager copied objects
+        # Goes through the manager so the adaptive lighting index stays in sync
+        light = streetlight_manager.set_adaptive_lighting(light_id, enabled_value)
+        if not light:
+            return jsonify({"error": f"Streetlight with ID '{light_id}' not found"}), 404
 
-        return jsonify(asdict(light)), 200
+        return jsonify(streetlight_to_dict(light)), 200
     except Exception as e:
         energy_bp.logger.error(f"Error toggling adaptive lighting for {light_id}: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
@@ -201,6 +241,7 @@ def apply_adaptive_lighting_schedule_api():
     """
     Applies the adaptive lighting schedule based on the provided hour.
     Expects JSON payload: {"current_time_hour": int}
+    Query parameter: details=false to return only the count of updated lights.
     """
     data = request.get_json()
     if not data:
@@ -219,7 +260,8 @@ def apply_adaptive_lighting_schedule_api():
     # If manager raises ValueError, it will be caught by the generic Exception.
 
     try:
-        result_summary = streetlight_manager.apply_adaptive_lighting_schedule(current_time_hour)
+        include_details = request.args.get('details', 'true').lower() not in ('false', '0', 'no')
+        result_summary = streetlight_manager.apply_adaptive_lighting_schedule(current_time_hour, include_details=include_details)
         return jsonify(result_summary), 200
     except ValueError as e: # Catch specific error from manager for bad hour
         return jsonify({"error": str(e)}), 400
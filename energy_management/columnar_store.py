@@ -0,0 +1,261 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .models import Streetlight
+
+# Status codes stored in the status column; the code is the index into this tuple
+STATUS_NAMES = ('OFF', 'ON', 'FAULTY')
+STATUS_CODES: Dict[str, int] = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+class StreetlightArrayRegistry:
+    """
+    Array-backed streetlight registry for vectorized energy simulation.
+
+    Power, brightness, status, adaptive lighting and accumulated energy are kept as
+    typed NumPy columns with an ID-to-row map. Lights without a known power rating are
+    stored with 0 W, which matches how simulate_energy_consumption treats them.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        Initializes an empty registry.
+
+        Args:
+            initial_capacity: Number of rows to preallocate; columns grow by doubling.
+        """
+        initial_capacity = max(1, initial_capacity)
+        self._size = 0
+        self._row_by_id: Dict[str, int] = {}
+        self._light_ids: List[str] = []
+        self._power_watts = np.zeros(initial_capacity, dtype=np.float64)
+        self._brightness = np.zeros(initial_capacity, dtype=np.uint8)
+        self._status = np.zeros(initial_capacity, dtype=np.int8)
+        self._energy_kwh = np.zeros(initial_capacity, dtype=np.float64)
+        self._adaptive = np.zeros(initial_capacity, dtype=bool)
+
+    @classmethod
+    def from_streetlights(cls, lights: Iterable[Streetlight]) -> 'StreetlightArrayRegistry':
+        """
+        Builds a registry from existing Streetlight instances (e.g. streetlight_manager.list_streetlights()).
+
+        Args:
+            lights: The streetlights to copy into the registry.
+
+        Returns:
+            A new StreetlightArrayRegistry holding the lights' current values.
+        """
+        lights = list(lights)
+        registry = cls(initial_capacity=len(lights))
+        registry.add_streetlights(
+            [light.light_id for light in lights],
+            [light.power_consumption_watts for light in lights],
+            [light.brightness_level for light in lights],
+            [light.status for light in lights],
+            [light.current_energy_usage for light in lights],
+            [light.adaptive_lighting_enabled for light in lights],
+        )
+        return registry
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, light_id: str) -> bool:
+        return light_id in self._row_by_id
+
+    def _grow(self, min_capacity: int) -> None:
+        new_capacity = max(min_capacity, 2 * len(self._power_watts))
+        for name in ('_power_watts', '_brightness', '_status', '_energy_kwh', '_adaptive'):
+            column = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def add_streetlights(self, light_ids: Sequence[str], power_consumption_watts: Sequence[Optional[float]],
+                         brightness_levels: Optional[Sequence[int]] = None, statuses: Optional[Sequence[str]] = None,
+                         energy_usage_kwh: Optional[Sequence[float]] = None,
+                         adaptive_lighting: Optional[Sequence[bool]] = None) -> np.ndarray:
+        """
+        Appends streetlights to the registry.
+
+        Args:
+            light_ids: The unique identifiers for the new lights.
+            power_consumption_watts: Power ratings aligned with light_ids; None means unknown.
+            brightness_levels: Optional brightness percentages (0-100). Defaults to 0.
+            statuses: Optional statuses ('ON', 'OFF', 'FAULTY'). Defaults to 'OFF'.
+            energy_usage_kwh: Optional accumulated energy in kWh. Defaults to 0.
+            adaptive_lighting: Optional adaptive lighting flags. Defaults to False.
+
+        Returns:
+            The row numbers assigned to the new lights.
+
+        Raises:
+            ValueError: If an ID already exists or repeats, the inputs are misaligned,
+                        or a status or brightness value is invalid.
+        """
+        count = len(light_ids)
+        for values in (power_consumption_watts, brightness_levels, statuses, energy_usage_kwh, adaptive_lighting):
+            if values is not None and len(values) != count:
+                raise ValueError("All streetlight columns must have the same length as light_ids.")
+        new_ids = set(light_ids)
+        if len(new_ids) != count or not new_ids.isdisjoint(self._row_by_id):
+            raise ValueError("Streetlight IDs must be unique and not already in the registry.")
+
+        power = np.array([0.0 if watts is None else watts for watts in power_consumption_watts], dtype=np.float64)
+        brightness = np.zeros(count, dtype=np.int64) if brightness_levels is None else np.asarray(brightness_levels, dtype=np.int64)
+        if count and (brightness.min() < 0 or brightness.max() > 100):
+            raise ValueError("Brightness level must be between 0 and 100.")
+        try:
+            status_codes = [STATUS_CODES['OFF']] * count if statuses is None else [STATUS_CODES[s] for s in statuses]
+        except KeyError:
+            raise ValueError("Status must be one of 'ON', 'OFF', or 'FAULTY'.")
+
+        if self._size + count > len(self._power_watts):
+            self._grow(self._size + count)
+        start, end = self._size, self._size + count
+        self._power_watts[start:end] = power
+        self._brightness[start:end] = brightness
+        self._status[start:end] = status_codes
+        self._energy_kwh[start:end] = 0.0 if energy_usage_kwh is None else energy_usage_kwh
+        self._adaptive[start:end] = False if adaptive_lighting is None else adaptive_lighting
+        self._light_ids.extend(light_ids)
+        self._row_by_id.update(zip(light_ids, range(start, end)))
+        self._size = end
+        return np.arange(start, end)
+
+    def rows_for(self, light_ids: Sequence[str]) -> np.ndarray:
+        """
+        Maps light IDs to row numbers.
+
+        Raises:
+            KeyError: If any light ID is not in the registry.
+        """
+        row_by_id = self._row_by_id
+        return np.fromiter((row_by_id[light_id] for light_id in light_ids), dtype=np.int64, count=len(light_ids))
+
+    def set_state(self, rows: np.ndarray, status: str, brightness_level: int) -> None:
+        """
+        Sets the status and brightness of many lights at once.
+
+        Args:
+            rows: Row numbers to update (see rows_for).
+            status: The new status ('ON', 'OFF', 'FAULTY').
+            brightness_level: The new brightness percentage (0-100).
+
+        Raises:
+            ValueError: If the status or brightness is invalid.
+        """
+        if status not in STATUS_CODES:
+            raise ValueError("Status must be one of 'ON', 'OFF', or 'FAULTY'.")
+        if not 0 <= brightness_level <= 100:
+            raise ValueError("Brightness level must be between 0 and 100.")
+        self._status[rows] = STATUS_CODES[status]
+        self._brightness[rows] = brightness_level
+
+    def power_draw_kw(self) -> np.ndarray:
+        """Returns each light's current draw in kW (0 for lights that are not ON or have no power rating)."""
+        size = self._size
+        power_watts = self._power_watts[:size]
+        is_consuming = (self._status[:size] == STATUS_CODES['ON']) & (power_watts > 0)
+        # Energy (kWh) = Power (W) * Brightness (%) / 100 * Time (h) / 1000
+        return np.where(is_consuming, power_watts * self._brightness[:size] * 1e-5, 0.0)
+
+    def simulate_energy_consumption(self, duration_hours: Union[float, Sequence[float], np.ndarray],
+                                    start_hour: Optional[float] = None,
+                                    adaptive_schedule: Optional[Sequence[Optional[Tuple[str, int]]]] = None) -> Union[float, np.ndarray]:
+        """
+        Vectorized counterpart of streetlight_manager.simulate_energy_consumption.
+
+        Each step's draw is evaluated from the power, brightness and status columns. With an
+        adaptive schedule, every step starts by applying the schedule entry for its hour of day
+        to the adaptive lights (as streetlight_manager.apply_adaptive_lighting_schedule would),
+        so their draw follows the schedule along the series; all other lights keep their state.
+        Non-positive durations consume nothing.
+
+        Args:
+            duration_hours: A duration in hours, or a time series of step durations
+                            (e.g. 8760 hourly steps for one year).
+            start_hour: Hour of day (0-24) at which the first step starts; needed with a schedule.
+            adaptive_schedule: 24 entries, one per hour of day: the (status, brightness) target of
+                               adaptive lights, or None to leave them as they are.
+
+        Returns:
+            The total energy consumed in kWh for a scalar duration, or an array with the
+            total energy consumed in each step for a time series. Adaptive lights are left in
+            the state of the last schedule entry applied.
+        """
+        durations = np.clip(np.asarray(duration_hours, dtype=np.float64), 0.0, None)
+        steps = np.atleast_1d(durations)
+        size = self._size
+        draw_kw = self.power_draw_kw()
+        adaptive = self._adaptive[:size]
+        if adaptive_schedule is None or start_hour is None or not adaptive.any() or not len(steps):
+            self._energy_kwh[:size] += draw_kw * steps.sum()
+            step_totals = steps * draw_kw.sum()
+        else:
+            step_totals = self._simulate_adaptive(steps, draw_kw, adaptive, start_hour, adaptive_schedule)
+        if durations.ndim == 0:
+            return float(step_totals[0])
+        return step_totals
+
+    def _simulate_adaptive(self, steps: np.ndarray, draw_kw: np.ndarray, adaptive: np.ndarray, start_hour: float,
+                           adaptive_schedule: Sequence[Optional[Tuple[str, int]]]) -> np.ndarray:
+        size = self._size
+        # Fraction of rated power drawn under each hour's target (0 for OFF), and which hours have one
+        has_target = np.array([entry is not None for entry in adaptive_schedule], dtype=bool)
+        target_factor = np.array([entry[1] / 100.0 if entry is not None and entry[0] == 'ON' else 0.0
+                                  for entry in adaptive_schedule])
+        step_hours = (np.floor(start_hour + np.concatenate(([0.0], np.cumsum(steps)[:-1]))) % 24).astype(np.int64)
+        # The target in force during each step: that of the latest step whose hour has one
+        last_target = np.maximum.accumulate(np.where(has_target[step_hours], np.arange(len(steps)), -1))
+        scheduled = last_target >= 0
+        step_factor = np.where(scheduled, target_factor[step_hours[np.maximum(last_target, 0)]], 0.0)
+
+        # Adaptive lights draw their own state until the first target, then power x target factor
+        fixed_kw = np.where(adaptive, 0.0, draw_kw)
+        own_kw = np.where(adaptive, draw_kw, 0.0)
+        rated_kw = np.where(adaptive, self._power_watts[:size] * 1e-3, 0.0)
+        self._energy_kwh[:size] += (fixed_kw * steps.sum() + own_kw * steps[~scheduled].sum()
+                                    + rated_kw * (steps * step_factor).sum())
+        step_totals = steps * fixed_kw.sum() + np.where(scheduled, steps * step_factor * rated_kw.sum(), steps * own_kw.sum())
+
+        if scheduled.any():
+            status, brightness = adaptive_schedule[step_hours[last_target[-1]]]
+            self.set_state(np.flatnonzero(adaptive), status, brightness)
+        return step_totals
+
+    def light_state(self, light_id: str) -> Tuple[str, int]:
+        """Returns the (status, brightness) of one light."""
+        row = self._row_by_id[light_id]
+        return STATUS_NAMES[self._status[row]], int(self._brightness[row])
+
+    def energy_usage(self, light_id: str) -> float:
+        """Returns the accumulated energy of one light in kWh."""
+        return float(self._energy_kwh[self._row_by_id[light_id]])
+
+    def energy_usage_kwh(self) -> np.ndarray:
+        """Returns a copy of the accumulated energy of every light in kWh, in row order."""
+        return self._energy_kwh[:self._size].copy()
+
+    def total_energy_usage(self) -> float:
+        """Returns the accumulated energy of all lights in kWh."""
+        return float(self._energy_kwh[:self._size].sum())
+
+    def apply_energy_usage(self, lights: Dict[str, Streetlight]) -> int:
+        """
+        Copies accumulated energy back onto Streetlight objects (e.g. streetlight_manager._streetlights).
+
+        Args:
+            lights: Streetlights keyed by light_id. IDs missing from the registry are skipped.
+
+        Returns:
+            The number of streetlights updated.
+        """
+        updated = 0
+        energy_kwh = self._energy_kwh
+        for light_id, row in self._row_by_id.items():
+            light = lights.get(light_id)
+            if light is not None:
+                light.current_energy_usage = float(energy_kwh[row])
+                updated += 1
+        return updated
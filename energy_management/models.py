@@ -2,6 +2,8 @@ import datetime
 from dataclasses import dataclass, field
 from typing import Optional, Dict
 
+from common.serialization import dataclass_serializer
+
 @dataclass
 class Streetlight:
     """Represents a single streetlight in the energy management system."""
@@ -19,3 +21,6 @@ class Streetlight:
             raise ValueError("Brightness level must be between 0 and 100.")
         if self.status not in ['ON', 'OFF', 'FAULTY']:
             raise ValueError("Status must be one of 'ON', 'OFF', or 'FAULTY'.")
+
+# Response serializer: a shallow dict of the fields, without dataclasses.asdict's deep copy
+streetlight_to_dict = dataclass_serializer(Streetlight)
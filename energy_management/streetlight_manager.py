@@ -1,16 +1,59 @@
+import contextlib
 import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
+
+import numpy as np
+
+from common.change_feed import get_feed
+from common.pagination import SortedKeyIndex
+from common.storage import StorageBackend
+from .columnar_store import StreetlightArrayRegistry
 from .models import Streetlight
 
+# Record kind of streetlights in a storage backend
+LIGHT_RECORD = 'streetlight'
+
 # In-memory storage for streetlights
 _streetlights: Dict[str, Streetlight] = {}
+# Light IDs in sorted order, for keyset pagination (see list_streetlights_page)
+_sorted_light_ids = SortedKeyIndex()
+# IDs of lights with adaptive lighting enabled (dict used as an insertion-ordered set), kept up to
+# date by set_adaptive_lighting and when lights are cached; the schedule only visits these lights
+_adaptive_light_ids: Dict[str, None] = {}
+# Optional shared or persistent store; when attached, _streetlights acts as a read-through cache in front of it
+_storage: Optional[StorageBackend] = None
+# Storage change sequence the cache reflects (see sync_storage)
+_storage_sequence = 0
+# The energy subsystem's change feed; every changed light is published to it (see common.change_feed)
+_changes = get_feed('energy')
+# Longest simulation that may be stepped hour by hour through the adaptive lighting schedule (ten years)
+MAX_SCHEDULED_SIMULATION_HOURS = 10 * 8760
+
+def _compile_adaptive_schedule() -> Tuple[Optional[Tuple[str, int]], ...]:
+    """
+    Compiles the adaptive lighting schedule into a 24-entry lookup table.
+    Entry h is the (status, brightness) target for hour h, or None for no change.
+    """
+    schedule = []
+    for hour in range(24):
+        if 0 <= hour <= 5: # Late Night (0-5 AM)
+            schedule.append(('ON', 50))
+        elif 8 <= hour <= 17: # Day Time (8 AM - 5 PM)
+            schedule.append(('OFF', 0))
+        elif (6 <= hour <= 7) or (18 <= hour <= 23): # Evening/Early Morning
+            schedule.append(('ON', 100))
+        else: # No change for other times
+            schedule.append(None)
+    return tuple(schedule)
+
+_ADAPTIVE_SCHEDULE = _compile_adaptive_schedule()
 
 def add_streetlight(light_id: str, location: Dict[str, float], power_consumption_watts: Optional[float] = None) -> Streetlight:
     """
     Adds a new streetlight to the system.
     Raises ValueError if the light_id already exists.
     """
-    if light_id in _streetlights:
+    if get_streetlight(light_id) is not None:
         raise ValueError(f"Streetlight with ID '{light_id}' already exists.")
 
     new_streetlight = Streetlight(
@@ -19,12 +62,98 @@ def add_streetlight(light_id: str, location: Dict[str, float], power_consumption
         power_consumption_watts=power_consumption_watts
         # status, brightness_level, last_updated will use defaults from the model
     )
-    _streetlights[light_id] = new_streetlight
+    _cache_streetlight(new_streetlight)
+    _persist_streetlight(new_streetlight)
     return new_streetlight
 
+def _cache_streetlight(light: Streetlight) -> Streetlight:
+    _streetlights[light.light_id] = light
+    _sorted_light_ids.add(light.light_id)
+    _index_adaptive_lighting(light)
+    return light
+
+def _index_adaptive_lighting(light: Streetlight) -> None:
+    """Adds a light to the adaptive lighting index or removes it, following its field."""
+    if light.adaptive_lighting_enabled:
+        _adaptive_light_ids[light.light_id] = None
+    else:
+        _adaptive_light_ids.pop(light.light_id, None)
+
+def _persist_streetlight(light: Streetlight) -> None:
+    """Writes a changed light through to the attached storage and publishes it on the change feed."""
+    if _storage is not None:
+        _storage.put(LIGHT_RECORD, light.light_id, vars(light))
+    _changes.publish(LIGHT_RECORD, light.light_id, light)
+
+def _persist_streetlights(lights: Dict[str, Streetlight]) -> None:
+    """_persist_streetlight for many lights keyed by light_id, in one storage transaction and one feed update."""
+    if _storage is not None:
+        with _storage.batch():
+            for light_id, light in lights.items():
+                _storage.put(LIGHT_RECORD, light_id, vars(light))
+    _changes.publish_many(LIGHT_RECORD, lights)
+
+def _storage_batch():
+    """One storage transaction for a multi-light change (a no-op without storage)."""
+    return _storage.batch() if _storage is not None else contextlib.nullcontext()
+
+def attach_storage(backend: Optional[StorageBackend]) -> int:
+    """
+    Makes a storage backend the home of streetlight state, loading the lights it holds.
+
+    The in-memory lights then serve reads as a cache and every change is written through.
+    With a backend shared by several processes (common.state_server or a SQLite file), call
+    sync_storage() to pick up the other processes' changes. Passing None detaches and keeps
+    running in memory.
+    Returns the number of lights loaded.
+    """
+    global _storage, _storage_sequence
+    _reset_streetlights_data()
+    _changes.publish_reset()
+    if backend is None:
+        return 0
+    _storage_sequence = backend.change_sequence()
+    for _, record in backend.load_all(LIGHT_RECORD):
+        _cache_streetlight(Streetlight(**record))
+    _storage = backend
+    return len(_streetlights)
+
+def sync_storage() -> int:
+    """
+    Applies streetlight changes other processes wrote to the attached storage since the last sync.
+    Returns the number of changed lights applied.
+    """
+    global _storage_sequence
+    if _storage is None:
+        return 0
+    sequence, changes = _storage.changes_since(_storage_sequence)
+    if changes is None:
+        return attach_storage(_storage)
+    applied = 0
+    for kind, light_id, record in changes:
+        if kind != LIGHT_RECORD or record is None:
+            continue
+        light = _streetlights.get(light_id)
+        if light is None:
+            light = _cache_streetlight(Streetlight(**record))
+        elif vars(light) != record:
+            vars(light).update(record)
+            _cache_streetlight(light)
+        else:
+            continue
+        _changes.publish(LIGHT_RECORD, light_id, light)
+        applied += 1
+    _storage_sequence = sequence
+    return applied
+
 def get_streetlight(light_id: str) -> Optional[Streetlight]:
     """Retrieves a streetlight by its ID."""
-    return _streetlights.get(light_id)
+    light = _streetlights.get(light_id)
+    if light is None and _storage is not None:
+        record = _storage.get(LIGHT_RECORD, light_id)
+        if record is not None:
+            light = _cache_streetlight(Streetlight(**record))
+    return light
 
 def list_streetlights(status_filter: Optional[str] = None) -> List[Streetlight]:
     """
@@ -38,6 +167,20 @@ def list_streetlights(status_filter: Optional[str] = None) -> List[Streetlight]:
         return [light for light in _streetlights.values() if light.status == status_filter]
     return list(_streetlights.values())
 
+def list_streetlights_page(limit: int, after: Optional[str] = None,
+                           status_filter: Optional[str] = None) -> Tuple[List[Streetlight], Optional[str]]:
+    """
+    Lists one page of streetlights in light ID order, optionally filtered by status.
+    The page starts right after the light ID `after` (None for the first page), found by binary
+    search in the sorted ID index. Returns the lights and the light ID to pass as `after` for the
+    next page (None on the last page). An invalid status_filter gives an empty page.
+    """
+    if status_filter:
+        if status_filter not in ['ON', 'OFF', 'FAULTY']:
+            return [], None
+        return _sorted_light_ids.page(limit, after, _streetlights.get, lambda light: light.status == status_filter)
+    return _sorted_light_ids.page(limit, after, _streetlights.get)
+
 def update_streetlight_status(light_id: str, status: str, brightness_level: Optional[int] = None) -> Optional[Streetlight]:
     """
     Updates the status and optionally the brightness level of a streetlight.
@@ -67,7 +210,7 @@ def update_streetlight_status(light_id: str, status: str, brightness_level: Opti
 
 
     light.last_updated = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    _streetlights[light_id] = light # Update the stored object
+    _persist_streetlight(light)
     return light
 
 def report_streetlight_fault(light_id: str, description: str) -> Optional[Streetlight]:
@@ -94,49 +237,98 @@ def report_streetlight_fault(light_id: str, description: str) -> Optional[Street
     light.status = 'FAULTY'
     # Optionally, set a specific brightness for faulty lights, e.g., light.brightness_level = 0 or some dim value
     light.last_updated = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    _streetlights[light_id] = light
+    _persist_streetlight(light)
     # print(f"Fault reported for {light_id}: {description}") # Placeholder for logging
     return light
 
-def simulate_energy_consumption(duration_hours: float) -> float:
+def simulate_energy_consumption(duration_hours: float, start_hour: Optional[int] = None) -> float:
     """
     Simulates energy consumption for all 'ON' streetlights.
 
-    Iterates through all streetlights, calculates energy consumed based on
-    power_consumption_watts, brightness_level, and duration_hours.
-    Updates the current_energy_usage for each streetlight and returns the
-    total energy consumed in this simulation run.
+    The energy consumed is calculated from power_consumption_watts, brightness_level and
+    duration_hours in one vectorized pass over a StreetlightArrayRegistry snapshot of the
+    lights. Only streetlights that consumed energy or changed state are then updated and
+    persisted.
+
+    With a start hour, the duration is simulated in hourly steps and lights with adaptive
+    lighting follow the adaptive lighting schedule at each hour, as if
+    apply_adaptive_lighting_schedule ran on the hour; they are left in the state of the
+    last scheduled hour.
 
     Args:
         duration_hours: The duration of the simulation in hours.
+        start_hour: Optional hour of the day (0-23) at which the simulation starts.
 
     Returns:
         The total energy consumed by all lights in kWh.
+
+    Raises:
+        ValueError: If start_hour is out of range, or duration_hours exceeds
+                    MAX_SCHEDULED_SIMULATION_HOURS when a start hour is given.
     """
-    total_energy_consumed_kwh = 0.0
+    if start_hour is not None:
+        if not 0 <= start_hour <= 23:
+            raise ValueError("start_hour must be between 0 and 23.")
+        if not duration_hours <= MAX_SCHEDULED_SIMULATION_HOURS:
+            raise ValueError(f"duration_hours must be at most {MAX_SCHEDULED_SIMULATION_HOURS} with a start hour.")
 
-    if duration_hours <= 0:
+    if duration_hours <= 0 or not _streetlights:
         # No consumption if duration is zero or negative
         return 0.0
 
-    for light in _streetlights.values():
-        if light.status == 'ON' and \
-           light.power_consumption_watts is not None and \
-           light.power_consumption_watts > 0:
+    # A snapshot taken per call, so lights changed by any means are simulated as they are now
+    lights = list(_streetlights.values())
+    registry = StreetlightArrayRegistry.from_streetlights(lights)
+    energy_before = registry.energy_usage_kwh()
+    if start_hour is None:
+        total_energy_consumed_kwh = registry.simulate_energy_consumption(duration_hours)
+    else:
+        # Whole hours, then the remaining fraction of an hour
+        whole_hours, remainder = divmod(duration_hours, 1.0)
+        steps = np.ones(int(whole_hours) + (remainder > 0))
+        if remainder > 0:
+            steps[-1] = remainder
+        total_energy_consumed_kwh = float(registry.simulate_energy_consumption(steps, start_hour, _ADAPTIVE_SCHEDULE).sum())
+
+    # Only lights that consumed energy are written back
+    energy_after = registry.energy_usage_kwh()
+    rows = np.flatnonzero(energy_after != energy_before).tolist()
+    changed = {}
+    for row, energy_kwh in zip(rows, energy_after[rows].tolist()):
+        light = lights[row]  # Registry rows follow the order of the snapshot
+        light.current_energy_usage = energy_kwh
+        changed[light.light_id] = light
+    if start_hour is not None:
+        # Adaptive lights are left in the state of the last scheduled hour
+        now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        for light_id in _adaptive_light_ids:
+            light = _streetlights[light_id]
+            status, brightness = registry.light_state(light_id)
+            if (status, brightness) != (light.status, light.brightness_level):
+                light.status, light.brightness_level = status, brightness
+                light.last_updated = now_iso
+                changed[light_id] = light
+    _persist_streetlights(changed)
 
-            # Energy (kWh) = (Power (Watts) * Brightness (%) * Time (hours)) / 1000
-            # Brightness is a percentage, so divide by 100
-            energy_kwh = (light.power_consumption_watts * \
-                          (light.brightness_level / 100.0) * \
-                          duration_hours) / 1000.0
+    return total_energy_consumed_kwh
 
-            light.current_energy_usage += energy_kwh
-            total_energy_consumed_kwh += energy_kwh
-            # No need to call _streetlights[light.light_id] = light as we are modifying the object directly
+def set_adaptive_lighting(light_id: str, enabled: bool) -> Optional[Streetlight]:
+    """
+    Enables or disables adaptive lighting for a streetlight.
+    Keeps the adaptive lighting index in sync and updates the 'last_updated' timestamp.
+    Returns the updated streetlight or None if not found.
+    """
+    light = get_streetlight(light_id)
+    if not light:
+        return None
 
-    return total_energy_consumed_kwh
+    light.adaptive_lighting_enabled = enabled
+    _index_adaptive_lighting(light)
+    light.last_updated = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    _persist_streetlight(light)
+    return light
 
-def apply_adaptive_lighting_schedule(current_time_hour: int) -> Dict:
+def apply_adaptive_lighting_schedule(current_time_hour: int, include_details: bool = True) -> Dict:
     """
     Applies an adaptive lighting schedule to streetlights with the feature enabled.
 
@@ -146,61 +338,59 @@ def apply_adaptive_lighting_schedule(current_time_hour: int) -> Dict:
     - 6-7 AM (6-7) or 6 PM-11 PM (18-23): ON, Brightness 100%
     - Other times: No change.
 
+    The schedule is precompiled into an hourly lookup table, and only lights in
+    the adaptive lighting index (see set_adaptive_lighting) are visited. Lights
+    already in the target state are left untouched.
+
     Updates 'last_updated' for any lights that are changed.
 
     Args:
         current_time_hour: The current hour of the day (0-23).
+        include_details: Whether to include a per-light "details" list in the result.
 
     Returns:
         A dictionary summarizing the changes, including the count of updated
-        lights and details for each.
+        lights and, if requested, details for each.
     """
     if not 0 <= current_time_hour <= 23:
         raise ValueError("current_time_hour must be between 0 and 23.")
 
     updated_lights_count = 0
     update_details = []
-    now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
-
-    for light in _streetlights.values():
-        if not light.adaptive_lighting_enabled:
-            continue
-
-        original_status = light.status
-        original_brightness = light.brightness_level
-
-        new_status = original_status
-        new_brightness = original_brightness
-
-        if 0 <= current_time_hour <= 5: # Late Night (0-5 AM)
-            new_status = 'ON'
-            new_brightness = 50
-        elif 8 <= current_time_hour <= 17: # Day Time (8 AM - 5 PM)
-            new_status = 'OFF'
-            new_brightness = 0
-        elif (6 <= current_time_hour <= 7) or (18 <= current_time_hour <= 23): # Evening/Early Morning
-            new_status = 'ON'
-            new_brightness = 100
-        # else: No change for other times, as per requirement.
-
-        if new_status != original_status or new_brightness != original_brightness:
-            light.status = new_status
-            light.brightness_level = new_brightness
-            light.last_updated = now_iso
-            # _streetlights[light.light_id] = light # Not strictly necessary, modifying object in place
-
-            updated_lights_count += 1
-            update_details.append({
-                "light_id": light.light_id,
-                "new_status": new_status,
-                "new_brightness": new_brightness
-            })
-
-    return {
-        "updated_lights": updated_lights_count,
-        "details": update_details
-    }
+    target = _ADAPTIVE_SCHEDULE[current_time_hour]
+
+    if target is not None:
+        new_status, new_brightness = target
+        now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with _storage_batch():
+            for light_id in _adaptive_light_ids:
+                light = _streetlights[light_id]
+                if light.status == new_status and light.brightness_level == new_brightness:
+                    continue
+
+                light.status = new_status
+                light.brightness_level = new_brightness
+                light.last_updated = now_iso
+                _persist_streetlight(light)
+
+                updated_lights_count += 1
+                if include_details:
+                    update_details.append({
+                        "light_id": light_id,
+                        "new_status": new_status,
+                        "new_brightness": new_brightness
+                    })
+
+    summary = {"updated_lights": updated_lights_count}
+    if include_details:
+        summary["details"] = update_details
+    return summary
 
 # Helper function for tests to clear data
 def _reset_streetlights_data():
+    global _storage, _storage_sequence
+    _storage = None
+    _storage_sequence = 0
     _streetlights.clear()
+    _sorted_light_ids.clear()
+    _adaptive_light_ids.clear()
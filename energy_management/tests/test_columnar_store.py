@@ -0,0 +1,113 @@
+import unittest
+
+import numpy as np
+
+from .. import streetlight_manager
+from ..columnar_store import StreetlightArrayRegistry
+
+class TestStreetlightArrayRegistry(unittest.TestCase):
+
+    def setUp(self):
+        """Mirror the lights used by TestSimulateEnergyConsumption in the manager tests."""
+        streetlight_manager._reset_streetlights_data()
+        streetlight_manager.add_streetlight("SL1", {"lat": 1, "lon": 1}, 100)
+        streetlight_manager.update_streetlight_status("SL1", "ON", 100)
+        streetlight_manager.add_streetlight("SL2", {"lat": 2, "lon": 2}, 50)
+        streetlight_manager.update_streetlight_status("SL2", "ON", 50)
+        streetlight_manager.add_streetlight("SL3", {"lat": 3, "lon": 3}, 100) # OFF
+        streetlight_manager.add_streetlight("SL4", {"lat": 4, "lon": 4}, 0)
+        streetlight_manager.update_streetlight_status("SL4", "ON", 100)
+        streetlight_manager.add_streetlight("SL5", {"lat": 5, "lon": 5}, None)
+        streetlight_manager.update_streetlight_status("SL5", "ON", 100)
+        self.registry = StreetlightArrayRegistry.from_streetlights(streetlight_manager.list_streetlights())
+
+    def tearDown(self):
+        streetlight_manager._reset_streetlights_data()
+
+    def test_scalar_duration_matches_manager(self):
+        """Test that a scalar simulation matches streetlight_manager.simulate_energy_consumption."""
+        total = self.registry.simulate_energy_consumption(2.0)
+        expected_total = streetlight_manager.simulate_energy_consumption(2.0)
+
+        self.assertAlmostEqual(total, expected_total)
+        for light in streetlight_manager.list_streetlights():
+            self.assertAlmostEqual(self.registry.energy_usage(light.light_id), light.current_energy_usage)
+
+    def test_non_positive_duration(self):
+        """Test that zero and negative durations consume nothing."""
+        self.assertEqual(self.registry.simulate_energy_consumption(0.0), 0.0)
+        self.assertEqual(self.registry.simulate_energy_consumption(-1.0), 0.0)
+        self.assertEqual(self.registry.total_energy_usage(), 0.0)
+
+    def test_time_series(self):
+        """Test a time series of durations, returning per-step totals and accumulating per light."""
+        step_totals = self.registry.simulate_energy_consumption([1.0, 2.0, -1.0, 0.5])
+
+        np.testing.assert_allclose(step_totals, [0.125, 0.25, 0.0, 0.0625])
+        self.assertAlmostEqual(self.registry.energy_usage("SL1"), 0.35)
+        self.assertAlmostEqual(self.registry.energy_usage("SL2"), 0.0875)
+        self.assertEqual(self.registry.energy_usage("SL3"), 0.0)
+        self.assertEqual(self.registry.energy_usage("SL5"), 0.0)
+
+    def test_time_series_with_adaptive_schedule(self):
+        """Test that adaptive lights draw each step's scheduled state while other lights keep theirs."""
+        streetlight_manager.set_adaptive_lighting("SL1", True)
+        registry = StreetlightArrayRegistry.from_streetlights(streetlight_manager.list_streetlights())
+        step_totals = registry.simulate_energy_consumption([1.0, 1.0, 1.0], start_hour=7,
+                                                           adaptive_schedule=streetlight_manager._ADAPTIVE_SCHEDULE)
+
+        np.testing.assert_allclose(step_totals, [0.125, 0.025, 0.025]) # SL1 is ON at 7:00, OFF from 8:00
+        self.assertAlmostEqual(registry.energy_usage("SL1"), 0.1)
+        self.assertAlmostEqual(registry.energy_usage("SL2"), 0.075)
+        self.assertEqual(registry.light_state("SL1"), ('OFF', 0))
+        self.assertEqual(registry.light_state("SL2"), ('ON', 50))
+
+    def test_adaptive_schedule_carries_targets_over_unscheduled_hours(self):
+        """Test that hours without a target keep the last target, and the own state before the first."""
+        streetlight_manager.set_adaptive_lighting("SL1", True)
+        registry = StreetlightArrayRegistry.from_streetlights(streetlight_manager.list_streetlights())
+        schedule = [('ON', 20)] + [None] * 23
+        step_totals = registry.simulate_energy_consumption([1.0, 1.0, 1.0], start_hour=23, adaptive_schedule=schedule)
+
+        np.testing.assert_allclose(step_totals, [0.125, 0.045, 0.045])
+        self.assertAlmostEqual(registry.energy_usage("SL1"), 0.14)
+        self.assertEqual(registry.light_state("SL1"), ('ON', 20))
+
+    def test_set_state_and_apply_energy_usage(self):
+        """Test bulk state changes and writing accumulated energy back to Streetlight objects."""
+        self.registry.set_state(self.registry.rows_for(["SL2"]), "OFF", 0)
+        self.registry.simulate_energy_consumption(10.0)
+
+        updated = self.registry.apply_energy_usage(streetlight_manager._streetlights)
+        self.assertEqual(updated, 5)
+        self.assertAlmostEqual(streetlight_manager.get_streetlight("SL1").current_energy_usage, 1.0)
+        self.assertEqual(streetlight_manager.get_streetlight("SL2").current_energy_usage, 0.0)
+
+        with self.assertRaisesRegex(ValueError, "Status must be one of 'ON', 'OFF', or 'FAULTY'."):
+            self.registry.set_state(self.registry.rows_for(["SL1"]), "BROKEN", 0)
+        with self.assertRaisesRegex(ValueError, "Brightness level must be between 0 and 100."):
+            self.registry.set_state(self.registry.rows_for(["SL1"]), "ON", 101)
+
+    def test_manager_simulates_lights_as_they_are(self):
+        """Test that the manager's simulation sees lights changed directly as well as through its functions."""
+        streetlight_manager.update_streetlight_status("SL3", "ON", 40)
+        streetlight_manager.report_streetlight_fault("SL1", "Lamp out")
+        self.assertAlmostEqual(streetlight_manager.simulate_energy_consumption(1.0), 0.065) # SL2 and SL3
+
+        light = streetlight_manager.get_streetlight("SL4")
+        light.status, light.brightness_level, light.power_consumption_watts = "ON", 100, 100.0
+        self.assertAlmostEqual(streetlight_manager.simulate_energy_consumption(1.0), 0.165)
+        self.assertAlmostEqual(light.current_energy_usage, 0.1)
+
+    def test_add_streetlights_validation(self):
+        """Test that duplicate IDs and invalid values are rejected."""
+        with self.assertRaises(ValueError):
+            self.registry.add_streetlights(["SL1"], [10.0])
+        with self.assertRaisesRegex(ValueError, "Brightness level must be between 0 and 100."):
+            self.registry.add_streetlights(["SL9"], [10.0], brightness_levels=[150])
+        with self.assertRaisesRegex(ValueError, "Status must be one of 'ON', 'OFF', or 'FAULTY'."):
+            self.registry.add_streetlights(["SL9"], [10.0], statuses=["BROKEN"])
+        self.assertEqual(len(self.registry), 5)
+
+if __name__ == '__main__':
+    unittest.main()
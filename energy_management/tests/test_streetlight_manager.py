@@ -220,13 +220,30 @@ class TestSimulateEnergyConsumption(unittest.TestCase):
         self.assertAlmostEqual(self.sl2.current_energy_usage, expected_sl2_consumption1 + expected_sl2_consumption2)
         self.assertAlmostEqual(total_consumed2, expected_sl1_consumption2 + expected_sl2_consumption2)
 
+    def test_simulate_energy_consumption_follows_adaptive_schedule(self):
+        """Test that with a start hour, adaptive lights follow the hourly schedule."""
+        streetlight_manager.set_adaptive_lighting("SL1", True)
+        # 16:00-18:00 OFF, 18:00-19:30 ON at 100%
+        total_consumed = streetlight_manager.simulate_energy_consumption(3.5, start_hour=16)
+
+        self.assertAlmostEqual(self.sl1.current_energy_usage, 0.15)
+        self.assertAlmostEqual(self.sl2.current_energy_usage, 0.0875) # Not adaptive
+        self.assertAlmostEqual(total_consumed, 0.2375)
+        self.assertEqual((self.sl1.status, self.sl1.brightness_level), ('ON', 100))
+        self.assertEqual(self.sl3.status, 'OFF')
+
+        with self.assertRaises(ValueError):
+            streetlight_manager.simulate_energy_consumption(1.0, start_hour=24)
+        with self.assertRaises(ValueError):
+            streetlight_manager.simulate_energy_consumption(float('inf'), start_hour=0)
+
 
 class TestApplyAdaptiveLightingSchedule(unittest.TestCase):
     def setUp(self):
         streetlight_manager._reset_streetlights_data()
         # Light 1: Adaptive enabled, initial state to be changed
         self.adapt_light = streetlight_manager.add_streetlight("ADAPT01", {"lat": 10, "lon": 10}, 75)
-        self.adapt_light.adaptive_lighting_enabled = True
+        streetlight_manager.set_adaptive_lighting("ADAPT01", True)
         self.adapt_light.status = "ON"
         self.adapt_light.brightness_level = 77 # Arbitrary initial
         self.initial_last_updated_adapt = self.adapt_light.last_updated
@@ -240,7 +257,7 @@ class TestApplyAdaptiveLightingSchedule(unittest.TestCase):
 
         # Light 3: Adaptive enabled, but already matching a schedule state (for "no change" test)
         self.adapt_no_change_light = streetlight_manager.add_streetlight("ADAPTNC03", {"lat": 12, "lon": 12}, 75)
-        self.adapt_no_change_light.adaptive_lighting_enabled = True
+        streetlight_manager.set_adaptive_lighting("ADAPTNC03", True)
         self.adapt_no_change_light.status = "ON" # Matches Late Night
         self.adapt_no_change_light.brightness_level = 50 # Matches Late Night
         self.initial_last_updated_adapt_nc = self.adapt_no_change_light.last_updated
@@ -334,6 +351,29 @@ class TestApplyAdaptiveLightingSchedule(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "current_time_hour must be between 0 and 23."):
             streetlight_manager.apply_adaptive_lighting_schedule(-1)
 
+    def test_apply_schedule_without_details(self):
+        """Test that details can be omitted from the summary."""
+        result = streetlight_manager.apply_adaptive_lighting_schedule(10, include_details=False)
+        self.assertEqual(result, {"updated_lights": 2})
+        self.assertEqual(self.adapt_light.status, "OFF")
+
+    def test_set_adaptive_lighting(self):
+        """Test enabling and disabling adaptive lighting through the manager."""
+        light = streetlight_manager.set_adaptive_lighting("NONADAPT02", True)
+        self.assertTrue(light.adaptive_lighting_enabled)
+        self.assertNotEqual(light.last_updated, self.initial_last_updated_non_adapt)
+
+        result = streetlight_manager.apply_adaptive_lighting_schedule(10)
+        self.assertEqual(result["updated_lights"], 3)
+
+        streetlight_manager.set_adaptive_lighting("ADAPT01", False)
+        streetlight_manager.update_streetlight_status("ADAPT01", "ON", 80)
+        result = streetlight_manager.apply_adaptive_lighting_schedule(10)
+        self.assertEqual(result["updated_lights"], 0) # ADAPT01 is no longer adaptive
+        self.assertEqual(self.adapt_light.brightness_level, 80)
+
+        self.assertIsNone(streetlight_manager.set_adaptive_lighting("SL_MISSING", True))
+
     def test_apply_schedule_no_adaptive_lights(self):
         """Test when no lights have adaptive_lighting_enabled."""
         streetlight_manager._reset_streetlights_data()
@@ -1,8 +1,12 @@
+import logging
+
 from flask import Flask, render_template, url_for
 from traffic_management.api import traffic_bp
 from energy_management.api import energy_bp
+from common.serialization import install_json_provider
 
 app = Flask(__name__)
+install_json_provider(app)
 
 # Register the blueprints
 app.register_blueprint(traffic_bp, url_prefix='/traffic')
@@ -13,4 +17,5 @@ def home():
     return render_template('home.html')
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     app.run(debug=True, port=5005)
@@ -1,88 +1,227 @@
-from flask import Blueprint, jsonify, request, render_template # Added render_template
+from flask import Blueprint, Response, current_app, jsonify, request, render_template, stream_with_context # Added render_template
 from traffic_management.signal_controller import SignalController
-from traffic_management.simulation import TrafficSimulation
-from traffic_management.models import TrafficSignal # Required for simulation setup
-import time # Added for unique IDs
+from traffic_management.simulation_jobs import (DEFAULT_SCENARIO, DEFAULT_SEED, SimulationJob, SimulationJobManager,
+                                                SimulationQueueFullError, simulation_job_to_dict)
+from traffic_management import inventory
+from common.conditional import conditional_response
+from common.change_feed import get_feed
+from common.events import HEARTBEAT_INTERVAL, SSE_MIMETYPE, sse_response
+from common.pagination import MAX_PAGE_LIMIT
+from common.state_server import get_shared_client
+from common.streaming import ndjson_response, wants_ndjson
+import datetime
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 # --- Global Instances (for demonstration purposes) ---
 # In a production app, state management would need to be more robust (e.g., database, app context)
 
-# Initialize SignalController
-# Signals will be registered to this controller instance.
-# The simulation setup in TrafficSimulation also creates signals;
-# we will use that setup to populate our global_traffic_controller.
-global_traffic_controller = SignalController(controller_id="GlobalCtrl001_TrafficAPI")
-print(f"Global Traffic Controller '{global_traffic_controller.controller_id}' initialized in traffic_management.api.")
-
-# Use a TrafficSimulation instance to pre-populate signals for the global_traffic_controller
-# This way, the API has some signals to manage from the start, based on the simulation's default setup.
-# This simulation instance is just for setup; API calls for /simulation/run will create fresh instances.
-_setup_sim_instance = TrafficSimulation(sim_id="APISetupSim")
-if hasattr(_setup_sim_instance, 'signals') and _setup_sim_instance.signals:
-    for signal_id, signal_obj in _setup_sim_instance.signals.items():
-        if signal_id not in global_traffic_controller.signals:
-            # Create a new signal object for the global controller if needed,
-            # or use the one from simulation if its controller is not what we want globally.
-            # For simplicity, let's re-register (or register if not present).
-            # The TrafficSignal objects themselves are stateful.
-            global_traffic_controller.register_signal(signal_obj) # Assumes register_signal can handle existing if needed or we check
-            print(f"Registered signal '{signal_id}' from APISetupSim to '{global_traffic_controller.controller_id}'.")
-    print(f"Signals registered in '{global_traffic_controller.controller_id}': {list(global_traffic_controller.signals.keys())}")
-else:
-    print(f"Warning: APISetupSim did not have 'signals' or it was empty. Global controller will have no pre-registered signals from sim.")
+# The global SignalController is built lazily on first use from a declarative signal inventory
+# (JSON or CSV), so importing this module stays cheap for every worker process.
+# TRAFFIC_SIGNAL_INVENTORY overrides the inventory file; TRAFFIC_SIGNAL_SNAPSHOT names a precompiled
+# snapshot (see `python -m traffic_management.inventory`) that is used instead of parsing the inventory.
+GLOBAL_CONTROLLER_ID = "GlobalCtrl001_TrafficAPI"
+_global_traffic_controller = None
+_global_controller_lock = threading.Lock()
+
+# When SMARTCITY_STATE_SOCKET names a state server, the signal states and emergency mode set through
+# this API are shared with the other worker processes; every worker builds the same signals from the
+# inventory, and only the state that requests change is exchanged.
+SIGNAL_RECORD = 'signal'
+CONTROLLER_RECORD = 'traffic_controller'
+_shared_state = None
+_shared_state_sequence = 0
+# The traffic subsystem's change feed: the ID of every signal of the global controller that changes
+_changes = get_feed('traffic')
+
+# The controller's clock is the wall clock (Unix time in seconds). Every signal's cycle is aligned to
+# the epoch, so all worker processes show the same phases without exchanging the transitions; the
+# cycles are advanced to the current time at the start of each request.
+
+def get_global_traffic_controller() -> SignalController:
+    """Returns the API's SignalController, building it from the signal inventory on first call."""
+    global _global_traffic_controller, _shared_state, _shared_state_sequence
+    if _global_traffic_controller is None:
+        with _global_controller_lock:
+            if _global_traffic_controller is None: # Another thread may have built it while we waited
+                controller = inventory.build_controller(
+                    GLOBAL_CONTROLLER_ID,
+                    inventory_path=os.environ.get("TRAFFIC_SIGNAL_INVENTORY", inventory.DEFAULT_INVENTORY_PATH),
+                    snapshot_path=os.environ.get("TRAFFIC_SIGNAL_SNAPSHOT"),
+                )
+                shared_state = get_shared_client()
+                if shared_state is not None:
+                    _shared_state_sequence = shared_state.change_sequence()
+                    for signal_id, record in shared_state.load_all(SIGNAL_RECORD):
+                        _apply_shared_record(controller, SIGNAL_RECORD, signal_id, record)
+                    for controller_id, record in shared_state.load_all(CONTROLLER_RECORD):
+                        _apply_shared_record(controller, CONTROLLER_RECORD, controller_id, record)
+                    _shared_state = shared_state
+                _start_signal_cycles(controller, time.time())
+                controller.add_change_listener(_publish_signal_change)
+                _global_traffic_controller = controller
+    return _global_traffic_controller
+
+def _start_signal_cycles(controller: SignalController, now: float) -> None:
+    """Starts the normal cycle of every signal whose timing plan can drive one, at its epoch-aligned phase."""
+    controller.advance_to(now)
+    offsets = dict.fromkeys(controller.signals, now)
+    try:
+        controller.start_normal_operation(offsets=offsets)
+    except ValueError:
+        # Some timing plan is unusable; start the other signals one at a time
+        for signal_id in controller.signals:
+            try:
+                controller.start_normal_operation([signal_id], offsets)
+            except ValueError as e:
+                logger.warning("Signal '%s' keeps its inventory state: %s", signal_id, e,
+                               extra={"event": "signal_cycle_not_started", "signal_id": signal_id})
+
+def advance_signal_cycles() -> int:
+    """Advances the global controller's signal cycles to the current time. Returns the number of phase transitions."""
+    controller = _global_traffic_controller
+    if controller is None:
+        return 0
+    with _global_controller_lock:
+        return controller.advance_to(time.time())
+
+def _apply_shared_record(controller: SignalController, kind: str, key: str, record: dict) -> None:
+    if kind == SIGNAL_RECORD:
+        signal_obj = controller.signals.get(key)
+        if signal_obj is not None:
+            signal_obj.current_state.update(record['current_state'])
+            # Keeps ETags identical across workers
+            signal_obj.version = record.get('version', signal_obj.version)
+            signal_obj.last_changed = record.get('last_changed', signal_obj.last_changed)
+            _publish_signal_change(key)
+    elif kind == CONTROLLER_RECORD and key == controller.controller_id:
+        controller.active_emergency_mode = record['active_emergency_mode']
+
+def _publish_signal_change(signal_id: str) -> None:
+    _changes.publish(SIGNAL_RECORD, signal_id, signal_id)
+
+def _publish_signal_state(controller: SignalController, signal_id: str) -> None:
+    """Writes a signal's state and the emergency mode to the shared state, if attached."""
+    if _shared_state is None:
+        return
+    with _shared_state.batch():
+        signal_obj = controller.signals[signal_id]
+        _shared_state.put(SIGNAL_RECORD, signal_id, {'current_state': signal_obj.current_state, 'version': signal_obj.version,
+                                                     'last_changed': signal_obj.last_changed})
+        _shared_state.put(CONTROLLER_RECORD, controller.controller_id,
+                          {'active_emergency_mode': controller.active_emergency_mode})
+
+def sync_shared_state() -> int:
+    """Applies signal changes other worker processes made since the last sync. Returns the number applied."""
+    global _shared_state_sequence
+    controller = _global_traffic_controller
+    if _shared_state is None or controller is None:
+        return 0
+    with _global_controller_lock:
+        sequence, changes = _shared_state.changes_since(_shared_state_sequence)
+        if changes is None:
+            # Too far behind the change log; reload every shared record
+            changes = [(kind, key, record) for kind in (SIGNAL_RECORD, CONTROLLER_RECORD)
+                       for key, record in _shared_state.load_all(kind)]
+        for kind, key, record in changes:
+            if record is not None:
+                _apply_shared_record(controller, kind, key, record)
+        _shared_state_sequence = sequence
+    return len(changes)
+
+def __getattr__(name):
+    # Keeps `from traffic_management.api import global_traffic_controller` working, lazily.
+    if name == "global_traffic_controller":
+        return get_global_traffic_controller()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 traffic_bp = Blueprint('traffic_bp', __name__, url_prefix='/traffic')
 
+@traffic_bp.before_request
+def _refresh_signals():
+    # Picks up signal changes other worker processes made, then the phase transitions that came due
+    sync_shared_state()
+    advance_signal_cycles()
+
 # --- API Endpoints ---
 
+def _signal_details(controller: SignalController, signal_id: str, current_state: dict) -> dict:
+    signal_obj = controller.signals.get(signal_id)
+    if signal_obj:
+        return {
+            "signal_id": signal_id,
+            "location": signal_obj.location,
+            "current_state": current_state,
+            "lanes_controlled": signal_obj.lanes_controlled,
+            "default_timing": signal_obj.default_timing,
+        }
+    # Should ideally not happen if states are from controller.signals
+    return {
+        "signal_id": signal_id,
+        "current_state": current_state,
+        "error": "Details not found, object missing from controller.signals"
+    }
+
+@traffic_bp.route('/events', methods=['GET'])
+def signal_events_api():
+    """
+    Streams signal changes as Server-Sent Events: `event: signal` with the signal's details (as in
+    GET /signals), coalesced to its latest state, and `event: reset` when the list must be refetched.
+    """
+    controller = get_global_traffic_controller()
+    encode_signal = lambda signal_id: _signal_details(controller, signal_id, controller.signals[signal_id].current_state)
+    return sse_response(_changes, {SIGNAL_RECORD: encode_signal}, sync=_refresh_signals)
+
 @traffic_bp.route('/signals', methods=['GET'])
 def list_signals_api():
-    """Lists all traffic signals and their current states managed by the global_traffic_controller."""
+    """
+    Lists all traffic signals and their current states managed by the global_traffic_controller.
+    With ?stream=1 (or Accept: application/x-ndjson) the signals are streamed one JSON object per line.
+    """
+    global_traffic_controller = get_global_traffic_controller()
     states = global_traffic_controller.get_signal_current_states()
     if states is not None:
+        if wants_ndjson():
+            return ndjson_response(states.items(), lambda item: _signal_details(global_traffic_controller, *item))
         # Enhance with more details if available
-        detailed_signals = []
-        for signal_id, current_state in states.items():
-            signal_obj = global_traffic_controller.signals.get(signal_id)
-            if signal_obj:
-                detailed_signals.append({
-                    "signal_id": signal_id,
-                    "location": signal_obj.location,
-                    "current_state": current_state,
-                    "lanes_controlled": signal_obj.lanes_controlled,
-                    "default_timing": signal_obj.default_timing,
-                })
-            else: # Should ideally not happen if states are from controller.signals
-                detailed_signals.append({
-                    "signal_id": signal_id,
-                    "current_state": current_state,
-                    "error": "Details not found, object missing from controller.signals"
-                })
+        detailed_signals = [_signal_details(global_traffic_controller, signal_id, current_state)
+                            for signal_id, current_state in states.items()]
         return jsonify(detailed_signals), 200
     else:
         return jsonify({"error": "Could not retrieve signal states or no signals registered"}), 404 # 404 if no signals
 
 @traffic_bp.route('/signals/<string:signal_id>', methods=['GET'])
 def get_signal_api(signal_id: str):
-    """Gets details of a specific signal from the global_traffic_controller."""
+    """
+    Gets details of a specific signal from the global_traffic_controller.
+    Supports conditional GET: the ETag covers the signal's version and the controller's emergency mode.
+    """
+    global_traffic_controller = get_global_traffic_controller()
     signal_obj = global_traffic_controller.signals.get(signal_id)
     if signal_obj:
-        state = signal_obj.current_state # Use the object's current state
-        return jsonify({
+        emergency_mode = global_traffic_controller.active_emergency_mode
+        last_changed = (datetime.datetime.fromtimestamp(signal_obj.last_changed, datetime.timezone.utc)
+                        if signal_obj.last_changed is not None else None)
+        return conditional_response(signal_obj.version, last_changed, lambda: (jsonify({
             "signal_id": signal_id,
             "location": signal_obj.location,
             "lanes_controlled": signal_obj.lanes_controlled,
-            "current_state": state,
+            "current_state": signal_obj.current_state, # Use the object's current state
             "default_timing": signal_obj.default_timing,
-            "controller_emergency_mode": global_traffic_controller.active_emergency_mode
-        }), 200
+            "controller_emergency_mode": emergency_mode
+        }), 200), variant='e' if emergency_mode else 'n')
     else:
         return jsonify({"error": f"Signal {signal_id} not found in global_traffic_controller."}), 404
 
 @traffic_bp.route('/signals/<string:signal_id>/set_state', methods=['POST'])
 def set_signal_state_api(signal_id: str):
     """Allows manual override of a signal's state in the global_traffic_controller."""
+    global_traffic_controller = get_global_traffic_controller()
     data = request.get_json()
     if not data:
         return jsonify({"error": "Request must be JSON"}), 400
@@ -92,17 +231,19 @@ def set_signal_state_api(signal_id: str):
 
     try:
         global_traffic_controller.set_signal_state(signal_id, data)
+        _publish_signal_state(global_traffic_controller, signal_id)
         updated_state = global_traffic_controller.get_signal_current_states(signal_id)
         return jsonify({"message": f"State for signal {signal_id} updated.", "new_state": updated_state}), 200
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Unexpected error in set_signal_state_api for '{signal_id}': {e}")
+        logger.exception("Unexpected error in set_signal_state_api for '%s': %s", signal_id, e)
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 @traffic_bp.route('/emergency/trigger', methods=['POST'])
 def trigger_emergency_api():
     """Triggers emergency preemption for a signal via global_traffic_controller."""
+    global_traffic_controller = get_global_traffic_controller()
     data = request.get_json()
     if not data: return jsonify({"error": "Request must be JSON"}), 400
 
@@ -120,6 +261,7 @@ def trigger_emergency_api():
         vehicle_location=tuple(vehicle_location) if isinstance(vehicle_location, list) else vehicle_location, # ensure tuple
         vehicle_route=vehicle_route
     )
+    _publish_signal_state(global_traffic_controller, signal_id)
     return jsonify({
         "message": f"Emergency preemption triggered for signal {signal_id}.",
         "signal_state": global_traffic_controller.get_signal_current_states(signal_id),
@@ -129,6 +271,7 @@ def trigger_emergency_api():
 @traffic_bp.route('/emergency/end', methods=['POST'])
 def end_emergency_api():
     """Ends emergency preemption for a signal via global_traffic_controller."""
+    global_traffic_controller = get_global_traffic_controller()
     data = request.get_json()
     if not data: return jsonify({"error": "Request must be JSON"}), 400
     signal_id = data.get('signal_id')
@@ -137,47 +280,167 @@ def end_emergency_api():
          return jsonify({"error": f"Signal '{signal_id}' not registered."}), 404
 
     global_traffic_controller.end_emergency_preemption(signal_id_to_reset=signal_id)
+    _publish_signal_state(global_traffic_controller, signal_id)
     return jsonify({
         "message": f"Emergency preemption ended for signal {signal_id}.",
         "signal_state": global_traffic_controller.get_signal_current_states(signal_id),
         "emergency_mode_active": global_traffic_controller.active_emergency_mode
     }), 200
 
+# Simulation runs requested through the API, run in the background and memoized by run key
+_simulation_jobs = SimulationJobManager()
+# Longest a request may wait for a run to finish, in seconds
+MAX_RUN_WAIT_SECONDS = 30.0
+# Longest a run-log stream sleeps before rechecking whether its run has finished
+RUN_STREAM_POLL_SECONDS = 0.5
+# Retry-After, in seconds, sent when the simulation queue is full
+QUEUE_FULL_RETRY_AFTER_SECONDS = 5
+
+def _wait_seconds(value) -> float:
+    try:
+        wait = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError("'wait' must be a number of seconds.")
+    if not 0 <= wait <= MAX_RUN_WAIT_SECONDS:
+        raise ValueError(f"'wait' must be between 0 and {MAX_RUN_WAIT_SECONDS:g} seconds.")
+    return wait
+
+def _run_response(job: SimulationJob, message: str):
+    body = simulation_job_to_dict(job)
+    body["message"] = message
+    body["log_preview"] = job.log[-5:]
+    return jsonify(body), 200 if job.finished.is_set() else 202
+
+def _queue_full_response(error: SimulationQueueFullError):
+    response = jsonify({"error": str(error)})
+    response.headers['Retry-After'] = str(QUEUE_FULL_RETRY_AFTER_SECONDS)
+    return response, 503
+
 @traffic_bp.route('/simulation/run', methods=['POST'])
 def run_simulation_api():
-    """Triggers a new run of the TrafficSimulation's scenario."""
-    # Each call creates and runs a new, independent simulation instance.
-    # Its controller and signals are internal to the simulation run.
-    # This does not affect global_traffic_controller unless explicitly designed to.
-    sim_run_id = f"APISimRun_{int(time.time())}" # pseudo-unique ID
-    current_simulation_instance = TrafficSimulation(sim_id=sim_run_id)
-    current_simulation_instance.run_emergency_preemption_scenario() # This method logs to its own .log
+    """
+    Submits a simulation run to the background workers.
 
+    Payload (all optional): {"scenario": "emergency_preemption" | "grid_city", "params": {...},
+    "seed": int, "wait": seconds}. Runs are identified by scenario, parameters and seed, so
+    submitting the same run again returns the existing one (its result, if it has finished)
+    instead of simulating again. Responds 200 with the result once the run has finished within
+    `wait` seconds, or 202 with its run ID to poll or stream. A new run submitted while the
+    queue is full is refused with 503 and a Retry-After header.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        wait = _wait_seconds(data.get('wait'))
+        job = _simulation_jobs.submit(data.get('scenario', DEFAULT_SCENARIO), data.get('params'), data.get('seed', DEFAULT_SEED))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SimulationQueueFullError as e:
+        return _queue_full_response(e)
+    job.wait(wait)
+    return _run_response(job, f"Traffic simulation run {job.run_id} is {job.status}.")
+
+@traffic_bp.route('/simulation/runs/<run_id>', methods=['GET'])
+def get_simulation_run_api(run_id):
+    """Returns a run's status and, once it is done, its result. `?wait=<seconds>` waits for it to finish first."""
+    try:
+        wait = _wait_seconds(request.args.get('wait'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    job = _simulation_jobs.get(run_id)
+    if job is None:
+        return jsonify({"error": f"Simulation run '{run_id}' not found."}), 404
+    job.wait(wait)
+    return _run_response(job, f"Traffic simulation run {job.run_id} is {job.status}.")
+
+def _log_page(job: SimulationJob, log_source: str):
+    """
+    Query parameters:
+        since: Sequence number of the last event already read (default 0, the start of the log).
+        limit: Most events to return (default and maximum MAX_PAGE_LIMIT).
+    The response's `next` is the `since` value that continues after the returned events.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', MAX_PAGE_LIMIT))
+    except ValueError:
+        return jsonify({"error": "'since' and 'limit' must be integers."}), 400
+    if since < 0 or not 1 <= limit <= MAX_PAGE_LIMIT:
+        return jsonify({"error": f"'since' must be non-negative and 'limit' between 1 and {MAX_PAGE_LIMIT}."}), 400
+
+    records, next_sequence = job.log.since(since, limit)
     return jsonify({
-        "message": "Traffic simulation scenario executed.",
-        "simulation_id": current_simulation_instance.sim_id,
-        "log_preview": current_simulation_instance.log[-5:] if current_simulation_instance.log else []
+        "simulation_id": job.simulation_id,
+        "run_id": job.run_id,
+        "status": job.status,
+        "log_source": log_source,
+        "log": [job.log.format(record) for record in records],
+        "records": [record.to_dict() for record in records],
+        "next": next_sequence,
+        "dropped": job.log.dropped,
     }), 200
 
+@traffic_bp.route('/simulation/runs/<run_id>/log', methods=['GET'])
+def get_simulation_run_log_api(run_id):
+    """Returns a page of a run's log (see _log_page); readable while the run is in progress."""
+    job = _simulation_jobs.get(run_id)
+    if job is None:
+        return jsonify({"error": f"Simulation run '{run_id}' not found."}), 404
+    return _log_page(job, f"The log of simulation run {run_id}.")
+
 @traffic_bp.route('/simulation/log', methods=['GET'])
 def get_simulation_log_api():
     """
-    Runs a new simulation and returns its full log.
-    This endpoint demonstrates fetching a log from a simulation run.
-    The log is for a fresh simulation instance created on this GET request.
+    Returns the log of the latest simulation run (see _log_page), submitting the default
+    scenario first if there has been none.
     """
-    sim_log_id = f"APISimLog_{int(time.time())}"
-    log_simulation_instance = TrafficSimulation(sim_id=sim_log_id)
-    log_simulation_instance.run_emergency_preemption_scenario() # Run to populate the log fully
-
-    if hasattr(log_simulation_instance, 'log') and log_simulation_instance.log:
-        return jsonify({
-            "simulation_id": log_simulation_instance.sim_id,
-            "log_source": "A new simulation run was executed for this log request.",
-            "log": log_simulation_instance.log
-        }), 200
-    else:
-        return jsonify({"error": "No simulation log available or simulation failed to produce log."}), 404
+    job = _simulation_jobs.latest()
+    log_source = "The log of the latest simulation run."
+    if job is None:
+        try:
+            job = _simulation_jobs.submit()
+        except SimulationQueueFullError as e:
+            return _queue_full_response(e)
+        job.wait(MAX_RUN_WAIT_SECONDS)
+        log_source = "No simulation had run yet, so the default scenario was run for this log request."
+    return _log_page(job, log_source)
+
+def _run_events(job: SimulationJob, cursor: int):
+    dumps = current_app.json.dumps
+    yield "retry: 2000\n\n"
+    last_write = time.monotonic()
+    while True:
+        finished = job.finished.is_set() # Read before the log: a finished run has logged everything
+        records, cursor = job.log.since(cursor, MAX_PAGE_LIMIT)
+        if records:
+            yield ''.join(f"id: {record.sequence}\nevent: log\ndata: {dumps(record.to_dict())}\n\n" for record in records)
+            last_write = time.monotonic()
+            continue
+        if finished:
+            yield f"event: result\ndata: {dumps(simulation_job_to_dict(job))}\n\n"
+            return
+        idle = time.monotonic() - last_write
+        if idle >= HEARTBEAT_INTERVAL:
+            yield ": keep-alive\n\n"
+            last_write = time.monotonic()
+            continue
+        job.log.wait(cursor, min(HEARTBEAT_INTERVAL - idle, RUN_STREAM_POLL_SECONDS))
+
+@traffic_bp.route('/simulation/runs/<run_id>/events', methods=['GET'])
+def stream_simulation_run_api(run_id):
+    """
+    Streams a run as Server-Sent Events: one `log` event per log record (its ID is the record's
+    sequence number, so a reconnecting client resumes after the last one it saw), then a final
+    `result` event with the run's status and result.
+    """
+    job = _simulation_jobs.get(run_id)
+    if job is None:
+        return jsonify({"error": f"Simulation run '{run_id}' not found."}), 404
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    cursor = int(last_event_id) if last_event_id.isdigit() else 0
+    response = Response(stream_with_context(_run_events(job, cursor)), mimetype=SSE_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @traffic_bp.route('/') # This will be the root of the blueprint, e.g., /traffic/
 def dashboard():
@@ -1,7 +1,12 @@
 # This file will handle communication aspects of the traffic management system.
 # For this iteration, it focuses on centralized communication to a SignalController.
 
+import logging
+from typing import Optional
+
 from .signal_controller import SignalController
+
+logger = logging.getLogger(__name__)
 # from .models import EmergencyVehicle # Not directly using EmergencyVehicle objects as parameters yet
 
 class CentralCommunicator:
@@ -20,9 +25,10 @@ class CentralCommunicator:
 
         self.signal_controller = signal_controller
         self.server_id = server_id
-        print(f"CentralCommunicator '{self.server_id}' initialized and linked to SignalController '{self.signal_controller.controller_id}'.")
+        logger.debug("CentralCommunicator '%s' initialized and linked to SignalController '%s'.",
+                     self.server_id, self.signal_controller.controller_id, extra={"event": "communicator_initialized"})
 
-    def send_emergency_vehicle_data(self, vehicle_id: str, location: tuple, route: list):
+    def send_emergency_vehicle_data(self, vehicle_id: str, location: tuple, route: list, emergency_state: Optional[dict] = None):
         """
         Simulates sending emergency vehicle data to the linked SignalController.
 
@@ -31,20 +37,22 @@ class CentralCommunicator:
             location (tuple): Current location of the vehicle (e.g., (x, y) or (lat, lon)).
             route (list): Planned route of the vehicle. For the SignalController,
                           the first element is expected to be the ID of the next signal.
+            emergency_state (dict, optional): An explicit state for the next signal, passed through to the controller.
         """
-        print(f"CentralCommunicator '{self.server_id}': Simulating sending emergency data for vehicle '{vehicle_id}' to controller '{self.signal_controller.controller_id}'.")
-        print(f"Data: Vehicle ID='{vehicle_id}', Location={location}, Route={route}")
+        logger.debug("CentralCommunicator '%s': Sending emergency data for vehicle '%s' (Location=%s, Route=%s).",
+                     self.server_id, vehicle_id, location, route, extra={"event": "emergency_data_sent", "vehicle_id": vehicle_id})
 
         if self.signal_controller:
             # Call the SignalController's method to handle this data
             self.signal_controller.handle_emergency_vehicle_approach(
                 vehicle_id=vehicle_id,
                 vehicle_location=location,
-                vehicle_route=route
+                vehicle_route=route,
+                emergency_state=emergency_state
             )
-            print(f"CentralCommunicator '{self.server_id}': Data for vehicle '{vehicle_id}' relayed to SignalController.")
         else:
-            print(f"CentralCommunicator '{self.server_id}': Error - No SignalController linked. Cannot send emergency data.")
+            logger.error("CentralCommunicator '%s': No SignalController linked. Cannot send emergency data.", self.server_id,
+                         extra={"event": "no_controller", "vehicle_id": vehicle_id})
 
     def trigger_end_emergency_preemption(self, signal_id_to_reset: str = None):
         """
@@ -52,12 +60,13 @@ class CentralCommunicator:
         Args:
             signal_id_to_reset (str, optional): The specific signal that was preempted.
         """
-        print(f"CentralCommunicator '{self.server_id}': Simulating command to end emergency preemption for signal '{signal_id_to_reset if signal_id_to_reset else 'any active'}'.")
+        logger.debug("CentralCommunicator '%s': Sending command to end emergency preemption for signal '%s'.",
+                     self.server_id, signal_id_to_reset or 'any active', extra={"event": "end_preemption_sent", "signal_id": signal_id_to_reset})
         if self.signal_controller:
             self.signal_controller.end_emergency_preemption(signal_id_to_reset=signal_id_to_reset)
-            print(f"CentralCommunicator '{self.server_id}': End preemption command relayed to SignalController.")
         else:
-            print(f"CentralCommunicator '{self.server_id}': Error - No SignalController linked. Cannot send end preemption command.")
+            logger.error("CentralCommunicator '%s': No SignalController linked. Cannot send end preemption command.", self.server_id,
+                         extra={"event": "no_controller", "signal_id": signal_id_to_reset})
 
     # The methods below are from the previous version and are less relevant now,
     # or would need significant adaptation if multiple controllers were managed.
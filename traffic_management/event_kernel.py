@@ -0,0 +1,123 @@
+# Discrete-event simulation kernel used by TrafficSimulation.
+# Events are kept in a priority queue ordered by simulated time, so the simulation jumps
+# straight from one event to the next instead of ticking through idle time.
+
+import heapq
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+class Event:
+    """A scheduled callback. Returned by EventKernel.schedule() so it can be cancelled."""
+    __slots__ = ("time", "handler", "args", "cancelled")
+
+    def __init__(self, time: float, handler: Callable[..., Any], args: tuple):
+        self.time = time
+        self.handler = handler
+        self.args = args
+        self.cancelled = False
+
+    def __repr__(self):
+        name = getattr(self.handler, "__name__", repr(self.handler))
+        return f"Event(time={self.time}, handler={name}, cancelled={self.cancelled})"
+
+class EventKernel:
+    """
+    Priority-queue driven discrete-event kernel.
+
+    Handlers run in time order; events scheduled for the same time run in the order they
+    were scheduled. Simulated time only advances when an event is processed, so a run can
+    cover hours of simulated time in a fraction of a second of wall-clock time.
+    """
+
+    def __init__(self, start_time: float = 0.0):
+        """
+        Initializes an empty kernel.
+        Args:
+            start_time (float): The simulated time, in seconds, at which the kernel starts.
+        """
+        self.now = start_time
+        self.events_processed = 0
+        self._queue: List[Tuple[float, int, Event]] = []
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        """Returns the number of queued events, including cancelled ones not yet discarded."""
+        return len(self._queue)
+
+    def schedule(self, at_time: float, handler: Callable[..., Any], *args) -> Event:
+        """
+        Schedules handler(*args) to run at an absolute simulated time.
+        Args:
+            at_time (float): Simulated time in seconds. Times in the past run at the current time.
+            handler (callable): The callback to run.
+        Returns:
+            Event: A handle that can be passed to cancel().
+        """
+        event = Event(max(at_time, self.now), handler, args)
+        self._sequence += 1
+        heapq.heappush(self._queue, (event.time, self._sequence, event))
+        return event
+
+    def schedule_in(self, delay: float, handler: Callable[..., Any], *args) -> Event:
+        """Schedules handler(*args) to run `delay` simulated seconds from now."""
+        return self.schedule(self.now + delay, handler, *args)
+
+    def cancel(self, event: Optional[Event]):
+        """Cancels a pending event. Cancelled events are discarded lazily when they reach the front of the queue."""
+        if event is not None:
+            event.cancelled = True
+
+    def peek_time(self) -> Optional[float]:
+        """Returns the time of the next pending event, or None if the queue is empty."""
+        queue = self._queue
+        while queue and queue[0][2].cancelled:
+            heapq.heappop(queue)
+        return queue[0][0] if queue else None
+
+    def step(self) -> bool:
+        """
+        Processes the next pending event.
+        Returns:
+            bool: False if there was no event left to process.
+        """
+        queue = self._queue
+        while queue:
+            event_time, _, event = heapq.heappop(queue)
+            if event.cancelled:
+                continue
+            self.now = event_time
+            self.events_processed += 1
+            event.handler(*event.args)
+            return True
+        return False
+
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None, speedup: Optional[float] = None) -> int:
+        """
+        Processes events in time order.
+        Args:
+            until (float, optional): Stop before the first event later than this simulated time,
+                                     and advance the clock to it. Defaults to running until the queue is empty.
+            max_events (int, optional): Stop after processing this many events.
+            speedup (float, optional): Pace the run against the wall clock, e.g. 60.0 runs one simulated
+                                       minute per real second. Defaults to running as fast as possible.
+        Returns:
+            int: The number of events processed.
+        """
+        if speedup is not None and speedup <= 0:
+            raise ValueError("speedup must be positive.")
+        processed = 0
+        wall_start = time.perf_counter()
+        sim_start = self.now
+        while max_events is None or processed < max_events:
+            next_time = self.peek_time()
+            if next_time is None or (until is not None and next_time > until):
+                break
+            if speedup is not None:
+                delay = (next_time - sim_start) / speedup - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.step()
+            processed += 1
+        if until is not None and until > self.now and (max_events is None or processed < max_events):
+            self.now = until
+        return processed
@@ -0,0 +1,74 @@
+# Logging helpers for the traffic management package.
+#
+# Every module logs through a `logging.getLogger(__name__)` logger under the
+# "traffic_management" namespace, passing %-style arguments so messages are only formatted
+# when a record is actually emitted. Records carry structured fields in their attributes:
+# `event` (e.g. "signal_state_changed", "preemption_started") and, where relevant,
+# `signal_id`, `vehicle_id` and `sim_id`, which handlers and filters can use directly.
+#
+# Per-call events (registrations, state changes) are logged at DEBUG, preemption events at
+# INFO, and problems at WARNING/ERROR, so the default WARNING level keeps hot paths quiet.
+
+import logging
+import logging.handlers
+import queue
+from typing import List, Optional
+
+LOGGER_NAME = "traffic_management"
+
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_replaced_handlers: List[logging.Handler] = []
+
+def start_async_logging(handlers: Optional[List[logging.Handler]] = None, level: Optional[int] = None,
+                        max_queue_size: int = 0) -> logging.handlers.QueueListener:
+    """
+    Moves traffic_management log output off the calling thread.
+
+    The package logger's handlers are replaced by a QueueHandler; a QueueListener thread
+    drains the queue into the given handlers, so callers never block on stream or file I/O.
+    Args:
+        handlers (list, optional): Handlers that write the records. Defaults to the package
+                                   logger's current handlers, or a stderr StreamHandler if it has none.
+        level (int, optional): If given, sets the package logger's level.
+        max_queue_size (int): Bound on queued records; 0 means unbounded. When a bounded queue is
+                              full, new records are dropped (and reported via logging.raiseExceptions).
+    Returns:
+        logging.handlers.QueueListener: The running listener. Call stop_async_logging() to flush and stop it.
+    Raises:
+        RuntimeError: If asynchronous logging is already running.
+    """
+    global _queue_handler, _listener, _replaced_handlers
+    if _listener is not None:
+        raise RuntimeError("Asynchronous traffic_management logging is already running.")
+
+    package_logger = logging.getLogger(LOGGER_NAME)
+    _replaced_handlers = list(package_logger.handlers)
+    if handlers is None:
+        handlers = _replaced_handlers or [logging.StreamHandler()]
+    if level is not None:
+        package_logger.setLevel(level)
+
+    record_queue = queue.Queue(maxsize=max_queue_size)
+    _queue_handler = logging.handlers.QueueHandler(record_queue)
+    for handler in _replaced_handlers:
+        package_logger.removeHandler(handler)
+    package_logger.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(record_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_async_logging():
+    """Flushes queued records, stops the listener and restores the package logger's previous handlers."""
+    global _queue_handler, _listener, _replaced_handlers
+    if _listener is None:
+        return
+    _listener.stop() # Processes everything already queued before returning
+    package_logger = logging.getLogger(LOGGER_NAME)
+    package_logger.removeHandler(_queue_handler)
+    for handler in _replaced_handlers:
+        package_logger.addHandler(handler)
+    _queue_handler = None
+    _listener = None
+    _replaced_handlers = []
@@ -0,0 +1,165 @@
+# Declarative signal inventory: loads TrafficSignal definitions from JSON or CSV files,
+# and caches them as a precompiled (pickled) snapshot for fast process startup.
+
+import csv
+import json
+import logging
+import os
+import pickle
+from typing import List, Optional
+
+from .models import TrafficSignal
+from .signal_controller import SignalController
+
+logger = logging.getLogger(__name__)
+
+# Inventory shipped with the package; matches the signals of the TrafficSimulation demo setup.
+DEFAULT_INVENTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "signal_inventory.json")
+
+# Bumped whenever the snapshot layout changes; snapshots with another version are ignored.
+# 2: TrafficSignal gained version and last_changed.
+SNAPSHOT_FORMAT_VERSION = 2
+
+def load_signal_inventory(path: str) -> List[TrafficSignal]:
+    """
+    Loads signal definitions from a JSON or CSV inventory file (chosen by file extension).
+
+    JSON: a list of objects (or {"signals": [...]}) with "signal_id", "location" ([lat, lon]),
+    "current_state" ({aspect: state}), "lanes_controlled" (list) and "default_timing" ({phase: seconds}).
+
+    CSV: one row per signal with the columns signal_id, lat, lon, current_state, lanes_controlled,
+    green, yellow, red. current_state is "aspect=state" pairs separated by "|" (e.g.
+    "north_south=red|east_west=green"), lanes_controlled is "|"-separated, and empty timing cells are omitted.
+    Args:
+        path (str): Path to a .json or .csv inventory file.
+    Returns:
+        list: The TrafficSignal objects, in file order.
+    Raises:
+        ValueError: If the extension is unsupported, a definition is malformed, or a signal ID repeats.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        definitions = data.get("signals", []) if isinstance(data, dict) else data
+        signals = [_signal_from_dict(definition) for definition in definitions]
+    elif extension == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            signals = [_signal_from_csv_row(row) for row in csv.DictReader(f)]
+    else:
+        raise ValueError(f"Unsupported signal inventory format '{extension}'. Use .json or .csv.")
+
+    seen = set()
+    for signal in signals:
+        if signal.id in seen:
+            raise ValueError(f"Duplicate signal ID '{signal.id}' in inventory '{path}'.")
+        seen.add(signal.id)
+    return signals
+
+def _signal_from_dict(definition: dict) -> TrafficSignal:
+    try:
+        return TrafficSignal(
+            signal_id=str(definition["signal_id"]),
+            location=tuple(definition["location"]),
+            current_state=dict(definition["current_state"]),
+            lanes_controlled=list(definition.get("lanes_controlled", [])),
+            default_timing=dict(definition.get("default_timing", {})),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid signal definition {definition!r}: {e}") from e
+
+def _signal_from_csv_row(row: dict) -> TrafficSignal:
+    try:
+        current_state = {}
+        for pair in filter(None, (row.get("current_state") or "").split("|")):
+            aspect, state = pair.split("=", 1)
+            current_state[aspect.strip()] = state.strip()
+        default_timing = {phase: float(row[phase]) for phase in ("green", "yellow", "red") if row.get(phase)}
+        return TrafficSignal(
+            signal_id=row["signal_id"].strip(),
+            location=(float(row["lat"]), float(row["lon"])),
+            current_state=current_state,
+            lanes_controlled=[lane.strip() for lane in (row.get("lanes_controlled") or "").split("|") if lane.strip()],
+            default_timing=default_timing,
+        )
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"Invalid signal inventory row {row!r}: {e}") from e
+
+def save_snapshot(signals: List[TrafficSignal], snapshot_path: str, source_path: Optional[str] = None):
+    """
+    Writes signals to a precompiled snapshot file.
+    Args:
+        signals (list): The TrafficSignal objects to store.
+        snapshot_path (str): Destination file. Written atomically via a temporary file.
+        source_path (str, optional): The inventory the signals came from; its modification time is
+                                     recorded so stale snapshots are detected.
+    """
+    payload = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "source_mtime": os.path.getmtime(source_path) if source_path else None,
+        "signals": signals,
+    }
+    temp_path = f"{snapshot_path}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, snapshot_path)
+
+def load_snapshot(snapshot_path: str, source_path: Optional[str] = None) -> Optional[List[TrafficSignal]]:
+    """
+    Loads signals from a snapshot written by save_snapshot.
+    Snapshots must only come from trusted locations, since they are unpickled.
+    Returns:
+        list or None: The signals, or None if the snapshot is missing, unreadable, of another
+                      format version, or older than the source inventory.
+    """
+    try:
+        with open(snapshot_path, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        logger.debug("Signal snapshot '%s' not usable: %s", snapshot_path, e)
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    if source_path and payload.get("source_mtime") != os.path.getmtime(source_path):
+        logger.info("Signal snapshot '%s' is stale for inventory '%s'.", snapshot_path, source_path)
+        return None
+    return payload["signals"]
+
+def build_controller(controller_id: str, inventory_path: str = DEFAULT_INVENTORY_PATH,
+                     snapshot_path: Optional[str] = None) -> SignalController:
+    """
+    Builds a SignalController with every signal of an inventory registered.
+
+    If snapshot_path is given, a current snapshot is used instead of parsing the inventory,
+    and a missing or stale snapshot is (re)written after parsing.
+    Args:
+        controller_id (str): ID for the new controller.
+        inventory_path (str): JSON or CSV inventory file.
+        snapshot_path (str, optional): Precompiled snapshot file.
+    Returns:
+        SignalController: The populated controller.
+    """
+    signals = load_snapshot(snapshot_path, inventory_path) if snapshot_path else None
+    if signals is None:
+        signals = load_signal_inventory(inventory_path)
+        if snapshot_path:
+            try:
+                save_snapshot(signals, snapshot_path, inventory_path)
+            except OSError as e:
+                logger.warning("Could not write signal snapshot '%s': %s", snapshot_path, e)
+
+    controller = SignalController(controller_id=controller_id)
+    for signal in signals:
+        controller.register_signal(signal)
+    logger.info("SignalController '%s' loaded %d signals from '%s'.", controller_id, len(signals), inventory_path,
+                extra={"event": "inventory_loaded"})
+    return controller
+
+if __name__ == "__main__":
+    # Precompile a snapshot: python -m traffic_management.inventory <inventory.json|csv> <snapshot.pickle>
+    import sys
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m traffic_management.inventory <inventory.json|.csv> <snapshot_path>")
+    compiled = load_signal_inventory(sys.argv[1])
+    save_snapshot(compiled, sys.argv[2], sys.argv[1])
+    print(f"Wrote {len(compiled)} signals to {sys.argv[2]}")
@@ -1,4 +1,5 @@
 # This file will contain the data models for the traffic management system.
+import time
 
 class EmergencyVehicle:
     """Represents an emergency vehicle and its status."""
@@ -36,6 +37,14 @@ class TrafficSignal:
         self.lanes_controlled = lanes_controlled
         # Example: {"green": 30, "yellow": 5, "red": 25} (in seconds)
         self.default_timing = default_timing
+        # Bumped on every actual change to the state or timing; identifies the signal's state in ETags
+        self.version = 0
+        self.last_changed = None  # Epoch seconds of the last change, or None if unchanged since creation
+
+    def mark_changed(self):
+        """Bumps the version after a change to the signal."""
+        self.version += 1
+        self.last_changed = time.time()
 
     def change_state(self, new_state_component: dict):
         """
@@ -44,14 +53,21 @@ class TrafficSignal:
         e.g., {"north_south": "yellow"}
         """
         # Basic validation: ensure keys in new_state_component are valid signal aspects
-        for aspect, state in new_state_component.items():
-            if aspect in self.current_state:
-                if state in ['red', 'yellow', 'green', 'flashing_red', 'flashing_yellow', 'off']: # Extended states
-                    self.current_state[aspect] = state
+        changed = False
+        try:
+            for aspect, state in new_state_component.items():
+                if aspect in self.current_state:
+                    if state in ['red', 'yellow', 'green', 'flashing_red', 'flashing_yellow', 'off']: # Extended states
+                        changed = changed or self.current_state[aspect] != state
+                        self.current_state[aspect] = state
+                    else:
+                        raise ValueError(f"Invalid state '{state}' for aspect '{aspect}'.")
                 else:
-                    raise ValueError(f"Invalid state '{state}' for aspect '{aspect}'.")
-            else:
-                raise ValueError(f"Invalid signal aspect '{aspect}'. Valid aspects: {list(self.current_state.keys())}")
+                    raise ValueError(f"Invalid signal aspect '{aspect}'. Valid aspects: {list(self.current_state.keys())}")
+        finally:
+            # Aspects applied before an invalid one stay changed
+            if changed:
+                self.mark_changed()
 
     def get_aspect_state(self, aspect: str):
         """Returns the state of a specific aspect/face of the signal."""
@@ -0,0 +1,120 @@
+# Scenario generators for offline stress tests of the traffic management system.
+
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+from common.geo import METERS_PER_DEGREE
+from .models import EmergencyVehicle, TrafficSignal
+
+class Scenario:
+    """A set of signals and emergency vehicles, plus when each vehicle departs (in simulated seconds)."""
+
+    def __init__(self, name: str, signals: List[TrafficSignal], vehicles: List[EmergencyVehicle],
+                 departures: Dict[str, float], offsets: Optional[Dict[str, float]] = None):
+        self.name = name
+        self.signals = signals
+        self.vehicles = vehicles
+        self.departures = departures # vehicle_id -> departure time
+        self.offsets = offsets or {} # signal_id -> cycle offset for SignalController.start_normal_operation
+
+    def __repr__(self):
+        return (f"Scenario(name='{self.name}', signals={len(self.signals)}, "
+                f"vehicles={len(self.vehicles)})")
+
+def grid_signal_id(row: int, col: int) -> str:
+    """Returns the ID generate_grid_city gives the signal at a grid position."""
+    return f"TS_{row:04d}_{col:04d}"
+
+def generate_grid_city(rows: int, cols: int, vehicle_count: int, block_meters: float = 200.0,
+                       origin: Tuple[float, float] = (40.0, -74.0), departure_window_s: float = 600.0,
+                       vehicle_speed_kmh: float = 50.0, seed: Optional[int] = None) -> Scenario:
+    """
+    Builds a grid city of rows x cols signalized intersections and a fleet of emergency vehicles.
+
+    Each intersection gets a signal with "north_south" and "east_west" aspects and a randomly
+    chosen timing plan. Each vehicle drives a shortest (Manhattan) path between two random
+    intersections, starting one block before its first signal.
+    Args:
+        rows (int): Number of east-west streets.
+        cols (int): Number of north-south avenues.
+        vehicle_count (int): Number of emergency vehicles.
+        block_meters (float): Distance between neighbouring intersections.
+        origin (tuple): (lat, lon) of the south-west intersection.
+        departure_window_s (float): Vehicles depart uniformly at random within this many seconds.
+        vehicle_speed_kmh (float): Speed of every vehicle.
+        seed (int, optional): Seed for reproducible scenarios.
+    Returns:
+        Scenario: The generated signals, vehicles, departure times and cycle offsets.
+    Raises:
+        ValueError: If the grid is empty or an argument is negative.
+    """
+    if rows < 1 or cols < 1:
+        raise ValueError("A grid city needs at least one row and one column.")
+    if vehicle_count < 0 or block_meters <= 0 or departure_window_s < 0 or vehicle_speed_kmh <= 0:
+        raise ValueError("vehicle_count and departure_window_s must be non-negative; block_meters and vehicle_speed_kmh must be positive.")
+
+    rng = random.Random(seed)
+    lat0, lon0 = origin
+    d_lat = block_meters / METERS_PER_DEGREE
+    d_lon = block_meters / (METERS_PER_DEGREE * math.cos(math.radians(lat0)))
+
+    def location(row: int, col: int) -> Tuple[float, float]:
+        return (lat0 + row * d_lat, lon0 + col * d_lon)
+
+    signals = []
+    offsets = {}
+    for row in range(rows):
+        for col in range(cols):
+            signal_id = grid_signal_id(row, col)
+            signals.append(TrafficSignal(
+                signal_id=signal_id,
+                location=location(row, col),
+                current_state={"north_south": "red", "east_west": "red"},
+                lanes_controlled=[f"{signal_id}_northbound", f"{signal_id}_southbound",
+                                  f"{signal_id}_eastbound", f"{signal_id}_westbound"],
+                default_timing={"green": rng.choice([20, 30, 40]), "yellow": rng.choice([3, 4, 5])},
+            ))
+            offsets[signal_id] = rng.uniform(0.0, 90.0)
+
+    vehicles = []
+    departures = {}
+    vehicle_types = ("ambulance", "fire_truck", "police_car")
+    for i in range(vehicle_count):
+        start = (rng.randrange(rows), rng.randrange(cols))
+        end = (rng.randrange(rows), rng.randrange(cols))
+        path = _manhattan_path(start, end, rng)
+        # Start one block before the first intersection, approaching along the path's first leg.
+        if len(path) > 1:
+            step_row, step_col = path[1][0] - path[0][0], path[1][1] - path[0][1]
+        else:
+            step_row, step_col = 1, 0
+        first_lat, first_lon = location(*path[0])
+        vehicle_id = f"EV_{i:05d}"
+        vehicles.append(EmergencyVehicle(
+            vehicle_id=vehicle_id,
+            type=rng.choice(vehicle_types),
+            location=(first_lat - step_row * d_lat, first_lon - step_col * d_lon),
+            speed=vehicle_speed_kmh,
+            route=[grid_signal_id(row, col) for row, col in path],
+            status="en_route_to_emergency",
+        ))
+        departures[vehicle_id] = rng.uniform(0.0, departure_window_s)
+
+    return Scenario(f"grid_{rows}x{cols}_{vehicle_count}ev", signals, vehicles, departures, offsets)
+
+def _manhattan_path(start: Tuple[int, int], end: Tuple[int, int], rng: random.Random) -> List[Tuple[int, int]]:
+    """Returns a random shortest grid path from start to end, including both endpoints."""
+    row, col = start
+    row_step = 1 if end[0] > row else -1
+    col_step = 1 if end[1] > col else -1
+    moves = ["row"] * abs(end[0] - row) + ["col"] * abs(end[1] - col)
+    rng.shuffle(moves)
+    path = [start]
+    for move in moves:
+        if move == "row":
+            row += row_step
+        else:
+            col += col_step
+        path.append((row, col))
+    return path
@@ -1,9 +1,52 @@
 # This file will contain the logic for controlling traffic signals.
 # This could include algorithms for adaptive signal timing, pedestrian detection, etc.
-from typing import Optional # Added Optional for type hinting
+import heapq
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 from .models import TrafficSignal # EmergencyVehicle is not directly used by controller yet, but models.py is updated
 
+logger = logging.getLogger(__name__)
+
+# Seconds every aspect is held red after emergency preemption before the normal cycle resumes.
+ALL_RED_CLEARANCE_SECONDS = 2.0
+
+def _is_pedestrian_aspect(aspect: str) -> bool:
+    return aspect.startswith("pedestrian") or aspect.startswith("ped_")
+
+def _build_cycle_phases(signal: TrafficSignal, timing_plan: dict) -> List[Tuple[Dict[str, str], float]]:
+    """
+    Builds the (state, duration_seconds) phases of a signal's normal cycle.
+    Pedestrian aspects are left out of the phases and keep their current state.
+    Raises:
+        ValueError: If the plan has no positive green time or the signal has no vehicle aspects.
+    """
+    green = timing_plan.get("green", 0) if timing_plan else 0
+    yellow = timing_plan.get("yellow", 0) if timing_plan else 0
+    if green <= 0 or yellow < 0:
+        raise ValueError(f"Signal '{signal.id}' needs a timing plan with a positive 'green' duration (and a non-negative 'yellow').")
+    aspects = [aspect for aspect in signal.current_state if not _is_pedestrian_aspect(aspect)]
+    if not aspects:
+        raise ValueError(f"Signal '{signal.id}' has no vehicle aspects to cycle.")
+
+    phases = []
+    all_red = {aspect: "red" for aspect in aspects}
+    for aspect in aspects:
+        phases.append(({**all_red, aspect: "green"}, float(green)))
+        if yellow > 0:
+            phases.append(({**all_red, aspect: "yellow"}, float(yellow)))
+    return phases
+
+class _SignalCycle:
+    """Normal-cycle bookkeeping for one signal."""
+    __slots__ = ("phases", "index", "generation", "suspended")
+
+    def __init__(self, phases: List[Tuple[Dict[str, str], float]]):
+        self.phases = phases
+        self.index = 0
+        self.generation = 0 # Bumped whenever queued deadlines for this signal become stale
+        self.suspended = False
+
 class SignalController:
     """Manages the state of traffic signals, including emergency preemption."""
 
@@ -17,11 +60,14 @@ class SignalController:
         self.signals = {}  # Stores registered TrafficSignal objects, keyed by signal_id
         self.active_emergency_mode = False # Flag to indicate if emergency preemption is active
 
-        # Existing phase logic attributes - can be adapted or used for normal operation
-        # self.timing_plan = {}
-        # self.current_phase = None
-        # self.phase_timer = 0
-        # For now, we are focusing on emergency preemption, so regular cycle management is secondary.
+        # Normal-cycle state: controller time in seconds, per-signal cycles, and a min-heap of
+        # (deadline, sequence, signal_id, generation) entries for pending phase transitions.
+        self.clock = 0.0
+        self._cycles: Dict[str, _SignalCycle] = {}
+        self._schedule: List[Tuple[float, int, str, int]] = []
+        self._sequence = 0
+        # Callbacks notified with a signal's ID after its state or timing plan changes
+        self._change_listeners: List[Callable[[str], None]] = []
 
     def register_signal(self, signal_object: TrafficSignal):
         """
@@ -33,10 +79,12 @@ class SignalController:
             raise ValueError("Invalid object type. Expected TrafficSignal.")
 
         if signal_object.id in self.signals:
-            print(f"Warning: Signal with ID '{signal_object.id}' is already registered. Overwriting.")
+            logger.warning("SignalController '%s': Signal with ID '%s' is already registered. Overwriting.",
+                           self.controller_id, signal_object.id, extra={"event": "signal_overwritten", "signal_id": signal_object.id})
 
         self.signals[signal_object.id] = signal_object
-        print(f"SignalController '{self.controller_id}': Registered signal '{signal_object.id}'.")
+        logger.debug("SignalController '%s': Registered signal '%s'.", self.controller_id, signal_object.id,
+                     extra={"event": "signal_registered", "signal_id": signal_object.id})
 
     def set_signal_state(self, signal_id: str, new_state_dict: dict):
         """
@@ -47,15 +95,20 @@ class SignalController:
                                    (e.g., {"north_south": "green"}).
         """
         if signal_id not in self.signals:
-            print(f"SignalController '{self.controller_id}': Error - Signal '{signal_id}' not found.")
+            logger.error("SignalController '%s': Signal '%s' not found.", self.controller_id, signal_id,
+                         extra={"event": "signal_not_found", "signal_id": signal_id})
             return
 
         signal = self.signals[signal_id]
         try:
             signal.change_state(new_state_dict)
-            print(f"SignalController '{self.controller_id}': Signal '{signal_id}' state changed to {new_state_dict}. Current full state: {signal.current_state}")
+            logger.debug("SignalController '%s': Signal '%s' state changed to %s. Current full state: %s",
+                         self.controller_id, signal_id, new_state_dict, signal.current_state,
+                         extra={"event": "signal_state_changed", "signal_id": signal_id})
         except ValueError as e:
-            print(f"SignalController '{self.controller_id}': Error changing state for signal '{signal_id}': {e}")
+            logger.error("SignalController '%s': Error changing state for signal '%s': %s", self.controller_id, signal_id, e,
+                         extra={"event": "signal_state_rejected", "signal_id": signal_id})
+        self._notify_change(signal_id) # Aspects before a rejected one may have changed
 
     def handle_emergency_vehicle_approach(self, vehicle_id: str, vehicle_location: tuple, vehicle_route: list, emergency_state: Optional[dict] = None):
         """
@@ -68,11 +121,14 @@ class SignalController:
             emergency_state (Optional[dict]): An explicit state to set the signal to.
                                               If None, fallback logic is used.
         """
-        print(f"SignalController '{self.controller_id}': Received emergency vehicle approach: ID='{vehicle_id}', Location={vehicle_location}, Route={vehicle_route}, EmergencyStateProvided={emergency_state is not None}")
+        logger.info("SignalController '%s': Received emergency vehicle approach: ID='%s', Location=%s, Route=%s, EmergencyStateProvided=%s",
+                    self.controller_id, vehicle_id, vehicle_location, vehicle_route, emergency_state is not None,
+                    extra={"event": "emergency_approach", "vehicle_id": vehicle_id})
         self.active_emergency_mode = True # Activate emergency mode
 
         if not vehicle_route:
-            print(f"SignalController '{self.controller_id}': No route information for vehicle '{vehicle_id}'. Cannot determine target signal.")
+            logger.warning("SignalController '%s': No route information for vehicle '%s'. Cannot determine target signal.",
+                           self.controller_id, vehicle_id, extra={"event": "emergency_no_route", "vehicle_id": vehicle_id})
             return
 
         # Simplified: Assume the first element of the route is the ID of the *next* signal to prioritize.
@@ -80,11 +136,12 @@ class SignalController:
         target_signal_id = vehicle_route[0]
 
         if target_signal_id not in self.signals:
-            print(f"SignalController '{self.controller_id}': Target signal '{target_signal_id}' for vehicle '{vehicle_id}' not registered with this controller.")
+            logger.warning("SignalController '%s': Target signal '%s' for vehicle '%s' not registered with this controller.",
+                           self.controller_id, target_signal_id, vehicle_id,
+                           extra={"event": "signal_not_found", "signal_id": target_signal_id, "vehicle_id": vehicle_id})
             return
 
         relevant_signal = self.signals[target_signal_id]
-        print(f"SignalController '{self.controller_id}': Controlling signal '{relevant_signal.id}' for vehicle '{vehicle_id}'.")
 
         # Simplified prioritization logic:
         # Determine which direction/lanes need to be green.
@@ -99,12 +156,14 @@ class SignalController:
         target_state = None
         if emergency_state is not None and isinstance(emergency_state, dict):
             target_state = emergency_state
-            print(f"SignalController '{self.controller_id}': Using provided emergency_state {target_state} for signal '{relevant_signal.id}' for EV '{vehicle_id}'.")
         else:
-            print(f"SignalController '{self.controller_id}': Warning - No explicit emergency_state provided for EV '{vehicle_id}' at signal '{relevant_signal.id}'. Falling back to naive logic. Provide 'emergency_state' for predictable behavior.")
+            logger.warning("SignalController '%s': No explicit emergency_state provided for EV '%s' at signal '%s'. Falling back to naive logic. Provide 'emergency_state' for predictable behavior.",
+                           self.controller_id, vehicle_id, relevant_signal.id,
+                           extra={"event": "emergency_fallback_state", "signal_id": relevant_signal.id, "vehicle_id": vehicle_id})
             current_signal_aspects = relevant_signal.current_state
             if not current_signal_aspects: # Check if current_state itself is empty or None
-                 print(f"SignalController '{self.controller_id}': Signal '{relevant_signal.id}' has no current state aspects defined. Cannot determine fallback target state.")
+                 logger.error("SignalController '%s': Signal '%s' has no current state aspects defined. Cannot determine fallback target state.",
+                              self.controller_id, relevant_signal.id, extra={"event": "emergency_no_target_state", "signal_id": relevant_signal.id})
                  return
 
             # temp_target_state = {} # This variable was in the prompt but not used, so removed.
@@ -123,10 +182,14 @@ class SignalController:
                     target_state[aspect_keys[0]] = "green"
 
             if not target_state: # If target_state is still None or empty after fallback logic
-                print(f"SignalController '{self.controller_id}': Signal '{relevant_signal.id}' fallback logic failed to determine a target state (e.g. no aspects). Cannot control.")
+                logger.error("SignalController '%s': Signal '%s' fallback logic failed to determine a target state (e.g. no aspects). Cannot control.",
+                             self.controller_id, relevant_signal.id, extra={"event": "emergency_no_target_state", "signal_id": relevant_signal.id})
                 return
-            print(f"SignalController '{self.controller_id}': Using fallback emergency_state {target_state} for signal '{relevant_signal.id}' for EV '{vehicle_id}'.")
 
+        logger.info("SignalController '%s': Preempting signal '%s' for EV '%s' with state %s.",
+                    self.controller_id, relevant_signal.id, vehicle_id, target_state,
+                    extra={"event": "preemption_started", "signal_id": relevant_signal.id, "vehicle_id": vehicle_id})
+        self._suspend_cycle(relevant_signal.id) # Hold the preempted signal; other signals keep cycling
         self.set_signal_state(relevant_signal.id, target_state)
 
     def end_emergency_preemption(self, signal_id_to_reset: str = None):
@@ -137,7 +200,8 @@ class SignalController:
                                                 If None, could try to reset all.
         """
         self.active_emergency_mode = False
-        print(f"SignalController '{self.controller_id}': Emergency preemption mode ended.")
+        logger.info("SignalController '%s': Emergency preemption mode ended.", self.controller_id,
+                    extra={"event": "preemption_ended", "signal_id": signal_id_to_reset})
         if signal_id_to_reset and signal_id_to_reset in self.signals:
             signal = self.signals[signal_id_to_reset]
             # Restore to default timing or a safe state.
@@ -146,62 +210,219 @@ class SignalController:
             # A better way would be to resume the normal cycle.
             default_red_state = {aspect: "red" for aspect in signal.current_state.keys()}
             if default_red_state:
-                 print(f"SignalController '{self.controller_id}': Reverting signal '{signal_id_to_reset}' to default red state: {default_red_state}.")
+                 logger.debug("SignalController '%s': Reverting signal '%s' to default red state: %s.",
+                              self.controller_id, signal_id_to_reset, default_red_state,
+                              extra={"event": "signal_reverted", "signal_id": signal_id_to_reset})
                  self.set_signal_state(signal_id_to_reset, default_red_state)
-            # Ideally, here you would trigger logic to resume the normal timing plan.
-            # self.resume_normal_operation(signal_id_to_reset)
+            # The all-red state doubles as the clearance interval before the normal cycle resumes.
+            self._resume_cycle(signal_id_to_reset)
         else:
-            print(f"SignalController '{self.controller_id}': No specific signal ID to reset or signal not found. Consider logic to reset all managed signals or resume normal cycles.")
-
-
-    # The methods below are from the previous version and might need adaptation or removal
-    # if they conflict with the primary goal of emergency vehicle preemption.
-    # For now, they are kept but commented out or made secondary.
-
-    # def set_timing_plan(self, plan):
-    #     """Sets a new timing plan for the signals (normal operation)."""
-    #     if self.active_emergency_mode:
-    #         print(f"SignalController '{self.controller_id}': Cannot set timing plan while emergency mode is active.")
-    #         return
-    #     self.timing_plan = plan
-    #     if self.timing_plan and not self.current_phase:
-    #         self.current_phase = list(self.timing_plan.keys())[0]
-    #     print(f"SignalController '{self.controller_id}': Timing plan set: {plan}")
-
-
-    # def update(self, time_delta):
-    #     """
-    #     Updates signal states based on the timing plan (normal operation).
-    #     `time_delta` is the time elapsed since the last update, in seconds.
-    #     """
-    #     if self.active_emergency_mode:
-    #         # print(f"SignalController '{self.controller_id}': Update paused due to active emergency mode.")
-    #         return # Preemption overrides normal cycle
-
-    #     if not self.timing_plan or not self.current_phase:
-    #         return
-
-    #     self.phase_timer += time_delta
-    #     current_phase_duration = self.timing_plan[self.current_phase]
+            logger.info("SignalController '%s': No specific signal ID to reset or signal not found. Resuming any suspended normal cycles.",
+                        self.controller_id, extra={"event": "preemption_ended_all"})
+            for signal_id, cycle in list(self._cycles.items()):
+                if cycle.suspended:
+                    self._resume_cycle(signal_id)
+
+
+    # --- Normal operation: time-stepped phase cycling ---
+    #
+    # Each cycling signal steps through phases built from its timing plan: every
+    # vehicle aspect in turn gets green (then yellow, if the plan has one) while the
+    # other vehicle aspects are red. Deadlines for the next transition of every signal
+    # live in one min-heap, so update() only touches signals that are actually due.
+    # Heap entries carry a generation number; bumping a signal's generation (stop,
+    # restart, preemption) invalidates its queued entry without searching the heap.
+
+    def set_timing_plan(self, signal_id: str, timing_plan: dict):
+        """
+        Sets the timing plan used for a signal's normal cycle.
+        Args:
+            signal_id (str): The ID of a registered signal.
+            timing_plan (dict): Phase durations in seconds, e.g. {"green": 30, "yellow": 5}.
+                                Replaces the signal's default_timing; a cycling signal restarts
+                                its cycle from the first phase (a signal held by preemption
+                                starts the new plan when the preemption ends).
+        """
+        if signal_id not in self.signals:
+            raise ValueError(f"Signal '{signal_id}' not registered with controller '{self.controller_id}'.")
+        phases = _build_cycle_phases(self.signals[signal_id], timing_plan)
+        self.signals[signal_id].default_timing = timing_plan
+        self.signals[signal_id].mark_changed()
+        self._notify_change(signal_id)
+        cycle = self._cycles.get(signal_id)
+        if cycle is not None:
+            cycle.phases = phases
+            if not cycle.suspended: # A preempted signal keeps its hold; _resume_cycle restarts the cycle
+                self._enter_phase(signal_id, cycle, 0, self.clock)
+
+    def start_normal_operation(self, signal_ids: Optional[Iterable[str]] = None, offsets: Optional[Dict[str, float]] = None):
+        """
+        Starts phase cycling for signals, driven by each signal's default_timing.
+        Args:
+            signal_ids (Iterable[str], optional): Signals to start. Defaults to all registered signals.
+            offsets (dict, optional): Seconds into its cycle at which each signal starts,
+                                      keyed by signal ID (e.g. for green-wave coordination).
+        Raises:
+            ValueError: If a signal is not registered or its timing plan cannot drive a cycle.
+        """
+        if signal_ids is None:
+            signal_ids = list(self.signals.keys())
+        offsets = offsets or {}
+        # Build every plan first so an invalid signal does not leave a half-started batch.
+        plans = []
+        for signal_id in signal_ids:
+            if signal_id not in self.signals:
+                raise ValueError(f"Signal '{signal_id}' not registered with controller '{self.controller_id}'.")
+            signal = self.signals[signal_id]
+            plans.append((signal_id, _build_cycle_phases(signal, signal.default_timing)))
+
+        for signal_id, phases in plans:
+            cycle = self._cycles.get(signal_id)
+            if cycle is None:
+                cycle = self._cycles[signal_id] = _SignalCycle(phases)
+            else:
+                cycle.phases = phases
+            cycle.suspended = False
+
+            # Locate the phase the offset falls in, and how far into that phase it is.
+            cycle_length = sum(duration for _, duration in phases)
+            into_cycle = offsets.get(signal_id, 0.0) % cycle_length
+            index = 0
+            while index < len(phases) - 1 and into_cycle >= phases[index][1]:
+                into_cycle -= phases[index][1]
+                index += 1
+            self._enter_phase(signal_id, cycle, index, self.clock - into_cycle)
+
+    def stop_normal_operation(self, signal_ids: Optional[Iterable[str]] = None):
+        """
+        Stops phase cycling. Signals keep their current state.
+        Args:
+            signal_ids (Iterable[str], optional): Signals to stop. Defaults to all cycling signals.
+        """
+        if signal_ids is None:
+            signal_ids = list(self._cycles.keys())
+        for signal_id in signal_ids:
+            cycle = self._cycles.pop(signal_id, None)
+            if cycle is not None:
+                cycle.generation += 1
+
+    def update(self, time_delta: float) -> int:
+        """
+        Advances the controller clock and applies every phase transition that has come due.
+        Args:
+            time_delta (float): Seconds elapsed since the last update.
+        Returns:
+            int: The number of phase transitions applied.
+        """
+        return self.advance_to(self.clock + time_delta)
 
-    #     if self.phase_timer >= current_phase_duration:
-    #         self.transition_to_next_phase()
-    #         self.phase_timer = 0
+    def advance_to(self, new_time: float) -> int:
+        """
+        Advances the controller clock to an absolute time, applying due transitions in deadline order.
+        A signal whose phases are shorter than the step transitions several times.
+        Args:
+            new_time (float): The new controller time in seconds. Earlier times are ignored.
+        Returns:
+            int: The number of phase transitions applied.
+        """
+        if new_time > self.clock:
+            self.clock = new_time
+        transitions = 0
+        schedule = self._schedule
+        cycles = self._cycles
+        while schedule and schedule[0][0] <= self.clock:
+            deadline, _, signal_id, generation = heapq.heappop(schedule)
+            cycle = cycles.get(signal_id)
+            if cycle is None or cycle.generation != generation:
+                continue # Stale entry for a stopped, restarted or preempted signal
+            # Chain from the deadline rather than the clock so coarse ticks do not cause drift.
+            self._enter_phase(signal_id, cycle, (cycle.index + 1) % len(cycle.phases), deadline)
+            transitions += 1
+        return transitions
+
+    def transition_to_next_phase(self, signal_id: str):
+        """
+        Immediately moves a cycling signal to its next phase, restarting that phase's timer.
+        Args:
+            signal_id (str): The ID of a cycling signal.
+        """
+        cycle = self._cycles.get(signal_id)
+        if cycle is None or cycle.suspended:
+            return
+        self._enter_phase(signal_id, cycle, (cycle.index + 1) % len(cycle.phases), self.clock)
+
+    def next_transition_time(self) -> Optional[float]:
+        """Returns the controller time of the earliest pending phase transition, or None if nothing is cycling."""
+        schedule = self._schedule
+        cycles = self._cycles
+        while schedule:
+            _, _, signal_id, generation = schedule[0]
+            cycle = cycles.get(signal_id)
+            if cycle is not None and cycle.generation == generation:
+                return schedule[0][0]
+            heapq.heappop(schedule) # Drop stale entries while we are here
+        return None
+
+    def get_current_phase(self, signal_id: str) -> Optional[dict]:
+        """
+        Returns the normal-cycle status of a signal, or None if it is not cycling.
+        The result holds the phase index, the phase state, and whether the cycle is suspended by preemption.
+        """
+        cycle = self._cycles.get(signal_id)
+        if cycle is None:
+            return None
+        return {
+            "phase_index": cycle.index,
+            "phase_state": dict(cycle.phases[cycle.index][0]),
+            "suspended": cycle.suspended,
+        }
+
+    def _enter_phase(self, signal_id: str, cycle: '_SignalCycle', index: int, started_at: float):
+        """Applies a phase to a signal and queues its next transition."""
+        cycle.index = index
+        cycle.generation += 1
+        phase_state, duration = cycle.phases[index]
+        self.signals[signal_id].change_state(phase_state)
+        if self._change_listeners:
+            self._notify_change(signal_id)
+        self._sequence += 1
+        heapq.heappush(self._schedule, (started_at + duration, self._sequence, signal_id, cycle.generation))
+
+    def _suspend_cycle(self, signal_id: str):
+        """Pauses a signal's cycle while it is held by emergency preemption."""
+        cycle = self._cycles.get(signal_id)
+        if cycle is not None and not cycle.suspended:
+            cycle.suspended = True
+            cycle.generation += 1
+
+    def _resume_cycle(self, signal_id: str):
+        """Restarts a suspended cycle from its first phase after an all-red clearance interval."""
+        cycle = self._cycles.get(signal_id)
+        if cycle is None or not cycle.suspended:
+            return
+        cycle.suspended = False
+        cycle.generation += 1
+        # Re-enter at the last phase so the next transition, after the clearance, lands on phase 0.
+        cycle.index = len(cycle.phases) - 1
+        self._sequence += 1
+        heapq.heappush(self._schedule, (self.clock + ALL_RED_CLEARANCE_SECONDS, self._sequence, signal_id, cycle.generation))
 
-    # def transition_to_next_phase(self):
-    #     """Transitions to the next phase in the normal cycle."""
-    #     if self.active_emergency_mode:
-    #         return
 
-    #     phase_names = list(self.timing_plan.keys())
-    #     if not phase_names: return
+    def add_change_listener(self, callback: Callable[[str], None]):
+        """
+        Registers a callback that is called with a signal's ID after its state or timing plan changes,
+        whether set directly, by emergency preemption or by the normal cycle.
+        """
+        self._change_listeners.append(callback)
 
-    #     current_index = phase_names.index(self.current_phase)
-    #     next_index = (current_index + 1) % len(phase_names)
-    #     self.current_phase = phase_names[next_index]
-    #     print(f"SignalController '{self.controller_id}': Transitioning to phase {self.current_phase}")
-        # Actual signal state changes based on phase would be implemented here for normal operation
+    def remove_change_listener(self, callback: Callable[[str], None]):
+        """Unregisters a callback added with add_change_listener. Unknown callbacks are ignored."""
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
 
+    def _notify_change(self, signal_id: str):
+        for callback in list(self._change_listeners):
+            callback(signal_id)
 
     def get_signal_current_states(self, signal_id: str = None):
         """
@@ -1,22 +1,57 @@
 # This file will contain the simulation environment for the traffic management system.
 # It demonstrates emergency vehicle preemption.
 
-import time # For potential pauses, not for simulation steps here
+import logging
+import math
+import time # Used to measure wall-clock time of event-driven runs
+from typing import Dict, Optional
+
+from common.geo import METERS_PER_DEGREE
 from .models import TrafficSignal, EmergencyVehicle
 from .signal_controller import SignalController
 from .communication import CentralCommunicator
+from .event_kernel import Event, EventKernel
+from .scenarios import Scenario
+from .simulation_log import DEFAULT_LOG_CAPACITY, SimulationLog
+
+logger = logging.getLogger(__name__)
+
+# Seconds before reaching a signal at which an emergency vehicle requests preemption.
+PREEMPTION_LEAD_SECONDS = 10.0
+
+def _distance_meters(a: tuple, b: tuple) -> float:
+    """Equirectangular distance between two (lat, lon) points; accurate enough at city scale."""
+    d_lat = (b[0] - a[0]) * METERS_PER_DEGREE
+    d_lon = (b[1] - a[1]) * METERS_PER_DEGREE * math.cos(math.radians((a[0] + b[0]) / 2.0))
+    return math.hypot(d_lat, d_lon)
 
 class TrafficSimulation:
     """
     Simulates a scenario involving an emergency vehicle and traffic signal preemption.
     """
-    def __init__(self, sim_id="Sim01"):
+    def __init__(self, sim_id="Sim01", log_capacity: int = DEFAULT_LOG_CAPACITY, log_spill_path: Optional[str] = None,
+                 log: Optional[SimulationLog] = None):
+        """
+        Args:
+            sim_id (str): Identifier used in log lines.
+            log_capacity (int): Most recent events kept in self.log.
+            log_spill_path (str, optional): File that events leaving self.log are appended to.
+            log (SimulationLog, optional): An existing log to record into instead (the other log arguments are ignored).
+        """
         self.sim_id = sim_id
         self.controller = None
         self.communicator = None
         self.signals = {} # Store signal objects keyed by id
         self.emergency_vehicles = {} # Store EV objects keyed by id
-        self.log = []
+        self.log = log if log is not None else SimulationLog(sim_id, capacity=log_capacity, spill_path=log_spill_path)
+        self.departures = {} # Departure times (simulated seconds) of EVs, used by run_event_driven
+        self.signal_offsets = {} # Cycle offsets of signals, used by run_event_driven
+
+        # Event-driven run state
+        self.kernel = None
+        self._signal_tick: Optional[Event] = None
+        self._preemption_holders: Dict[str, int] = {} # signal_id -> number of EVs currently preempting it
+        self._stats = {}
 
         self._setup_simulation_entities()
 
@@ -26,11 +61,11 @@ class TrafficSimulation:
 
         # 1. Instantiate SignalController
         self.controller = SignalController(controller_id="Ctrl001")
-        self.log_event(f"SignalController '{self.controller.controller_id}' instantiated.")
+        self.log_event("SignalController '%s' instantiated.", self.controller.controller_id)
 
         # 2. Instantiate CentralCommunicator, linking it to the SignalController
         self.communicator = CentralCommunicator(signal_controller=self.controller, server_id="CommHub01")
-        self.log_event(f"CentralCommunicator '{self.communicator.server_id}' instantiated and linked to controller.")
+        self.log_event("CentralCommunicator '%s' instantiated and linked to controller.", self.communicator.server_id)
 
         # 3. Create TrafficSignal objects
         signal1_initial_state = {"north_south": "red", "east_west": "green"}
@@ -56,7 +91,7 @@ class TrafficSimulation:
         # 4. Register signals with the SignalController
         self.controller.register_signal(self.signals["TS001"])
         self.controller.register_signal(self.signals["TS002"])
-        self.log_event(f"Registered signals: {list(self.signals.keys())} with controller.")
+        self.log_event("Registered signals: %s with controller.", list(self.signals.keys()))
 
         # 5. Create an EmergencyVehicle instance
         ev_route = ["TS001", "TS003"] # Targeting TS001 first
@@ -69,24 +104,161 @@ class TrafficSimulation:
             status="en_route_to_emergency"
         )
         self.emergency_vehicles[emergency_vehicle.id] = emergency_vehicle
-        self.log_event(f"EmergencyVehicle '{emergency_vehicle.id}' created with route {ev_route}.")
+        self.departures[emergency_vehicle.id] = 0.0
+        self.log_event("EmergencyVehicle '%s' created with route %s.", emergency_vehicle.id, ev_route)
         self.log_event("Simulation entities setup complete.")
 
+    def load_scenario(self, scenario: Scenario):
+        """
+        Replaces the simulation entities with those of a scenario (see scenarios.generate_grid_city).
+        A fresh SignalController and CentralCommunicator are created for the scenario.
+        """
+        self.log_event("Loading scenario %r...", scenario)
+        self.controller = SignalController(controller_id=f"Ctrl_{scenario.name}")
+        self.communicator = CentralCommunicator(signal_controller=self.controller, server_id=f"CommHub_{scenario.name}")
+        self.signals = {}
+        for signal in scenario.signals:
+            self.signals[signal.id] = signal
+            self.controller.register_signal(signal)
+        self.emergency_vehicles = {vehicle.id: vehicle for vehicle in scenario.vehicles}
+        self.departures = dict(scenario.departures)
+        self.signal_offsets = dict(scenario.offsets)
+        self.log_event("Scenario '%s' loaded: %d signals, %d emergency vehicles.", scenario.name, len(self.signals), len(self.emergency_vehicles))
+
+    def run_event_driven(self, until: Optional[float] = None, speedup: Optional[float] = None) -> dict:
+        """
+        Runs the loaded entities on the discrete-event kernel.
+
+        Signals cycle through their timing plans, each emergency vehicle departs at its departure
+        time and drives along its route, requesting preemption PREEMPTION_LEAD_SECONDS before each
+        signal and releasing it once it has passed. The run ends when every vehicle has finished
+        its route (or at `until`).
+        Args:
+            until (float, optional): Simulated time, in seconds, at which to stop.
+            speedup (float, optional): Simulated seconds per wall-clock second. Defaults to as fast as possible.
+        Returns:
+            dict: Run statistics (simulated and wall-clock time, events, transitions, preemptions, trips).
+        """
+        self.log_event("Starting event-driven run...")
+        self.kernel = EventKernel()
+        self.controller.clock = self.kernel.now
+        self._signal_tick = None
+        self._preemption_holders = {}
+        self._stats = {"signal_transitions": 0, "preemptions": 0, "vehicles_arrived": 0, "trip_seconds": []}
+
+        self.controller.start_normal_operation(offsets=self.signal_offsets)
+        self._reschedule_signal_tick()
+        for vehicle_id, vehicle in self.emergency_vehicles.items():
+            self.kernel.schedule(self.departures.get(vehicle_id, 0.0), self._on_vehicle_depart, vehicle)
+
+        wall_start = time.perf_counter()
+        # Signals cycle forever, so without a time limit the run stops once every vehicle is done.
+        while self._stats["vehicles_arrived"] < len(self.emergency_vehicles) or until is not None:
+            if not self.kernel.run(until=until, max_events=1, speedup=speedup):
+                break
+        wall_seconds = time.perf_counter() - wall_start
+
+        trips = self._stats.pop("trip_seconds")
+        stats = {
+            "simulated_seconds": self.kernel.now,
+            "wall_seconds": wall_seconds,
+            "events_processed": self.kernel.events_processed,
+            "signal_transitions": self._stats["signal_transitions"],
+            "preemptions": self._stats["preemptions"],
+            "vehicles_arrived": self._stats["vehicles_arrived"],
+            "mean_trip_seconds": sum(trips) / len(trips) if trips else None,
+        }
+        self.log_event("Event-driven run finished: %s", stats)
+        return stats
+
+    # --- Event handlers for run_event_driven ---
+
+    def _reschedule_signal_tick(self):
+        """Keeps exactly one kernel event pending for the controller's next phase transition."""
+        next_time = self.controller.next_transition_time()
+        if self._signal_tick is not None and not self._signal_tick.cancelled and self._signal_tick.time == next_time:
+            return
+        self.kernel.cancel(self._signal_tick)
+        self._signal_tick = None if next_time is None else self.kernel.schedule(next_time, self._on_signal_tick)
+
+    def _on_signal_tick(self):
+        self._signal_tick = None
+        self._stats["signal_transitions"] += self.controller.advance_to(self.kernel.now)
+        self._reschedule_signal_tick()
+
+    def _on_vehicle_depart(self, vehicle: EmergencyVehicle):
+        self._schedule_next_hop(vehicle, 0, self.kernel.now)
+
+    def _schedule_next_hop(self, vehicle: EmergencyVehicle, hop: int, trip_started: float):
+        """Schedules the preemption request and arrival for the signal at route[hop], or finishes the trip."""
+        next_signal = self.signals.get(vehicle.route[hop]) if hop < len(vehicle.route) else None
+        if next_signal is None or vehicle.speed <= 0:
+            vehicle.update_status("arrived")
+            self._stats["vehicles_arrived"] += 1
+            self._stats["trip_seconds"].append(self.kernel.now - trip_started)
+            return
+        travel_seconds = _distance_meters(vehicle.location, next_signal.location) / (vehicle.speed / 3.6) # speed in km/h
+        self.kernel.schedule_in(max(0.0, travel_seconds - PREEMPTION_LEAD_SECONDS), self._on_preemption_start, vehicle, hop)
+        self.kernel.schedule_in(travel_seconds, self._on_vehicle_arrive, vehicle, hop, trip_started)
+
+    def _on_preemption_start(self, vehicle: EmergencyVehicle, hop: int):
+        signal = self.signals[vehicle.route[hop]]
+        self.controller.advance_to(self.kernel.now)
+        self._preemption_holders[signal.id] = self._preemption_holders.get(signal.id, 0) + 1
+        self._stats["preemptions"] += 1
+        self.log_event("t=%.1fs %s requests preemption of %s.", self.kernel.now, vehicle.id, signal.id)
+        self.communicator.send_emergency_vehicle_data(
+            vehicle_id=vehicle.id,
+            location=vehicle.location,
+            route=vehicle.route[hop:],
+            emergency_state=self._approach_state(signal, vehicle.location),
+        )
+        self._reschedule_signal_tick()
+
+    def _on_vehicle_arrive(self, vehicle: EmergencyVehicle, hop: int, trip_started: float):
+        signal = self.signals[vehicle.route[hop]]
+        vehicle.update_location(signal.location, vehicle.speed)
+        self.log_event("t=%.1fs %s passed %s.", self.kernel.now, vehicle.id, signal.id)
+        self.controller.advance_to(self.kernel.now)
+        self._preemption_holders[signal.id] -= 1
+        if not self._preemption_holders[signal.id]: # Keep the preemption while other EVs still approach
+            del self._preemption_holders[signal.id]
+            self.communicator.trigger_end_emergency_preemption(signal_id_to_reset=signal.id)
+            self._reschedule_signal_tick()
+        self._schedule_next_hop(vehicle, hop + 1, trip_started)
+
+    @staticmethod
+    def _approach_state(signal: TrafficSignal, vehicle_location: tuple) -> Optional[dict]:
+        """Green for the aspect matching the EV's direction of approach, red for the rest (None if the aspects are unknown)."""
+        if "north_south" not in signal.current_state or "east_west" not in signal.current_state:
+            return None
+        d_lat = abs(signal.location[0] - vehicle_location[0])
+        d_lon = abs(signal.location[1] - vehicle_location[1]) * math.cos(math.radians(signal.location[0]))
+        green_aspect = "north_south" if d_lat >= d_lon else "east_west"
+        state = {aspect: "red" for aspect in signal.current_state}
+        state[green_aspect] = "green"
+        return state
+
     def print_all_signal_states(self, stage_description: str):
-        """Helper function to print the current states of all registered signals."""
-        print(f"\n--- Signal States: {stage_description} ---")
+        """Logs the current states of all registered signals at INFO level."""
+        if not logger.isEnabledFor(logging.INFO):
+            return # Skip walking every signal when nobody is listening
+        logger.info("[%s] Signal states: %s", self.sim_id, stage_description, extra={"event": "signal_states", "sim_id": self.sim_id})
         if not self.controller.signals:
-            print("No signals registered with the controller.")
+            logger.info("[%s] No signals registered with the controller.", self.sim_id, extra={"event": "signal_states", "sim_id": self.sim_id})
             return
         for signal_id, signal_obj in self.controller.signals.items():
-            print(f"Signal ID: {signal_id}, Location: {signal_obj.location}, Current State: {signal_obj.current_state}")
-        print("-------------------------------------------")
+            logger.info("[%s] Signal ID: %s, Location: %s, Current State: %s", self.sim_id, signal_id, signal_obj.location,
+                        signal_obj.current_state, extra={"event": "signal_states", "sim_id": self.sim_id, "signal_id": signal_id})
 
-    def log_event(self, message: str):
-        """Logs a simulation event."""
-        entry = f"[{self.sim_id} Log] {message}"
-        self.log.append(entry)
-        print(entry) # Also print to console for immediate feedback
+    def log_event(self, message: str, *args):
+        """
+        Records a simulation event in self.log and emits it at INFO level. Like logging calls,
+        `message` is a %-style template that is formatted with `args` only when it is read.
+        """
+        self.log.append(message, *args)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[%s Log] " + message, self.sim_id, *args, extra={"event": "simulation_log", "sim_id": self.sim_id})
 
     def run_emergency_preemption_scenario(self):
         """Executes the emergency vehicle preemption demonstration."""
@@ -102,11 +274,11 @@ class TrafficSimulation:
             return
 
         if not ev.route:
-            self.log_event(f"Error: Emergency vehicle {ev.id} has no route defined.")
+            self.log_event("Error: Emergency vehicle %s has no route defined.", ev.id)
             return
 
         target_signal_id = ev.route[0]
-        self.log_event(f"Simulating approach of {ev.id} (type: {ev.type}) towards signal {target_signal_id}...")
+        self.log_event("Simulating approach of %s (type: %s) towards signal %s...", ev.id, ev.type, target_signal_id)
 
         # Use the CentralCommunicator instance to send this data
         self.communicator.send_emergency_vehicle_data(
@@ -119,7 +291,7 @@ class TrafficSimulation:
         self.print_all_signal_states(f"After EV {ev.id} Approach (Targeting {target_signal_id})")
 
         # d. Simulate the emergency vehicle having passed and ending the preemption
-        self.log_event(f"Simulating {ev.id} has passed signal {target_signal_id}...")
+        self.log_event("Simulating %s has passed signal %s...", ev.id, target_signal_id)
 
         # Use CentralCommunicator to trigger end of preemption
         self.communicator.trigger_end_emergency_preemption(signal_id_to_reset=target_signal_id)
@@ -128,26 +300,32 @@ class TrafficSimulation:
         self.print_all_signal_states(f"After EV {ev.id} Passed (Preemption Ended for {target_signal_id})")
 
         self.log_event("Emergency preemption scenario finished.")
-        self.print_simulation_log()
 
 
     def print_simulation_log(self):
         """Prints all logged events for the simulation run."""
         print("\n--- Full Simulation Log ---")
+        if self.log.dropped:
+            print(f"({self.log.dropped} earlier events not kept in memory)")
         for entry in self.log:
-            # Re-print without the live prefix if it was already printed
-            if entry.startswith(f"[{self.sim_id} Log] "):
-                 print(entry)
-            else: # Should not happen if log_event is used consistently
-                 print(f"RAW: {entry}")
+            print(entry)
         print("---------------------------")
 
 
 # Main execution block
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Instantiate TrafficSimulation and run the scenario
     simulation_instance = TrafficSimulation(sim_id="EmergencyDemoSim")
     simulation_instance.run_emergency_preemption_scenario()
+    simulation_instance.print_simulation_log()
+
+    # Event-driven run of a small generated grid city
+    from .scenarios import generate_grid_city
+    grid_simulation = TrafficSimulation(sim_id="GridCitySim")
+    grid_simulation.load_scenario(generate_grid_city(rows=3, cols=3, vehicle_count=2, seed=7))
+    grid_simulation.run_event_driven()
 
     # Old simulation logic (time-step based) is commented out as it's not used for this specific scenario.
     # sim = TrafficSimulation()
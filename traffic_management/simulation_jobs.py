@@ -0,0 +1,244 @@
+"""
+Background simulation runs, memoized by what they simulate.
+
+A run is identified by a deterministic key: a hash of the scenario name, its parameters (with
+defaults filled in) and the seed. Submitting a run that is already queued, running or
+finished returns that run instead of simulating again, so repeated requests for the same
+scenario cost nothing after the first. Runs execute on a small worker pool, off the request
+thread, and each keeps its TrafficSimulation's bounded log, which clients can read while the
+run is in progress. Finished runs are kept in a least-recently-used cache of `cache_size`
+entries; runs still queued or in progress are never evicted, so at most `max_pending` of them
+are accepted at a time and further new runs are refused until some finish.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .scenarios import generate_grid_city
+from .simulation import TrafficSimulation
+from .simulation_log import SimulationLog
+
+# Threads running simulations
+SIMULATION_WORKERS = 2
+# Finished runs kept for reuse
+DEFAULT_RESULT_CACHE_SIZE = 64
+# Runs queued or in progress at once; new runs beyond it are refused
+DEFAULT_MAX_PENDING_RUNS = 16
+# Log events kept in memory per run
+RUN_LOG_CAPACITY = 1_000
+# Seed used when a submission does not give one, so that its run key is still deterministic
+DEFAULT_SEED = 0
+DEFAULT_SCENARIO = "emergency_preemption"
+# Largest generated city a run may simulate
+MAX_GRID_INTERSECTIONS = 10_000
+MAX_GRID_VEHICLES = 5_000
+# Longest simulated time and departure window a run may ask for, in seconds, so no run holds a worker for long
+MAX_UNTIL_SECONDS = 24 * 3600.0
+MAX_DEPARTURE_WINDOW_S = 6 * 3600.0
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+class SimulationQueueFullError(RuntimeError):
+    """Raised when a new run is submitted while `max_pending` runs are queued or in progress."""
+
+@dataclass
+class SimulationJob:
+    """One simulation run; `log` fills while it runs, `result` is set when it is done."""
+    run_id: str
+    scenario: str
+    params: Dict[str, Any]
+    seed: int
+    log: SimulationLog
+    status: str = QUEUED
+    submitted_at: float = field(default_factory=time.time)  # Epoch seconds
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    finished: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def simulation_id(self) -> str:
+        return self.log.sim_id
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the run is done or failed, or the timeout passes. Returns whether it finished."""
+        return self.finished.wait(timeout)
+
+def simulation_job_to_dict(job: SimulationJob) -> dict:
+    return {
+        "run_id": job.run_id,
+        "simulation_id": job.simulation_id,
+        "scenario": job.scenario,
+        "params": job.params,
+        "seed": job.seed,
+        "status": job.status,
+        "submitted_at": job.submitted_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": job.result,
+        "error": job.error,
+    }
+
+def _run_emergency_preemption(simulation: TrafficSimulation, params: dict, seed: int) -> dict:
+    simulation.run_emergency_preemption_scenario()
+    return {"signal_states": {signal_id: dict(signal.current_state) for signal_id, signal in simulation.signals.items()}}
+
+def _run_grid_city(simulation: TrafficSimulation, params: dict, seed: int) -> dict:
+    scenario = generate_grid_city(params["rows"], params["cols"], params["vehicles"],
+                                  departure_window_s=params["departure_window_s"], seed=seed)
+    simulation.load_scenario(scenario)
+    return simulation.run_event_driven(until=params["until"])
+
+def _check_grid_city(params: dict) -> None:
+    if params["rows"] < 1 or params["cols"] < 1:
+        raise ValueError("A grid city needs at least one row and one column.")
+    if params["rows"] * params["cols"] > MAX_GRID_INTERSECTIONS or params["vehicles"] > MAX_GRID_VEHICLES:
+        raise ValueError(f"A grid city run is limited to {MAX_GRID_INTERSECTIONS} intersections and {MAX_GRID_VEHICLES} vehicles.")
+    if not 0 < params["until"] <= MAX_UNTIL_SECONDS:
+        raise ValueError(f"'until' must be positive and at most {MAX_UNTIL_SECONDS:g} seconds.")
+    if not 0 <= params["departure_window_s"] <= MAX_DEPARTURE_WINDOW_S:
+        raise ValueError(f"'departure_window_s' must be between 0 and {MAX_DEPARTURE_WINDOW_S:g} seconds.")
+
+# Scenario name -> (parameter defaults, validation or None, runner). A parameter's type is that of its default.
+SCENARIOS: Dict[str, Tuple[Dict[str, Any], Optional[Callable[[dict], None]], Callable[[TrafficSimulation, dict, int], dict]]] = {
+    "emergency_preemption": ({}, None, _run_emergency_preemption),
+    "grid_city": ({"rows": 5, "cols": 5, "vehicles": 10, "departure_window_s": 600.0, "until": 3600.0},
+                  _check_grid_city, _run_grid_city),
+}
+
+def _normalize_params(scenario: str, params: Optional[dict]) -> Dict[str, Any]:
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario '{scenario}'. Known scenarios: {', '.join(sorted(SCENARIOS))}.")
+    defaults, check, _ = SCENARIOS[scenario]
+    params = params or {}
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown parameters for scenario '{scenario}': {', '.join(sorted(unknown))}.")
+    normalized = {}
+    for name, default in defaults.items():
+        value = params.get(name, default)
+        if isinstance(default, float) and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if type(value) is not type(default):
+            raise ValueError(f"Parameter '{name}' must be of type {type(default).__name__}.")
+        if isinstance(value, (int, float)) and value < 0:
+            raise ValueError(f"Parameter '{name}' must not be negative.")
+        normalized[name] = value
+    if check is not None:
+        check(normalized)
+    return normalized
+
+def run_key(scenario: str, params: Optional[dict] = None, seed: int = DEFAULT_SEED) -> str:
+    """
+    Returns the run ID of a scenario, parameters and seed: the same for every submission of
+    the same run, whichever parameters were left at their defaults.
+
+    Raises:
+        ValueError: If the scenario is unknown or a parameter is invalid.
+    """
+    if type(seed) is not int:
+        raise ValueError("'seed' must be an integer.")
+    canonical = json.dumps([scenario, _normalize_params(scenario, params), seed], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:20]
+
+class SimulationJobManager:
+    """Runs simulations on a worker pool and memoizes them by run key."""
+
+    def __init__(self, workers: int = SIMULATION_WORKERS, cache_size: int = DEFAULT_RESULT_CACHE_SIZE,
+                 log_capacity: int = RUN_LOG_CAPACITY, max_pending: int = DEFAULT_MAX_PENDING_RUNS):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.log_capacity = log_capacity
+        self.max_pending = max_pending
+        self._pending = 0  # Runs queued or in progress, including any forgotten by clear()
+        self._jobs: "OrderedDict[str, SimulationJob]" = OrderedDict()  # Least recently used first
+        self._latest: Optional[SimulationJob] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def submit(self, scenario: str = DEFAULT_SCENARIO, params: Optional[dict] = None,
+               seed: int = DEFAULT_SEED) -> SimulationJob:
+        """
+        Queues a run, or returns the run with the same key if one is queued, running or done.
+        A failed run is retried.
+
+        Raises:
+            ValueError: If the scenario is unknown or a parameter is invalid.
+            SimulationQueueFullError: If the run is new and `max_pending` runs are unfinished.
+        """
+        run_id = run_key(scenario, params, seed)
+        with self._lock:
+            job = self._jobs.get(run_id)
+            if job is not None and job.status != FAILED:
+                self._jobs.move_to_end(run_id)
+            else:
+                if self._pending >= self.max_pending:
+                    raise SimulationQueueFullError(
+                        f"{self._pending} simulation runs are already queued or in progress; try again later.")
+                job = SimulationJob(run_id=run_id, scenario=scenario, params=_normalize_params(scenario, params), seed=seed,
+                                    log=SimulationLog(f"SimRun_{run_id[:8]}", capacity=self.log_capacity))
+                self._jobs[run_id] = job
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='simulation')
+                self._executor.submit(self._run, job)
+                self._pending += 1
+                self._evict()
+            self._latest = job
+        return job
+
+    def get(self, run_id: str) -> Optional[SimulationJob]:
+        """Returns a run by ID (marking it recently used), or None if it is unknown or was evicted."""
+        with self._lock:
+            job = self._jobs.get(run_id)
+            if job is not None:
+                self._jobs.move_to_end(run_id)
+            return job
+
+    def latest(self) -> Optional[SimulationJob]:
+        """Returns the most recently submitted run."""
+        return self._latest
+
+    def _evict(self) -> None:
+        excess = len(self._jobs) - self.cache_size
+        if excess <= 0:
+            return
+        for run_id in [run_id for run_id, job in self._jobs.items() if job.finished.is_set()][:excess]:
+            del self._jobs[run_id]
+
+    def _run(self, job: SimulationJob) -> None:
+        job.status, job.started_at = RUNNING, time.time()
+        _, _, runner = SCENARIOS[job.scenario]
+        try:
+            simulation = TrafficSimulation(sim_id=job.simulation_id, log=job.log)
+            job.result = runner(simulation, job.params, job.seed)
+            job.status = DONE
+        except Exception as e:
+            job.error, job.status = str(e), FAILED
+        job.finished_at = time.time()
+        job.log.append("Run %s %s in %.3f s.", job.run_id, job.status, job.finished_at - job.started_at)
+        job.finished.set()
+        with self._lock:
+            self._pending -= 1
+            self._evict()
+
+    def clear(self) -> None:
+        """Forgets every run; runs in progress finish unrecorded."""
+        with self._lock:
+            self._jobs.clear()
+            self._latest = None
+
+    def shutdown(self) -> None:
+        """Waits for queued runs to finish and stops the workers."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
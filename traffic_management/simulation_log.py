@@ -0,0 +1,144 @@
+"""
+Bounded log of simulation events.
+
+A TrafficSimulation used to keep every event as a formatted string in a list, so a long
+event-driven run grew without limit and paid for string formatting whether or not the log
+was ever read. A SimulationLog instead keeps the most recent `capacity` events as records
+of a %-style message and its arguments, numbered by a sequence that keeps counting after
+older records are dropped; a record is formatted only when it is read. With a spill file,
+records leaving the buffer are appended to it as text, so the full log survives on disk
+while memory stays constant.
+
+Reading it as a sequence (`log[-5:]`, `for line in log`) yields formatted lines, as the
+old list did; since() pages through the records by sequence number.
+"""
+import threading
+import time
+from collections import deque
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# Records kept in memory per simulation
+DEFAULT_LOG_CAPACITY = 10_000
+
+class LogRecord(NamedTuple):
+    """One simulation event; `text` formats it on demand."""
+    sequence: int
+    time: float  # Epoch seconds
+    message: str  # %-style template
+    args: tuple
+
+    @property
+    def text(self) -> str:
+        return self.message % self.args if self.args else self.message
+
+    def to_dict(self) -> dict:
+        return {"sequence": self.sequence, "time": self.time, "message": self.text}
+
+class SimulationLog:
+    """
+    Ring buffer of the most recent simulation events, optionally spilling older ones to a file.
+
+    Formatted lines read `[<sim_id> Log] <message>`.
+    """
+
+    def __init__(self, sim_id: str, capacity: int = DEFAULT_LOG_CAPACITY, spill_path: Optional[str] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self.sim_id = sim_id
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._prefix = f"[{sim_id} Log] "
+        self._records: deque = deque()
+        self._next_sequence = 1
+        self._spill_file = None
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)  # Signalled on append while someone waits
+        self._waiters = 0
+
+    def append(self, message: str, *args) -> None:
+        """Records an event; `message` is formatted with `args` (%-style) only when read."""
+        with self._lock:
+            records = self._records
+            if len(records) == self.capacity:
+                evicted = records.popleft()
+                if self.spill_path is not None:
+                    self._spill(evicted)
+            records.append(LogRecord(self._next_sequence, time.time(), message, args))
+            self._next_sequence += 1
+            if self._waiters:
+                self._condition.notify_all()
+
+    def _spill(self, record: LogRecord) -> None:
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, 'a', encoding='utf-8')
+        self._spill_file.write(f"{record.sequence}\t{record.time:.6f}\t{self.format(record)}\n")
+
+    def format(self, record: LogRecord) -> str:
+        return self._prefix + record.text
+
+    @property
+    def next_sequence(self) -> int:
+        """Sequence number the next record gets; pass the last one read as since()."""
+        return self._next_sequence
+
+    @property
+    def dropped(self) -> int:
+        """Number of records no longer held in memory (spilled, if there is a spill file)."""
+        with self._lock:
+            return self._next_sequence - 1 - len(self._records)
+
+    def since(self, sequence: int = 0, limit: Optional[int] = None) -> Tuple[List[LogRecord], int]:
+        """
+        Returns the records with a sequence number greater than `sequence`, oldest first.
+
+        Args:
+            sequence: Sequence number of the last record the caller has seen; 0 for the start.
+            limit: Most records to return; all if None.
+
+        Returns:
+            (records, sequence number of the last record returned, or `sequence` if none). Records
+            that have left the buffer are skipped.
+        """
+        with self._lock:
+            records = self._records
+            if not records:
+                return [], sequence
+            start = max(0, sequence - records[0].sequence + 1)
+            stop = len(records) if limit is None else min(len(records), start + max(0, limit))
+            page = [records[i] for i in range(start, stop)] if start < stop else []
+        return page, (page[-1].sequence if page else sequence)
+
+    def wait(self, sequence: int, timeout: Optional[float]) -> bool:
+        """Blocks until a record after `sequence` is appended or the timeout passes. Returns whether one was."""
+        with self._lock:
+            if self._next_sequence - 1 <= sequence:
+                self._waiters += 1
+                try:
+                    self._condition.wait(timeout)
+                finally:
+                    self._waiters -= 1
+            return self._next_sequence - 1 > sequence
+
+    def records(self) -> List[LogRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def close(self) -> None:
+        """Flushes and closes the spill file; later spills reopen it."""
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.format(record) for record in self.records())
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        with self._lock:
+            if isinstance(index, slice):
+                records = self._records
+                return [self.format(records[i]) for i in range(*index.indices(len(records)))]
+            return self.format(self._records[index])
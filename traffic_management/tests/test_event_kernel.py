@@ -0,0 +1,99 @@
+import unittest
+from traffic_management.event_kernel import EventKernel
+from traffic_management.models import EmergencyVehicle
+from traffic_management.scenarios import generate_grid_city, grid_signal_id
+from traffic_management.simulation import TrafficSimulation
+
+class TestEventKernel(unittest.TestCase):
+    """Unit tests for the discrete-event kernel."""
+
+    def setUp(self):
+        self.kernel = EventKernel()
+        self.fired = []
+
+    def record(self, label):
+        self.fired.append((self.kernel.now, label))
+
+    def test_events_run_in_time_then_schedule_order(self):
+        self.kernel.schedule(5.0, self.record, "b")
+        self.kernel.schedule(1.0, self.record, "a")
+        self.kernel.schedule(5.0, self.record, "c")
+        self.assertEqual(self.kernel.run(), 3)
+        self.assertEqual(self.fired, [(1.0, "a"), (5.0, "b"), (5.0, "c")])
+
+    def test_handlers_can_schedule_more_events(self):
+        def chain(remaining):
+            self.record(remaining)
+            if remaining:
+                self.kernel.schedule_in(2.0, chain, remaining - 1)
+        self.kernel.schedule(0.0, chain, 3)
+        self.kernel.run()
+        self.assertEqual([t for t, _ in self.fired], [0.0, 2.0, 4.0, 6.0])
+
+    def test_cancelled_events_do_not_run(self):
+        event = self.kernel.schedule(1.0, self.record, "cancelled")
+        self.kernel.schedule(2.0, self.record, "kept")
+        self.kernel.cancel(event)
+        self.assertEqual(self.kernel.peek_time(), 2.0)
+        self.kernel.run()
+        self.assertEqual(self.fired, [(2.0, "kept")])
+
+    def test_run_until_stops_and_advances_clock(self):
+        self.kernel.schedule(1.0, self.record, "a")
+        self.kernel.schedule(10.0, self.record, "b")
+        self.assertEqual(self.kernel.run(until=5.0), 1)
+        self.assertEqual(self.kernel.now, 5.0)
+        self.assertEqual(self.kernel.peek_time(), 10.0)
+
+    def test_events_in_the_past_run_now(self):
+        self.kernel.run(until=5.0)
+        self.kernel.schedule(1.0, self.record, "late")
+        self.kernel.run()
+        self.assertEqual(self.fired, [(5.0, "late")])
+
+class TestGridScenario(unittest.TestCase):
+    """Tests for the grid city generator and event-driven simulation runs."""
+
+    def test_generate_grid_city(self):
+        scenario = generate_grid_city(rows=3, cols=4, vehicle_count=5, seed=1)
+        self.assertEqual(len(scenario.signals), 12)
+        self.assertEqual(len(scenario.vehicles), 5)
+        signal_ids = {signal.id for signal in scenario.signals}
+        for vehicle in scenario.vehicles:
+            self.assertTrue(set(vehicle.route) <= signal_ids)
+            self.assertIn(vehicle.id, scenario.departures)
+        # The same seed gives the same scenario
+        again = generate_grid_city(rows=3, cols=4, vehicle_count=5, seed=1)
+        self.assertEqual([v.route for v in again.vehicles], [v.route for v in scenario.vehicles])
+        with self.assertRaises(ValueError):
+            generate_grid_city(rows=0, cols=4, vehicle_count=1)
+
+    def test_run_event_driven_completes_all_trips(self):
+        simulation = TrafficSimulation(sim_id="TestGridSim")
+        simulation.load_scenario(generate_grid_city(rows=4, cols=4, vehicle_count=6, departure_window_s=120, seed=3))
+        stats = simulation.run_event_driven()
+        self.assertEqual(stats["vehicles_arrived"], 6)
+        self.assertTrue(all(v.status == "arrived" for v in simulation.emergency_vehicles.values()))
+        self.assertEqual(stats["preemptions"], sum(len(v.route) for v in simulation.emergency_vehicles.values()))
+        self.assertGreater(stats["signal_transitions"], 0)
+        # No signal is left held by preemption once every vehicle has passed
+        for signal_id in simulation.signals:
+            self.assertFalse(simulation.controller.get_current_phase(signal_id)["suspended"])
+
+    def test_preempted_signal_is_green_for_approaching_vehicle(self):
+        simulation = TrafficSimulation(sim_id="TestPreemptSim")
+        simulation.load_scenario(generate_grid_city(rows=1, cols=3, vehicle_count=0, seed=5))
+        # A single eastbound vehicle, about 170 m west of the first signal
+        start = simulation.signals[grid_signal_id(0, 0)].location
+        ev = EmergencyVehicle("EV_T", "ambulance", (start[0], start[1] - 0.002), 50.0,
+                              [grid_signal_id(0, 0), grid_signal_id(0, 1)], "en_route_to_emergency")
+        simulation.emergency_vehicles[ev.id] = ev
+        simulation.departures[ev.id] = 0.0
+
+        simulation.run_event_driven(until=10.0) # Within the lead time of the first signal
+        self.assertEqual(simulation.signals[grid_signal_id(0, 0)].current_state,
+                         {"north_south": "red", "east_west": "green"})
+        self.assertTrue(simulation.controller.get_current_phase(grid_signal_id(0, 0))["suspended"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import logging
+import unittest
+from traffic_management import event_log
+from traffic_management.models import TrafficSignal
+from traffic_management.signal_controller import SignalController
+
+class _CountingDict(dict):
+    """A state dict that counts how often it is formatted."""
+    calls = 0
+
+    def __repr__(self):
+        type(self).calls += 1
+        return super().__repr__()
+
+    __str__ = __repr__
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+class TestEventLog(unittest.TestCase):
+    """Tests for the traffic_management logging surface."""
+
+    def setUp(self):
+        self.controller = SignalController(controller_id="LogCtrl")
+        self.signal = TrafficSignal("sig_1", (0, 0), {"north_south": "red", "east_west": "red"}, [], {"green": 30})
+        self.controller.register_signal(self.signal)
+
+    def tearDown(self):
+        event_log.stop_async_logging()
+        logging.getLogger(event_log.LOGGER_NAME).setLevel(logging.NOTSET)
+
+    def test_records_carry_structured_fields(self):
+        with self.assertLogs("traffic_management", level="DEBUG") as captured:
+            self.controller.set_signal_state("sig_1", {"north_south": "green"})
+            self.controller.handle_emergency_vehicle_approach("ev_1", (0, 0), ["sig_1"], emergency_state={"east_west": "green"})
+        events = [(record.event, getattr(record, "signal_id", None)) for record in captured.records]
+        self.assertIn(("signal_state_changed", "sig_1"), events)
+        self.assertIn(("preemption_started", "sig_1"), events)
+
+    def test_disabled_levels_skip_formatting(self):
+        logging.getLogger(event_log.LOGGER_NAME).setLevel(logging.WARNING)
+        _CountingDict.calls = 0
+        for _ in range(100):
+            self.controller.set_signal_state("sig_1", _CountingDict(north_south="green"))
+        self.assertEqual(_CountingDict.calls, 0)
+        self.assertEqual(self.signal.current_state["north_south"], "green")
+
+        logging.getLogger(event_log.LOGGER_NAME).setLevel(logging.DEBUG)
+        with self.assertLogs("traffic_management", level="DEBUG"):
+            self.controller.set_signal_state("sig_1", _CountingDict(north_south="red"))
+        self.assertEqual(_CountingDict.calls, 1)
+
+    def test_async_logging_delivers_records_through_listener(self):
+        handler = _ListHandler()
+        event_log.start_async_logging([handler], level=logging.DEBUG)
+        with self.assertRaises(RuntimeError):
+            event_log.start_async_logging([handler])
+        self.controller.set_signal_state("sig_1", {"north_south": "green"})
+        event_log.stop_async_logging() # Flushes the queue
+        self.assertTrue(any(getattr(record, "event", None) == "signal_state_changed" for record in handler.records))
+        self.assertNotIn(handler, logging.getLogger(event_log.LOGGER_NAME).handlers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from traffic_management import inventory
+
+CSV_INVENTORY = """signal_id,lat,lon,current_state,lanes_controlled,green,yellow,red
+TS100,40.1,-74.2,north_south=red|east_west=green,nb|sb|eb|wb,30,4,
+TS101,40.2,-74.3,main_st=green|side_st=red,,45,,20
+"""
+
+class TestSignalInventory(unittest.TestCase):
+    """Tests for the declarative signal inventory loader and snapshots."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_default_inventory_loads(self):
+        signals = inventory.load_signal_inventory(inventory.DEFAULT_INVENTORY_PATH)
+        self.assertEqual([signal.id for signal in signals], ["TS001", "TS002"])
+        self.assertEqual(signals[0].location, (10, 20))
+        self.assertEqual(signals[0].current_state, {"north_south": "red", "east_west": "green"})
+
+    def test_csv_inventory(self):
+        signals = inventory.load_signal_inventory(self.write("signals.csv", CSV_INVENTORY))
+        self.assertEqual(len(signals), 2)
+        self.assertEqual(signals[0].current_state, {"north_south": "red", "east_west": "green"})
+        self.assertEqual(signals[0].lanes_controlled, ["nb", "sb", "eb", "wb"])
+        self.assertEqual(signals[0].default_timing, {"green": 30.0, "yellow": 4.0})
+        self.assertEqual(signals[1].lanes_controlled, [])
+        self.assertEqual(signals[1].default_timing, {"green": 45.0, "red": 20.0})
+
+    def test_invalid_inventories_are_rejected(self):
+        duplicate = [{"signal_id": "A", "location": [0, 0], "current_state": {"x": "red"}}] * 2
+        with self.assertRaises(ValueError):
+            inventory.load_signal_inventory(self.write("dup.json", json.dumps(duplicate)))
+        with self.assertRaises(ValueError):
+            inventory.load_signal_inventory(self.write("missing.json", json.dumps([{"signal_id": "A"}])))
+        with self.assertRaises(ValueError):
+            inventory.load_signal_inventory(self.write("signals.yaml", ""))
+
+    def test_build_controller_writes_and_reuses_snapshot(self):
+        source = self.write("signals.csv", CSV_INVENTORY)
+        snapshot = os.path.join(self.temp_dir.name, "signals.snapshot")
+        controller = inventory.build_controller("Ctrl", source, snapshot)
+        self.assertEqual(sorted(controller.signals), ["TS100", "TS101"])
+        self.assertTrue(os.path.exists(snapshot))
+
+        cached = inventory.load_snapshot(snapshot, source)
+        self.assertEqual([signal.id for signal in cached], ["TS100", "TS101"])
+
+        # Editing the inventory makes the snapshot stale
+        os.utime(source, (0, os.path.getmtime(source) + 10))
+        self.assertIsNone(inventory.load_snapshot(snapshot, source))
+        self.assertIsNone(inventory.load_snapshot(os.path.join(self.temp_dir.name, "absent"), source))
+
+    def test_snapshot_of_another_format_version_is_ignored(self):
+        source = self.write("signals.csv", CSV_INVENTORY)
+        snapshot = os.path.join(self.temp_dir.name, "signals.snapshot")
+        inventory.save_snapshot(inventory.load_signal_inventory(source), snapshot, source)
+        with open(snapshot, "rb") as f:
+            payload = pickle.load(f)
+        payload["version"] = inventory.SNAPSHOT_FORMAT_VERSION - 1  # e.g. signals pickled without a version
+        with open(snapshot, "wb") as f:
+            pickle.dump(payload, f)
+        self.assertIsNone(inventory.load_snapshot(snapshot, source))
+        controller = inventory.build_controller("Ctrl", source, snapshot)
+        self.assertEqual(controller.signals["TS100"].version, 0)
+
+    def test_api_builds_controller_lazily(self):
+        from traffic_management import api
+        original = api._global_traffic_controller
+        try:
+            api._global_traffic_controller = None
+            controller = api.get_global_traffic_controller()
+            self.assertIs(api.global_traffic_controller, controller)
+            self.assertEqual(sorted(controller.signals), ["TS001", "TS002"])
+        finally:
+            api._global_traffic_controller = original
+
+if __name__ == '__main__':
+    unittest.main()
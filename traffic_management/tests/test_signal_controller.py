@@ -1,4 +1,10 @@
+import time
 import unittest
+from unittest import mock
+
+from flask import Flask
+
+from traffic_management import api
 from traffic_management.models import TrafficSignal # EmergencyVehicle not used in tests directly yet
 from traffic_management.signal_controller import SignalController
 
@@ -52,6 +58,39 @@ class TestSignalController(unittest.TestCase):
         # Other aspects of signal1 should remain as they were if not specified in new_state
         self.assertEqual(self.controller.signals["signal_001"].current_state["east_west"], self.signal1_original_full_state["east_west"])
 
+    def test_state_and_timing_changes_bump_version(self):
+        """Test that state changes and timing plans bump the signal's version and change time."""
+        self.assertEqual(self.signal1.version, 0)
+        self.assertIsNone(self.signal1.last_changed)
+        self.controller.set_signal_state("signal_001", {"north_south": "green"})
+        self.controller.set_timing_plan("signal_001", {"green": 20, "yellow": 4})
+        self.assertEqual(self.signal1.version, 2)
+        self.assertIsNotNone(self.signal1.last_changed)
+        self.assertEqual(self.signal2.version, 0)
+
+    def test_rejected_and_unchanged_states_keep_version(self):
+        """Test that a rejected or no-op state change does not bump the signal's version."""
+        self.controller.set_signal_state("signal_001", {"north_south": "purple"})
+        self.controller.set_signal_state("signal_001", {"unknown_aspect": "green"})
+        self.controller.set_signal_state("signal_001", {"north_south": "red"}) # Already red
+        self.assertEqual(self.signal1.version, 0)
+        self.assertIsNone(self.signal1.last_changed)
+        self.controller.set_signal_state("signal_001", {"east_west": "green", "north_south": "purple"})
+        self.assertEqual(self.signal1.current_state["east_west"], "green") # Applied before the invalid aspect
+        self.assertEqual(self.signal1.version, 1)
+
+    def test_change_listeners(self):
+        """Test that listeners hear about direct, timing plan and normal cycle changes."""
+        changed = []
+        self.controller.add_change_listener(changed.append)
+        self.controller.set_signal_state("signal_002", {"main_street_flow": "green"})
+        self.controller.start_normal_operation(["signal_001"])
+        self.controller.set_timing_plan("signal_001", {"green": 20, "yellow": 4})
+        self.assertEqual(changed, ["signal_002", "signal_001", "signal_001", "signal_001"])
+        self.controller.remove_change_listener(changed.append)
+        self.controller.set_signal_state("signal_002", {"main_street_flow": "red"})
+        self.assertEqual(len(changed), 4)
+
     def test_set_signal_state_invalid_signal_id(self):
         """Test setting state for an unregistered signal ID."""
         # This should be handled gracefully by set_signal_state (e.g., print error, not raise exception)
@@ -196,5 +235,124 @@ class TestSignalController(unittest.TestCase):
         self.assertEqual(self.controller.signals["signal_002"].current_state, self.signal2_original_full_state,
                          "Signal 2 state should remain unaffected.")
 
+    def test_start_normal_operation_applies_first_phase(self):
+        """Starting the cycle gives the first vehicle aspect green and leaves pedestrian aspects alone."""
+        self.controller.start_normal_operation()
+        self.assertEqual(self.signal1.current_state, {"north_south": "green", "east_west": "red", "pedestrian_button": "off"})
+        self.assertEqual(self.signal2.current_state, {"main_street_flow": "green", "side_street_access": "red"})
+        self.assertEqual(self.controller.next_transition_time(), 30.0)
+
+    def test_update_steps_through_full_cycle(self):
+        """Signal 1 cycles green(30) -> yellow(5) for each aspect, then wraps around."""
+        self.controller.start_normal_operation(["signal_001"])
+        self.assertEqual(self.controller.update(29.9), 0)
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "green")
+        self.assertEqual(self.controller.update(0.1), 1)
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "yellow")
+        self.controller.update(5)
+        self.assertEqual(self.signal1.current_state["north_south"], "red")
+        self.assertEqual(self.signal1.current_state["east_west"], "green")
+        self.controller.update(35)
+        self.assertEqual(self.controller.get_current_phase("signal_001")["phase_index"], 0)
+        self.assertEqual(self.signal1.current_state["north_south"], "green")
+
+    def test_update_with_large_step_applies_every_due_transition(self):
+        """One coarse step applies all transitions that came due, without drifting the schedule."""
+        self.controller.start_normal_operation(["signal_002"]) # green 40, no yellow
+        self.assertEqual(self.controller.update(85), 2)
+        self.assertEqual(self.signal2.current_state, {"main_street_flow": "green", "side_street_access": "red"})
+        self.assertEqual(self.controller.next_transition_time(), 120.0)
+
+    def test_offsets_start_signals_mid_cycle(self):
+        self.controller.start_normal_operation(["signal_001"], offsets={"signal_001": 32})
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "yellow")
+        self.assertEqual(self.controller.next_transition_time(), 3.0)
+
+    def test_stop_normal_operation_freezes_state(self):
+        self.controller.start_normal_operation()
+        self.controller.stop_normal_operation(["signal_001"])
+        self.controller.update(100)
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "green")
+        self.assertIsNone(self.controller.get_current_phase("signal_001"))
+        self.assertIsNotNone(self.controller.get_current_phase("signal_002"))
+
+    def test_set_timing_plan_restarts_cycle(self):
+        self.controller.start_normal_operation(["signal_002"])
+        self.controller.update(10)
+        self.controller.set_timing_plan("signal_002", {"green": 15, "yellow": 3})
+        self.assertEqual(self.controller.next_transition_time(), 25.0)
+        self.controller.update(15)
+        self.assertEqual(self.signal2.get_aspect_state("main_street_flow"), "yellow")
+
+    def test_invalid_timing_plan_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.controller.set_timing_plan("signal_001", {"red": 30})
+        with self.assertRaises(ValueError):
+            self.controller.start_normal_operation(["unknown_signal"])
+
+    def test_emergency_preemption_suspends_and_resumes_cycle(self):
+        """Only the preempted signal stops cycling; it resumes after the all-red clearance."""
+        self.controller.start_normal_operation()
+        self.controller.handle_emergency_vehicle_approach("ambulance_1", (0, 0), ["signal_001"])
+        self.assertTrue(self.controller.get_current_phase("signal_001")["suspended"])
+        self.controller.update(50)
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "green") # Held by preemption
+        self.assertEqual(self.signal2.get_aspect_state("side_street_access"), "green") # Kept cycling
+
+        self.controller.end_emergency_preemption(signal_id_to_reset="signal_001")
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "red")
+        self.controller.update(1.9)
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "red")
+        self.controller.update(0.1)
+        phase = self.controller.get_current_phase("signal_001")
+        self.assertFalse(phase["suspended"])
+        self.assertEqual(phase["phase_index"], 0)
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "green")
+
+    def test_set_timing_plan_during_preemption_keeps_hold(self):
+        """A new timing plan does not restart cycling on a preempted signal; the cycle uses it once resumed."""
+        self.controller.start_normal_operation(["signal_001"])
+        held_state = {"north_south": "red", "east_west": "green", "pedestrian_button": "off"}
+        self.controller.handle_emergency_vehicle_approach("ambulance_1", (0, 0), ["signal_001"], emergency_state=held_state)
+        self.controller.set_timing_plan("signal_001", {"green": 10, "yellow": 2})
+        self.assertEqual(self.signal1.current_state, held_state)
+        self.assertTrue(self.controller.get_current_phase("signal_001")["suspended"])
+        self.controller.update(100)
+        self.assertEqual(self.signal1.current_state, held_state)
+
+        self.controller.end_emergency_preemption(signal_id_to_reset="signal_001")
+        self.controller.update(2)
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "green")
+        self.controller.update(10)
+        self.assertEqual(self.signal1.get_aspect_state("north_south"), "yellow")
+
+class TestSignalApiCycles(unittest.TestCase):
+    """The API's global controller cycles its signals on the wall clock."""
+
+    def setUp(self):
+        patcher = mock.patch.object(api, "_global_traffic_controller", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # TS001 in the default inventory cycles north_south green 30 s, yellow 5 s, then east_west: 70 s
+        self.now = 70 * 24_000_000
+        clock = mock.patch.object(api, "time", wraps=time)
+        self.time = clock.start()
+        self.addCleanup(clock.stop)
+        self.time.time.side_effect = lambda: self.now
+        app = Flask(__name__)
+        app.register_blueprint(api.traffic_bp)
+        self.client = app.test_client()
+
+    def test_reads_show_phase_changes(self):
+        first = self.client.get('/traffic/signals/TS001')
+        self.assertEqual(first.json["current_state"], {"north_south": "green", "east_west": "red"})
+        self.now += 31
+        second = self.client.get('/traffic/signals/TS001', headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json["current_state"], {"north_south": "yellow", "east_west": "red"})
+        self.now += 70 * 10 + 4  # Ten whole cycles later, 5 s into the east_west green
+        listed = {signal["signal_id"]: signal for signal in self.client.get('/traffic/signals').json}
+        self.assertEqual(listed["TS001"]["current_state"], {"north_south": "red", "east_west": "green"})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,163 @@
+import threading
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from traffic_management import api, simulation_jobs
+from traffic_management.simulation_jobs import SimulationJobManager, SimulationQueueFullError, run_key
+
+class TestSimulationJobManager(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = SimulationJobManager(workers=2, cache_size=3)
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+        def counting_runner(simulation, params, seed):
+            self.calls.append((params["size"], seed))
+            self.release.wait(5)
+            simulation.log_event("Counted size %d.", params["size"])
+            if params["size"] == 13:
+                raise RuntimeError("unlucky size")
+            return {"size": params["size"], "seed": seed}
+
+        patcher = mock.patch.dict(simulation_jobs.SCENARIOS, {"counting": ({"size": 1}, None, counting_runner)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.manager.shutdown)
+
+    def test_run_key_is_deterministic(self):
+        self.assertEqual(run_key("grid_city", {}, 1), run_key("grid_city", {"rows": 5, "until": 3600}, 1))
+        self.assertNotEqual(run_key("grid_city", {}, 1), run_key("grid_city", {}, 2))
+        self.assertNotEqual(run_key("grid_city", {"rows": 6}, 1), run_key("grid_city", {}, 1))
+
+    def test_rejects_invalid_runs(self):
+        for scenario, params, seed in (("nope", None, 0), ("grid_city", {"lanes": 2}, 0), ("grid_city", {"rows": "5"}, 0),
+                                       ("grid_city", {"rows": 1000, "cols": 1000}, 0), ("grid_city", {"rows": 0}, 0),
+                                       ("grid_city", {"vehicles": -1}, 0), ("grid_city", None, 1.5),
+                                       ("grid_city", {"until": 1e12}, 0), ("grid_city", {"until": float("nan")}, 0), ("grid_city", {"departure_window_s": float("nan")}, 0),
+                                       ("grid_city", {"departure_window_s": simulation_jobs.MAX_DEPARTURE_WINDOW_S + 1}, 0)):
+            with self.assertRaises(ValueError):
+                self.manager.submit(scenario, params, seed)
+
+    def test_memoizes_runs(self):
+        job = self.manager.submit("counting", {"size": 2}, seed=7)
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.result, {"size": 2, "seed": 7})
+        self.assertIs(self.manager.submit("counting", {"size": 2}, seed=7), job)
+        self.assertIs(self.manager.get(job.run_id), job)
+        self.assertEqual(self.calls, [(2, 7)])
+        self.assertIn("Counted size 2.", job.log[-2])
+
+    def test_in_progress_runs_are_shared(self):
+        self.release.clear()
+        job = self.manager.submit("counting", {"size": 3})
+        self.assertIs(self.manager.submit("counting", {"size": 3}), job)
+        self.assertFalse(job.finished.is_set())
+        self.release.set()
+        self.assertTrue(job.wait(5))
+        self.assertEqual(self.calls, [(3, 0)])
+
+    def test_evicts_least_recently_used_finished_runs(self):
+        jobs = [self.manager.submit("counting", {"size": size}) for size in range(3)]
+        for job in jobs:
+            job.wait(5)
+        self.manager.get(jobs[0].run_id)  # Recently used again
+        self.manager.submit("counting", {"size": 3}).wait(5)
+        self.assertEqual(len(self.manager), 3)
+        self.assertIsNotNone(self.manager.get(jobs[0].run_id))
+        self.assertIsNone(self.manager.get(jobs[1].run_id))
+
+    def test_failed_runs_are_retried(self):
+        job = self.manager.submit("counting", {"size": 13})
+        job.wait(5)
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "unlucky size")
+        retry = self.manager.submit("counting", {"size": 13})
+        self.assertIsNot(retry, job)
+        retry.wait(5)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_refuses_new_runs_when_queue_is_full(self):
+        manager = SimulationJobManager(workers=1, max_pending=2)
+        self.addCleanup(manager.shutdown)
+        self.release.clear()
+        jobs = [manager.submit("counting", {"size": size}) for size in range(2)]
+        with self.assertRaises(SimulationQueueFullError):
+            manager.submit("counting", {"size": 2})
+        self.assertIs(manager.submit("counting", {"size": 1}), jobs[1])  # Existing runs are still shared
+        manager.clear()  # Forgotten runs still hold their places until they finish
+        with self.assertRaises(SimulationQueueFullError):
+            manager.submit("counting", {"size": 2})
+        self.release.set()
+        for job in jobs:
+            self.assertTrue(job.wait(5))
+        self.assertTrue(manager.submit("counting", {"size": 2}).wait(5))
+
+    def test_runs_grid_city(self):
+        job = self.manager.submit("grid_city", {"rows": 3, "cols": 3, "vehicles": 2, "until": 600}, seed=4)
+        self.assertTrue(job.wait(30))
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.result["simulated_seconds"], 600)
+        self.assertEqual(self.manager.latest(), job)
+
+class TestSimulationRunApi(unittest.TestCase):
+
+    def setUp(self):
+        api._simulation_jobs.clear()
+        app = Flask(__name__)
+        app.register_blueprint(api.traffic_bp)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        api._simulation_jobs.clear()
+
+    def test_submit_and_poll(self):
+        payload = {"scenario": "grid_city", "params": {"rows": 3, "cols": 3, "vehicles": 2, "until": 600}, "seed": 5}
+        submitted = self.client.post('/traffic/simulation/run', json=payload)
+        self.assertIn(submitted.status_code, (200, 202))
+        run_id = submitted.json["run_id"]
+        polled = self.client.get(f'/traffic/simulation/runs/{run_id}?wait=30')
+        self.assertEqual(polled.status_code, 200)
+        self.assertEqual(polled.json["status"], "done")
+        self.assertEqual(polled.json["result"]["simulated_seconds"], 600)
+        again = self.client.post('/traffic/simulation/run', json=payload)
+        self.assertEqual(again.status_code, 200)  # Memoized
+        self.assertEqual(again.json["run_id"], run_id)
+        self.assertEqual(again.json["started_at"], polled.json["started_at"])
+        log = self.client.get(f'/traffic/simulation/runs/{run_id}/log?limit=2').json
+        self.assertEqual(len(log["log"]), 2)
+
+    def test_stream_ends_with_result(self):
+        run_id = self.client.post('/traffic/simulation/run', json={}).json["run_id"]
+        response = self.client.get(f'/traffic/simulation/runs/{run_id}/events')
+        self.assertEqual(response.mimetype, "text/event-stream")
+        body = response.get_data(as_text=True)
+        self.assertIn("event: log", body)
+        self.assertTrue(body.rstrip().split("\n\n")[-1].startswith("event: result"))
+        self.assertIn('"status":"done"', body.replace(" ", ""))
+        resumed = self.client.get(f'/traffic/simulation/runs/{run_id}/events', headers={"Last-Event-ID": "3"})
+        self.assertNotIn("id: 3\n", resumed.get_data(as_text=True))
+        self.assertIn("id: 4\n", resumed.get_data(as_text=True))
+
+    def test_full_queue_is_service_unavailable(self):
+        with mock.patch.object(api, '_simulation_jobs', SimulationJobManager(max_pending=0)):
+            response = self.client.post('/traffic/simulation/run', json={})
+            self.assertEqual(self.client.get('/traffic/simulation/log').status_code, 503)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], str(api.QUEUE_FULL_RETRY_AFTER_SECONDS))
+        self.assertIn("try again later", response.json["error"])
+
+    def test_errors(self):
+        self.assertEqual(self.client.post('/traffic/simulation/run', json={"scenario": "nope"}).status_code, 400)
+        self.assertEqual(self.client.post('/traffic/simulation/run', json={"wait": 1000}).status_code, 400)
+        self.assertEqual(self.client.post('/traffic/simulation/run', json={"scenario": "grid_city", "params": {"until": 1e12}}).status_code, 400)
+        self.assertEqual(self.client.get('/traffic/simulation/runs/missing').status_code, 404)
+        self.assertEqual(self.client.get('/traffic/simulation/runs/missing/log').status_code, 404)
+        self.assertEqual(self.client.get('/traffic/simulation/runs/missing/events').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
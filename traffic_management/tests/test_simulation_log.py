@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+
+from traffic_management import api
+from traffic_management.scenarios import generate_grid_city
+from traffic_management.simulation import TrafficSimulation
+from traffic_management.simulation_log import SimulationLog
+
+class _CountingArg:
+    """An argument that counts how often it is formatted."""
+    calls = 0
+
+    def __str__(self):
+        type(self).calls += 1
+        return "arg"
+
+class TestSimulationLog(unittest.TestCase):
+
+    def test_reads_like_a_list_of_lines(self):
+        log = SimulationLog("S1")
+        log.append("Started.")
+        log.append("%s reached %s.", "EV1", "TS1")
+        self.assertEqual(len(log), 2)
+        self.assertEqual(list(log), ["[S1 Log] Started.", "[S1 Log] EV1 reached TS1."])
+        self.assertEqual(log[-1], "[S1 Log] EV1 reached TS1.")
+        self.assertEqual(log[-5:], list(log))
+
+    def test_formats_lazily(self):
+        _CountingArg.calls = 0
+        log = SimulationLog("S1")
+        arg = _CountingArg()
+        for _ in range(100):
+            log.append("value %s", arg)
+        self.assertEqual(_CountingArg.calls, 0)
+        self.assertEqual(log[0], "[S1 Log] value arg")
+        self.assertEqual(_CountingArg.calls, 1)
+
+    def test_keeps_only_the_newest_records(self):
+        log = SimulationLog("S1", capacity=3)
+        for i in range(10):
+            log.append("event %d", i)
+        self.assertEqual(len(log), 3)
+        self.assertEqual(log.dropped, 7)
+        self.assertEqual([record.sequence for record in log.records()], [8, 9, 10])
+        self.assertEqual(log.next_sequence, 11)
+
+    def test_since_pages_by_sequence(self):
+        log = SimulationLog("S1", capacity=5)
+        for i in range(8):
+            log.append("event %d", i)
+        records, last = log.since(0, limit=2)  # Records 1-3 are gone; paging starts at the oldest kept
+        self.assertEqual([record.sequence for record in records], [4, 5])
+        records, last = log.since(last, limit=10)
+        self.assertEqual([record.text for record in records], ["event 5", "event 6", "event 7"])
+        self.assertEqual(last, 8)
+        self.assertEqual(log.since(last), ([], 8))
+        self.assertEqual(SimulationLog("S2").since(3), ([], 3))
+
+    def test_spills_evicted_records_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sim.log")
+            log = SimulationLog("S1", capacity=2, spill_path=path)
+            for i in range(5):
+                log.append("event %d", i)
+            log.close()
+            with open(path) as f:
+                lines = f.read().splitlines()
+        self.assertEqual([line.split("\t")[0] for line in lines], ["1", "2", "3"])
+        self.assertEqual(lines[-1].split("\t")[2], "[S1 Log] event 2")
+        self.assertEqual(list(log), ["[S1 Log] event 3", "[S1 Log] event 4"])
+
+    def test_rejects_empty_capacity(self):
+        with self.assertRaises(ValueError):
+            SimulationLog("S1", capacity=0)
+
+    def test_long_run_stays_bounded(self):
+        simulation = TrafficSimulation(sim_id="BoundedSim", log_capacity=50)
+        simulation.load_scenario(generate_grid_city(rows=4, cols=4, vehicle_count=6, seed=3))
+        stats = simulation.run_event_driven(until=1800)
+        self.assertEqual(len(simulation.log), 50)
+        self.assertGreater(simulation.log.dropped, 0)
+        self.assertIn("Event-driven run finished", simulation.log[-1])
+        self.assertGreater(stats["preemptions"], 0)
+
+class TestSimulationLogApi(unittest.TestCase):
+
+    def setUp(self):
+        api._simulation_jobs.clear()
+        app = Flask(__name__)
+        app.register_blueprint(api.traffic_bp)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        api._simulation_jobs.clear()
+
+    def test_serves_the_latest_run(self):
+        run = self.client.post('/traffic/simulation/run', json={"wait": 10}).json
+        body = self.client.get('/traffic/simulation/log').json
+        self.assertEqual(body["simulation_id"], run["simulation_id"])
+        self.assertEqual(body["log"][-5:], run["log_preview"])
+        self.assertEqual(body["next"], body["records"][-1]["sequence"])
+        again = self.client.get('/traffic/simulation/log').json
+        self.assertEqual(again["simulation_id"], run["simulation_id"])  # Not re-run per request
+
+    def test_runs_a_simulation_when_none_has_run(self):
+        body = self.client.get('/traffic/simulation/log').json
+        self.assertTrue(body["log"])
+        self.assertEqual(body["status"], "done")
+        self.assertIsNotNone(api._simulation_jobs.latest())
+
+    def test_since_and_limit(self):
+        self.client.post('/traffic/simulation/run', json={"wait": 10})
+        full = self.client.get('/traffic/simulation/log').json["log"]
+        first = self.client.get('/traffic/simulation/log?limit=3').json
+        self.assertEqual(first["log"], full[:3])
+        rest = self.client.get(f'/traffic/simulation/log?since={first["next"]}').json
+        self.assertEqual(rest["log"], full[3:])
+        self.assertEqual(self.client.get(f'/traffic/simulation/log?since={rest["next"]}').json["log"], [])
+        for query in ('since=x', 'limit=0', 'since=-1', 'limit=100000'):
+            self.assertEqual(self.client.get(f'/traffic/simulation/log?{query}').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
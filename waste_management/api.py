@@ -1,26 +1,139 @@
-import datetime # Not directly used in API functions but good practice if time manipulation was needed
+import atexit
+import datetime # Used for batch timestamps and forecast times
+import json
+import math
+import os
 from flask import Flask, request, jsonify, render_template
-from dataclasses import asdict # To convert dataclass instances to dicts
 
 # Importing from our existing modules
-from .models import TrashBin # Primarily for type hinting and understanding data structures
+from .models import WasteCollectionTruck, collection_route_to_dict, trash_bin_to_dict # Models, and the serializers used for responses
 from . import bin_manager # Import the module itself to call its functions
 from . import route_manager # Import the module itself to call its functions
+from .distance_matrix import DistanceMatrixService
+from .storage import BIN_RECORD, ROUTE_RECORD, SQLiteStorage
+from common.state_server import STATE_SOCKET_ENV, get_shared_client
+from common.pagination import page_args, page_response
+from common.conditional import conditional_response
+from common.change_feed import get_feed
+from common.events import sse_response
+from common.serialization import install_json_provider
+from common.streaming import ndjson_response, wants_ndjson
 
 app = Flask(__name__)
+install_json_provider(app)
+
+# Longest planning horizon accepted by the route endpoints (one week)
+MAX_HORIZON_HOURS = 168
+
+# Path of a SQLite database that keeps bins and routes across restarts; state is in-memory only when unset.
+# A state server named by SMARTCITY_STATE_SOCKET (shared by all worker processes) takes precedence.
+STORAGE_PATH_ENV = "WASTE_STORAGE_PATH"
+# Directory that keeps the bins' nearest-neighbor lists across restarts; they are kept in memory only when unset.
+DISTANCE_CACHE_DIR_ENV = "WASTE_DISTANCE_CACHE_DIR"
+
+def _attach_storage_from_env():
+    backend = get_shared_client()
+    if backend is not None:
+        source = os.environ[STATE_SOCKET_ENV]
+    else:
+        source = os.environ.get(STORAGE_PATH_ENV)
+        if not source:
+            return None
+        backend = SQLiteStorage(source)
+    bin_count = bin_manager.attach_storage(backend)
+    route_count = route_manager.attach_storage(backend)
+    app.logger.info(f"Loaded {bin_count} bins and {route_count} routes from '{source}'")
+    return backend
+
+_storage = _attach_storage_from_env()
+
+# Nearest-neighbor lists over the bins, followed as bins are added or moved and used to plan routes
+_distance_matrix = DistanceMatrixService(cache_dir=os.environ.get(DISTANCE_CACHE_DIR_ENV))
+_distance_matrix.attach()
+atexit.register(_distance_matrix.close)
+
+@app.before_request
+def _sync_shared_state():
+    # Picks up changes other worker processes made to shared storage
+    bin_manager.sync_storage()
+    route_manager.sync_storage()
 
 # --- Bin Endpoints ---
 
+def _parse_float_list(raw_value: str, expected_count: int, param_name: str) -> list:
+    """Parses a comma-separated query parameter into a list of finite floats."""
+    parts = raw_value.split(',')
+    if len(parts) != expected_count:
+        raise ValueError(f"'{param_name}' must contain {expected_count} comma-separated numbers")
+    try:
+        values = [float(part) for part in parts]
+    except ValueError:
+        raise ValueError(f"'{param_name}' must contain only numbers")
+    if not all(math.isfinite(value) for value in values):
+        raise ValueError(f"'{param_name}' must contain only finite numbers")
+    return values
+
+def _parse_coordinates(raw_value: str, expected_count: int, param_name: str) -> list:
+    """Parses a comma-separated query parameter of lat,lon pairs, checking each lies on the globe."""
+    values = _parse_float_list(raw_value, expected_count, param_name)
+    lats, lons = values[0::2], values[1::2]
+    if not all(-90 <= lat <= 90 for lat in lats) or not all(-180 <= lon <= 180 for lon in lons):
+        raise ValueError(f"'{param_name}' latitudes must be within [-90, 90] and longitudes within [-180, 180]")
+    return values
+
 @app.route('/bins', methods=['GET'])
 def get_all_bins_api():
     """
-    Retrieves a list of all trash bins, optionally filtered by status.
-    Query parameter: status (e.g., /bins?status=FULL)
+    Retrieves a list of all trash bins, optionally filtered by status and location.
+    Query parameters:
+        status (e.g., /bins?status=FULL)
+        near and radius in meters, default 1000 (e.g., /bins?near=40.71,-74.00&radius=500), nearest first
+        bbox as min_lat,min_lon,max_lat,max_lon (e.g., /bins?bbox=40.70,-74.02,40.72,-73.99)
+        stream=1 (or Accept: application/x-ndjson) to stream one JSON object per line
+        limit and after for one page in bin ID order, e.g. /bins?limit=100 then /bins?limit=100&after=<next>;
+        the response is then {"items": [...], "next": cursor or null}
     """
     status_filter = request.args.get('status')
-    bins_list = bin_manager.list_bins(status_filter=status_filter)
+    near = request.args.get('near')
+    bbox = request.args.get('bbox')
+
+    if near and bbox:
+        return jsonify({"error": "Use either 'near' or 'bbox', not both"}), 400
+
+    filters = {"status": status_filter} if status_filter else None
+    try:
+        page = page_args(filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if page is not None:
+        if near or bbox:
+            return jsonify({"error": "'limit' and 'after' cannot be combined with 'near' or 'bbox'"}), 400
+        bins_page, next_bin_id = bin_manager.list_bins_page(*page, status_filter=status_filter)
+        return page_response(bins_page, next_bin_id, trash_bin_to_dict, filters)
+
+    try:
+        if near:
+            lat, lon = _parse_coordinates(near, 2, 'near')
+            radius = float(request.args.get('radius', 1000.0))
+            if not 0 <= radius < math.inf:  # Also rejects NaN
+                raise ValueError("'radius' must be a finite, non-negative number")
+            bins_list = bin_manager.bins_within_radius(lat, lon, radius)
+        elif bbox:
+            min_lat, min_lon, max_lat, max_lon = _parse_coordinates(bbox, 4, 'bbox')
+            bins_list = bin_manager.bins_in_bbox(min_lat, min_lon, max_lat, max_lon)
+        else:
+            bins_list = None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid location query: {e}"}), 400
+
+    if bins_list is None:
+        bins_list = bin_manager.list_bins(status_filter=status_filter)
+    elif status_filter:
+        bins_list = [b for b in bins_list if b.status == status_filter]
+    if wants_ndjson():
+        return ndjson_response(bins_list, trash_bin_to_dict)
     # Convert list of TrashBin objects to list of dictionaries
-    bins_as_dicts = [asdict(b) for b in bins_list]
+    bins_as_dicts = [trash_bin_to_dict(b) for b in bins_list]
     return jsonify(bins_as_dicts), 200
 
 @app.route('/bins', methods=['POST'])
@@ -53,7 +166,7 @@ def create_new_bin_api():
             location=location,
             capacity_gallons=float(capacity_gallons) # Ensure capacity is float
         )
-        return jsonify(asdict(new_bin)), 201
+        return jsonify(trash_bin_to_dict(new_bin)), 201
     except ValueError as e: # Handles duplicate bin_id
         return jsonify({"error": str(e)}), 409 # Conflict
     except Exception as e: # Catch any other unexpected errors
@@ -64,14 +177,34 @@ def create_new_bin_api():
 @app.route('/bins/<string:bin_id>', methods=['GET'])
 def get_specific_bin_api(bin_id: str):
     """
-    Retrieves a specific trash bin by its ID.
+    Retrieves a specific trash bin by its ID. Supports conditional GET (ETag / Last-Modified).
     """
     bin_obj = bin_manager.get_bin(bin_id)
     if bin_obj:
-        return jsonify(asdict(bin_obj)), 200
+        # Answered with 304 while the client's ETag (or If-Modified-Since) is current
+        return conditional_response(bin_obj.version, datetime.datetime.fromisoformat(bin_obj.last_updated),
+                                    lambda: (jsonify(trash_bin_to_dict(bin_obj)), 200))
     else:
         return jsonify({"error": f"Bin with ID '{bin_id}' not found"}), 404
 
+@app.route('/bins/<string:bin_id>/forecast', methods=['GET'])
+def get_bin_forecast_api(bin_id: str):
+    """
+    Retrieves a bin's estimated fill rate, predicted time to become full and recent readings.
+    """
+    forecast = bin_manager.get_fill_forecast(bin_id)
+    if forecast is None:
+        return jsonify({"error": f"Bin with ID '{bin_id}' not found"}), 404
+    full_at = forecast['predicted_full_at']
+    return jsonify({
+        "bin_id": bin_id,
+        "fill_rate_gallons_per_hour": forecast['fill_rate_gallons_per_hour'],
+        "predicted_full_at": (datetime.datetime.fromtimestamp(full_at, datetime.timezone.utc).isoformat()
+                              if full_at is not None else None),
+        "history": [{"timestamp": datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).isoformat(),
+                     "fill_level": level} for epoch, level in bin_manager.get_fill_history(bin_id)]
+    }), 200
+
 @app.route('/bins/<string:bin_id>/sensor_data', methods=['PUT'])
 def update_bin_sensor_data_api(bin_id: str):
     """
@@ -92,7 +225,7 @@ def update_bin_sensor_data_api(bin_id: str):
     try:
         updated_bin = bin_manager.update_bin_from_sensor_data(bin_id, float(fill_level))
         if updated_bin:
-            return jsonify(asdict(updated_bin)), 200
+            return jsonify(trash_bin_to_dict(updated_bin)), 200
         else:
             return jsonify({"error": f"Bin with ID '{bin_id}' not found for update"}), 404
     except ValueError as e: # e.g. if fill_level is not a float
@@ -102,6 +235,72 @@ def update_bin_sensor_data_api(bin_id: str):
         return jsonify({"error": "An unexpected error occurred"}), 500
 
 
+@app.route('/bins/sensor_data:batch', methods=['POST'])
+def update_bins_sensor_data_batch_api():
+    """
+    Applies a batch of sensor readings under a single timestamp.
+    Expects a JSON array, or NDJSON (one object per line) with Content-Type application/x-ndjson:
+        [{"bin_id": "str", "fill_level": float}, ...]
+    Responds with per-item results aligned with the input: the bin's new status, or null if the
+    item failed. Failed items are listed in "errors" as [index, message] pairs.
+    """
+    raw_body = request.get_data(cache=False)
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            items = [json.loads(line) for line in raw_body.splitlines() if line.strip()]
+        else:
+            items = json.loads(raw_body)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid JSON payload: {e}"}), 400
+    if not isinstance(items, list):
+        return jsonify({"error": "Payload must be a JSON array or NDJSON"}), 400
+
+    results = [None] * len(items)
+    errors = []
+    readings = []
+    reading_positions = []
+    for index, item in enumerate(items):
+        try:
+            bin_id = item['bin_id']
+            fill_level = item['fill_level']
+            if not isinstance(bin_id, str):
+                raise ValueError("'bin_id' must be a string")
+            if not isinstance(fill_level, (int, float)) or isinstance(fill_level, bool):
+                raise ValueError("'fill_level' must be a number")
+        except (KeyError, TypeError):
+            errors.append([index, "Each item must be an object with 'bin_id' and 'fill_level'"])
+            continue
+        except ValueError as e:
+            errors.append([index, str(e)])
+            continue
+        readings.append((bin_id, float(fill_level)))
+        reading_positions.append(index)
+
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    try:
+        updated_bins = bin_manager.update_bins_bulk(readings, timestamp=timestamp)
+    except Exception as e: # Catch any other unexpected errors
+        app.logger.error(f"Error applying sensor data batch: {e}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+    updated_count = 0
+    for index, updated_bin in zip(reading_positions, updated_bins):
+        if updated_bin is None:
+            errors.append([index, "Bin not found"])
+        else:
+            results[index] = updated_bin.status
+            updated_count += 1
+    errors.sort()
+
+    return jsonify({
+        "timestamp": timestamp,
+        "updated": updated_count,
+        "failed": len(errors),
+        "results": results,
+        "errors": errors
+    }), 200
+
+
 # --- Route Endpoints ---
 
 @app.route('/routes', methods=['GET'])
@@ -109,17 +308,27 @@ def get_all_routes_api():
     """
     Retrieves a list of all collection routes, optionally filtered by status.
     Query parameter: status (e.g., /routes?status=PENDING)
+    Query parameters: limit and after for one page in route ID order (see GET /bins)
     """
     status_filter = request.args.get('status')
+    filters = {"status": status_filter} if status_filter else None
+    try:
+        page = page_args(filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if page is not None:
+        routes_page, next_route_id = route_manager.list_routes_page(*page, status_filter=status_filter)
+        return page_response(routes_page, next_route_id, collection_route_to_dict, filters)
     routes_list = route_manager.list_routes(status_filter=status_filter)
-    routes_as_dicts = [asdict(r) for r in routes_list]
+    routes_as_dicts = [collection_route_to_dict(r) for r in routes_list]
     return jsonify(routes_as_dicts), 200
 
 @app.route('/routes/generate', methods=['POST'])
 def create_new_route_api():
     """
     Generates a new collection route.
-    Expects JSON payload: {"assigned_truck_id": "str"}
+    Expects JSON payload: {"assigned_truck_id": "str", "horizon_hours": float (optional)}
+    With horizon_hours, bins predicted to become full within that many hours are included.
     """
     data = request.get_json()
     if not data:
@@ -132,10 +341,14 @@ def create_new_route_api():
     except TypeError: # If data is not a dict
         return jsonify({"error": "Payload must be a JSON object"}), 400
 
+    horizon_hours = data.get('horizon_hours')
+    if horizon_hours is not None and not _is_valid_horizon(horizon_hours):
+        return jsonify({"error": f"'horizon_hours' must be a number between 0 and {MAX_HORIZON_HOURS}"}), 400
+
     try:
-        new_route = route_manager.generate_route(assigned_truck_id=assigned_truck_id)
+        new_route = route_manager.generate_route(assigned_truck_id=assigned_truck_id, horizon_hours=horizon_hours)
         if new_route:
-            return jsonify(asdict(new_route)), 201
+            return jsonify(collection_route_to_dict(new_route)), 201
         else:
             # No full bins were found to generate a route.
             return jsonify({"message": "No full bins to generate a route for at this time."}), 200
@@ -143,6 +356,77 @@ def create_new_route_api():
         app.logger.error(f"Error generating route: {e}")
         return jsonify({"error": "An unexpected error occurred during route generation"}), 500
 
+def _is_valid_horizon(value) -> bool:
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and 0 <= value <= MAX_HORIZON_HOURS
+
+def _parse_truck(item) -> WasteCollectionTruck:
+    """Builds a WasteCollectionTruck from one entry of a route optimization payload."""
+    if not isinstance(item, dict):
+        raise ValueError("Each truck must be a JSON object")
+    truck_id = item.get('truck_id')
+    location = item.get('current_location')
+    capacity = item.get('capacity_gallons')
+    load = item.get('current_load_gallons', 0.0)
+    if not isinstance(truck_id, str) or not truck_id:
+        raise ValueError("'truck_id' must be a non-empty string")
+    if not isinstance(location, dict) or 'lat' not in location or 'lon' not in location:
+        raise ValueError(f"Truck '{truck_id}': 'current_location' must be a dict with 'lat' and 'lon'")
+    for name, value in (('capacity_gallons', capacity), ('current_load_gallons', load),
+                        ('current_location.lat', location['lat']), ('current_location.lon', location['lon'])):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Truck '{truck_id}': '{name}' must be a number")
+    return WasteCollectionTruck(truck_id=truck_id, current_location={'lat': float(location['lat']), 'lon': float(location['lon'])},
+                                capacity_gallons=float(capacity), current_load_gallons=float(load))
+
+@app.route('/routes/optimize', methods=['POST'])
+def optimize_routes_api():
+    """
+    Plans capacity-constrained, distance-optimized routes for several trucks over the 'FULL' bins.
+    Expects JSON payload:
+        {"trucks": [{"truck_id": "str", "current_location": {"lat": float, "lon": float},
+                     "capacity_gallons": float, "current_load_gallons": float (optional)}],
+         "time_budget_seconds": float (optional, default 5, at most 30),
+         "return_to_depot": bool (optional, default true),
+         "horizon_hours": float (optional; also plan for bins predicted to be full within this many hours)}
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Payload must be a JSON object"}), 400
+
+    trucks_data = data.get('trucks')
+    if not isinstance(trucks_data, list) or not trucks_data:
+        return jsonify({"error": "'trucks' must be a non-empty list"}), 400
+    time_budget = data.get('time_budget_seconds', 5.0)
+    if isinstance(time_budget, bool) or not isinstance(time_budget, (int, float)) or not 0 < time_budget <= 30:
+        return jsonify({"error": "'time_budget_seconds' must be a number between 0 and 30"}), 400
+    return_to_depot = data.get('return_to_depot', True)
+    if not isinstance(return_to_depot, bool):
+        return jsonify({"error": "'return_to_depot' must be a boolean"}), 400
+    horizon_hours = data.get('horizon_hours')
+    if horizon_hours is not None and not _is_valid_horizon(horizon_hours):
+        return jsonify({"error": f"'horizon_hours' must be a number between 0 and {MAX_HORIZON_HOURS}"}), 400
+
+    try:
+        trucks = [_parse_truck(item) for item in trucks_data]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len({truck.truck_id for truck in trucks}) != len(trucks):
+        return jsonify({"error": "Truck IDs must be unique"}), 400
+
+    try:
+        _distance_matrix.attach()  # Catches up if the bins were reloaded from storage since
+        new_routes, unassigned_bin_ids = route_manager.generate_routes(
+            trucks, time_budget_seconds=float(time_budget), return_to_depot=return_to_depot,
+            distance_matrix=_distance_matrix, horizon_hours=horizon_hours)
+    except Exception as e: # Catch any other unexpected errors during route optimization
+        app.logger.error(f"Error optimizing routes: {e}")
+        return jsonify({"error": "An unexpected error occurred during route optimization"}), 500
+
+    return jsonify({
+        "routes": [collection_route_to_dict(route) for route in new_routes],
+        "unassigned_bin_ids": unassigned_bin_ids
+    }), 201 if new_routes else 200
+
 
 @app.route('/routes/<string:route_id>', methods=['GET'])
 def get_specific_route_api(route_id: str):
@@ -151,7 +435,7 @@ def get_specific_route_api(route_id: str):
     """
     route_obj = route_manager.get_route(route_id)
     if route_obj:
-        return jsonify(asdict(route_obj)), 200
+        return jsonify(collection_route_to_dict(route_obj)), 200
     else:
         return jsonify({"error": f"Route with ID '{route_id}' not found"}), 404
 
@@ -175,7 +459,7 @@ def update_specific_route_status_api(route_id: str):
     try:
         updated_route = route_manager.update_route_status(route_id, new_status)
         if updated_route:
-            return jsonify(asdict(updated_route)), 200
+            return jsonify(collection_route_to_dict(updated_route)), 200
         else:
             # This implies route_id was not found.
             return jsonify({"error": f"Route with ID '{route_id}' not found for status update"}), 404
@@ -183,6 +467,17 @@ def update_specific_route_status_api(route_id: str):
         app.logger.error(f"Error updating route status: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
+# --- Change Feed ---
+
+@app.route('/events', methods=['GET'])
+def waste_events_api():
+    """
+    Streams bin and route changes as Server-Sent Events: `event: bin` / `event: route` with the changed
+    record as JSON, coalesced to its latest state, and `event: reset` when the listings must be refetched.
+    """
+    return sse_response(get_feed('waste'), {BIN_RECORD: trash_bin_to_dict, ROUTE_RECORD: collection_route_to_dict},
+                        sync=_sync_shared_state)
+
 @app.route('/dashboard')
 def dashboard():
     """Serves the main dashboard HTML page."""
@@ -202,26 +497,29 @@ if __name__ == '__main__':
     # Clear existing bins and routes for a clean start when running directly,
     # useful for development and testing this specific script.
     # In a real deployment, you wouldn't typically clear data like this on startup.
-    if bin_manager._bins:
-        bin_manager._bins.clear()
-    if route_manager._routes:
-        route_manager._routes.clear()
-
-    print("Attempting to add sample data for API testing...")
-    try:
-        b1 = bin_manager.add_bin("bin1", {"lat": 10.0, "lon": 20.0}, 100.0)
-        print(f"Added sample bin: {b1.bin_id}")
-        b2 = bin_manager.add_bin("bin2", {"lat": 10.05, "lon": 20.05}, 120.0)
-        print(f"Added sample bin: {b2.bin_id}")
-
-        updated_b1 = bin_manager.update_bin_from_sensor_data("bin1", 90.0)
-        if updated_b1:
-            print(f"Updated sample bin {updated_b1.bin_id} to status {updated_b1.status}")
-
-    except ValueError as e:
-        print(f"Sample data setup error (possibly already exists or other): {e}")
-    except Exception as e:
-        print(f"An unexpected error occurred during sample data setup: {e}")
+    if _storage is not None:
+        print("Using persistent or shared storage; skipping sample data.")
+    else:
+        if bin_manager._bins:
+            bin_manager._reset_bins_data()
+        if route_manager._routes:
+            route_manager._routes.clear()
+
+        print("Attempting to add sample data for API testing...")
+        try:
+            b1 = bin_manager.add_bin("bin1", {"lat": 10.0, "lon": 20.0}, 100.0)
+            print(f"Added sample bin: {b1.bin_id}")
+            b2 = bin_manager.add_bin("bin2", {"lat": 10.05, "lon": 20.05}, 120.0)
+            print(f"Added sample bin: {b2.bin_id}")
+
+            updated_b1 = bin_manager.update_bin_from_sensor_data("bin1", 90.0)
+            if updated_b1:
+                print(f"Updated sample bin {updated_b1.bin_id} to status {updated_b1.status}")
+
+        except ValueError as e:
+            print(f"Sample data setup error (possibly already exists or other): {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred during sample data setup: {e}")
 
     print("Starting Flask server...")
     app.run(debug=True, port=5000, host='0.0.0.0')
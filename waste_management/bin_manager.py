@@ -1,11 +1,38 @@
+import contextlib
 import datetime
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict, Iterable, Tuple
 
-from .models import TrashBin
+from common.change_feed import get_feed
+from common.pagination import SortedKeyIndex
+from .columnar_store import ColumnarBinStore
+from .fill_forecast import BinFillSeries
+from .models import TrashBin, trash_bin_to_dict
+from .storage import BIN_RECORD, StorageBackend
 from .sensor_simulator import update_bin_fill_level as sim_update_bin_fill_level # Renamed to avoid confusion
+from .spatial_index import GridSpatialIndex
 
-# Module-level dictionary to store bins in memory
+# Columns holding every bin's state; replaced (not emptied) on reset, so views handed out earlier keep their data
+_store = ColumnarBinStore()
+# Bins in memory by ID: TrashBinView objects reading and writing their row of _store
 _bins: Dict[str, TrashBin] = {}
+# Spatial index over bin locations, kept in sync with _bins
+_spatial_index = GridSpatialIndex()
+# Bin IDs in sorted order, for keyset pagination (see list_bins_page)
+_sorted_bin_ids = SortedKeyIndex()
+# Secondary index: status -> bin IDs with that status (dicts used as insertion-ordered sets)
+_bin_ids_by_status: Dict[str, Dict[str, None]] = {}
+# Per-bin reading history and fill-rate forecast, fed by every sensor reading
+_fill_series: Dict[str, BinFillSeries] = {}
+# Bumped whenever a bin is added or moved; derived data (e.g. distance matrices) is keyed by it
+_bin_set_version = 0
+# Callbacks notified with the bin after it is added or moved
+_bin_listeners: List[Callable[[TrashBin], None]] = []
+# Optional persistent store; when attached, _bins acts as a read-through cache in front of it
+_storage: Optional[StorageBackend] = None
+# Storage change sequence the cache reflects (see sync_storage)
+_storage_sequence = 0
+# The waste subsystem's change feed; every changed bin is published to it (see common.change_feed)
+_changes = get_feed('waste')
 
 def add_bin(bin_id: str, location: Dict[str, float], capacity_gallons: float) -> TrashBin:
     """
@@ -20,25 +47,127 @@ def add_bin(bin_id: str, location: Dict[str, float], capacity_gallons: float) ->
         The created TrashBin instance.
 
     Raises:
-        ValueError: If a bin with the given bin_id already exists.
+        ValueError: If a bin with the given bin_id already exists, or capacity_gallons is not positive.
     """
-    if bin_id in _bins:
+    if get_bin(bin_id) is not None:
         raise ValueError(f"Bin with ID '{bin_id}' already exists.")
+    if not capacity_gallons > 0:
+        raise ValueError("capacity_gallons must be positive.")
 
     # Use current UTC time for initial last_updated
     # The TrashBin dataclass defaults last_updated and status, so explicit setting is optional
     # but good for clarity in this manager context.
-    new_bin = TrashBin(
+    new_bin = _cache_bin(TrashBin(
         bin_id=bin_id,
         location=location,
         capacity_gallons=capacity_gallons,
         current_fill_level_gallons=0.0, # Explicitly set, though default is 0.0
         last_updated=datetime.datetime.now(datetime.timezone.utc).isoformat(),
         status='EMPTY' # Explicitly set, though default is 'EMPTY'
-    )
-    _bins[bin_id] = new_bin
+    ))
+    _persist_bin(new_bin)
+    _notify_bin_listeners(new_bin)
     return new_bin
 
+def _cache_bin(bin_instance: TrashBin) -> TrashBin:
+    """Copies a bin into the in-memory store and its indexes. Returns the stored view of the bin."""
+    location = bin_instance.location
+    # Index first so a malformed location does not leave an unindexed bin behind
+    _spatial_index.insert(bin_instance.bin_id, location['lat'], location['lon'])
+    bin_instance = _bins[bin_instance.bin_id] = _store.put_bin(bin_instance)
+    _sorted_bin_ids.add(bin_instance.bin_id)
+    _bin_ids_by_status.setdefault(bin_instance.status, {})[bin_instance.bin_id] = None
+    # The first reading (empty for a new bin) anchors the fill rate measured from the next one
+    series = _fill_series[bin_instance.bin_id] = BinFillSeries()
+    series.record(_to_epoch(bin_instance.last_updated), bin_instance.current_fill_level_gallons, bin_instance.capacity_gallons)
+    return bin_instance
+
+def _persist_bin(bin_instance: TrashBin) -> None:
+    """Writes a changed bin through to the attached storage and publishes it on the change feed."""
+    if _storage is not None:
+        _storage.put(BIN_RECORD, bin_instance.bin_id, trash_bin_to_dict(bin_instance))
+    _changes.publish(BIN_RECORD, bin_instance.bin_id, bin_instance)
+
+def attach_storage(backend: Optional[StorageBackend]) -> int:
+    """
+    Makes a storage backend the persistent home of bin state, loading the bins it holds.
+
+    The in-memory bins and indexes are replaced by the backend's contents and then serve all
+    reads as a cache; every change is written through to the backend. Bins missing from the
+    cache (e.g. written by another process sharing the database) are read through on lookup,
+    and sync_storage() applies the other processes' changes to cached bins.
+
+    Args:
+        backend: The backend to attach, or None to detach and keep running in memory only.
+
+    Returns:
+        The number of bins loaded.
+    """
+    global _storage, _storage_sequence, _bin_set_version, _store
+    _storage = None
+    _store = ColumnarBinStore()
+    _bins.clear()
+    _sorted_bin_ids.clear()
+    _spatial_index.clear()
+    _bin_ids_by_status.clear()
+    _fill_series.clear()
+    _changes.publish_reset()
+    if backend is None:
+        return 0
+    # Taken before loading, so changes made while loading are replayed by the next sync
+    _storage_sequence = backend.change_sequence()
+    for _, record in backend.load_all(BIN_RECORD):
+        _cache_bin(TrashBin(**record))
+    _storage = backend
+    _bin_set_version += 1
+    return len(_bins)
+
+def sync_storage() -> int:
+    """
+    Applies bin changes that other processes wrote to the attached storage since the last sync.
+
+    Only needed when the backend is shared between processes (common.state_server, or one
+    SQLite database file opened by each process); the APIs call it at the start of each request. Without storage this is a no-op.
+
+    Returns:
+        The number of changed bins applied.
+    """
+    global _storage_sequence
+    if _storage is None:
+        return 0
+    sequence, changes = _storage.changes_since(_storage_sequence)
+    if changes is None:
+        # Too far behind for the change log; start over from the stored state
+        return attach_storage(_storage)
+    applied = 0
+    for kind, _, record in changes:
+        if kind == BIN_RECORD and record is not None:
+            applied += _apply_stored_bin(record)
+    _storage_sequence = sequence
+    return applied
+
+def _apply_stored_bin(record: dict) -> int:
+    """Brings the cached copy of a bin in line with its stored record. Returns 1 if anything changed."""
+    bin_instance = _bins.get(record['bin_id'])
+    if bin_instance is None:
+        bin_instance = _cache_bin(TrashBin(**record))
+        _notify_bin_listeners(bin_instance)
+        _changes.publish(BIN_RECORD, bin_instance.bin_id, bin_instance)
+        return 1
+    if trash_bin_to_dict(bin_instance) == record:
+        return 0  # Our own write, or already applied
+    previous_status, previous_location = bin_instance.status, bin_instance.location
+    _store.put_bin(TrashBin(**record))  # Overwrites the row bin_instance views
+    if bin_instance.status != previous_status:
+        _move_status(bin_instance.bin_id, previous_status, bin_instance.status)
+    if bin_instance.location != previous_location:
+        _spatial_index.insert(bin_instance.bin_id, bin_instance.location['lat'], bin_instance.location['lon'])
+        _notify_bin_listeners(bin_instance)
+    _fill_series[bin_instance.bin_id].record(_to_epoch(bin_instance.last_updated), bin_instance.current_fill_level_gallons,
+                                             bin_instance.capacity_gallons)
+    _changes.publish(BIN_RECORD, bin_instance.bin_id, bin_instance)
+    return 1
+
 def get_bin(bin_id: str) -> Optional[TrashBin]:
     """
     Retrieves a trash bin by its ID.
@@ -49,15 +178,21 @@ def get_bin(bin_id: str) -> Optional[TrashBin]:
     Returns:
         The TrashBin instance if found, otherwise None.
     """
-    return _bins.get(bin_id)
+    bin_instance = _bins.get(bin_id)
+    if bin_instance is None and _storage is not None:
+        record = _storage.get(BIN_RECORD, bin_id)
+        if record is not None:
+            bin_instance = _cache_bin(TrashBin(**record))
+    return bin_instance
 
-def update_bin_from_sensor_data(bin_id: str, new_fill_level: float) -> Optional[TrashBin]:
+def update_bin_from_sensor_data(bin_id: str, new_fill_level: float, location: Optional[Dict[str, float]] = None) -> Optional[TrashBin]:
     """
     Updates a bin's fill level based on new sensor data.
 
     Args:
         bin_id: The ID of the bin to update.
         new_fill_level: The new fill level reported by the sensor.
+        location: An optional new location reported by the sensor (e.g. a relocated bin).
 
     Returns:
         The updated TrashBin instance if the bin was found and updated, otherwise None.
@@ -66,26 +201,279 @@ def update_bin_from_sensor_data(bin_id: str, new_fill_level: float) -> Optional[
     if not bin_instance:
         return None
 
+    if location is not None:
+        moved = (location['lat'], location['lon']) != (bin_instance.location['lat'], bin_instance.location['lon'])
+        _spatial_index.insert(bin_id, location['lat'], location['lon'])
+        bin_instance.location = location
+        if moved:
+            _notify_bin_listeners(bin_instance)
+
+    return _apply_sensor_reading(bin_instance, new_fill_level)
+
+def update_bins_bulk(readings: Iterable[Tuple[str, float]], timestamp: Optional[str] = None) -> List[Optional[TrashBin]]:
+    """
+    Applies a batch of sensor readings, stamping every updated bin with the same time.
+
+    Fill levels, statuses and versions are updated in one vectorized pass over the bin store;
+    a bin read more than once keeps its last reading.
+
+    Args:
+        readings: An iterable of (bin_id, new_fill_level) pairs.
+        timestamp: An optional ISO format timestamp for the batch. Defaults to the current UTC time.
+
+    Returns:
+        A list aligned with the readings, holding the updated TrashBin instance for each
+        reading or None where the bin was not found.
+    """
+    if timestamp is None:
+        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    epoch = _to_epoch(timestamp)
+
+    bins = _bins
+    results: List[Optional[TrashBin]] = []
+    applied_ids: List[str] = []
+    applied_levels: List[float] = []
+    for bin_id, new_fill_level in readings:
+        bin_instance = bins.get(bin_id)
+        if bin_instance is None:
+            bin_instance = get_bin(bin_id)
+        results.append(bin_instance)
+        if bin_instance is not None:
+            applied_ids.append(bin_id)
+            applied_levels.append(new_fill_level)
+    if not applied_ids:
+        return results
+
+    # Fill levels, statuses, timestamps and versions of the whole batch in one vectorized pass
+    store = _store
+    rows = store.rows_for(applied_ids)
+    previous_statuses = store.statuses(rows)
+    store.apply_readings(rows, applied_levels, timestamp)
+
+    changed: Dict[str, TrashBin] = {}
+    for bin_id, new_fill_level, capacity, previous_status, status in zip(
+            applied_ids, applied_levels, store.capacities(rows), previous_statuses, store.statuses(rows)):
+        if bin_id not in changed:
+            # A repeated bin moves from the status before its first reading to the one after its last
+            if status != previous_status:
+                _move_status(bin_id, previous_status, status)
+            changed[bin_id] = bins[bin_id]
+        _fill_series[bin_id].record(epoch, new_fill_level, capacity)
+    # One storage transaction for the whole batch
+    with _storage.batch() if _storage is not None else contextlib.nullcontext():
+        for bin_instance in changed.values():
+            _persist_bin(bin_instance)
+    return results
+
+def _to_epoch(timestamp: str) -> float:
+    return datetime.datetime.fromisoformat(timestamp).timestamp()
+
+def _apply_sensor_reading(bin_instance: TrashBin, new_fill_level: float, timestamp: Optional[str] = None,
+                          epoch: Optional[float] = None) -> TrashBin:
+    """Updates a stored bin in-place, bumps its version and keeps the status index and fill history in sync."""
     # The imported update_bin_fill_level function updates the bin instance in-place
     # and also returns it. Since it's updated in-place, and _bins stores references,
     # the object in _bins is directly modified.
-    updated_bin = sim_update_bin_fill_level(bin_instance, new_fill_level)
+    previous_status = bin_instance.status
+    updated_bin = sim_update_bin_fill_level(bin_instance, new_fill_level, timestamp)
+    updated_bin.version += 1
+    if updated_bin.status != previous_status:
+        _move_status(updated_bin.bin_id, previous_status, updated_bin.status)
+    if epoch is None:
+        epoch = _to_epoch(updated_bin.last_updated)
+    _fill_series[updated_bin.bin_id].record(epoch, new_fill_level, updated_bin.capacity_gallons)
+    _persist_bin(updated_bin)
     return updated_bin
 
+def _move_status(bin_id: str, old_status: str, new_status: str) -> None:
+    """Moves a bin ID between buckets of the status index."""
+    old_bucket = _bin_ids_by_status.get(old_status)
+    if old_bucket is not None:
+        old_bucket.pop(bin_id, None)
+    _bin_ids_by_status.setdefault(new_status, {})[bin_id] = None
+
 def list_bins(status_filter: Optional[str] = None) -> List[TrashBin]:
     """
     Lists all trash bins, optionally filtering by status.
 
+    Filtered listings are served from the status index, so they cost
+    O(matching bins) rather than O(all bins).
+
     Args:
         status_filter: An optional status string (e.g., 'FULL', 'EMPTY') to filter bins by.
 
     Returns:
-        A list of TrashBin instances.
+        A list of TrashBin instances. Filtered results are ordered by when each bin
+        entered that status.
     """
     if status_filter:
-        return [bin_obj for bin_obj in _bins.values() if bin_obj.status == status_filter]
+        return [_bins[bin_id] for bin_id in _bin_ids_by_status.get(status_filter, ())]
     return list(_bins.values())
 
+def list_bins_page(limit: int, after: Optional[str] = None,
+                   status_filter: Optional[str] = None) -> Tuple[List[TrashBin], Optional[str]]:
+    """
+    Lists one page of bins in bin ID order, optionally filtering by status.
+
+    The page starts right after the bin ID `after`, found by binary search in the sorted ID
+    index, so deep pages cost the same as the first one.
+
+    Args:
+        limit: Maximum number of bins to return.
+        after: The last bin ID of the previous page, or None for the first page.
+        status_filter: An optional status string (e.g., 'FULL', 'EMPTY') to filter bins by.
+
+    Returns:
+        The bins and the bin ID to pass as `after` for the next page (None on the last page).
+    """
+    predicate = (lambda b: b.status == status_filter) if status_filter else None
+    return _sorted_bin_ids.page(limit, after, _bins.get, predicate)
+
+def bins_within_radius(lat: float, lon: float, meters: float) -> List[TrashBin]:
+    """
+    Lists the bins within a given distance of a location.
+
+    Args:
+        lat: Latitude of the search center in degrees.
+        lon: Longitude of the search center in degrees.
+        meters: The search radius in meters.
+
+    Returns:
+        A list of TrashBin instances, nearest first.
+    """
+    return [_bins[bin_id] for _, bin_id in _spatial_index.query_radius(lat, lon, meters)]
+
+def bins_in_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[TrashBin]:
+    """
+    Lists the bins inside a bounding box.
+
+    Args:
+        min_lat: Southern edge of the box in degrees.
+        min_lon: Western edge of the box in degrees.
+        max_lat: Northern edge of the box in degrees.
+        max_lon: Eastern edge of the box in degrees.
+
+    Returns:
+        A list of TrashBin instances, in no particular order.
+    """
+    return [_bins[bin_id] for bin_id in _spatial_index.query_bbox(min_lat, min_lon, max_lat, max_lon)]
+
+def get_fill_history(bin_id: str) -> Optional[List[Tuple[int, float]]]:
+    """
+    Returns a bin's recent sensor readings.
+
+    Args:
+        bin_id: The ID of the bin.
+
+    Returns:
+        (epoch_seconds, fill_level_gallons) tuples, oldest first, or None if the bin does not exist.
+        Only the most recent fill_forecast.DEFAULT_HISTORY_SIZE readings are kept.
+    """
+    series = _fill_series.get(bin_id)
+    return series.history.readings() if series is not None else None
+
+def get_fill_forecast(bin_id: str) -> Optional[Dict[str, Optional[float]]]:
+    """
+    Returns a bin's estimated fill rate and when it is predicted to become 'FULL'.
+
+    Args:
+        bin_id: The ID of the bin.
+
+    Returns:
+        A dict with 'fill_rate_gallons_per_hour' (None until two readings were seen) and
+        'predicted_full_at' (epoch seconds; None if the bin is not filling), or None if the
+        bin does not exist.
+    """
+    series = _fill_series.get(bin_id)
+    if series is None:
+        return None
+    return {
+        'fill_rate_gallons_per_hour': series.estimator.rate_gallons_per_hour,
+        'predicted_full_at': series.estimator.predict_crossing(_bins[bin_id].capacity_gallons),
+    }
+
+def list_bins_full_within(hours: float, now: Optional[float] = None) -> List[TrashBin]:
+    """
+    Lists the bins that are 'FULL' or predicted to become full within a time horizon.
+
+    Args:
+        hours: The planning horizon in hours (0 lists only the bins that are already full).
+        now: Start of the horizon in epoch seconds. Defaults to the current time.
+
+    Returns:
+        A list of TrashBin instances: the 'FULL' bins first, then the others by predicted full time.
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+    deadline = now + hours * 3600.0
+    upcoming = []
+    for bin_id, bin_instance in _bins.items():
+        if bin_instance.status == 'FULL':
+            continue
+        full_at = _fill_series[bin_id].estimator.predict_crossing(bin_instance.capacity_gallons)
+        if full_at is not None and full_at <= deadline:
+            upcoming.append((full_at, bin_id))
+    upcoming.sort()
+    return list_bins(status_filter='FULL') + [_bins[bin_id] for _, bin_id in upcoming]
+
+def projected_fill_levels(bin_ids: Iterable[str], at_epoch: float) -> Dict[str, float]:
+    """
+    Predicts the fill levels of bins at a future time from their estimated fill rates.
+
+    Args:
+        bin_ids: IDs of existing bins.
+        at_epoch: The time to project to, in epoch seconds.
+
+    Returns:
+        A dict of bin ID -> predicted fill level in gallons, capped at each bin's capacity
+        and never below its current level.
+    """
+    levels = {}
+    for bin_id in bin_ids:
+        bin_instance = _bins[bin_id]
+        projected = _fill_series[bin_id].estimator.projected_level(at_epoch, bin_instance.capacity_gallons)
+        levels[bin_id] = max(bin_instance.current_fill_level_gallons, projected)
+    return levels
+
+def get_bin_set_version() -> int:
+    """Returns a counter that changes whenever a bin is added or moved."""
+    return _bin_set_version
+
+def add_bin_listener(callback: Callable[[TrashBin], None]) -> None:
+    """
+    Registers a callback that is called with each bin after it is added or its location changes.
+
+    get_bin_set_version() already reflects the change when the callback runs. Registering
+    the same callback again has no effect.
+    """
+    if callback not in _bin_listeners:
+        _bin_listeners.append(callback)
+
+def remove_bin_listener(callback: Callable[[TrashBin], None]) -> None:
+    """Unregisters a callback added with add_bin_listener. Unknown callbacks are ignored."""
+    if callback in _bin_listeners:
+        _bin_listeners.remove(callback)
+
+def _notify_bin_listeners(bin_instance: TrashBin) -> None:
+    global _bin_set_version
+    _bin_set_version += 1
+    for callback in list(_bin_listeners):
+        callback(bin_instance)
+
+# Helper function for tests to clear data
+def _reset_bins_data():
+    global _bin_set_version, _storage, _storage_sequence, _store
+    _storage = None
+    _storage_sequence = 0
+    _store = ColumnarBinStore()
+    _bins.clear()
+    _sorted_bin_ids.clear()
+    _fill_series.clear()
+    _spatial_index.clear()
+    _bin_ids_by_status.clear()
+    _bin_set_version += 1  # Not reset, so anything synced to an earlier version sees that the bins changed
+    _bin_listeners.clear()
+
 if __name__ == "__main__":
     print("--- Initializing Bin Manager ---")
 
@@ -0,0 +1,387 @@
+import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .models import TrashBin
+from .sensor_simulator import EMPTY_FILL_RATIO, FULL_FILL_RATIO
+
+# Status codes stored in the status column; the code is the index into this tuple
+STATUS_NAMES = ('EMPTY', 'FILLING', 'FULL', 'NEEDS_MAINTENANCE')
+STATUS_CODES: Dict[str, int] = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+# Upper bounds used by np.digitize: ratio < 0.1 -> 0 (EMPTY), < 0.8 -> 1 (FILLING), else 2 (FULL)
+_STATUS_BOUNDARIES = np.array([EMPTY_FILL_RATIO, FULL_FILL_RATIO])
+
+def derive_status_codes(fill_levels: np.ndarray, capacities: np.ndarray) -> np.ndarray:
+    """
+    Derives bin status codes for many readings in one vectorized pass.
+
+    Uses the same thresholds as sensor_simulator.update_bin_fill_level.
+
+    Args:
+        fill_levels: Array of fill levels in gallons.
+        capacities: Array of bin capacities in gallons, broadcastable to fill_levels.
+
+    Returns:
+        An int8 array of codes into STATUS_NAMES.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fill_ratios = np.asarray(fill_levels, dtype=np.float64) / capacities
+    return np.digitize(fill_ratios, _STATUS_BOUNDARIES).astype(np.int8)
+
+def _now_iso() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+def _to_epoch(timestamp: str) -> float:
+    return datetime.datetime.fromisoformat(timestamp).timestamp()
+
+class ColumnarBinStore:
+    """
+    Array-backed bin store for bulk fill-level processing.
+
+    bin_manager keeps its bins in one of these stores (see put_bin) and hands out views of
+    them; batch jobs can also build a separate store from TrashBin instances (from_bins).
+
+    Fill level, capacity, status code, last-updated epoch and version live in NumPy columns,
+    with an ID-to-row map for lookups. The last-updated time is also kept as the ISO string
+    it was given in, so views return it unchanged. Rows are never reused, so row numbers stay
+    valid for the lifetime of the store. TrashBin-compatible views are created on
+    demand by view().
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        Initializes an empty store.
+
+        Args:
+            initial_capacity: Number of rows to preallocate; columns grow by doubling.
+        """
+        initial_capacity = max(1, initial_capacity)
+        self._size = 0
+        self._row_by_id: Dict[str, int] = {}
+        self._bin_ids: List[str] = []
+        self._locations: List[Dict[str, float]] = []
+        self._fill = np.zeros(initial_capacity, dtype=np.float64)
+        self._capacity = np.zeros(initial_capacity, dtype=np.float64)
+        self._status = np.zeros(initial_capacity, dtype=np.int8)
+        self._updated_epoch = np.zeros(initial_capacity, dtype=np.float64)
+        self._updated_at = np.empty(initial_capacity, dtype=object)  # ISO strings
+        self._version = np.zeros(initial_capacity, dtype=np.int64)
+
+    @classmethod
+    def from_bins(cls, bins: Iterable[TrashBin]) -> 'ColumnarBinStore':
+        """
+        Builds a store from existing TrashBin instances (e.g. bin_manager.list_bins()).
+
+        Args:
+            bins: The bins to copy into the store.
+
+        Returns:
+            A new ColumnarBinStore holding the bins' current values.
+        """
+        bins = list(bins)
+        store = cls(initial_capacity=len(bins))
+        rows = store.add_bins(
+            [bin_obj.bin_id for bin_obj in bins],
+            [bin_obj.location for bin_obj in bins],
+            [bin_obj.capacity_gallons for bin_obj in bins],
+            [bin_obj.current_fill_level_gallons for bin_obj in bins],
+        )
+        # Keep each bin's own status, timestamp and version rather than the freshly derived ones
+        store._status[rows] = [STATUS_CODES.get(bin_obj.status, STATUS_CODES['NEEDS_MAINTENANCE']) for bin_obj in bins]
+        store._updated_at[rows] = [bin_obj.last_updated for bin_obj in bins]
+        store._updated_epoch[rows] = [_to_epoch(bin_obj.last_updated) for bin_obj in bins]
+        store._version[rows] = [bin_obj.version for bin_obj in bins]
+        return store
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, bin_id: str) -> bool:
+        return bin_id in self._row_by_id
+
+    def _grow(self, min_capacity: int) -> None:
+        new_capacity = max(min_capacity, 2 * len(self._fill))
+        for name in ('_fill', '_capacity', '_status', '_updated_epoch', '_updated_at', '_version'):
+            column = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def add_bin(self, bin_id: str, location: Dict[str, float], capacity_gallons: float,
+                fill_level_gallons: float = 0.0, timestamp: Optional[str] = None) -> int:
+        """
+        Appends a bin to the store.
+
+        Args:
+            bin_id: The unique identifier for the bin.
+            location: A dictionary with 'lat' and 'lon' keys for the bin's location.
+            capacity_gallons: The total capacity of the bin in gallons.
+            fill_level_gallons: The initial fill level in gallons.
+            timestamp: An optional ISO format last-updated time. Defaults to now.
+
+        Returns:
+            The row number assigned to the bin.
+
+        Raises:
+            ValueError: If a bin with the given bin_id already exists, or capacity_gallons is not positive.
+        """
+        if bin_id in self._row_by_id:
+            raise ValueError(f"Bin with ID '{bin_id}' already exists.")
+        if not capacity_gallons > 0:
+            raise ValueError("capacity_gallons must be positive.")
+        if self._size == len(self._fill):
+            self._grow(self._size + 1)
+
+        row = self._size
+        self._fill[row] = fill_level_gallons
+        self._capacity[row] = capacity_gallons
+        self._status[row] = derive_status_codes(self._fill[row], self._capacity[row])
+        self._set_updated(row, timestamp or _now_iso())
+        self._bin_ids.append(bin_id)
+        self._locations.append(location)
+        self._row_by_id[bin_id] = row
+        self._size += 1
+        return row
+
+    def add_bins(self, bin_ids: Sequence[str], locations: Sequence[Dict[str, float]], capacities: Sequence[float],
+                 fill_levels: Optional[Sequence[float]] = None, timestamp: Optional[str] = None) -> np.ndarray:
+        """
+        Appends many bins at once, deriving their statuses in one vectorized pass.
+
+        Args:
+            bin_ids: The unique identifiers for the new bins.
+            locations: Location dictionaries aligned with bin_ids.
+            capacities: Capacities in gallons aligned with bin_ids.
+            fill_levels: Optional initial fill levels in gallons. Defaults to empty bins.
+            timestamp: An optional ISO format last-updated time shared by all bins. Defaults to now.
+
+        Returns:
+            The row numbers assigned to the new bins.
+
+        Raises:
+            ValueError: If any bin ID already exists or repeats, the inputs are misaligned,
+                        or a capacity is not positive.
+        """
+        count = len(bin_ids)
+        if len(locations) != count or len(capacities) != count or (fill_levels is not None and len(fill_levels) != count):
+            raise ValueError("bin_ids, locations, capacities and fill_levels must have the same length.")
+        new_ids = set(bin_ids)
+        if len(new_ids) != count or not new_ids.isdisjoint(self._row_by_id):
+            raise ValueError("Bin IDs must be unique and not already in the store.")
+        capacities = np.asarray(capacities, dtype=np.float64)
+        if count and not (capacities > 0).all():
+            raise ValueError("capacity_gallons must be positive.")
+        if self._size + count > len(self._fill):
+            self._grow(self._size + count)
+
+        start, end = self._size, self._size + count
+        self._capacity[start:end] = capacities
+        self._fill[start:end] = 0.0 if fill_levels is None else fill_levels
+        self._status[start:end] = derive_status_codes(self._fill[start:end], self._capacity[start:end])
+        self._set_updated(slice(start, end), timestamp or _now_iso())
+        self._bin_ids.extend(bin_ids)
+        self._locations.extend(locations)
+        self._row_by_id.update(zip(bin_ids, range(start, end)))
+        self._size = end
+        return np.arange(start, end)
+
+    def put_bin(self, bin_instance: TrashBin) -> 'TrashBinView':
+        """
+        Copies every field of a TrashBin into its row, appending a row for a new bin.
+
+        Unlike add_bin, the bin's own status, timestamp and version are kept and its capacity
+        is not validated, so any stored bin record can be loaded.
+
+        Args:
+            bin_instance: The bin to store.
+
+        Returns:
+            A view of the bin's row.
+        """
+        row = self._row_by_id.get(bin_instance.bin_id)
+        if row is None:
+            if self._size == len(self._fill):
+                self._grow(self._size + 1)
+            row = self._size
+            self._bin_ids.append(bin_instance.bin_id)
+            self._locations.append(bin_instance.location)
+            self._row_by_id[bin_instance.bin_id] = row
+            self._size += 1
+        else:
+            self._locations[row] = bin_instance.location
+        self._fill[row] = bin_instance.current_fill_level_gallons
+        self._capacity[row] = bin_instance.capacity_gallons
+        self._status[row] = STATUS_CODES.get(bin_instance.status, STATUS_CODES['NEEDS_MAINTENANCE'])
+        self._set_updated(row, bin_instance.last_updated)
+        self._version[row] = bin_instance.version
+        return TrashBinView(self, row)
+
+    def _set_updated(self, rows, timestamp: str) -> None:
+        self._updated_at[rows] = timestamp
+        self._updated_epoch[rows] = _to_epoch(timestamp)
+
+    def rows_for(self, bin_ids: Sequence[str]) -> np.ndarray:
+        """
+        Maps bin IDs to row numbers.
+
+        Args:
+            bin_ids: The IDs to look up.
+
+        Returns:
+            An int64 array of row numbers aligned with bin_ids.
+
+        Raises:
+            KeyError: If any bin ID is not in the store.
+        """
+        row_by_id = self._row_by_id
+        return np.fromiter((row_by_id[bin_id] for bin_id in bin_ids), dtype=np.int64, count=len(bin_ids))
+
+    def apply_readings(self, rows: np.ndarray, fill_levels: np.ndarray, timestamp: Optional[str] = None) -> np.ndarray:
+        """
+        Applies fill-level readings to many rows, re-deriving their status and bumping their versions in one pass.
+
+        Args:
+            rows: Row numbers to update (see rows_for). If a row repeats, its last reading wins and
+                  its version is bumped once per reading.
+            fill_levels: New fill levels in gallons, aligned with rows.
+            timestamp: An optional ISO format time shared by all readings. Defaults to now.
+
+        Returns:
+            The new status codes for the updated rows.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        fill_levels = np.asarray(fill_levels, dtype=np.float64)
+        if rows.shape != fill_levels.shape:
+            raise ValueError("rows and fill_levels must have the same shape.")
+
+        self._fill[rows] = fill_levels
+        status_codes = derive_status_codes(fill_levels, self._capacity[rows])
+        self._status[rows] = status_codes
+        self._set_updated(rows, timestamp or _now_iso())
+        np.add.at(self._version, rows, 1)
+        return status_codes
+
+    def statuses(self, rows: np.ndarray) -> List[str]:
+        """Returns the status names of the given rows, in the same order."""
+        return [STATUS_NAMES[code] for code in self._status[rows].tolist()]
+
+    def capacities(self, rows: np.ndarray) -> List[float]:
+        """Returns the capacities in gallons of the given rows, in the same order."""
+        return self._capacity[rows].tolist()
+
+    def update_bins(self, bin_ids: Sequence[str], fill_levels: Sequence[float], timestamp: Optional[str] = None) -> np.ndarray:
+        """Applies readings addressed by bin ID. See apply_readings."""
+        return self.apply_readings(self.rows_for(bin_ids), np.asarray(fill_levels, dtype=np.float64), timestamp)
+
+    def simulate_step(self, rng: Optional[np.random.Generator] = None, low: float = 0.1, high: float = 1.0,
+                      timestamp: Optional[str] = None) -> None:
+        """
+        Vectorized counterpart of sensor_simulator.generate_sensor_reading for every bin.
+
+        Adds a uniform random increase in [low, high) gallons to each bin, capped at capacity.
+
+        Args:
+            rng: Optional NumPy random generator, for reproducible runs.
+            low: Smallest increase in gallons.
+            high: Largest increase in gallons.
+            timestamp: An optional ISO format time for the step. Defaults to now.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        size = self._size
+        new_fill = np.minimum(self._fill[:size] + rng.uniform(low, high, size), self._capacity[:size])
+        self.apply_readings(np.arange(size), new_fill, timestamp)
+
+    def status_counts(self) -> Dict[str, int]:
+        """Returns the number of bins per status name."""
+        counts = np.bincount(self._status[:self._size], minlength=len(STATUS_NAMES))
+        return {name: int(count) for name, count in zip(STATUS_NAMES, counts)}
+
+    def ids_with_status(self, status: str) -> List[str]:
+        """Returns the IDs of all bins with the given status name, in row order."""
+        code = STATUS_CODES.get(status)
+        if code is None:
+            return []
+        bin_ids = self._bin_ids
+        return [bin_ids[row] for row in np.flatnonzero(self._status[:self._size] == code)]
+
+    def view(self, bin_id: str) -> Optional['TrashBinView']:
+        """Returns a TrashBin view of a stored bin, or None if it is not in the store."""
+        row = self._row_by_id.get(bin_id)
+        if row is None:
+            return None
+        return TrashBinView(self, row)
+
+    def views(self) -> Iterator['TrashBinView']:
+        """Yields TrashBin views of every stored bin, in row order."""
+        for row in range(self._size):
+            yield TrashBinView(self, row)
+
+class TrashBinView(TrashBin):
+    """
+    A TrashBin whose fields read from and write to one row of a ColumnarBinStore.
+
+    Views hold no data of their own, so they are cheap to create and always reflect
+    the latest vectorized updates. dataclasses.asdict and equality work as for TrashBin,
+    and every field but bin_id can be assigned.
+    """
+
+    def __init__(self, store: ColumnarBinStore, row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def bin_id(self) -> str:
+        return self._store._bin_ids[self._row]
+
+    @property
+    def location(self) -> Dict[str, float]:
+        return self._store._locations[self._row]
+
+    @location.setter
+    def location(self, value: Dict[str, float]) -> None:
+        self._store._locations[self._row] = value
+
+    @property
+    def capacity_gallons(self) -> float:
+        return float(self._store._capacity[self._row])
+
+    @capacity_gallons.setter
+    def capacity_gallons(self, value: float) -> None:
+        self._store._capacity[self._row] = value
+
+    @property
+    def current_fill_level_gallons(self) -> float:
+        return float(self._store._fill[self._row])
+
+    @current_fill_level_gallons.setter
+    def current_fill_level_gallons(self, value: float) -> None:
+        self._store._fill[self._row] = value
+
+    @property
+    def last_updated(self) -> str:
+        return self._store._updated_at[self._row]
+
+    @last_updated.setter
+    def last_updated(self, value: str) -> None:
+        self._store._set_updated(self._row, value)
+
+    @property
+    def version(self) -> int:
+        return int(self._store._version[self._row])
+
+    @version.setter
+    def version(self, value: int) -> None:
+        self._store._version[self._row] = value
+
+    @property
+    def status(self) -> str:
+        return STATUS_NAMES[self._store._status[self._row]]
+
+    @status.setter
+    def status(self, value: str) -> None:
+        if value not in STATUS_CODES:
+            raise ValueError(f"Unknown bin status '{value}'.")
+        self._store._status[self._row] = STATUS_CODES[value]
@@ -0,0 +1,549 @@
+import glob
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from common.geo import EARTH_RADIUS_METERS, METERS_PER_DEGREE
+
+from . import bin_manager
+from .models import TrashBin
+
+# Default number of nearest neighbors kept per bin.
+DEFAULT_NEIGHBOR_COUNT = 16
+# Side of a vectorized block of distances; a block holds about block_size**2 of them in memory.
+DEFAULT_BLOCK_SIZE = 1024
+# Lists recomputed by comparing with every bin on one query, beyond which rebuilding all of them
+# with nearest_neighbor_lists is cheaper (a rebuild costs about as much as a few hundred full comparisons).
+INCREMENTAL_ROW_LIMIT = 256
+
+_ARRAYS_FILE = "neighbors_v{version}.npz"
+_METADATA_FILE = "neighbors_v{version}.json"
+_METADATA_PATTERN = re.compile(r"neighbors_v(\d+)\.json$")
+
+def pairwise_haversine(lats_a: np.ndarray, lons_a: np.ndarray, lats_b: np.ndarray, lons_b: np.ndarray) -> np.ndarray:
+    """
+    Computes great-circle distances between every point of one set and every point of another.
+
+    Args:
+        lats_a: Latitudes of the first set in degrees.
+        lons_a: Longitudes of the first set in degrees.
+        lats_b: Latitudes of the second set in degrees.
+        lons_b: Longitudes of the second set in degrees.
+
+    Returns:
+        An (len(a), len(b)) array of distances in meters.
+    """
+    phi_a = np.radians(np.asarray(lats_a, dtype=np.float64))
+    phi_b = np.radians(np.asarray(lats_b, dtype=np.float64))
+    lam_a = np.radians(np.asarray(lons_a, dtype=np.float64))
+    lam_b = np.radians(np.asarray(lons_b, dtype=np.float64))
+    a = (np.sin((phi_a[:, None] - phi_b[None, :]) / 2.0) ** 2
+         + np.cos(phi_a)[:, None] * np.cos(phi_b)[None, :] * np.sin((lam_a[:, None] - lam_b[None, :]) / 2.0) ** 2)
+    return 2.0 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def nearest_neighbor_lists(lats: Sequence[float], lons: Sequence[float], k: int,
+                           block_size: int = DEFAULT_BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds each point's k nearest other points without computing all pairwise distances.
+
+    Points are bucketed into a grid sized for about k points per cell, and each cell is compared
+    with the 3x3 block of cells around it. Points whose k-th neighbor could lie outside that
+    block (sparse areas) are compared with every point, block by block, so the result is exact
+    while memory stays proportional to n * k.
+
+    Args:
+        lats: Latitudes in degrees.
+        lons: Longitudes in degrees.
+        k: Number of neighbors per point.
+        block_size: Bounds the distances held at once, for the points resolved by full scan, to about block_size**2.
+
+    Returns:
+        (rows, distances) arrays of shape (n, k), nearest first: the indices of the neighbors and
+        their distances in meters (float32), padded with -1 and inf when there are fewer than k
+        other points.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    n = len(lats)
+    rows = np.full((n, k), -1, dtype=np.int64)
+    distances = np.full((n, k), np.inf, dtype=np.float32)
+    if n < 2 or k <= 0:
+        return rows, distances
+
+    # Equirectangular grid: x is longitude scaled to degrees of latitude at the mean latitude
+    lon_scale = np.cos(np.radians(lats.mean()))
+    x = (lons - lons.min()) * lon_scale
+    y = lats - lats.min()
+    area = max(float(x.max()) * float(y.max()), 1e-12)
+    cell = max(np.sqrt(area * k / n), 1e-6)
+    cell_x = np.floor(x / cell).astype(np.int64)
+    cell_y = np.floor(y / cell).astype(np.int64)
+    columns = int(cell_y.max()) + 1
+    keys = cell_x * columns + cell_y
+    by_key = np.argsort(keys, kind='stable')
+    cell_keys, starts = np.unique(keys[by_key], return_index=True)
+    ends = np.append(starts[1:], n)
+    members = {key: by_key[start:end] for key, start, end in zip(cell_keys.tolist(), starts.tolist(), ends.tolist())}
+
+    # A 3x3 block covers at least one cell width around every point of its center cell; east-west
+    # that width shrinks with the cosine of the point's latitude relative to the mean latitude.
+    covered = METERS_PER_DEGREE * np.minimum(
+        np.minimum(x - (cell_x - 1) * cell, (cell_x + 2) * cell - x) * np.cos(np.radians(lats)) / lon_scale,
+        np.minimum(y - (cell_y - 1) * cell, (cell_y + 2) * cell - y)) * 0.999
+    unresolved = []
+    for key, points in members.items():
+        center_x, center_y = divmod(key, columns)
+        candidates = np.concatenate([members[neighbor_key]
+                                     for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                                     if 0 <= center_y + dy < columns
+                                     and (neighbor_key := (center_x + dx) * columns + center_y + dy) in members])
+        block = pairwise_haversine(lats[points], lons[points], lats[candidates], lons[candidates])
+        block[points[:, None] == candidates[None, :]] = np.inf  # A point is not its own neighbor
+        picked_rows, picked_distances = _smallest_k(block, k, np.broadcast_to(candidates, block.shape))
+        rows[points], distances[points] = picked_rows, picked_distances
+        kth = picked_distances.max(axis=1)
+        unresolved.append(points[kth > covered[points]])
+
+    unresolved = np.concatenate(unresolved) if unresolved else np.zeros(0, dtype=np.int64)
+    rows_per_block = _rows_per_block(block_size, n)
+    for block_start in range(0, len(unresolved), rows_per_block):
+        points = unresolved[block_start:block_start + rows_per_block]
+        block = pairwise_haversine(lats[points], lons[points], lats, lons)
+        block[np.arange(len(points)), points] = np.inf
+        rows[points], distances[points] = _smallest_k(block, k)
+
+    order = np.argsort(distances, axis=1, kind='stable')
+    return np.take_along_axis(rows, order, axis=1), np.take_along_axis(distances, order, axis=1)
+
+class DistanceMatrixService:
+    """
+    Bin-to-bin distances and k-nearest-neighbor lists, kept in step with the bins.
+
+    Only each bin's location and its neighbor_count nearest other bins (as row numbers and
+    float32 distances) are stored, so memory and the cache file grow linearly with the number
+    of bins; any other distance is computed from the locations when asked for. The lists let
+    routing code consider a few candidate bins per stop instead of every bin.
+
+    Added and moved bins are recorded when they are reported and folded into the lists on the
+    next query: new bins are compared with every bin block by block, and only the lists that
+    held a moved bin are recomputed. When that would recompute more than INCREMENTAL_ROW_LIMIT
+    lists, every list is rebuilt with nearest_neighbor_lists instead.
+
+    flush() stores the lists under the bin-set version they reflect (see
+    bin_manager.get_bin_set_version), so a later process that adds the same bins in the same
+    order reuses the file and only computes lists for bins added since. Rows are assigned in
+    insertion order and bins cannot be removed except by sync() against a shorter bin list.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, neighbor_count: int = DEFAULT_NEIGHBOR_COUNT,
+                 block_size: int = DEFAULT_BLOCK_SIZE, initial_capacity: int = 1024):
+        """
+        Opens the newest cached lists in cache_dir, or starts empty.
+
+        Args:
+            cache_dir: Directory for the cache files. When None, nothing is written to disk.
+            neighbor_count: Number of nearest neighbors kept per bin.
+            block_size: Most rows compared with every bin at once (fewer when there are many bins).
+            initial_capacity: Number of rows to preallocate; the arrays grow by doubling.
+
+        Raises:
+            ValueError: If neighbor_count or block_size is not positive.
+        """
+        if neighbor_count <= 0 or block_size <= 0:
+            raise ValueError("neighbor_count and block_size must be positive.")
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.neighbor_count = neighbor_count
+        self.block_size = block_size
+        self.version = 0  # Bin-set version the stored locations reflect
+        self._bin_ids: List[str] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._lats = np.zeros(0, dtype=np.float64)
+        self._lons = np.zeros(0, dtype=np.float64)
+        self._neighbor_rows = np.zeros((0, neighbor_count), dtype=np.int64)
+        self._neighbor_distances = np.zeros((0, neighbor_count), dtype=np.float32)
+        self._neighbor_radius = np.zeros(0, dtype=np.float32)
+        self._listed = 0  # Rows below this have lists; later rows were added since
+        self._moved: Set[int] = set()  # Listed rows whose bin moved since their lists were computed
+        self._neighbors_valid = True  # False when every list must be rebuilt
+        self._attached = False
+        if not self._load_cached():
+            self._resize_row_arrays(max(1, initial_capacity))
+
+    def __len__(self) -> int:
+        return len(self._bin_ids)
+
+    def __contains__(self, bin_id: str) -> bool:
+        return bin_id in self._row_by_id
+
+    @property
+    def bin_ids(self) -> List[str]:
+        """The bin IDs in row order."""
+        return list(self._bin_ids)
+
+    # --- Keeping the lists in sync with bins ---
+
+    def attach(self) -> None:
+        """
+        Follows bin_manager: syncs with its bins, then records every later add_bin or bin move.
+
+        Calling it again only re-syncs if bins changed without this service hearing of them
+        (e.g. after bin_manager reloaded its storage), so it is cheap to call before each use.
+        """
+        bin_manager.add_bin_listener(self._on_bin_changed)
+        if not self._attached or self.version != bin_manager.get_bin_set_version():
+            self.sync(bin_manager.list_bins(), bin_manager.get_bin_set_version())
+            self._attached = True
+
+    def detach(self) -> None:
+        """Stops following bin_manager."""
+        bin_manager.remove_bin_listener(self._on_bin_changed)
+        self._attached = False
+
+    def _on_bin_changed(self, bin_instance: TrashBin) -> None:
+        self.upsert(bin_instance.bin_id, bin_instance.location['lat'], bin_instance.location['lon'],
+                    version=bin_manager.get_bin_set_version())
+
+    def sync(self, bins: Iterable[TrashBin], version: Optional[int] = None) -> int:
+        """
+        Brings the service in line with a list of bins in insertion order.
+
+        Rows for the longest common ID prefix are kept (and updated if the bin moved);
+        everything after it is added afresh.
+
+        Args:
+            bins: The bins, in the order they were added.
+            version: The bin-set version the list corresponds to. Defaults to the current version plus one.
+
+        Returns:
+            The number of bins added or moved.
+        """
+        ids, lats, lons = [], [], []
+        for bin_instance in bins:
+            ids.append(bin_instance.bin_id)
+            lats.append(bin_instance.location['lat'])
+            lons.append(bin_instance.location['lon'])
+
+        prefix = 0
+        limit = min(len(ids), len(self._bin_ids))
+        while prefix < limit and self._bin_ids[prefix] == ids[prefix]:
+            prefix += 1
+        if prefix < len(self._bin_ids):
+            self._truncate(prefix)
+
+        moved = np.flatnonzero((self._lats[:prefix] != lats[:prefix]) | (self._lons[:prefix] != lons[:prefix]))
+        for row in moved.tolist():
+            self._move_row(row, lats[row], lons[row])
+        if prefix < len(ids):
+            self.add_points(ids[prefix:], lats[prefix:], lons[prefix:])
+        self.version = self.version + 1 if version is None else version
+        return len(moved) + len(ids) - prefix
+
+    def upsert(self, bin_id: str, lat: float, lon: float, version: Optional[int] = None) -> None:
+        """
+        Adds a bin or updates its location.
+
+        Args:
+            bin_id: The bin ID.
+            lat: Latitude in degrees.
+            lon: Longitude in degrees.
+            version: The bin-set version after the change. Defaults to the current version plus one.
+        """
+        row = self._row_by_id.get(bin_id)
+        if row is None:
+            self.add_points([bin_id], [lat], [lon])
+        elif self._lats[row] != lat or self._lons[row] != lon:
+            self._move_row(row, lat, lon)
+        self.version = self.version + 1 if version is None else version
+
+    def add_points(self, bin_ids: Sequence[str], lats: Sequence[float], lons: Sequence[float]) -> None:
+        """
+        Appends new bins; their neighbor lists are computed on the next query.
+
+        Args:
+            bin_ids: IDs of the new bins.
+            lats: Their latitudes in degrees.
+            lons: Their longitudes in degrees.
+
+        Raises:
+            ValueError: If an ID is already present or repeated, or the sequences differ in length.
+        """
+        if not (len(bin_ids) == len(lats) == len(lons)):
+            raise ValueError("bin_ids, lats and lons must have the same length.")
+        if len(set(bin_ids)) != len(bin_ids) or any(bin_id in self._row_by_id for bin_id in bin_ids):
+            raise ValueError("Bin IDs must be unique and not already in the service.")
+        if not bin_ids:
+            return
+
+        start = len(self._bin_ids)
+        size = start + len(bin_ids)
+        if size > len(self._lats):
+            # Leave headroom after bulk loads too, so the next add_bin calls do not each grow the arrays
+            self._resize_row_arrays(max(size + size // 4, 2 * len(self._lats)))
+        self._lats[start:size] = lats
+        self._lons[start:size] = lons
+        for offset, bin_id in enumerate(bin_ids):
+            self._row_by_id[bin_id] = start + offset
+        self._bin_ids.extend(bin_ids)
+
+    def _move_row(self, row: int, lat: float, lon: float) -> None:
+        self._lats[row] = lat
+        self._lons[row] = lon
+        if row < self._listed:
+            self._moved.add(row)
+
+    def _truncate(self, size: int) -> None:
+        for bin_id in self._bin_ids[size:]:
+            del self._row_by_id[bin_id]
+        del self._bin_ids[size:]
+        self._neighbors_valid = False
+
+    # --- Queries ---
+
+    def distance(self, bin_id_a: str, bin_id_b: str) -> float:
+        """
+        Returns the great-circle distance in meters between two bins.
+
+        Raises:
+            KeyError: If either bin is not in the service.
+        """
+        row_a = self._row_by_id[bin_id_a]
+        row_b = self._row_by_id[bin_id_b]
+        return float(pairwise_haversine(self._lats[row_a:row_a + 1], self._lons[row_a:row_a + 1],
+                                        self._lats[row_b:row_b + 1], self._lons[row_b:row_b + 1])[0, 0])
+
+    def distances(self, bin_ids: Sequence[str]) -> np.ndarray:
+        """
+        Returns the distance matrix of a list of bins.
+
+        Args:
+            bin_ids: The bins, in the row/column order wanted.
+
+        Returns:
+            A float64 (len(bin_ids), len(bin_ids)) array of distances in meters.
+
+        Raises:
+            KeyError: If a bin is not in the service.
+        """
+        rows = np.fromiter((self._row_by_id[bin_id] for bin_id in bin_ids), dtype=np.int64, count=len(bin_ids))
+        lats, lons = self._lats[rows], self._lons[rows]
+        return pairwise_haversine(lats, lons, lats, lons)
+
+    def nearest_neighbors(self, bin_id: str, k: Optional[int] = None) -> List[Tuple[float, str]]:
+        """
+        Returns a bin's nearest other bins from the neighbor lists.
+
+        Args:
+            bin_id: The bin to look up.
+            k: Number of neighbors to return, at most neighbor_count. Defaults to neighbor_count.
+
+        Returns:
+            (distance_meters, bin_id) tuples, nearest first.
+
+        Raises:
+            KeyError: If the bin is not in the service.
+        """
+        row = self._row_by_id[bin_id]
+        self._ensure_neighbors()
+        rows = self._neighbor_rows[row]
+        distances = self._neighbor_distances[row]
+        order = np.argsort(distances, kind='stable')[:k]
+        return [(float(distances[i]), self._bin_ids[rows[i]]) for i in order if rows[i] >= 0]
+
+    def candidate_lists(self, bin_ids: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Returns the nearest-neighbor candidate IDs (nearest first) for many bins at once.
+
+        Args:
+            bin_ids: The bins to include. Defaults to every bin in the service.
+        """
+        self._ensure_neighbors()
+        ids = self._bin_ids
+        wanted = ids if bin_ids is None else list(bin_ids)
+        rows = np.fromiter((self._row_by_id[bin_id] for bin_id in wanted), dtype=np.int64, count=len(wanted))
+        order = np.argsort(self._neighbor_distances[rows], axis=1, kind='stable')
+        sorted_rows = np.take_along_axis(self._neighbor_rows[rows], order, axis=1)
+        return {bin_id: [ids[row] for row in neighbors if row >= 0] for bin_id, neighbors in zip(wanted, sorted_rows.tolist())}
+
+    # --- Nearest-neighbor lists ---
+
+    def _ensure_neighbors(self) -> None:
+        """Folds the bins added or moved since the last query into the lists."""
+        added = len(self._bin_ids) - self._listed
+        # A moved bin's list is recomputed, and so are the lists it was in (about neighbor_count of them)
+        if not self._neighbors_valid or added + len(self._moved) * (self.neighbor_count + 1) > INCREMENTAL_ROW_LIMIT:
+            self._rebuild_neighbors()
+            return
+        if self._moved:
+            self._update_moved_rows(np.fromiter(sorted(self._moved), dtype=np.int64, count=len(self._moved)))
+            self._moved.clear()
+        if added:
+            self._add_neighbor_rows()
+
+    def _rebuild_neighbors(self) -> None:
+        size = len(self._bin_ids)
+        self._neighbor_rows[:size], self._neighbor_distances[:size] = nearest_neighbor_lists(
+            self._lats[:size], self._lons[:size], self.neighbor_count, self.block_size)
+        self._neighbor_radius[:size] = self._neighbor_distances[:size, -1]  # Sorted nearest first
+        self._listed = size
+        self._moved.clear()
+        self._neighbors_valid = True
+
+    def _compute_rows(self, rows: np.ndarray, columns: int) -> None:
+        """Recomputes the lists of some rows from scratch against the first `columns` rows."""
+        rows_per_block = _rows_per_block(self.block_size, columns)
+        for block_start in range(0, len(rows), rows_per_block):
+            block_rows = rows[block_start:block_start + rows_per_block]
+            block = pairwise_haversine(self._lats[block_rows], self._lons[block_rows], self._lats[:columns], self._lons[:columns])
+            block[np.arange(len(block_rows)), block_rows] = np.inf  # A bin is not its own neighbor
+            self._neighbor_rows[block_rows], self._neighbor_distances[block_rows] = _smallest_k(block, self.neighbor_count)
+            self._neighbor_radius[block_rows] = self._neighbor_distances[block_rows].max(axis=1)
+
+    def _merge_columns(self, rows: np.ndarray, columns: np.ndarray) -> None:
+        """Offers some rows as extra candidates to other rows whose lists do not hold them yet."""
+        rows_per_block = _rows_per_block(self.block_size, len(columns))
+        for block_start in range(0, len(rows), rows_per_block):
+            block_rows = rows[block_start:block_start + rows_per_block]
+            new_distances = pairwise_haversine(self._lats[block_rows], self._lons[block_rows],
+                                               self._lats[columns], self._lons[columns])
+            # Only rows where some offered bin beats the current k-th neighbor change.
+            hits = np.flatnonzero(new_distances.min(axis=1) < self._neighbor_radius[block_rows])
+            if not len(hits):
+                continue
+            hit_rows = block_rows[hits]
+            new_distances = new_distances[hits]
+            candidate_distances = np.concatenate((self._neighbor_distances[hit_rows], new_distances), axis=1)
+            candidate_rows = np.concatenate((self._neighbor_rows[hit_rows], np.broadcast_to(columns, new_distances.shape)), axis=1)
+            self._neighbor_rows[hit_rows], self._neighbor_distances[hit_rows] = \
+                _smallest_k(candidate_distances, self.neighbor_count, candidate_rows)
+            self._neighbor_radius[hit_rows] = self._neighbor_distances[hit_rows].max(axis=1)
+
+    def _update_moved_rows(self, moved: np.ndarray) -> None:
+        """Recomputes the lists of moved bins and of the bins that had one as a neighbor, and offers the rest the new locations."""
+        listed = self._listed
+        holds_moved = np.isin(self._neighbor_rows[:listed], moved).any(axis=1)
+        holds_moved[moved] = True
+        self._compute_rows(np.flatnonzero(holds_moved), listed)
+        self._merge_columns(np.flatnonzero(~holds_moved), moved)
+
+    def _add_neighbor_rows(self) -> None:
+        """Computes the lists of the bins added since the last query, and offers them to the earlier bins."""
+        listed, size = self._listed, len(self._bin_ids)
+        self._compute_rows(np.arange(listed, size), size)
+        self._merge_columns(np.arange(listed), np.arange(listed, size))
+        self._listed = size
+
+    # --- Storage ---
+
+    def _resize_row_arrays(self, capacity: int) -> None:
+        size = min(len(self._bin_ids), capacity)
+        lats = np.zeros(capacity, dtype=np.float64)
+        lons = np.zeros(capacity, dtype=np.float64)
+        neighbor_rows = np.full((capacity, self.neighbor_count), -1, dtype=np.int64)
+        neighbor_distances = np.full((capacity, self.neighbor_count), np.inf, dtype=np.float32)
+        neighbor_radius = np.full(capacity, np.inf, dtype=np.float32)
+        lats[:size] = self._lats[:size]
+        lons[:size] = self._lons[:size]
+        kept = min(size, len(self._neighbor_rows))
+        neighbor_rows[:kept] = self._neighbor_rows[:kept]
+        neighbor_distances[:kept] = self._neighbor_distances[:kept]
+        neighbor_radius[:kept] = self._neighbor_radius[:kept]
+        self._lats, self._lons = lats, lons
+        self._neighbor_rows, self._neighbor_distances = neighbor_rows, neighbor_distances
+        self._neighbor_radius = neighbor_radius  # Distance to the k-th (farthest kept) neighbor of each row
+
+    def flush(self) -> None:
+        """Writes the locations, lists and metadata to cache_dir under the current bin-set version."""
+        if self.cache_dir is None:
+            return
+        self._ensure_neighbors()
+        size = len(self._bin_ids)
+        arrays_path = os.path.join(self.cache_dir, _ARRAYS_FILE.format(version=self.version))
+        temp_path = os.path.join(self.cache_dir, "neighbors_writing.npz")
+        with open(temp_path, "wb") as f:
+            np.savez(f, lats=self._lats[:size], lons=self._lons[:size],
+                     neighbor_rows=self._neighbor_rows[:size], neighbor_distances=self._neighbor_distances[:size])
+        os.replace(temp_path, arrays_path)
+        metadata = {"version": self.version, "neighbor_count": self.neighbor_count, "bin_ids": self._bin_ids}
+        metadata_path = os.path.join(self.cache_dir, _METADATA_FILE.format(version=self.version))
+        temp_path = f"{metadata_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        os.replace(temp_path, metadata_path)
+        for stale in glob.glob(os.path.join(self.cache_dir, "neighbors_v*.*")):
+            if stale not in (metadata_path, arrays_path):
+                os.remove(stale)
+
+    def _load_cached(self) -> bool:
+        """Opens the newest lists recorded in cache_dir. Returns False if there are none usable."""
+        if self.cache_dir is None:
+            return False
+        candidates = []
+        for path in glob.glob(os.path.join(self.cache_dir, "neighbors_v*.json")):
+            match = _METADATA_PATTERN.search(os.path.basename(path))
+            if match:
+                candidates.append((int(match.group(1)), path))
+        for version, metadata_path in sorted(candidates, reverse=True):
+            try:
+                with open(metadata_path, encoding="utf-8") as f:
+                    metadata = json.load(f)
+                with np.load(os.path.join(self.cache_dir, _ARRAYS_FILE.format(version=version))) as arrays:
+                    lats, lons = arrays["lats"], arrays["lons"]
+                    neighbor_rows, neighbor_distances = arrays["neighbor_rows"], arrays["neighbor_distances"]
+            except (OSError, ValueError, KeyError):
+                continue
+            bin_ids = metadata.get("bin_ids", [])
+            size = len(bin_ids)
+            if lats.shape != (size,) or lons.shape != (size,):
+                continue
+            self._resize_row_arrays(max(1, size))
+            self.version = version
+            self._bin_ids = list(bin_ids)
+            self._row_by_id = {bin_id: row for row, bin_id in enumerate(bin_ids)}
+            self._lats[:size], self._lons[:size] = lats, lons
+            if metadata.get("neighbor_count") == self.neighbor_count and neighbor_rows.shape == (size, self.neighbor_count):
+                self._neighbor_rows[:size], self._neighbor_distances[:size] = neighbor_rows, neighbor_distances
+                self._neighbor_radius[:size] = neighbor_distances.max(axis=1)
+                self._listed = size
+            else:
+                self._neighbors_valid = False  # Rebuilt from the locations on first use
+            return True
+        return False
+
+    def close(self) -> None:
+        """Detaches from bin_manager and flushes to cache_dir."""
+        self.detach()
+        self.flush()
+
+def _rows_per_block(block_size: int, columns: int) -> int:
+    """Rows compared at once with `columns` points, so a block holds about block_size**2 distances."""
+    return max(1, block_size * block_size // max(1, columns))
+
+def _smallest_k(distances: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Picks the k smallest entries of each row of a distance block.
+
+    Args:
+        distances: A (m, c) array.
+        k: Number of entries to keep per row.
+        rows: Optional (m, c) matrix rows that the columns refer to; defaults to the column indices.
+
+    Returns:
+        (rows, distances) arrays of shape (m, k), unsorted, padded with -1 and inf when c < k.
+    """
+    m, c = distances.shape
+    if c > k:
+        picked = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        picked = np.broadcast_to(np.arange(c), (m, c))
+    picked_distances = np.take_along_axis(distances, picked, axis=1).astype(np.float32)
+    picked_rows = picked if rows is None else np.take_along_axis(rows, picked, axis=1)
+    picked_rows = np.where(np.isinf(picked_distances), -1, picked_rows)
+    if c < k:
+        picked_rows = np.pad(picked_rows, ((0, 0), (0, k - c)), constant_values=-1)
+        picked_distances = np.pad(picked_distances, ((0, 0), (0, k - c)), constant_values=np.inf)
+    return picked_rows, picked_distances
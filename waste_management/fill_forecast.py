@@ -0,0 +1,143 @@
+import math
+from array import array
+from typing import List, Optional, Tuple
+
+from .sensor_simulator import FULL_FILL_RATIO
+
+# Readings kept per bin; older readings are overwritten.
+DEFAULT_HISTORY_SIZE = 48
+# Time constant of the fill-rate smoothing: a rate observed this many hours ago has ~37% weight left.
+DEFAULT_SMOOTHING_HOURS = 12.0
+# Readings closer than this to the previous rate measurement are not used to measure a rate.
+MIN_RATE_INTERVAL_SECONDS = 60.0
+# A drop larger than this fraction of capacity is treated as the bin being emptied, not sensor noise.
+EMPTIED_DROP_RATIO = 0.05
+
+class FillHistory:
+    """
+    Fixed-size ring buffer of (epoch seconds, fill level) readings for one bin.
+
+    Readings are stored in two preallocated stdlib arrays (uint32 seconds and float32
+    gallons, 8 bytes per reading), so a full history costs the same memory as an empty one
+    and appending never allocates.
+    """
+
+    __slots__ = ('_times', '_levels', '_next', '_count')
+
+    def __init__(self, size: int = DEFAULT_HISTORY_SIZE):
+        """
+        Initializes an empty history.
+
+        Args:
+            size: Number of readings to keep.
+
+        Raises:
+            ValueError: If size is not positive.
+        """
+        if size <= 0:
+            raise ValueError("size must be positive.")
+        self._times = array('I', bytes(4 * size))
+        self._levels = array('f', bytes(4 * size))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, epoch_seconds: float, fill_level: float) -> None:
+        """Records a reading, overwriting the oldest one when the buffer is full."""
+        index = self._next
+        times = self._times
+        times[index] = int(epoch_seconds)
+        self._levels[index] = fill_level
+        index += 1
+        self._next = index if index < len(times) else 0
+        if self._count < len(times):
+            self._count += 1
+
+    def readings(self) -> List[Tuple[int, float]]:
+        """Returns the stored (epoch_seconds, fill_level) readings, oldest first."""
+        size = len(self._times)
+        start = (self._next - self._count) % size
+        return [(self._times[(start + i) % size], self._levels[(start + i) % size]) for i in range(self._count)]
+
+class FillRateEstimator:
+    """
+    Online estimate of how fast a bin fills, from irregularly spaced readings.
+
+    Each rise between consecutive readings gives an observed rate, which is blended into
+    the estimate by exponential smoothing with a weight of 1 - exp(-dt / smoothing_hours),
+    so a long gap between readings counts for more than a burst of closely spaced ones.
+    Readings less than MIN_RATE_INTERVAL_SECONDS apart are folded into the next measurement,
+    and drops (the bin being emptied) restart the baseline without touching the rate.
+    """
+
+    __slots__ = ('smoothing_hours', 'rate_gallons_per_hour', 'last_epoch', 'last_level', '_base_epoch', '_base_level')
+
+    def __init__(self, smoothing_hours: float = DEFAULT_SMOOTHING_HOURS):
+        self.smoothing_hours = smoothing_hours
+        self.rate_gallons_per_hour: Optional[float] = None
+        self.last_epoch: Optional[float] = None
+        self.last_level = 0.0
+        # Reading the next observed rate is measured from; it only advances once a rate is observed
+        self._base_epoch: Optional[float] = None
+        self._base_level = 0.0
+
+    def update(self, epoch_seconds: float, fill_level: float, capacity_gallons: float) -> None:
+        """Folds one reading into the estimate."""
+        previous_level = self.last_level
+        self.last_epoch, self.last_level = epoch_seconds, fill_level
+        if self._base_epoch is None or fill_level < previous_level - EMPTIED_DROP_RATIO * capacity_gallons:
+            # First reading, or the bin was emptied: the new level is the baseline for the next rate
+            self._base_epoch, self._base_level = epoch_seconds, fill_level
+            return
+        seconds = epoch_seconds - self._base_epoch
+        if seconds < MIN_RATE_INTERVAL_SECONDS:
+            return  # Too close to the baseline to give a meaningful rate
+        hours = seconds / 3600.0
+        observed = max(0.0, fill_level - self._base_level) / hours
+        self._base_epoch, self._base_level = epoch_seconds, fill_level
+        if self.rate_gallons_per_hour is None:
+            self.rate_gallons_per_hour = observed
+        else:
+            weight = 1.0 - math.exp(-hours / self.smoothing_hours)
+            self.rate_gallons_per_hour += weight * (observed - self.rate_gallons_per_hour)
+
+    def projected_level(self, epoch_seconds: float, capacity_gallons: float) -> float:
+        """Predicts the fill level at a time, capped at capacity. Without a rate, the last level is assumed to hold."""
+        if self.last_epoch is None:
+            return 0.0
+        rate = self.rate_gallons_per_hour or 0.0
+        hours = max(0.0, epoch_seconds - self.last_epoch) / 3600.0
+        return min(capacity_gallons, self.last_level + rate * hours)
+
+    def predict_crossing(self, capacity_gallons: float, threshold_ratio: float = FULL_FILL_RATIO) -> Optional[float]:
+        """
+        Predicts when the fill level reaches threshold_ratio of capacity.
+
+        Returns:
+            The epoch seconds of the crossing (the last reading's time if already past it), or
+            None if there is no reading yet or the bin is not filling.
+        """
+        if self.last_epoch is None:
+            return None
+        threshold = threshold_ratio * capacity_gallons
+        if self.last_level >= threshold:
+            return self.last_epoch
+        if not self.rate_gallons_per_hour:
+            return None
+        return self.last_epoch + 3600.0 * (threshold - self.last_level) / self.rate_gallons_per_hour
+
+class BinFillSeries:
+    """The reading history and fill-rate estimate of one bin."""
+
+    __slots__ = ('history', 'estimator')
+
+    def __init__(self, history_size: int = DEFAULT_HISTORY_SIZE, smoothing_hours: float = DEFAULT_SMOOTHING_HOURS):
+        self.history = FillHistory(history_size)
+        self.estimator = FillRateEstimator(smoothing_hours)
+
+    def record(self, epoch_seconds: float, fill_level: float, capacity_gallons: float) -> None:
+        """Appends a reading and updates the fill-rate estimate."""
+        self.history.append(epoch_seconds, fill_level)
+        self.estimator.update(epoch_seconds, fill_level, capacity_gallons)
@@ -2,6 +2,8 @@ import datetime
 from dataclasses import dataclass, field
 from typing import Optional # Used for Optional attributes like started_at, completed_at
 
+from common.serialization import dataclass_serializer
+
 @dataclass
 class TrashBin:
     """Represents a single trash bin in the waste management system."""
@@ -11,6 +13,7 @@ class TrashBin:
     current_fill_level_gallons: float = 0.0
     last_updated: str = field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc).isoformat())
     status: str = 'EMPTY'  # e.g., 'EMPTY', 'FILLING', 'FULL', 'NEEDS_MAINTENANCE'
+    version: int = 0  # Bumped by every change made through bin_manager; identifies the state in ETags
 
 @dataclass
 class WasteCollectionTruck:
@@ -31,3 +34,9 @@ class CollectionRoute:
     generated_at: str = field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc).isoformat())
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
+    planned_load_gallons: Optional[float] = None  # Set when the route was planned by the route optimizer
+    estimated_distance_meters: Optional[float] = None  # Set when the route was planned by the route optimizer
+
+# Response serializers: shallow dicts of the fields, without dataclasses.asdict's deep copy
+trash_bin_to_dict = dataclass_serializer(TrashBin)
+collection_route_to_dict = dataclass_serializer(CollectionRoute)
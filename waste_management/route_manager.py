@@ -1,27 +1,122 @@
+import contextlib
 import datetime
 import uuid
-from typing import Optional, List, Dict
-
-from .models import CollectionRoute
+from typing import Optional, List, Dict, Sequence, Tuple
+
+from common.change_feed import get_feed
+from common.pagination import SortedKeyIndex
+from .models import CollectionRoute, TrashBin, WasteCollectionTruck
+from .distance_matrix import DistanceMatrixService
+from .route_optimizer import DistanceFunction, optimize_routes
+from .storage import ROUTE_RECORD, StorageBackend
 from .bin_manager import list_bins as manager_list_bins # Aliased to avoid conflict if we had a local list_bins
+from .bin_manager import list_bins_full_within, projected_fill_levels
 from .bin_manager import add_bin as manager_add_bin # For example usage
 from .bin_manager import update_bin_from_sensor_data as manager_update_bin # For example usage
-from .bin_manager import _bins as manager_bins_store # To clear for repeatable examples
+from .bin_manager import _reset_bins_data as manager_reset_bins # To clear for repeatable examples
 
 # Module-level dictionary to store routes in memory
 _routes: Dict[str, CollectionRoute] = {}
+# Route IDs in sorted order, for keyset pagination (see list_routes_page)
+_sorted_route_ids = SortedKeyIndex()
+# Optional persistent store; when attached, _routes acts as a read-through cache in front of it
+_storage: Optional[StorageBackend] = None
+# Storage change sequence the cache reflects (see sync_storage)
+_storage_sequence = 0
+# The waste subsystem's change feed, shared with bin_manager; every changed route is published to it
+_changes = get_feed('waste')
+
+def attach_storage(backend: Optional[StorageBackend]) -> int:
+    """
+    Makes a storage backend the persistent home of route state, loading the routes it holds.
+
+    See bin_manager.attach_storage; both managers can share one backend.
+
+    Args:
+        backend: The backend to attach, or None to detach and keep running in memory only.
 
-def generate_route(assigned_truck_id: str) -> Optional[CollectionRoute]:
+    Returns:
+        The number of routes loaded.
+    """
+    global _storage, _storage_sequence
+    _storage = None
+    _routes.clear()
+    _sorted_route_ids.clear()
+    _changes.publish_reset()
+    if backend is None:
+        return 0
+    _storage_sequence = backend.change_sequence()
+    for _, record in backend.load_all(ROUTE_RECORD):
+        _cache_route(CollectionRoute(**record))
+    _storage = backend
+    return len(_routes)
+
+def sync_storage() -> int:
+    """
+    Applies route changes that other processes wrote to the attached storage since the last sync.
+
+    See bin_manager.sync_storage.
+
+    Returns:
+        The number of changed routes applied.
+    """
+    global _storage_sequence
+    if _storage is None:
+        return 0
+    sequence, changes = _storage.changes_since(_storage_sequence)
+    if changes is None:
+        return attach_storage(_storage)
+    applied = 0
+    for kind, route_id, record in changes:
+        if kind != ROUTE_RECORD or record is None:
+            continue
+        route_instance = _routes.get(route_id)
+        if route_instance is None:
+            route_instance = _cache_route(CollectionRoute(**record))
+        elif vars(route_instance) != record:
+            vars(route_instance).update(record)
+        else:
+            continue
+        _changes.publish(ROUTE_RECORD, route_id, route_instance)
+        applied += 1
+    _storage_sequence = sequence
+    return applied
+
+def _cache_route(route: CollectionRoute) -> CollectionRoute:
+    _routes[route.route_id] = route
+    _sorted_route_ids.add(route.route_id)
+    return route
+
+def _persist_route(route: CollectionRoute) -> None:
+    """Writes a changed route through to the attached storage and publishes it on the change feed."""
+    if _storage is not None:
+        _storage.put(ROUTE_RECORD, route.route_id, vars(route))
+    _changes.publish(ROUTE_RECORD, route.route_id, route)
+
+def _storage_batch():
+    """One storage transaction for a multi-record change (a no-op without storage)."""
+    return _storage.batch() if _storage is not None else contextlib.nullcontext()
+
+def generate_route(assigned_truck_id: str, truck: Optional[WasteCollectionTruck] = None,
+                   horizon_hours: Optional[float] = None) -> Optional[CollectionRoute]:
     """
     Generates a new collection route for a given truck, based on currently 'FULL' bins.
 
     Args:
         assigned_truck_id: The ID of the truck to assign to this route.
+        truck: Optional truck details. When given, the route only takes the bins that fit in the
+               truck's remaining capacity, ordered by the route optimizer (see generate_routes).
+        horizon_hours: Optional planning horizon. When given, the route also covers bins predicted
+                       to become full within that many hours (see bin_manager.list_bins_full_within).
 
     Returns:
-        The created CollectionRoute instance if there are 'FULL' bins, otherwise None.
+        The created CollectionRoute instance if there are bins to collect, otherwise None.
     """
-    full_bins = manager_list_bins(status_filter='FULL')
+    if truck is not None:
+        routes, _ = generate_routes([truck], horizon_hours=horizon_hours)
+        return routes[0] if routes else None
+
+    full_bins = _bins_to_collect(horizon_hours)
     if not full_bins:
         return None
 
@@ -36,9 +131,71 @@ def generate_route(assigned_truck_id: str) -> Optional[CollectionRoute]:
         generated_at=datetime.datetime.now(datetime.timezone.utc).isoformat()
         # started_at and completed_at default to None
     )
-    _routes[route_id] = new_route
+    _cache_route(new_route)
+    _persist_route(new_route)
     return new_route
 
+def generate_routes(trucks: Sequence[WasteCollectionTruck], time_budget_seconds: float = 5.0,
+                    distance_fn: Optional[DistanceFunction] = None,
+                    return_to_depot: bool = True,
+                    distance_matrix: Optional[DistanceMatrixService] = None,
+                    horizon_hours: Optional[float] = None) -> Tuple[List[CollectionRoute], List[str]]:
+    """
+    Plans capacity-constrained, distance-optimized routes for several trucks over the 'FULL' bins.
+
+    Each truck gets at most one route, holding the bins that fit in its remaining capacity, in
+    driving order starting from the truck's current location. See route_optimizer.optimize_routes.
+
+    Args:
+        trucks: The trucks to plan for.
+        time_budget_seconds: Wall-clock budget for route optimization.
+        distance_fn: Optional (lat1, lon1, lat2, lon2) -> meters function. Defaults to great-circle distance.
+        return_to_depot: Whether routes end back at each truck's starting location.
+        distance_matrix: Optional nearest-neighbor lists over the bins (a DistanceMatrixService attached to bin_manager).
+        horizon_hours: Optional planning horizon. When given, bins predicted to become full within
+                       that many hours are included too, and every bin's load is its fill level
+                       projected to the end of the horizon.
+
+    Returns:
+        A tuple of the created CollectionRoute instances (trucks without bins get none) and the IDs
+        of bins that did not fit in any truck.
+    """
+    full_bins = _bins_to_collect(horizon_hours)
+    if not full_bins or not trucks:
+        return [], [bin_obj.bin_id for bin_obj in full_bins]
+
+    demand_gallons = None
+    if horizon_hours is not None:
+        horizon_end = datetime.datetime.now(datetime.timezone.utc).timestamp() + horizon_hours * 3600.0
+        demand_gallons = projected_fill_levels((bin_obj.bin_id for bin_obj in full_bins), horizon_end)
+    plan = optimize_routes(trucks, full_bins, time_budget_seconds=time_budget_seconds,
+                           distance_fn=distance_fn, return_to_depot=return_to_depot,
+                           distance_matrix=distance_matrix, demand_gallons=demand_gallons)
+    generated_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    new_routes = []
+    for planned in plan.routes:
+        route_id = str(uuid.uuid4())
+        new_route = CollectionRoute(
+            route_id=route_id,
+            assigned_truck_id=planned.truck_id,
+            bin_ids_to_collect=planned.bin_ids,
+            status='PENDING',
+            generated_at=generated_at,
+            planned_load_gallons=planned.load_gallons,
+            estimated_distance_meters=planned.distance_meters,
+        )
+        new_routes.append(_cache_route(new_route))
+    with _storage_batch():
+        for new_route in new_routes:
+            _persist_route(new_route)
+    return new_routes, plan.unassigned_bin_ids
+
+def _bins_to_collect(horizon_hours: Optional[float]) -> List[TrashBin]:
+    """The 'FULL' bins, plus those predicted to fill up within horizon_hours when it is given."""
+    if horizon_hours is None:
+        return manager_list_bins(status_filter='FULL')
+    return list_bins_full_within(horizon_hours)
+
 def get_route(route_id: str) -> Optional[CollectionRoute]:
     """
     Retrieves a collection route by its ID.
@@ -49,7 +206,12 @@ def get_route(route_id: str) -> Optional[CollectionRoute]:
     Returns:
         The CollectionRoute instance if found, otherwise None.
     """
-    return _routes.get(route_id)
+    route_instance = _routes.get(route_id)
+    if route_instance is None and _storage is not None:
+        record = _storage.get(ROUTE_RECORD, route_id)
+        if record is not None:
+            route_instance = _cache_route(CollectionRoute(**record))
+    return route_instance
 
 def list_routes(status_filter: Optional[str] = None) -> List[CollectionRoute]:
     """
@@ -65,6 +227,24 @@ def list_routes(status_filter: Optional[str] = None) -> List[CollectionRoute]:
         return [route_obj for route_obj in _routes.values() if route_obj.status == status_filter]
     return list(_routes.values())
 
+def list_routes_page(limit: int, after: Optional[str] = None,
+                     status_filter: Optional[str] = None) -> Tuple[List[CollectionRoute], Optional[str]]:
+    """
+    Lists one page of collection routes in route ID order, optionally filtering by status.
+
+    See bin_manager.list_bins_page.
+
+    Args:
+        limit: Maximum number of routes to return.
+        after: The last route ID of the previous page, or None for the first page.
+        status_filter: An optional status string (e.g., 'PENDING', 'COMPLETED') to filter routes by.
+
+    Returns:
+        The routes and the route ID to pass as `after` for the next page (None on the last page).
+    """
+    predicate = (lambda r: r.status == status_filter) if status_filter else None
+    return _sorted_route_ids.page(limit, after, _routes.get, predicate)
+
 def update_route_status(route_id: str, new_status: str) -> Optional[CollectionRoute]:
     """
     Updates the status of a collection route.
@@ -83,22 +263,25 @@ def update_route_status(route_id: str, new_status: str) -> Optional[CollectionRo
     if not route_instance:
         return None
 
-    route_instance.status = new_status
-    current_time_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
-
-    if new_status == 'IN_PROGRESS' and route_instance.started_at is None:
-        route_instance.started_at = current_time_iso
-
-    if new_status in ['COMPLETED', 'CANCELLED'] and route_instance.completed_at is None:
-        route_instance.completed_at = current_time_iso
-        if new_status == 'COMPLETED':
-            print(f"Route {route_id} completed. Emptying collected bins: {route_instance.bin_ids_to_collect}")
-            for bin_id_to_empty in route_instance.bin_ids_to_collect:
-                updated_bin = manager_update_bin(bin_id_to_empty, 0.0) # Set fill level to 0
-                if updated_bin:
-                    print(f"Bin {bin_id_to_empty} emptied. New status: {updated_bin.status}, Fill level: {updated_bin.current_fill_level_gallons}")
-                else:
-                    print(f"Warning: Bin {bin_id_to_empty} from route {route_id} not found in bin_manager for emptying.")
+    # The route and the bins it empties are committed together when both managers share a backend
+    with _storage_batch():
+        route_instance.status = new_status
+        current_time_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+        if new_status == 'IN_PROGRESS' and route_instance.started_at is None:
+            route_instance.started_at = current_time_iso
+
+        if new_status in ['COMPLETED', 'CANCELLED'] and route_instance.completed_at is None:
+            route_instance.completed_at = current_time_iso
+            if new_status == 'COMPLETED':
+                print(f"Route {route_id} completed. Emptying collected bins: {route_instance.bin_ids_to_collect}")
+                for bin_id_to_empty in route_instance.bin_ids_to_collect:
+                    updated_bin = manager_update_bin(bin_id_to_empty, 0.0) # Set fill level to 0
+                    if updated_bin:
+                        print(f"Bin {bin_id_to_empty} emptied. New status: {updated_bin.status}, Fill level: {updated_bin.current_fill_level_gallons}")
+                    else:
+                        print(f"Warning: Bin {bin_id_to_empty} from route {route_id} not found in bin_manager for emptying.")
+        _persist_route(route_instance)
 
     return route_instance
 
@@ -106,8 +289,8 @@ if __name__ == "__main__":
     print("--- Initializing Route Manager ---")
 
     # Clear any existing bins from bin_manager for a clean example run
-    # This is a bit of a hack for example purposes, directly accessing _bins
-    manager_bins_store.clear()
+    # This is a bit of a hack for example purposes, using the bin_manager test helper
+    manager_reset_bins()
     _routes.clear() # Also clear any routes from previous partial runs of this example
 
     print("\n--- Setting up Bins (via bin_manager) ---")
@@ -0,0 +1,460 @@
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from common.geo import EARTH_RADIUS_METERS
+
+from .distance_matrix import DistanceMatrixService, nearest_neighbor_lists, pairwise_haversine
+from .models import TrashBin, WasteCollectionTruck
+from .spatial_index import GridSpatialIndex
+
+# Signature of a pluggable distance function: (lat1, lon1, lat2, lon2) -> meters.
+DistanceFunction = Callable[[float, float, float, float], float]
+
+# Moves must shorten a route by more than this many meters to be applied (avoids float churn).
+_MIN_GAIN_METERS = 1e-6
+# Longest segment Or-opt tries to relocate.
+_OR_OPT_MAX_SEGMENT = 3
+# Routes with more nodes than this are improved with candidate lists instead of a dense distance matrix.
+DENSE_ROUTE_LIMIT = 1024
+# Nearest stops considered as new neighbors of each stop when improving routes above DENSE_ROUTE_LIMIT.
+CANDIDATE_COUNT = 16
+
+@dataclass
+class PlannedRoute:
+    """The optimized stop sequence for one truck."""
+    truck_id: str
+    bin_ids: List[str]
+    load_gallons: float
+    distance_meters: float
+
+@dataclass
+class RoutingPlan:
+    """The result of optimize_routes."""
+    routes: List[PlannedRoute]
+    unassigned_bin_ids: List[str] = field(default_factory=list)
+    total_distance_meters: float = 0.0
+    construction_distance_meters: float = 0.0  # Total distance before local search
+    budget_exhausted: bool = False  # True if local search stopped on the time budget rather than converging
+
+def haversine_matrix(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Computes all pairwise great-circle distances between points in one vectorized pass.
+
+    Args:
+        lats: Latitudes in degrees.
+        lons: Longitudes in degrees.
+
+    Returns:
+        An (n, n) array of distances in meters.
+    """
+    return pairwise_haversine(lats, lons, lats, lons)
+
+def optimize_routes(trucks: Sequence[WasteCollectionTruck], bins: Sequence[TrashBin],
+                    time_budget_seconds: float = 5.0, distance_fn: Optional[DistanceFunction] = None,
+                    return_to_depot: bool = True,
+                    distance_matrix: Optional[DistanceMatrixService] = None,
+                    demand_gallons: Optional[Dict[str, float]] = None) -> RoutingPlan:
+    """
+    Plans capacity-constrained collection routes for a fleet of trucks (a vehicle routing problem).
+
+    Routes are built with a nearest-neighbor heuristic: each truck starts at its current
+    location and repeatedly drives to the closest unassigned bin whose fill level still fits
+    in its remaining capacity, using a grid spatial index so each step only looks at nearby
+    bins. Each route is then shortened with 2-opt and Or-opt local search until no move
+    improves it or the time budget runs out. Routes longer than DENSE_ROUTE_LIMIT stops only
+    try moves between nearby stops, which keeps memory linear in the route length.
+
+    With a distance_matrix that holds every bin, its nearest-neighbor lists are used for both:
+    construction takes the first unassigned bin that fits from the current bin's list (the
+    same bin the grid search would find) before searching the grid, and long routes take
+    their candidate stops from the lists.
+
+    Args:
+        trucks: The available trucks. Capacity is capacity_gallons minus current_load_gallons.
+        bins: The bins to collect. Each bin's demand is its current_fill_level_gallons unless
+              demand_gallons overrides it.
+        time_budget_seconds: Wall-clock budget for the whole call. Construction always completes;
+                             local search stops when the budget is spent.
+        distance_fn: Optional (lat1, lon1, lat2, lon2) -> meters function used to evaluate routes
+                     (e.g. road distances). Defaults to great-circle distance. Construction always
+                     picks the geographically nearest bin.
+        return_to_depot: Whether routes end back at the truck's starting location.
+        distance_matrix: Optional DistanceMatrixService whose nearest-neighbor lists speed up
+                         construction and local search on long routes.
+        demand_gallons: Optional per-bin demand overrides (e.g. fill levels projected to pickup time).
+
+    Returns:
+        A RoutingPlan with one PlannedRoute per truck that received bins, in truck order, and
+        the IDs of bins that did not fit in any truck.
+    """
+    deadline = time.perf_counter() + time_budget_seconds
+    demand: Dict[str, float] = {}
+    location: Dict[str, tuple] = {}
+    index = GridSpatialIndex()
+    for bin_instance in bins:
+        level = bin_instance.current_fill_level_gallons
+        if demand_gallons is not None:
+            level = demand_gallons.get(bin_instance.bin_id, level)
+        demand[bin_instance.bin_id] = max(0.0, level)
+        location[bin_instance.bin_id] = (bin_instance.location['lat'], bin_instance.location['lon'])
+        index.insert(bin_instance.bin_id, *location[bin_instance.bin_id])
+
+    candidates: Optional[Dict[str, List[str]]] = None
+    if distance_matrix is not None and all(bin_id in distance_matrix for bin_id in location):
+        candidates = distance_matrix.candidate_lists(location)
+
+    # Nearest-neighbor construction
+    sequences = []
+    smallest_demand = min(demand.values(), default=0.0)
+    for truck in trucks:
+        remaining = truck.capacity_gallons - truck.current_load_gallons
+        position = (truck.current_location['lat'], truck.current_location['lon'])
+        sequence: List[str] = []
+        while len(index) and remaining >= smallest_demand:
+            budget = remaining
+            bin_id = None
+            if candidates is not None and sequence:
+                # A list holds every bin nearer than its last entry, so its first fitting bin is the nearest
+                bin_id = next((other for other in candidates[sequence[-1]] if other in index and demand[other] <= budget), None)
+            if bin_id is None:
+                found = index.nearest(position[0], position[1], lambda bin_id: demand[bin_id] <= budget)
+                if found is None:
+                    break
+                bin_id = found[1]
+            index.remove(bin_id)
+            sequence.append(bin_id)
+            remaining -= demand[bin_id]
+            position = location[bin_id]
+        sequences.append(sequence)
+
+    # Local search, one route at a time, repeated while routes keep improving
+    tours = []
+    for truck, sequence in zip(trucks, sequences):
+        if sequence:
+            if len(sequence) + 2 <= DENSE_ROUTE_LIMIT:
+                tours.append(_RouteTour(truck, sequence, location, distance_fn, return_to_depot))
+            else:
+                tours.append(_CandidateRouteTour(truck, sequence, location, distance_fn, return_to_depot, candidates))
+    construction_distance = sum(tour.length() for tour in tours)
+
+    budget_exhausted = False
+    pending = list(tours)
+    while pending:
+        still_improving = []
+        for tour in pending:
+            if tour.improve_once(deadline):
+                still_improving.append(tour)
+            if tour.interrupted:
+                budget_exhausted = True
+                break
+        if budget_exhausted:
+            break
+        pending = still_improving
+
+    routes = [
+        PlannedRoute(
+            truck_id=tour.truck_id,
+            bin_ids=tour.bin_ids(),
+            load_gallons=sum(demand[bin_id] for bin_id in tour.sequence),
+            distance_meters=tour.length(),
+        )
+        for tour in tours
+    ]
+    unassigned = [bin_instance.bin_id for bin_instance in bins if bin_instance.bin_id in index]
+    return RoutingPlan(
+        routes=routes,
+        unassigned_bin_ids=unassigned,
+        total_distance_meters=sum(route.distance_meters for route in routes),
+        construction_distance_meters=construction_distance,
+        budget_exhausted=budget_exhausted,
+    )
+
+class _RouteTour:
+    """
+    One truck's route as a node order over a small route-local distance matrix.
+
+    Node 0 is the truck's start, nodes 1..n are the bins and node n+1 is the end: a copy of
+    the start when routes return to the depot, or a dummy node at zero distance from every
+    node when they do not. Both endpoints stay fixed while the bins in between are reordered.
+    Used for routes of up to DENSE_ROUTE_LIMIT nodes; longer routes use _CandidateRouteTour.
+    """
+
+    def __init__(self, truck: WasteCollectionTruck, sequence: List[str], location: Dict[str, tuple],
+                 distance_fn: Optional[DistanceFunction], return_to_depot: bool):
+        self.truck_id = truck.truck_id
+        self.sequence = sequence
+        start = (truck.current_location['lat'], truck.current_location['lon'])
+        points = [start] + [location[bin_id] for bin_id in sequence] + [start]
+        if distance_fn is None:
+            coords = np.asarray(points, dtype=np.float64)
+            matrix = haversine_matrix(coords[:, 0], coords[:, 1])
+        else:
+            matrix = np.array([[distance_fn(a[0], a[1], b[0], b[1]) for b in points] for a in points], dtype=np.float64)
+        if not return_to_depot:
+            matrix[-1, :] = 0.0
+            matrix[:, -1] = 0.0
+        self.matrix = matrix
+        self.order = np.arange(len(points))
+        self.interrupted = False  # True once improve_once has stopped on its deadline
+
+    def bin_ids(self) -> List[str]:
+        return [self.sequence[node - 1] for node in self.order[1:-1]]
+
+    def length(self) -> float:
+        order = self.order
+        return float(self.matrix[order[:-1], order[1:]].sum())
+
+    def improve_once(self, deadline: float = float('inf')) -> bool:
+        """
+        Runs one 2-opt pass and one Or-opt pass. Returns True if the route got shorter.
+
+        Stops early, setting interrupted, once time.perf_counter() passes deadline.
+        """
+        improved = self._two_opt_pass(deadline)
+        if self.interrupted:
+            return improved
+        return self._or_opt_pass(deadline) or improved
+
+    def _two_opt_pass(self, deadline: float) -> bool:
+        """Reverses the segment between two edges whenever that shortens the route (best move per first edge)."""
+        matrix = self.matrix
+        order = self.order
+        improved = False
+        last = len(order) - 1
+        for i in range(last - 2):
+            if time.perf_counter() >= deadline:
+                self.interrupted = True
+                return improved
+            a, b = order[i], order[i + 1]
+            c = order[i + 2:last]
+            d = order[i + 3:last + 1]
+            # Replacing edges (a, b) and (c, d) with (a, c) and (b, d)
+            delta = matrix[a, c] + matrix[b, d] - matrix[a, b] - matrix[c, d]
+            best = int(delta.argmin())
+            if delta[best] < -_MIN_GAIN_METERS:
+                j = i + 2 + best
+                order[i + 1:j + 1] = order[i + 1:j + 1][::-1].copy()
+                improved = True
+        return improved
+
+    def _or_opt_pass(self, deadline: float) -> bool:
+        """Moves segments of up to three stops (optionally reversed) to their cheapest position elsewhere in the route."""
+        matrix = self.matrix
+        improved = False
+        for length in range(1, _OR_OPT_MAX_SEGMENT + 1):
+            order = self.order
+            u, v = order[:-1], order[1:]
+            edge_cost = matrix[u, v]
+            start = 1
+            while start + length <= len(order) - 1:
+                if time.perf_counter() >= deadline:
+                    self.interrupted = True
+                    return improved
+                first, end = order[start], order[start + length - 1]
+                before, after = order[start - 1], order[start + length]
+                removal_gain = matrix[before, first] + matrix[end, after] - matrix[before, after]
+
+                # Cost of inserting the segment into each edge (u[p], v[p]) of the current route;
+                # edges touching the segment are not insertion points.
+                forward = matrix[u, first] + matrix[end, v] - edge_cost
+                backward = matrix[u, end] + matrix[first, v] - edge_cost
+                forward[start - 1:start + length] = np.inf
+                backward[start - 1:start + length] = np.inf
+                best_forward = forward.argmin()
+                best_backward = backward.argmin()
+                if forward[best_forward] <= backward[best_backward]:
+                    edge, cost, moved = best_forward, forward[best_forward], order[start:start + length]
+                else:
+                    edge, cost, moved = best_backward, backward[best_backward], order[start:start + length][::-1]
+
+                if removal_gain - cost > _MIN_GAIN_METERS:
+                    if edge < start:
+                        order = np.concatenate((order[:edge + 1], moved, order[edge + 1:start], order[start + length:]))
+                    else:
+                        order = np.concatenate((order[:start], order[start + length:edge + 1], moved, order[edge + 1:]))
+                    self.order = order
+                    u, v = order[:-1], order[1:]
+                    edge_cost = matrix[u, v]
+                    improved = True
+                start += 1
+        return improved
+
+class _CandidateRouteTour:
+    """
+    One truck's route as a node order, improved with candidate-list 2-opt and Or-opt moves.
+
+    Node 0 is the truck's start, nodes 1..n are the bins and node n+1 is the end: a copy of
+    the start when routes return to the depot, or a dummy node at zero distance from every
+    node when they do not. Both endpoints stay fixed while the bins in between are reordered.
+
+    Unlike _RouteTour, distances are computed when a move is evaluated and moves only consider
+    the CANDIDATE_COUNT nearest nodes of each stop, so memory grows linearly with the route
+    length instead of quadratically.
+    """
+
+    def __init__(self, truck: WasteCollectionTruck, sequence: List[str], location: Dict[str, tuple],
+                 distance_fn: Optional[DistanceFunction], return_to_depot: bool,
+                 candidates: Optional[Dict[str, List[str]]] = None):
+        self.truck_id = truck.truck_id
+        self.sequence = sequence
+        start = (truck.current_location['lat'], truck.current_location['lon'])
+        points = [start] + [location[bin_id] for bin_id in sequence] + [start]
+        self.lats = [point[0] for point in points]
+        self.lons = [point[1] for point in points]
+        self.distance_fn = distance_fn
+        # Great-circle terms precomputed per node, so each distance is a few float operations
+        self.phis = [math.radians(lat) for lat in self.lats]
+        self.lambdas = [math.radians(lon) for lon in self.lons]
+        self.cos_phis = [math.cos(phi) for phi in self.phis]
+        self.return_to_depot = return_to_depot
+        self.candidates = candidates  # Precomputed nearest bins per bin ID, possibly of other routes too
+        self.order = list(range(len(points)))
+        self.position = list(range(len(points)))
+        self.neighbors: Optional[List[List[int]]] = None  # Built on the first improve_once call
+        self.interrupted = False  # True once improve_once has stopped on its deadline
+
+    def distance(self, a: int, b: int) -> float:
+        end = len(self.order) - 1
+        if not self.return_to_depot and (a == end or b == end):
+            return 0.0
+        if self.distance_fn is not None:
+            return self.distance_fn(self.lats[a], self.lons[a], self.lats[b], self.lons[b])
+        sin_phi = math.sin((self.phis[b] - self.phis[a]) * 0.5)
+        sin_lambda = math.sin((self.lambdas[b] - self.lambdas[a]) * 0.5)
+        h = sin_phi * sin_phi + self.cos_phis[a] * self.cos_phis[b] * sin_lambda * sin_lambda
+        return 2.0 * EARTH_RADIUS_METERS * math.asin(math.sqrt(min(1.0, h)))
+
+    def bin_ids(self) -> List[str]:
+        return [self.sequence[node - 1] for node in self.order[1:-1]]
+
+    def length(self) -> float:
+        order = self.order
+        return sum(self.distance(a, b) for a, b in zip(order, order[1:]))
+
+    def improve_once(self, deadline: float = float('inf')) -> bool:
+        """
+        Runs one 2-opt pass and one Or-opt pass. Returns True if the route got shorter.
+
+        Stops early, setting interrupted, once time.perf_counter() passes deadline.
+        """
+        if self.neighbors is None:
+            self.neighbors = self._candidate_lists()
+        improved = self._two_opt_pass(deadline)
+        if self.interrupted:
+            return improved
+        return self._or_opt_pass(deadline) or improved
+
+    def _candidate_lists(self) -> List[List[int]]:
+        """The nearest nodes of every node (by great-circle distance), nearest first."""
+        bin_count = len(self.sequence)
+        node_for = {bin_id: node for node, bin_id in enumerate(self.sequence, start=1)}
+        local: Optional[List[List[int]]] = None
+        lists = []
+        for bin_id in self.sequence:
+            # Precomputed lists also hold bins of other routes; keep the members of this one.
+            kept = [node_for[other] for other in self.candidates[bin_id] if other in node_for] if self.candidates else []
+            if len(kept) < CANDIDATE_COUNT // 4:
+                if local is None:
+                    rows, _ = nearest_neighbor_lists(self.lats[1:-1], self.lons[1:-1], min(CANDIDATE_COUNT, bin_count - 1))
+                    local = [[row + 1 for row in neighbors if row >= 0] for neighbors in rows.tolist()]
+                kept = local[len(lists)]
+            lists.append(kept)
+
+        # The depot's nearest bins also get both endpoints as candidates
+        depot_distances = pairwise_haversine(self.lats[:1], self.lons[:1], self.lats[1:-1], self.lons[1:-1])[0]
+        depot_neighbors = [int(row) + 1 for row in np.argsort(depot_distances, kind='stable')[:CANDIDATE_COUNT]]
+        end = bin_count + 1
+        for node in depot_neighbors:
+            lists[node - 1].append(0)
+            if self.return_to_depot:
+                lists[node - 1].append(end)
+        return [depot_neighbors] + lists + [depot_neighbors if self.return_to_depot else []]
+
+    def _reverse(self, p: int, q: int) -> None:
+        """Reverses the stops at positions p+1..q, replacing edges (p, p+1) and (q, q+1)."""
+        order = self.order
+        order[p + 1:q + 1] = order[p + 1:q + 1][::-1]
+        position = self.position
+        for index in range(p + 1, q + 1):
+            position[order[index]] = index
+
+    def _two_opt_pass(self, deadline: float) -> bool:
+        """Applies every improving 2-opt move that adds an edge from a stop to one of its candidates."""
+        distance = self.distance
+        order = self.order
+        position = self.position
+        last = len(order) - 1
+        improved = False
+        for node in range(len(order)):
+            if time.perf_counter() >= deadline:
+                self.interrupted = True
+                return improved
+            for candidate in self.neighbors[node]:
+                i, j = position[node], position[candidate]
+                lo, hi = min(i, j), max(i, j)
+                added = distance(node, candidate)
+                # Adding edge (node, candidate) replaces the edges after both or before both of them.
+                # A move can only pay off if the new edge is shorter than the edge it replaces at node.
+                for p, q, replaced in ((lo, hi, i + 1), (lo - 1, hi - 1, i - 1)):
+                    if p < 0 or q > last - 1 or q - p < 2 or added >= distance(node, order[replaced]):
+                        continue
+                    a, b, c, d = order[p], order[p + 1], order[q], order[q + 1]
+                    gain = distance(a, b) + distance(c, d) - distance(a, c) - distance(b, d)
+                    if gain > _MIN_GAIN_METERS:
+                        self._reverse(p, q)
+                        improved = True
+                        break
+        return improved
+
+    def _or_opt_pass(self, deadline: float) -> bool:
+        """Moves segments of up to three stops (optionally reversed) next to a candidate of either end."""
+        distance = self.distance
+        position = self.position
+        improved = False
+        for length in range(1, _OR_OPT_MAX_SEGMENT + 1):
+            start = 1
+            while start + length <= len(self.order) - 1:
+                if time.perf_counter() >= deadline:
+                    self.interrupted = True
+                    return improved
+                order = self.order
+                first, end = order[start], order[start + length - 1]
+                before, after = order[start - 1], order[start + length]
+                removal_gain = distance(before, first) + distance(end, after) - distance(before, after)
+
+                best = None
+                if removal_gain > _MIN_GAIN_METERS:
+                    # Insertion edges (order[k], order[k + 1]) next to a candidate, not touching the segment
+                    edges = set()
+                    for candidate in self.neighbors[first] + self.neighbors[end]:
+                        k = position[candidate]
+                        edges.update(edge for edge in (k - 1, k)
+                                     if 0 <= edge < len(order) - 1 and not start - 1 <= edge < start + length)
+                    for edge in edges:
+                        u, v = order[edge], order[edge + 1]
+                        forward = distance(u, first) + distance(end, v) - distance(u, v)
+                        backward = distance(u, end) + distance(first, v) - distance(u, v)
+                        cost, reverse = min((forward, False), (backward, True))
+                        if best is None or cost < best[0]:
+                            best = (cost, edge, reverse)
+
+                if best is not None and removal_gain - best[0] > _MIN_GAIN_METERS:
+                    _, edge, reverse = best
+                    moved = order[start:start + length]
+                    if reverse:
+                        moved.reverse()
+                    if edge < start:
+                        order[edge + 1:start + length] = moved + order[edge + 1:start]
+                        changed = range(edge + 1, start + length)
+                    else:
+                        order[start:edge + 1] = order[start + length:edge + 1] + moved
+                        changed = range(start, edge + 1)
+                    for index in changed:
+                        position[order[index]] = index
+                    improved = True
+                start += 1
+        return improved
@@ -1,9 +1,13 @@
 import datetime
 import random
-from typing import Tuple
+from typing import Optional, Tuple
 
 from .models import TrashBin
 
+# Fill ratios at which a bin stops being 'EMPTY' and becomes 'FULL'
+EMPTY_FILL_RATIO = 0.1
+FULL_FILL_RATIO = 0.8
+
 def generate_sensor_reading(bin_id: str, current_fill_level: float, capacity: float) -> float:
     """
     Simulates a new sensor reading for a trash bin.
@@ -23,24 +27,28 @@ def generate_sensor_reading(bin_id: str, current_fill_level: float, capacity: fl
     new_fill_level = current_fill_level + increase
     return min(new_fill_level, capacity)
 
-def update_bin_fill_level(bin_instance: TrashBin, new_fill_level: float) -> TrashBin:
+def update_bin_fill_level(bin_instance: TrashBin, new_fill_level: float, timestamp: Optional[str] = None) -> TrashBin:
     """
     Updates a TrashBin object with a new fill level and derived status.
 
     Args:
         bin_instance: The TrashBin instance to update.
         new_fill_level: The new fill level in gallons.
+        timestamp: An optional ISO format timestamp to record as last_updated.
+                   Batch callers pass one shared value; defaults to the current UTC time.
 
     Returns:
         The updated TrashBin instance.
     """
     bin_instance.current_fill_level_gallons = new_fill_level
-    bin_instance.last_updated = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    if timestamp is None:
+        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    bin_instance.last_updated = timestamp
 
     fill_ratio = new_fill_level / bin_instance.capacity_gallons
-    if fill_ratio < 0.1:
+    if fill_ratio < EMPTY_FILL_RATIO:
         bin_instance.status = 'EMPTY'
-    elif fill_ratio < 0.8:
+    elif fill_ratio < FULL_FILL_RATIO:
         bin_instance.status = 'FILLING'
     else:
         bin_instance.status = 'FULL'
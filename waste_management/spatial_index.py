@@ -0,0 +1,243 @@
+import math
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from common.geo import METERS_PER_DEGREE, haversine_meters
+
+class GridSpatialIndex:
+    """
+    Uniform latitude/longitude grid that maps cells to the IDs of the points inside them.
+
+    Queries only visit the cells overlapping the search area, so their cost depends on
+    the number of points nearby rather than on the total number of indexed points.
+    The index is meant for city-scale data and does not handle wrap-around at the
+    antimeridian.
+    """
+
+    def __init__(self, cell_size_degrees: float = 0.01):
+        """
+        Initializes an empty index.
+
+        Args:
+            cell_size_degrees: Edge length of a grid cell in degrees (0.01 is roughly 1.1 km).
+
+        Raises:
+            ValueError: If cell_size_degrees is not positive.
+        """
+        if cell_size_degrees <= 0:
+            raise ValueError("cell_size_degrees must be positive.")
+        self.cell_size_degrees = cell_size_degrees
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._points: Dict[str, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._points
+
+    def _cell_for(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size_degrees), math.floor(lon / self.cell_size_degrees))
+
+    def insert(self, item_id: str, lat: float, lon: float) -> None:
+        """
+        Adds a point to the index, moving it if the ID is already indexed.
+
+        Args:
+            item_id: The ID of the indexed item.
+            lat: Latitude of the item in degrees.
+            lon: Longitude of the item in degrees.
+        """
+        lat = float(lat)
+        lon = float(lon)
+        new_cell = self._cell_for(lat, lon)
+        old_point = self._points.get(item_id)
+        if old_point is not None:
+            old_cell = self._cell_for(*old_point)
+            if old_cell != new_cell:
+                self._discard_from_cell(old_cell, item_id)
+                self._cells.setdefault(new_cell, set()).add(item_id)
+        else:
+            self._cells.setdefault(new_cell, set()).add(item_id)
+        self._points[item_id] = (lat, lon)
+
+    def remove(self, item_id: str) -> bool:
+        """
+        Removes a point from the index.
+
+        Args:
+            item_id: The ID of the item to remove.
+
+        Returns:
+            True if the item was indexed, otherwise False.
+        """
+        point = self._points.pop(item_id, None)
+        if point is None:
+            return False
+        self._discard_from_cell(self._cell_for(*point), item_id)
+        return True
+
+    def _discard_from_cell(self, cell: Tuple[int, int], item_id: str) -> None:
+        members = self._cells.get(cell)
+        if members is None:
+            return
+        members.discard(item_id)
+        if not members:
+            del self._cells[cell]  # Keep only occupied cells so sparse scans stay cheap
+
+    def clear(self) -> None:
+        """Removes every point from the index."""
+        self._cells.clear()
+        self._points.clear()
+
+    def position(self, item_id: str) -> Optional[Tuple[float, float]]:
+        """Returns the indexed (lat, lon) of an item, or None if it is not indexed."""
+        return self._points.get(item_id)
+
+    def query_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[str]:
+        """
+        Finds all points inside a bounding box (edges inclusive).
+
+        Args:
+            min_lat: Southern edge of the box in degrees.
+            min_lon: Western edge of the box in degrees.
+            max_lat: Northern edge of the box in degrees.
+            max_lon: Eastern edge of the box in degrees.
+
+        Returns:
+            The IDs of the points inside the box, in no particular order.
+        """
+        if min_lat > max_lat or min_lon > max_lon:
+            return []
+
+        matches = []
+        points = self._points
+        for members in self._cells_in_range(min_lat, min_lon, max_lat, max_lon):
+            for item_id in members:
+                lat, lon = points[item_id]
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    matches.append(item_id)
+        return matches
+
+    def query_radius(self, lat: float, lon: float, meters: float) -> List[Tuple[float, str]]:
+        """
+        Finds all points within a great-circle distance of a location.
+
+        Args:
+            lat: Latitude of the search center in degrees.
+            lon: Longitude of the search center in degrees.
+            meters: The search radius in meters.
+
+        Returns:
+            (distance_meters, item_id) tuples for the matching points, nearest first.
+        """
+        if meters < 0:
+            return []
+
+        d_lat = meters / METERS_PER_DEGREE
+        # Longitude degrees shrink with latitude; clamp to avoid blowing up near the poles.
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        d_lon = meters / (METERS_PER_DEGREE * cos_lat)
+
+        matches = []
+        points = self._points
+        for members in self._cells_in_range(lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon):
+            for item_id in members:
+                point_lat, point_lon = points[item_id]
+                distance = haversine_meters(lat, lon, point_lat, point_lon)
+                if distance <= meters:
+                    matches.append((distance, item_id))
+        matches.sort()
+        return matches
+
+    def nearest(self, lat: float, lon: float,
+                predicate: Optional[Callable[[str], bool]] = None) -> Optional[Tuple[float, str]]:
+        """
+        Finds the point closest to a location, searching outward ring by ring of grid cells.
+
+        Args:
+            lat: Latitude of the search center in degrees.
+            lon: Longitude of the search center in degrees.
+            predicate: Optional filter; only IDs for which it returns True are considered.
+
+        Returns:
+            A (distance_meters, item_id) tuple, or None if no indexed point matches.
+        """
+        if not self._points:
+            return None
+
+        center_row, center_col = self._cell_for(lat, lon)
+        cells = self._cells
+        # Candidates are compared by squared equirectangular distance (in degrees of latitude),
+        # which orders city-scale distances like the great-circle distance without trigonometry.
+        lon_scale = math.cos(math.radians(lat))
+        best: Optional[Tuple[float, str]] = None
+
+        ring = 0
+        while True:
+            if (2 * ring + 1) ** 2 > len(cells):
+                # The search square now spans more cells than are occupied; finish with a scan of the rest.
+                for (row, col), members in cells.items():
+                    if max(abs(row - center_row), abs(col - center_col)) < ring:
+                        continue  # Already searched
+                    best = self._nearest_in(members, lat, lon, lon_scale, predicate, best)
+                break
+
+            for row in range(center_row - ring, center_row + ring + 1):
+                on_edge = row in (center_row - ring, center_row + ring)
+                cols = range(center_col - ring, center_col + ring + 1) if on_edge else (center_col - ring, center_col + ring)
+                for col in cols:
+                    members = cells.get((row, col))
+                    if members:
+                        best = self._nearest_in(members, lat, lon, lon_scale, predicate, best)
+            if best is not None and best[0] <= self._squared_distance_to_unsearched(lat, lon, lon_scale, center_row, center_col, ring):
+                break
+            ring += 1
+
+        if best is None:
+            return None
+        point_lat, point_lon = self._points[best[1]]
+        return (haversine_meters(lat, lon, point_lat, point_lon), best[1])
+
+    def _squared_distance_to_unsearched(self, lat: float, lon: float, lon_scale: float,
+                                        center_row: int, center_col: int, ring: int) -> float:
+        """Squared equirectangular distance from (lat, lon) to the edge of the searched square of cells."""
+        size = self.cell_size_degrees
+        d_lat = min(lat - (center_row - ring) * size, (center_row + ring + 1) * size - lat)
+        d_lon = min(lon - (center_col - ring) * size, (center_col + ring + 1) * size - lon) * lon_scale
+        edge = min(d_lat, d_lon)
+        return edge * edge
+
+    def _nearest_in(self, members: Set[str], lat: float, lon: float, lon_scale: float,
+                    predicate: Optional[Callable[[str], bool]],
+                    best: Optional[Tuple[float, str]]) -> Optional[Tuple[float, str]]:
+        points = self._points
+        best_distance = best[0] if best is not None else math.inf
+        for item_id in members:
+            point_lat, point_lon = points[item_id]
+            d_lat = point_lat - lat
+            d_lon = (point_lon - lon) * lon_scale
+            distance = d_lat * d_lat + d_lon * d_lon
+            if distance < best_distance and (predicate is None or predicate(item_id)):
+                best_distance = distance
+                best = (distance, item_id)
+        return best
+
+    def _cells_in_range(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+        """Yields the member sets of the occupied cells overlapping a bounding box."""
+        min_row, min_col = self._cell_for(min_lat, min_lon)
+        max_row, max_col = self._cell_for(max_lat, max_lon)
+        cell_count = (max_row - min_row + 1) * (max_col - min_col + 1)
+
+        if cell_count > len(self._cells):
+            # Huge search areas cover more cells than are occupied; scan the occupied ones instead.
+            for (row, col), members in self._cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    yield members
+            return
+
+        cells = self._cells
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                members = cells.get((row, col))
+                if members:
+                    yield members
@@ -0,0 +1,8 @@
+# Storage backends live in common.storage; they are re-exported here with the record kinds of this package.
+from common.storage import InMemoryStorage, SQLiteStorage, StorageBackend
+
+__all__ = ['BIN_RECORD', 'ROUTE_RECORD', 'InMemoryStorage', 'SQLiteStorage', 'StorageBackend']
+
+# Record kinds stored by bin_manager and route_manager.
+BIN_RECORD = 'bin'
+ROUTE_RECORD = 'route'
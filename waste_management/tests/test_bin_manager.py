@@ -1,26 +1,35 @@
 import unittest
 import datetime # For checking last_updated format, approximately
 
+from common.change_feed import get_feed
+
 # Assuming the test runner will handle PYTHONPATH or that waste_management is discoverable
 # If running this file directly, ensure waste_management is in PYTHONPATH or run as module from root
+from waste_management import bin_manager
+from waste_management.columnar_store import TrashBinView
 from waste_management.models import TrashBin
 from waste_management.bin_manager import (
     add_bin,
     get_bin,
     update_bin_from_sensor_data,
+    update_bins_bulk,
     list_bins,
-    _bins # For direct manipulation in setUp/tearDown
+    list_bins_page,
+    bins_within_radius,
+    bins_in_bbox,
+    _bins, # For direct inspection in tests
+    _reset_bins_data # For resetting state in setUp/tearDown
 )
 
 class TestBinManager(unittest.TestCase):
 
     def setUp(self):
-        """Clear the _bins dictionary before each test."""
-        _bins.clear()
+        """Clear the bin store before each test."""
+        _reset_bins_data()
 
     def tearDown(self):
-        """Clear the _bins dictionary after each test to ensure test isolation."""
-        _bins.clear()
+        """Clear the bin store after each test to ensure test isolation."""
+        _reset_bins_data()
 
     def test_add_bin_success(self):
         """Test successfully adding a new bin."""
@@ -87,6 +96,72 @@ class TestBinManager(unittest.TestCase):
         self.assertNotEqual(updated_bin_empty.last_updated, original_last_updated_full)
 
 
+    def test_updates_bump_version(self):
+        """Test that single, located and bulk updates each bump the bin's version."""
+        bin_obj = add_bin(bin_id="bin1", location={'lat': 10, 'lon': 10}, capacity_gallons=100.0)
+        self.assertEqual(bin_obj.version, 0)
+        update_bin_from_sensor_data(bin_id="bin1", new_fill_level=20.0)
+        update_bin_from_sensor_data(bin_id="bin1", new_fill_level=20.0, location={'lat': 11, 'lon': 11})
+        update_bins_bulk([("bin1", 30.0)])
+        self.assertEqual(get_bin("bin1").version, 3)
+
+    def test_changes_are_published(self):
+        """Test that added and updated bins are published on the waste change feed."""
+        feed = get_feed('waste')
+        feed.subscribe()
+        self.addCleanup(feed.unsubscribe)
+        cursor = feed.sequence
+        bin_obj = add_bin(bin_id="bin1", location={'lat': 10, 'lon': 10}, capacity_gallons=100.0)
+        update_bins_bulk([("bin1", 30.0), ("missing", 10.0)])
+        _, changes = feed.changes_since(cursor)
+        self.assertEqual([(c.kind, c.key) for c in changes], [('bin', 'bin1'), ('bin', 'bin1')])
+        self.assertIs(changes[-1].entity, bin_obj)
+
+    def test_update_bins_bulk(self):
+        """Test applying a batch of readings under one shared timestamp."""
+        add_bin(bin_id="bin1", location={'lat': 10, 'lon': 10}, capacity_gallons=100.0)
+        add_bin(bin_id="bin2", location={'lat': 20, 'lon': 20}, capacity_gallons=100.0)
+        timestamp = "2024-01-01T00:00:00+00:00"
+
+        results = update_bins_bulk([("bin1", 90.0), ("missing", 10.0), ("bin2", 50.0)], timestamp=timestamp)
+
+        self.assertEqual(results, [get_bin("bin1"), None, get_bin("bin2")])
+        self.assertEqual(get_bin("bin1").status, 'FULL')
+        self.assertEqual(get_bin("bin2").status, 'FILLING')
+        self.assertEqual(get_bin("bin1").last_updated, timestamp)
+        self.assertEqual(get_bin("bin2").last_updated, timestamp)
+        self.assertEqual(list_bins(status_filter='FULL'), [get_bin("bin1")])
+
+    def test_update_bins_bulk_repeated_bin(self):
+        """Test that a bin read twice in one batch keeps its last reading and gains one version per reading."""
+        add_bin(bin_id="bin1", location={'lat': 10, 'lon': 10}, capacity_gallons=100.0)
+        update_bins_bulk([("bin1", 90.0), ("bin1", 50.0)])
+        self.assertEqual(get_bin("bin1").current_fill_level_gallons, 50.0)
+        self.assertEqual(get_bin("bin1").version, 2)
+        self.assertEqual(list_bins(status_filter='FULL'), [])
+        self.assertEqual(list_bins(status_filter='FILLING'), [get_bin("bin1")])
+        self.assertEqual(list_bins(status_filter='EMPTY'), [])
+
+    def test_bins_are_views_of_the_bin_store(self):
+        """Test that the manager's bins read and write the columnar bin store."""
+        added = add_bin(bin_id="bin1", location={'lat': 10, 'lon': 10}, capacity_gallons=100.0)
+        self.assertIsInstance(added, TrashBinView)
+        self.assertIs(get_bin("bin1"), added)
+        update_bins_bulk([("bin1", 85.0)])
+        self.assertEqual(added.status, 'FULL')
+        self.assertEqual(bin_manager._store.ids_with_status('FULL'), ["bin1"])
+        with self.assertRaisesRegex(ValueError, "capacity_gallons must be positive."):
+            add_bin(bin_id="bin2", location={'lat': 10, 'lon': 10}, capacity_gallons=0.0)
+
+    def test_update_bins_bulk_default_timestamp(self):
+        """Test that a batch without an explicit timestamp shares one generated timestamp."""
+        add_bin(bin_id="bin1", location={'lat': 10, 'lon': 10}, capacity_gallons=100.0)
+        add_bin(bin_id="bin2", location={'lat': 20, 'lon': 20}, capacity_gallons=100.0)
+
+        bin1, bin2 = update_bins_bulk([("bin1", 5.0), ("bin2", 85.0)])
+        self.assertEqual(bin1.last_updated, bin2.last_updated)
+        datetime.datetime.fromisoformat(bin1.last_updated)
+
     def test_update_non_existent_bin(self):
         """Test updating a non-existent bin."""
         result = update_bin_from_sensor_data(bin_id="nonexistent_bin", new_fill_level=50.0)
@@ -129,5 +204,82 @@ class TestBinManager(unittest.TestCase):
         self.assertEqual(list_bins(status_filter='NEEDS_MAINTENANCE'), [])
         self.assertEqual(list_bins(status_filter='NON_EXISTENT_STATUS'), [])
 
+    def test_list_bins_status_index_follows_updates(self):
+        """Test that filtered listings track every status change, including transitions back."""
+        bin1 = add_bin(bin_id="bin1", location={'lat': 10, 'lon': 10}, capacity_gallons=100)
+        bin2 = add_bin(bin_id="bin2", location={'lat': 20, 'lon': 20}, capacity_gallons=100)
+
+        update_bin_from_sensor_data(bin_id="bin1", new_fill_level=90.0) # FULL
+        update_bin_from_sensor_data(bin_id="bin2", new_fill_level=95.0) # FULL
+        update_bin_from_sensor_data(bin_id="bin1", new_fill_level=92.0) # Still FULL, no reordering
+        self.assertEqual(list_bins(status_filter='FULL'), [bin1, bin2])
+        self.assertEqual(list_bins(status_filter='EMPTY'), [])
+
+        update_bin_from_sensor_data(bin_id="bin1", new_fill_level=0.0) # Emptied
+        self.assertEqual(list_bins(status_filter='FULL'), [bin2])
+        self.assertEqual(list_bins(status_filter='EMPTY'), [bin1])
+
+        _reset_bins_data()
+        add_bin(bin_id="bin2", location={'lat': 20, 'lon': 20}, capacity_gallons=100)
+        self.assertEqual(list_bins(status_filter='FULL'), [])
+
+    def test_bins_within_radius(self):
+        """Test listing bins near a location, nearest first."""
+        far_bin = add_bin(bin_id="far", location={'lat': 40.7300, 'lon': -74.0060}, capacity_gallons=100)
+        near_bin = add_bin(bin_id="near", location={'lat': 40.7130, 'lon': -74.0060}, capacity_gallons=100)
+        add_bin(bin_id="other_city", location={'lat': 34.0522, 'lon': -118.2437}, capacity_gallons=100)
+
+        self.assertEqual(bins_within_radius(40.7128, -74.0060, 500), [near_bin])
+        self.assertEqual(bins_within_radius(40.7128, -74.0060, 5000), [near_bin, far_bin])
+
+    def test_bins_in_bbox(self):
+        """Test listing bins inside a bounding box."""
+        bin_in = add_bin(bin_id="in", location={'lat': 10.5, 'lon': 20.5}, capacity_gallons=100)
+        add_bin(bin_id="out", location={'lat': 11.5, 'lon': 20.5}, capacity_gallons=100)
+
+        self.assertEqual(bins_in_bbox(10.0, 20.0, 11.0, 21.0), [bin_in])
+
+    def test_api_rejects_invalid_location_queries(self):
+        """Test that non-finite or off-globe 'near', 'radius' and 'bbox' values are answered with 400."""
+        from waste_management.api import app
+        add_bin(bin_id="bin1", location={'lat': 40.7128, 'lon': -74.0060}, capacity_gallons=100)
+        client = app.test_client()
+        for query in ("near=inf,0", "near=nan,0", "near=91,0", "near=0,181", "near=40.7,-74&radius=inf",
+                      "near=40.7,-74&radius=nan", "near=40.7,-74&radius=-1", "bbox=0,0,1,inf", "bbox=-91,0,1,1"):
+            response = client.get(f"/bins?{query}")
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("Invalid location query", response.get_json()["error"])
+        response = client.get("/bins?near=40.7128,-74.0060&radius=1e300")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([b["bin_id"] for b in response.get_json()], ["bin1"])
+
+    def test_update_bin_location_from_sensor_data(self):
+        """Test that a location reported with sensor data moves the bin in spatial queries."""
+        add_bin(bin_id="mobile", location={'lat': 10.0, 'lon': 10.0}, capacity_gallons=100)
+        updated_bin = update_bin_from_sensor_data(bin_id="mobile", new_fill_level=20.0, location={'lat': 50.0, 'lon': 50.0})
+
+        self.assertEqual(updated_bin.location, {'lat': 50.0, 'lon': 50.0})
+        self.assertEqual(bins_within_radius(10.0, 10.0, 1000), [])
+        self.assertEqual(bins_within_radius(50.0, 50.0, 1000), [updated_bin])
+
+    def test_list_bins_page(self):
+        """Test keyset pagination in bin ID order, with and without a status filter."""
+        for i in (3, 0, 4, 1, 2):
+            add_bin(bin_id=f"bin{i}", location={'lat': 10, 'lon': 10}, capacity_gallons=100)
+        update_bins_bulk([("bin1", 90.0), ("bin4", 95.0)])
+
+        first, after = list_bins_page(2)
+        self.assertEqual([b.bin_id for b in first], ["bin0", "bin1"])
+        second, after = list_bins_page(2, after)
+        self.assertEqual([b.bin_id for b in second], ["bin2", "bin3"])
+        add_bin(bin_id="bin20", location={'lat': 10, 'lon': 10}, capacity_gallons=100)  # Sorts before the cursor
+        last, after = list_bins_page(2, after)
+        self.assertEqual(([b.bin_id for b in last], after), (["bin4"], None))
+
+        full, after = list_bins_page(1, status_filter='FULL')
+        self.assertEqual(([b.bin_id for b in full], after), (["bin1"], "bin1"))
+        full, after = list_bins_page(1, after, status_filter='FULL')
+        self.assertEqual(([b.bin_id for b in full], after), (["bin4"], None))
+
 if __name__ == '__main__':
     unittest.main()
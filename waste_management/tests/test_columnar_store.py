@@ -0,0 +1,138 @@
+import dataclasses
+import unittest
+from dataclasses import asdict
+
+import numpy as np
+
+from waste_management.models import TrashBin
+from waste_management.sensor_simulator import update_bin_fill_level
+from waste_management.columnar_store import (
+    ColumnarBinStore,
+    TrashBinView,
+    derive_status_codes,
+    STATUS_CODES,
+)
+
+class TestDeriveStatusCodes(unittest.TestCase):
+
+    def test_thresholds_match_scalar_update(self):
+        """Test that vectorized status codes agree with update_bin_fill_level."""
+        fill_levels = np.array([0.0, 9.99, 10.0, 50.0, 79.99, 80.0, 100.0])
+        codes = derive_status_codes(fill_levels, np.full(len(fill_levels), 100.0))
+
+        for fill_level, code in zip(fill_levels, codes):
+            scalar_bin = update_bin_fill_level(TrashBin("b", {'lat': 0, 'lon': 0}, 100.0), float(fill_level))
+            self.assertEqual(STATUS_CODES[scalar_bin.status], code)
+
+class TestColumnarBinStore(unittest.TestCase):
+
+    def setUp(self):
+        """Create a small store with a deliberately tiny initial capacity to exercise growth."""
+        self.store = ColumnarBinStore(initial_capacity=1)
+        self.store.add_bin("bin1", {'lat': 10.0, 'lon': 10.0}, 100.0)
+        self.store.add_bin("bin2", {'lat': 20.0, 'lon': 20.0}, 50.0, fill_level_gallons=45.0)
+        self.store.add_bin("bin3", {'lat': 30.0, 'lon': 30.0}, 200.0)
+
+    def test_add_bin(self):
+        """Test adding bins, including duplicates and column growth."""
+        self.assertEqual(len(self.store), 3)
+        self.assertIn("bin2", self.store)
+        self.assertEqual(self.store.view("bin2").status, 'FULL')
+        with self.assertRaisesRegex(ValueError, "Bin with ID 'bin1' already exists."):
+            self.store.add_bin("bin1", {'lat': 0, 'lon': 0}, 10.0)
+        with self.assertRaisesRegex(ValueError, "capacity_gallons must be positive."):
+            self.store.add_bin("bin4", {'lat': 0, 'lon': 0}, 0.0)
+        self.assertNotIn("bin4", self.store)
+
+    def test_add_bins(self):
+        """Test appending many bins in one call."""
+        rows = self.store.add_bins(["bin4", "bin5"], [{'lat': 0, 'lon': 0}] * 2, [100.0, 100.0], [5.0, 95.0])
+        self.assertEqual(list(rows), [3, 4])
+        self.assertEqual(self.store.view("bin4").status, 'EMPTY')
+        self.assertEqual(self.store.view("bin5").status, 'FULL')
+        with self.assertRaises(ValueError):
+            self.store.add_bins(["bin1"], [{'lat': 0, 'lon': 0}], [10.0])
+        with self.assertRaises(ValueError):
+            self.store.add_bins(["bin6", "bin6"], [{'lat': 0, 'lon': 0}] * 2, [10.0, 10.0])
+        with self.assertRaisesRegex(ValueError, "capacity_gallons must be positive."):
+            self.store.add_bins(["bin6", "bin7"], [{'lat': 0, 'lon': 0}] * 2, [10.0, -1.0])
+
+    def test_update_bins(self):
+        """Test a vectorized batch of readings and the shared timestamp."""
+        timestamp = "2024-05-01T12:00:00+00:00"
+        codes = self.store.update_bins(["bin1", "bin3", "bin2"], [85.0, 100.0, 1.0], timestamp=timestamp)
+
+        self.assertEqual(list(codes), [STATUS_CODES['FULL'], STATUS_CODES['FILLING'], STATUS_CODES['EMPTY']])
+        self.assertEqual(self.store.ids_with_status('FULL'), ["bin1"])
+        self.assertEqual(self.store.status_counts(), {'EMPTY': 1, 'FILLING': 1, 'FULL': 1, 'NEEDS_MAINTENANCE': 0})
+        self.assertEqual(self.store.view("bin3").last_updated, timestamp)
+        with self.assertRaises(KeyError):
+            self.store.update_bins(["missing"], [1.0])
+
+    def test_simulate_step_caps_at_capacity(self):
+        """Test that simulated readings only increase and never exceed capacity."""
+        rng = np.random.default_rng(7)
+        for _ in range(100):
+            self.store.simulate_step(rng=rng)
+        self.assertEqual(self.store.view("bin2").current_fill_level_gallons, 50.0)
+        self.assertGreater(self.store.view("bin1").current_fill_level_gallons, 10.0)
+
+    def test_views_behave_like_trash_bins(self):
+        """Test that views serialize and compare like TrashBin and write through to the columns."""
+        view = self.store.view("bin2")
+        self.assertIsInstance(view, TrashBin)
+        self.assertIsInstance(view, TrashBinView)
+        self.assertEqual(asdict(view), {
+            'bin_id': 'bin2',
+            'location': {'lat': 20.0, 'lon': 20.0},
+            'capacity_gallons': 50.0,
+            'current_fill_level_gallons': 45.0,
+            'last_updated': view.last_updated,
+            'status': 'FULL',
+            'version': 0,
+        })
+        self.assertEqual(view, self.store.view("bin2"))
+        self.assertIsNone(self.store.view("missing"))
+
+        # The scalar update path writes through the view into the arrays.
+        update_bin_fill_level(view, 2.0)
+        self.assertEqual(self.store.ids_with_status('EMPTY'), ["bin1", "bin2", "bin3"])
+        self.assertEqual([v.bin_id for v in self.store.views()], ["bin1", "bin2", "bin3"])
+
+        # Location and capacity assignments write through as well.
+        view.location = {'lat': 1.0, 'lon': 2.0}
+        view.capacity_gallons = 80.0
+        self.assertEqual(self.store.view("bin2").location, {'lat': 1.0, 'lon': 2.0})
+        self.assertEqual(self.store.view("bin2").capacity_gallons, 80.0)
+
+    def test_from_bins(self):
+        """Test building a store from TrashBin instances."""
+        bins = [
+            TrashBin("a", {'lat': 1.0, 'lon': 1.0}, 100.0, current_fill_level_gallons=90.0, status='FULL'),
+            TrashBin("b", {'lat': 2.0, 'lon': 2.0}, 100.0, status='NEEDS_MAINTENANCE'),
+        ]
+        store = ColumnarBinStore.from_bins(bins)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.view("a").status, 'FULL')
+        self.assertEqual(store.view("b").status, 'NEEDS_MAINTENANCE')
+        self.assertEqual(store.view("a").last_updated, bins[0].last_updated)
+
+    def test_put_bin(self):
+        """Test that put_bin keeps a bin's own fields and overwrites the row of a known bin."""
+        stored = TrashBin("bin2", {'lat': 5.0, 'lon': 5.0}, 60.0, current_fill_level_gallons=1.0,
+                          last_updated="2024-05-01T12:00:00", status='NEEDS_MAINTENANCE', version=7)
+        view = self.store.put_bin(stored)
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(dataclasses.astuple(view), dataclasses.astuple(stored))
+        new_view = self.store.put_bin(TrashBin("bin4", {'lat': 0.0, 'lon': 0.0}, 10.0, status='FULL'))
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(new_view.status, 'FULL')
+
+    def test_repeated_rows_bump_version_per_reading(self):
+        """Test that a bin read twice in one batch keeps the last reading and gains two versions."""
+        self.store.update_bins(["bin1", "bin1"], [50.0, 95.0])
+        self.assertEqual(self.store.view("bin1").current_fill_level_gallons, 95.0)
+        self.assertEqual(self.store.view("bin1").version, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from waste_management import bin_manager, route_optimizer
+from waste_management.distance_matrix import DistanceMatrixService, nearest_neighbor_lists, pairwise_haversine
+from waste_management.models import TrashBin, WasteCollectionTruck
+from waste_management.route_optimizer import optimize_routes
+from waste_management.spatial_index import haversine_meters
+
+def _random_points(count, rng):
+    return [(f"bin{i}", 40.0 + rng.uniform(0, 0.05), -74.0 + rng.uniform(0, 0.05)) for i in range(count)]
+
+class TestDistanceMatrixService(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(5)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        bin_manager._reset_bins_data()
+        self.addCleanup(bin_manager._reset_bins_data)
+
+    def open_service(self, **kwargs):
+        service = DistanceMatrixService(cache_dir=self.temp_dir.name, **kwargs)
+        self.addCleanup(service.close)
+        return service
+
+    def assert_matches_brute_force(self, service, points):
+        ids = [p[0] for p in points]
+        lats = np.array([p[1] for p in points])
+        lons = np.array([p[2] for p in points])
+        expected = pairwise_haversine(lats, lons, lats, lons)
+        np.testing.assert_allclose(service.distances(ids), expected, atol=0.05)
+        for row, bin_id in enumerate(ids):
+            others = np.delete(np.arange(len(ids)), row)
+            nearest = others[np.argsort(expected[row, others], kind='stable')][:service.neighbor_count]
+            found = service.nearest_neighbors(bin_id)
+            self.assertEqual(len(found), min(service.neighbor_count, len(ids) - 1))
+            np.testing.assert_allclose([d for d, _ in found], expected[row, nearest], atol=0.05)
+
+    def test_blockwise_and_incremental_builds_match_brute_force(self):
+        """Test that small blocks, repeated appends, moves and array growth give exact distances and neighbor lists."""
+        points = _random_points(70, self.rng)
+        service = self.open_service(neighbor_count=5, block_size=8, initial_capacity=4)
+        service.add_points(*zip(*points[:30]))
+        self.assert_matches_brute_force(service, points[:30])
+        for count, (bin_id, lat, lon) in enumerate(points[30:], start=31):
+            service.upsert(bin_id, lat, lon)
+            if count % 10 == 0:
+                self.assert_matches_brute_force(service, points[:count])
+        self.assertEqual(len(service), 70)
+        self.assert_matches_brute_force(service, points)
+
+        # Moves, some next to other bins and one together with new bins
+        for row in self.rng.sample(range(70), 6):
+            _, lat, lon = points[self.rng.randrange(70)]
+            points[row] = (points[row][0], lat + 0.0001, lon - 0.0001)
+            service.upsert(*points[row])
+            self.assert_matches_brute_force(service, points)
+        points[0] = ("bin0", 40.04, -73.96)
+        service.upsert(*points[0])
+        extra = [(f"extra{i}", lat, lon) for i, (_, lat, lon) in enumerate(_random_points(3, self.rng))]
+        service.add_points(*zip(*extra))
+        points += extra
+        self.assert_matches_brute_force(service, points)
+        self.assertAlmostEqual(service.distance("bin0", "bin1"), haversine_meters(*points[0][1:], *points[1][1:]), delta=0.05)
+        with self.assertRaises(ValueError):
+            service.add_points(["bin0"], [0.0], [0.0])
+
+    def test_memory_grows_with_bins_times_neighbors(self):
+        """Test that only locations and neighbor lists are kept, in memory and on disk."""
+        points = _random_points(500, self.rng)
+        service = self.open_service(neighbor_count=4, block_size=16, initial_capacity=1)
+        service.add_points(*zip(*points))
+        service.candidate_lists()
+        service.flush()
+        arrays = [value for value in vars(service).values() if isinstance(value, np.ndarray)]
+        self.assertTrue(all(array.size <= 2 * 500 * 4 for array in arrays))
+        stored = sum(entry.stat().st_size for entry in os.scandir(self.temp_dir.name))
+        self.assertLess(stored, 500 * 500)  # A float32 distance matrix would take 1 MB
+
+        in_memory = DistanceMatrixService(neighbor_count=4)
+        in_memory.add_points(["a", "b"], [40.0, 40.001], [-74.0, -74.0])
+        in_memory.close()
+        self.assertEqual(in_memory.candidate_lists(), {"a": ["b"], "b": ["a"]})
+
+    def test_fewer_bins_than_neighbors(self):
+        service = self.open_service(neighbor_count=8)
+        service.add_points(["a", "b"], [40.0, 40.001], [-74.0, -74.0])
+        self.assertEqual([bin_id for _, bin_id in service.nearest_neighbors("a")], ["b"])
+        self.assertEqual(service.candidate_lists(), {"a": ["b"], "b": ["a"]})
+
+    def test_attach_follows_bin_manager(self):
+        """Test that add_bin and bin moves update an attached service, and detach stops it."""
+        points = _random_points(20, self.rng)
+        for bin_id, lat, lon in points[:10]:
+            bin_manager.add_bin(bin_id, {'lat': lat, 'lon': lon}, 100.0)
+        service = self.open_service(neighbor_count=4)
+        service.attach()
+        self.assertEqual(service.version, bin_manager.get_bin_set_version())
+
+        for bin_id, lat, lon in points[10:]:
+            bin_manager.add_bin(bin_id, {'lat': lat, 'lon': lon}, 100.0)
+        moved = ("bin3", 40.02, -73.98)
+        points[3] = moved
+        bin_manager.update_bin_from_sensor_data("bin3", 10.0, location={'lat': moved[1], 'lon': moved[2]})
+        self.assertEqual(service.version, bin_manager.get_bin_set_version())
+        self.assert_matches_brute_force(service, points)
+
+        service.detach()
+        bin_manager.add_bin("late", {'lat': 40.0, 'lon': -74.0}, 100.0)
+        self.assertNotIn("late", service)
+
+    def test_flushed_lists_are_reused_by_version(self):
+        """Test that a reopened cache only computes lists for bins added since it was flushed."""
+        points = _random_points(30, self.rng)
+        bins = [TrashBin(bin_id=b, location={'lat': lat, 'lon': lon}, capacity_gallons=100.0) for b, lat, lon in points]
+        first = DistanceMatrixService(cache_dir=self.temp_dir.name, neighbor_count=3)
+        self.assertEqual(first.sync(bins[:20], version=20), 20)
+        first.close()
+
+        reopened = self.open_service(neighbor_count=3)
+        self.assertEqual(reopened.version, 20)
+        self.assertEqual(reopened.bin_ids, [b.bin_id for b in bins[:20]])
+        self.assertEqual(reopened.sync(bins, version=30), 10)
+        self.assert_matches_brute_force(reopened, points)
+
+        # A different bin set keeps only the common prefix
+        replaced = bins[:5] + [TrashBin(bin_id="other", location={'lat': 40.0, 'lon': -74.0}, capacity_gallons=100.0)]
+        self.assertEqual(reopened.sync(replaced, version=31), 1)
+        self.assertEqual(reopened.bin_ids, [b.bin_id for b in replaced])
+        self.assert_matches_brute_force(reopened, points[:5] + [("other", 40.0, -74.0)])
+
+    def test_grid_neighbor_lists_match_brute_force(self):
+        """Test that grid-bucketed neighbor lists are exact, including for isolated points and tiny inputs."""
+        points = _random_points(400, self.rng) + [("far0", 40.5, -74.0), ("far1", 40.5, -73.5)]
+        lats = np.array([p[1] for p in points])
+        lons = np.array([p[2] for p in points])
+        rows, distances = nearest_neighbor_lists(lats, lons, k=6, block_size=16)
+        expected = pairwise_haversine(lats, lons, lats, lons)
+        np.fill_diagonal(expected, np.inf)
+        np.testing.assert_allclose(distances, np.sort(expected, axis=1)[:, :6], atol=0.05)
+        np.testing.assert_allclose(expected[np.arange(len(points))[:, None], rows], distances, atol=0.05)
+
+        rows, distances = nearest_neighbor_lists([40.0, 40.001], [-74.0, -74.0], k=3)
+        self.assertEqual(rows.tolist(), [[1, -1, -1], [0, -1, -1]])
+        self.assertTrue(np.isinf(distances[:, 1:]).all())
+
+    def test_optimizer_uses_neighbor_lists(self):
+        """Test that routes planned with the neighbor lists match routes planned without them."""
+        points = _random_points(60, self.rng)
+        bins = [TrashBin(bin_id=b, location={'lat': lat, 'lon': lon}, capacity_gallons=100.0, current_fill_level_gallons=90.0)
+                for b, lat, lon in points]
+        service = self.open_service()
+        service.sync(bins + [TrashBin(bin_id="empty", location={'lat': 40.02, 'lon': -73.98}, capacity_gallons=100.0)])
+        trucks = [WasteCollectionTruck("t1", {'lat': 40.02, 'lon': -73.97}, 3000.0),
+                  WasteCollectionTruck("t2", {'lat': 40.03, 'lon': -73.99}, 3000.0)]
+        plain = optimize_routes(trucks, bins)
+        with mock.patch.object(service, 'candidate_lists', wraps=service.candidate_lists) as candidate_lists:
+            cached = optimize_routes(trucks, bins, distance_matrix=service)
+        candidate_lists.assert_called_once()
+        self.assertEqual([r.bin_ids for r in cached.routes], [r.bin_ids for r in plain.routes])
+        self.assertAlmostEqual(cached.total_distance_meters, plain.total_distance_meters, delta=1.0)
+
+        # Long routes take their local-search candidates from the lists as well
+        with mock.patch.object(route_optimizer, 'DENSE_ROUTE_LIMIT', 10):
+            long_routes = optimize_routes(trucks, bins, distance_matrix=service)
+        self.assertCountEqual([b for r in long_routes.routes for b in r.bin_ids], [p[0] for p in points])
+        self.assertLess(long_routes.total_distance_meters, long_routes.construction_distance_meters)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import datetime
+import unittest
+
+from waste_management import bin_manager
+from waste_management.fill_forecast import FillHistory, FillRateEstimator
+from waste_management.models import WasteCollectionTruck
+from waste_management.route_manager import _routes, generate_route, generate_routes
+
+HOUR = 3600.0
+
+def _iso(epoch):
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).isoformat()
+
+class TestFillHistory(unittest.TestCase):
+
+    def test_ring_buffer_keeps_latest_readings(self):
+        history = FillHistory(size=3)
+        self.assertEqual(history.readings(), [])
+        for i in range(5):
+            history.append(1000.0 + i, float(i))
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history.readings(), [(1002, 2.0), (1003, 3.0), (1004, 4.0)])
+        with self.assertRaises(ValueError):
+            FillHistory(size=0)
+
+class TestFillRateEstimator(unittest.TestCase):
+
+    def test_constant_rate_and_crossing(self):
+        estimator = FillRateEstimator()
+        for hour in range(5):
+            estimator.update(hour * HOUR, 5.0 * hour, 100.0)
+        self.assertAlmostEqual(estimator.rate_gallons_per_hour, 5.0)
+        # 20 gallons at hour 4; 80 gallons is 12 hours later
+        self.assertAlmostEqual(estimator.predict_crossing(100.0), 16 * HOUR)
+        self.assertAlmostEqual(estimator.projected_level(6 * HOUR, 100.0), 30.0)
+        self.assertEqual(estimator.projected_level(100 * HOUR, 100.0), 100.0)
+
+    def test_smoothing_weights_by_elapsed_time(self):
+        estimator = FillRateEstimator(smoothing_hours=10.0)
+        estimator.update(0.0, 0.0, 100.0)
+        estimator.update(HOUR, 2.0, 100.0)      # 2 gal/h
+        estimator.update(2 * HOUR, 12.0, 100.0) # 10 gal/h, blended with weight 1 - e^-0.1
+        self.assertAlmostEqual(estimator.rate_gallons_per_hour, 2.0 + 8.0 * 0.09516258, places=5)
+
+    def test_emptying_keeps_rate(self):
+        estimator = FillRateEstimator()
+        estimator.update(0.0, 0.0, 100.0)
+        estimator.update(HOUR, 10.0, 100.0)
+        estimator.update(2 * HOUR, 1.0, 100.0)  # Collected
+        self.assertAlmostEqual(estimator.rate_gallons_per_hour, 10.0)
+        self.assertAlmostEqual(estimator.predict_crossing(100.0), 2 * HOUR + 7.9 * HOUR)
+
+    def test_closely_spaced_readings_are_merged(self):
+        estimator = FillRateEstimator()
+        estimator.update(0.0, 0.0, 100.0)
+        estimator.update(1.0, 3.0, 100.0)  # One second later: no rate yet
+        self.assertIsNone(estimator.rate_gallons_per_hour)
+        estimator.update(HOUR, 6.0, 100.0)
+        self.assertAlmostEqual(estimator.rate_gallons_per_hour, 6.0)
+
+    def test_no_prediction_without_rate(self):
+        estimator = FillRateEstimator()
+        self.assertIsNone(estimator.predict_crossing(100.0))
+        estimator.update(0.0, 10.0, 100.0)
+        self.assertIsNone(estimator.predict_crossing(100.0))
+        estimator.update(HOUR, 85.0, 100.0)
+        self.assertEqual(estimator.predict_crossing(100.0), HOUR)  # Already past the threshold
+
+class TestFillForecastPlanning(unittest.TestCase):
+
+    def setUp(self):
+        _routes.clear()
+        bin_manager._reset_bins_data()
+        self.start = datetime.datetime.now(datetime.timezone.utc).timestamp()
+        bin_manager.add_bin("fast", {'lat': 40.0, 'lon': -74.0}, 100.0)
+        bin_manager.add_bin("slow", {'lat': 40.001, 'lon': -74.0}, 100.0)
+        bin_manager.add_bin("full", {'lat': 40.002, 'lon': -74.0}, 100.0)
+        # Readings one hour after the bins were installed (empty)
+        bin_manager.update_bins_bulk([("fast", 30.0), ("slow", 1.0), ("full", 90.0)], timestamp=_iso(self.start + HOUR))
+
+    def tearDown(self):
+        _routes.clear()
+        bin_manager._reset_bins_data()
+
+    def test_history_and_forecast_are_recorded(self):
+        history = bin_manager.get_fill_history("fast")
+        self.assertEqual([level for _, level in history], [0.0, 30.0])
+        forecast = bin_manager.get_fill_forecast("fast")
+        self.assertAlmostEqual(forecast['fill_rate_gallons_per_hour'], 30.0, places=1)
+        self.assertAlmostEqual(forecast['predicted_full_at'], self.start + HOUR + 50.0 / 30.0 * HOUR, delta=2.0)
+        self.assertIsNone(bin_manager.get_fill_forecast("missing"))
+
+    def test_bins_full_within_horizon(self):
+        ids = lambda bins: [b.bin_id for b in bins]
+        self.assertEqual(ids(bin_manager.list_bins_full_within(0, now=self.start)), ["full"])
+        self.assertEqual(ids(bin_manager.list_bins_full_within(12, now=self.start)), ["full", "fast"])
+        self.assertEqual(ids(bin_manager.list_bins_full_within(100, now=self.start)), ["full", "fast", "slow"])
+
+    def test_routes_plan_on_horizon(self):
+        self.assertEqual(generate_route("truck1").bin_ids_to_collect, ["full"])
+        self.assertEqual(sorted(generate_route("truck1", horizon_hours=12).bin_ids_to_collect), ["fast", "full"])
+
+        # Projected to the end of the horizon, "fast" holds a full 100 gallons
+        truck = WasteCollectionTruck("truck2", {'lat': 40.0, 'lon': -74.0}, capacity_gallons=150.0)
+        routes, unassigned = generate_routes([truck], horizon_hours=12)
+        self.assertEqual(routes[0].planned_load_gallons, 100.0)
+        self.assertEqual(len(unassigned), 1)
+
+if __name__ == '__main__':
+    unittest.main()
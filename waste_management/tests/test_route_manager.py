@@ -1,9 +1,10 @@
 import unittest
 import datetime
 
-from waste_management.models import CollectionRoute
+from waste_management.models import CollectionRoute, WasteCollectionTruck
 from waste_management.route_manager import (
     generate_route,
+    generate_routes,
     get_route,
     update_route_status,
     list_routes,
@@ -13,20 +14,20 @@ from waste_management.bin_manager import (
     add_bin as manager_add_bin, # Alias to avoid confusion if we had local add_bin
     update_bin_from_sensor_data as manager_update_bin,
     get_bin as manager_get_bin, # For verifying bin status after route completion
-    _bins as bin_manager_bins # For direct manipulation
+    _reset_bins_data as reset_bin_manager_data # For resetting bin state
 )
 
 class TestRouteManager(unittest.TestCase):
 
     def setUp(self):
-        """Clear the _routes and bin_manager_bins dictionaries before each test."""
+        """Clear the _routes dictionary and the bin_manager store before each test."""
         _routes.clear()
-        bin_manager_bins.clear()
+        reset_bin_manager_data()
 
     def tearDown(self):
-        """Clear the _routes and bin_manager_bins dictionaries after each test."""
+        """Clear the _routes dictionary and the bin_manager store after each test."""
         _routes.clear()
-        bin_manager_bins.clear()
+        reset_bin_manager_data()
 
     def test_generate_route_no_full_bins(self):
         """Test generating a route when no bins are 'FULL'."""
@@ -83,7 +84,7 @@ class TestRouteManager(unittest.TestCase):
         route1 = generate_route(assigned_truck_id="truck1")
 
         # Clear bins to generate a distinct route, or use different bins
-        bin_manager_bins.clear()
+        reset_bin_manager_data()
         manager_add_bin(bin_id="bin2", location={'lat': 20, 'lon': 20}, capacity_gallons=100)
         manager_update_bin(bin_id="bin2", new_fill_level=90.0)
         route2 = generate_route(assigned_truck_id="truck2")
@@ -101,7 +102,7 @@ class TestRouteManager(unittest.TestCase):
         route1 = generate_route(assigned_truck_id="truck1")
 
         # Route 2 - IN_PROGRESS
-        bin_manager_bins.clear()
+        reset_bin_manager_data()
         manager_add_bin(bin_id="bin2", location={'lat': 20, 'lon': 20}, capacity_gallons=100)
         manager_update_bin(bin_id="bin2", new_fill_level=90.0)
         route2 = generate_route(assigned_truck_id="truck2")
@@ -214,5 +215,58 @@ class TestRouteManager(unittest.TestCase):
         self.assertEqual(bin_not_on_route_after.status, 'FILLING', f"Bin {bin_not_on_route_id} status should be unaffected.")
         self.assertEqual(bin_not_on_route_after.current_fill_level_gallons, 70.0, f"Bin {bin_not_on_route_id} fill level should be unaffected.")
 
+    def test_generate_routes_for_multiple_trucks(self):
+        """Test planning capacity-constrained routes for several trucks."""
+        for i in range(6):
+            manager_add_bin(bin_id=f"bin{i}", location={'lat': 10 + 0.001 * i, 'lon': 10}, capacity_gallons=100)
+            manager_update_bin(bin_id=f"bin{i}", new_fill_level=90.0) # FULL
+        manager_add_bin(bin_id="not_full", location={'lat': 10, 'lon': 10}, capacity_gallons=100)
+
+        trucks = [
+            WasteCollectionTruck(truck_id="truck1", current_location={'lat': 10, 'lon': 10}, capacity_gallons=200),
+            WasteCollectionTruck(truck_id="truck2", current_location={'lat': 10, 'lon': 10}, capacity_gallons=200),
+        ]
+        routes, unassigned = generate_routes(trucks)
+        self.assertEqual([route.assigned_truck_id for route in routes], ["truck1", "truck2"])
+        self.assertEqual([len(route.bin_ids_to_collect) for route in routes], [2, 2])
+        self.assertEqual(len(unassigned), 2)
+        self.assertNotIn("not_full", unassigned)
+        for route in routes:
+            self.assertEqual(route.planned_load_gallons, 180.0)
+            self.assertGreater(route.estimated_distance_meters, 0)
+            self.assertIs(_routes[route.route_id], route)
+        # Nearest-neighbor construction starts with the bins closest to the trucks
+        self.assertEqual(routes[0].bin_ids_to_collect, ["bin0", "bin1"])
+
+    def test_optimize_api_plans_with_neighbor_lists(self):
+        """Test that the optimize endpoint keeps the app's neighbor lists current and plans with them."""
+        from unittest import mock
+        from waste_management import api
+        for i in range(6):
+            manager_add_bin(bin_id=f"bin{i}", location={'lat': 10 + 0.001 * i, 'lon': 10}, capacity_gallons=100)
+            manager_update_bin(bin_id=f"bin{i}", new_fill_level=90.0) # FULL
+        payload = {"trucks": [{"truck_id": "truck1", "current_location": {'lat': 10, 'lon': 10}, "capacity_gallons": 1000}]}
+        service = api._distance_matrix
+        with mock.patch.object(service, 'candidate_lists', wraps=service.candidate_lists) as candidate_lists:
+            response = api.app.test_client().post('/routes/optimize', json=payload)
+        self.assertEqual(response.status_code, 201)
+        candidate_lists.assert_called_once()
+        self.assertEqual(response.get_json()["routes"][0]["bin_ids_to_collect"], [f"bin{i}" for i in range(6)])
+        manager_add_bin(bin_id="late", location={'lat': 10, 'lon': 10.001}, capacity_gallons=100)
+        self.assertIn("late", service)  # Followed since the request
+
+    def test_generate_route_with_truck_respects_capacity(self):
+        """Test that passing truck details limits the route to the truck's remaining capacity."""
+        for i in range(3):
+            manager_add_bin(bin_id=f"bin{i}", location={'lat': 10, 'lon': 10 + 0.001 * i}, capacity_gallons=100)
+            manager_update_bin(bin_id=f"bin{i}", new_fill_level=90.0) # FULL
+        truck = WasteCollectionTruck(truck_id="truck1", current_location={'lat': 10, 'lon': 10},
+                                     capacity_gallons=300, current_load_gallons=100)
+        route = generate_route(assigned_truck_id="truck1", truck=truck)
+        self.assertEqual(len(route.bin_ids_to_collect), 2)
+
+        empty_truck = WasteCollectionTruck(truck_id="truck2", current_location={'lat': 10, 'lon': 10}, capacity_gallons=50)
+        self.assertIsNone(generate_route(assigned_truck_id="truck2", truck=empty_truck))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,132 @@
+import itertools
+import random
+import time
+import unittest
+from unittest import mock
+
+from waste_management.models import TrashBin, WasteCollectionTruck
+from waste_management import route_optimizer
+from waste_management.route_optimizer import haversine_matrix, optimize_routes
+from waste_management.spatial_index import haversine_meters
+
+def _random_bins(count, rng, fill=(80.0, 100.0)):
+    return [
+        TrashBin(bin_id=f"bin{i}", location={'lat': 40.0 + rng.uniform(0, 0.1), 'lon': -74.0 + rng.uniform(0, 0.1)},
+                 capacity_gallons=100.0, current_fill_level_gallons=rng.uniform(*fill))
+        for i in range(count)
+    ]
+
+def _route_length(start, bins_by_id, bin_ids, return_to_depot=True):
+    stops = [start] + [(bins_by_id[b].location['lat'], bins_by_id[b].location['lon']) for b in bin_ids]
+    if return_to_depot:
+        stops.append(start)
+    return sum(haversine_meters(*a, *b) for a, b in zip(stops, stops[1:]))
+
+class TestRouteOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(11)
+        self.depot = {'lat': 40.05, 'lon': -73.95}
+
+    def test_haversine_matrix_matches_scalar(self):
+        """Test that the vectorized distance matrix matches haversine_meters."""
+        lats, lons = [40.0, 40.01, 41.0], [-74.0, -74.02, -73.5]
+        matrix = haversine_matrix(lats, lons)
+        for i, j in itertools.product(range(3), repeat=2):
+            self.assertAlmostEqual(matrix[i, j], haversine_meters(lats[i], lons[i], lats[j], lons[j]), places=3)
+
+    def test_routes_respect_capacity_and_cover_bins(self):
+        """Test that every bin is assigned once and no truck is loaded past its remaining capacity."""
+        bins = _random_bins(200, self.rng)
+        trucks = [WasteCollectionTruck(f"truck{i}", self.depot, capacity_gallons=2000.0, current_load_gallons=100.0 * i)
+                  for i in range(12)]
+        plan = optimize_routes(trucks, bins)
+        assigned = [bin_id for route in plan.routes for bin_id in route.bin_ids]
+        self.assertEqual(len(assigned), len(set(assigned)))
+        self.assertCountEqual(assigned + plan.unassigned_bin_ids, [b.bin_id for b in bins])
+
+        fill = {b.bin_id: b.current_fill_level_gallons for b in bins}
+        capacity = {t.truck_id: t.capacity_gallons - t.current_load_gallons for t in trucks}
+        for route in plan.routes:
+            self.assertAlmostEqual(route.load_gallons, sum(fill[b] for b in route.bin_ids))
+            self.assertLessEqual(route.load_gallons, capacity[route.truck_id])
+
+    def test_bins_exceeding_fleet_capacity_are_unassigned(self):
+        """Test that bins that fit in no truck are reported as unassigned."""
+        bins = _random_bins(10, self.rng, fill=(90.0, 95.0))
+        plan = optimize_routes([WasteCollectionTruck("small", self.depot, capacity_gallons=200.0)], bins)
+        self.assertEqual(len(plan.routes[0].bin_ids), 2)
+        self.assertEqual(len(plan.unassigned_bin_ids), 8)
+        self.assertEqual(optimize_routes([WasteCollectionTruck("tiny", self.depot, 50.0)], bins).routes, [])
+
+    def test_local_search_shortens_routes(self):
+        """Test that reported distances are accurate and local search never lengthens a route."""
+        bins = _random_bins(150, self.rng)
+        bins_by_id = {b.bin_id: b for b in bins}
+        start = (self.depot['lat'], self.depot['lon'])
+        trucks = [WasteCollectionTruck(f"truck{i}", self.depot, capacity_gallons=5000.0) for i in range(3)]
+        plan = optimize_routes(trucks, bins)
+        self.assertLessEqual(plan.total_distance_meters, plan.construction_distance_meters)
+        self.assertFalse(plan.budget_exhausted)
+        for route in plan.routes:
+            self.assertAlmostEqual(route.distance_meters, _route_length(start, bins_by_id, route.bin_ids), delta=0.01)
+
+    def test_small_route_is_near_optimal(self):
+        """Test that a small single-truck route is within a few percent of the brute-force optimum."""
+        bins = _random_bins(7, self.rng)
+        bins_by_id = {b.bin_id: b for b in bins}
+        start = (self.depot['lat'], self.depot['lon'])
+        plan = optimize_routes([WasteCollectionTruck("truck", self.depot, capacity_gallons=1000.0)], bins)
+        optimum = min(_route_length(start, bins_by_id, order) for order in itertools.permutations(bins_by_id))
+        self.assertLessEqual(plan.total_distance_meters, optimum * 1.05)
+
+    def test_open_routes_and_custom_distance(self):
+        """Test open routes (no return to depot) and a pluggable distance function."""
+        bins = _random_bins(30, self.rng)
+        bins_by_id = {b.bin_id: b for b in bins}
+        start = (self.depot['lat'], self.depot['lon'])
+        truck = WasteCollectionTruck("truck", self.depot, capacity_gallons=5000.0)
+
+        open_plan = optimize_routes([truck], bins, return_to_depot=False)
+        self.assertAlmostEqual(open_plan.total_distance_meters,
+                               _route_length(start, bins_by_id, open_plan.routes[0].bin_ids, return_to_depot=False), delta=0.01)
+
+        calls = []
+        def manhattan(lat1, lon1, lat2, lon2):
+            calls.append(1)
+            return abs(lat1 - lat2) + abs(lon1 - lon2)
+        plan = optimize_routes([truck], bins, distance_fn=manhattan)
+        self.assertTrue(calls)
+        self.assertLess(plan.total_distance_meters, 10.0)  # Measured in degrees by the custom function
+
+    def test_long_routes_use_candidate_lists(self):
+        """Test that routes above the dense-matrix limit are still shortened and measured exactly."""
+        bins = _random_bins(300, self.rng)
+        bins_by_id = {b.bin_id: b for b in bins}
+        start = (self.depot['lat'], self.depot['lon'])
+        for return_to_depot in (True, False):
+            with mock.patch.object(route_optimizer, 'DENSE_ROUTE_LIMIT', 50):
+                plan = optimize_routes([WasteCollectionTruck("truck", self.depot, capacity_gallons=1e6)], bins,
+                                       return_to_depot=return_to_depot)
+            route = plan.routes[0]
+            self.assertCountEqual(route.bin_ids, bins_by_id)
+            self.assertFalse(plan.budget_exhausted)
+            self.assertLess(plan.total_distance_meters, plan.construction_distance_meters)
+            self.assertAlmostEqual(route.distance_meters,
+                                   _route_length(start, bins_by_id, route.bin_ids, return_to_depot), delta=0.01)
+
+    def test_budget_interrupts_a_single_route(self):
+        """Test that the time budget stops local search in the middle of one long route."""
+        bins = _random_bins(2000, self.rng)
+        truck = WasteCollectionTruck("truck", self.depot, capacity_gallons=1e6)
+        for limit in (route_optimizer.DENSE_ROUTE_LIMIT, 10_000):
+            with mock.patch.object(route_optimizer, 'DENSE_ROUTE_LIMIT', limit):
+                started = time.perf_counter()
+                plan = optimize_routes([truck], bins, time_budget_seconds=0.2)
+                elapsed = time.perf_counter() - started
+            self.assertTrue(plan.budget_exhausted)
+            self.assertEqual(len(plan.routes[0].bin_ids), 2000)
+            self.assertLess(elapsed, 2.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import random
+import unittest
+
+from waste_management.spatial_index import GridSpatialIndex, haversine_meters
+
+class TestHaversine(unittest.TestCase):
+
+    def test_zero_distance(self):
+        """Test that a point is at distance zero from itself."""
+        self.assertEqual(haversine_meters(40.0, -74.0, 40.0, -74.0), 0.0)
+
+    def test_one_degree_of_latitude(self):
+        """Test the distance spanned by one degree of latitude."""
+        self.assertAlmostEqual(haversine_meters(0.0, 0.0, 1.0, 0.0), 111_195.0, delta=1.0)
+
+class TestGridSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Create an index with a handful of points around Manhattan."""
+        self.index = GridSpatialIndex(cell_size_degrees=0.01)
+        self.index.insert("a", 40.7128, -74.0060)
+        self.index.insert("b", 40.7138, -74.0060)  # ~111 m north of a
+        self.index.insert("c", 40.7300, -74.0060)  # ~1.9 km north of a
+        self.index.insert("d", 34.0522, -118.2437)  # Los Angeles
+
+    def test_invalid_cell_size(self):
+        """Test that a non-positive cell size is rejected."""
+        with self.assertRaises(ValueError):
+            GridSpatialIndex(cell_size_degrees=0)
+
+    def test_query_radius(self):
+        """Test that a radius query returns matching points, nearest first."""
+        results = self.index.query_radius(40.7128, -74.0060, 500)
+        self.assertEqual([item_id for _, item_id in results], ["a", "b"])
+        self.assertAlmostEqual(results[1][0], 111.2, delta=1.0)
+
+        self.assertEqual([item_id for _, item_id in self.index.query_radius(40.7128, -74.0060, 5000)], ["a", "b", "c"])
+        self.assertEqual(self.index.query_radius(0.0, 0.0, 1000), [])
+
+    def test_query_bbox(self):
+        """Test that a bounding box query returns the points inside it."""
+        self.assertCountEqual(self.index.query_bbox(40.70, -74.01, 40.72, -74.00), ["a", "b"])
+        self.assertCountEqual(self.index.query_bbox(30.0, -120.0, 45.0, -70.0), ["a", "b", "c", "d"])
+        self.assertEqual(self.index.query_bbox(40.72, -74.01, 40.70, -74.00), [])  # Inverted box
+
+    def test_nearest(self):
+        """Test nearest-point queries, with and without a filter, against a brute-force scan."""
+        distance, item_id = self.index.nearest(40.7129, -74.0060)
+        self.assertEqual(item_id, "a")
+        self.assertAlmostEqual(distance, 11.1, delta=0.5)
+        self.assertEqual(self.index.nearest(40.7129, -74.0060, lambda i: i not in ("a", "b"))[1], "c")
+        self.assertEqual(self.index.nearest(35.0, -118.0)[1], "d")  # Far from every occupied cell
+        self.assertIsNone(self.index.nearest(40.7129, -74.0060, lambda i: False))
+        self.assertIsNone(GridSpatialIndex().nearest(0.0, 0.0))
+
+        random_index = GridSpatialIndex(cell_size_degrees=0.005)
+        rng = random.Random(7)
+        points = {f"p{i}": (40.0 + rng.uniform(0, 0.1), -74.0 + rng.uniform(0, 0.1)) for i in range(500)}
+        for item_id, (lat, lon) in points.items():
+            random_index.insert(item_id, lat, lon)
+        for _ in range(50):
+            lat, lon = 40.0 + rng.uniform(-0.05, 0.15), -74.0 + rng.uniform(-0.05, 0.15)
+            expected = min(haversine_meters(lat, lon, *point) for point in points.values())
+            self.assertAlmostEqual(random_index.nearest(lat, lon)[0], expected, places=3)
+
+    def test_insert_existing_moves_point(self):
+        """Test that re-inserting an ID moves it instead of duplicating it."""
+        self.index.insert("a", 34.0523, -118.2437)
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.position("a"), (34.0523, -118.2437))
+        self.assertCountEqual([i for _, i in self.index.query_radius(34.0522, -118.2437, 100)], ["a", "d"])
+        self.assertEqual([i for _, i in self.index.query_radius(40.7128, -74.0060, 500)], ["b"])
+
+    def test_remove_and_clear(self):
+        """Test removing single points and clearing the index."""
+        self.assertTrue(self.index.remove("b"))
+        self.assertFalse(self.index.remove("b"))
+        self.assertNotIn("b", self.index)
+        self.assertEqual([i for _, i in self.index.query_radius(40.7128, -74.0060, 500)], ["a"])
+
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.query_bbox(-90, -180, 90, 180), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from waste_management import bin_manager, route_manager
+from waste_management.models import WasteCollectionTruck
+from waste_management.storage import BIN_RECORD, SQLiteStorage
+
+class TestManagersWithStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "waste.db")
+        bin_manager._reset_bins_data()
+        route_manager._routes.clear()
+
+    def tearDown(self):
+        bin_manager._reset_bins_data()
+        route_manager.attach_storage(None)
+
+    def attach(self):
+        backend = SQLiteStorage(self.path)
+        self.addCleanup(backend.close)
+        return bin_manager.attach_storage(backend), route_manager.attach_storage(backend), backend
+
+    def test_state_survives_restart(self):
+        self.attach()
+        bin_manager.add_bin("b1", {'lat': 40.0, 'lon': -74.0}, 100.0)
+        bin_manager.add_bin("b2", {'lat': 40.001, 'lon': -74.0}, 100.0)
+        bin_manager.update_bins_bulk([("b1", 90.0), ("b2", 85.0)])
+        truck = WasteCollectionTruck("t1", {'lat': 40.0, 'lon': -74.0}, 500.0)
+        routes, _ = route_manager.generate_routes([truck])
+        route_manager.update_route_status(routes[0].route_id, 'COMPLETED')
+
+        bins_loaded, routes_loaded, _ = self.attach()  # A fresh process attaching the same database
+        self.assertEqual((bins_loaded, routes_loaded), (2, 1))
+        self.assertEqual([b.bin_id for b in bin_manager.list_bins()], ["b1", "b2"])
+        self.assertEqual(bin_manager.get_bin("b1").current_fill_level_gallons, 0.0)
+        self.assertEqual(bin_manager.list_bins(status_filter='EMPTY')[0].bin_id, "b1")
+        self.assertEqual(bin_manager.bins_within_radius(40.0, -74.0, 50)[0].bin_id, "b1")
+        self.assertEqual(route_manager.get_route(routes[0].route_id).status, 'COMPLETED')
+
+    def test_reads_fall_through_to_storage(self):
+        _, _, backend = self.attach()
+        other_process = SQLiteStorage(self.path)
+        self.addCleanup(other_process.close)
+        other_process.put(BIN_RECORD, "remote", {
+            "bin_id": "remote", "location": {'lat': 1.0, 'lon': 2.0}, "capacity_gallons": 50.0,
+            "current_fill_level_gallons": 45.0, "last_updated": "2024-01-01T00:00:00+00:00", "status": "FULL"})
+        self.assertIsNone(bin_manager._bins.get("remote"))
+        self.assertEqual(bin_manager.get_bin("remote").status, "FULL")
+        self.assertEqual([b.bin_id for b in bin_manager.list_bins(status_filter='FULL')], ["remote"])
+        with self.assertRaises(ValueError):
+            bin_manager.add_bin("remote", {'lat': 0.0, 'lon': 0.0}, 10.0)
+
+    def test_sync_applies_other_processes_changes(self):
+        self.attach()
+        bin_manager.add_bin("b1", {'lat': 40.0, 'lon': -74.0}, 100.0)
+        other_process = SQLiteStorage(self.path)
+        self.addCleanup(other_process.close)
+        record = dict(other_process.get(BIN_RECORD, "b1"), current_fill_level_gallons=95.0, status="FULL", version=1)
+        other_process.put(BIN_RECORD, "b1", record)
+        self.assertEqual(bin_manager.get_bin("b1").status, "EMPTY")  # Cached until synced
+        self.assertEqual(bin_manager.sync_storage(), 1)
+        self.assertEqual(bin_manager.get_bin("b1").current_fill_level_gallons, 95.0)
+        self.assertEqual([b.bin_id for b in bin_manager.list_bins(status_filter='FULL')], ["b1"])
+        self.assertEqual(bin_manager.sync_storage(), 0)
+
+if __name__ == '__main__':
+    unittest.main()